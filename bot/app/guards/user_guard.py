@@ -6,11 +6,10 @@ from urllib.parse import urlparse
 from aiogram.types import CallbackQuery, Message
 
 from shared.config import settings
-from shared.db import get_async_session
 from shared.enums import UserStatus
 
 from bot.app.keyboards.main import main_menu_kb
-from bot.app.repository.users import UserRepository
+from bot.app.services.user_principals import get_user_principal
 
 _logger = logging.getLogger(__name__)
 
@@ -39,14 +38,14 @@ async def ensure_registered_or_reply(event: Message | CallbackQuery):
     - first lookup is without any filters (no is_deleted/approved)
     - only if not found -> 'Вы не зарегистрированы'
     - DB exceptions are logged and shown as server error (not 'not registered')
+
+    Returns a cached ``UserPrincipal`` snapshot (not a session-bound ``User``).
     """
 
     tg_id = extract_tg_id(event)
 
     try:
-        async with get_async_session() as session:
-            repo = UserRepository(session)
-            user = await repo.get_by_tg_id_any(tg_id)
+        user = await get_user_principal(tg_id)
     except Exception:
         _logger.exception("ensure_registered db error", extra={"tg_id": tg_id, "dsn": _safe_dsn_parts(settings.DATABASE_URL or "")})
         if isinstance(event, Message):
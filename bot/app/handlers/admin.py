@@ -9,8 +9,7 @@ from bot.app.repository.admin_actions import AdminActionRepository
 from bot.app.services.jwt_links import create_admin_jwt, create_manager_jwt
 from shared.config import settings
 import logging
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
+from shared.services.bot_clients import get_bot
 from bot.app.utils.bot_commands import sync_commands_for_chat
 from shared.permissions import role_flags
 from bot.app.utils.access import is_admin_or_manager
@@ -103,7 +102,7 @@ async def cb_approve(call: CallbackQuery):
         await arepo.log(call.from_user.id, user.id, AdminActionType.APPROVE, None)
     # notify user
     try:
-        bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+        bot = get_bot()
         await bot.send_message(user.tg_id, "Ваша заявка подтверждена. Доступен профиль в боте.")
         try:
             await sync_commands_for_chat(
@@ -116,7 +115,6 @@ async def cb_approve(call: CallbackQuery):
             )
         except Exception:
             pass
-        await bot.session.close()
     except Exception:
         pass
     await call.message.edit_text(call.message.text + "\n\n✅ Подтвержден")
@@ -142,7 +140,7 @@ async def cb_reject(call: CallbackQuery):
         await arepo.log(call.from_user.id, user.id, AdminActionType.REJECT, None)
     # notify user
     try:
-        bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+        bot = get_bot()
         await bot.send_message(user.tg_id, "Ваша заявка отклонена. Дальнейшее использование бота ограничено.")
         try:
             await sync_commands_for_chat(
@@ -155,7 +153,6 @@ async def cb_reject(call: CallbackQuery):
             )
         except Exception:
             pass
-        await bot.session.close()
     except Exception:
         pass
     await call.message.edit_text(call.message.text + "\n\n❌ Отклонен (в черном списке)")
@@ -1,5 +1,4 @@
 import logging
-import asyncio
 from pathlib import Path
 from uuid import uuid4
 
@@ -9,13 +8,14 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.types import FSInputFile
 from aiogram.fsm.context import FSMContext
 from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
 from datetime import datetime
 
 from shared.config import settings
 from shared.db import get_async_session
 from shared.enums import UserStatus, PurchaseStatus
 from shared.models import PurchaseEvent
+from shared.services.background_tasks import spawn_background
+from shared.services.bot_clients import get_bot
 from shared.utils import format_date, format_moscow, utc_now
 from bot.app.utils.telegram import send_html
 from bot.app.guards.user_guard import ensure_registered_or_reply
@@ -150,48 +150,45 @@ async def _send_purchase_status_to_purchases_chat(*, user, purchase) -> None:
             return
         u2 = await urepo.get_by_id(int(getattr(p2, "user_id", 0) or 0))
 
-        bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-        try:
-            text = purchases_chat_message_text(user=u2, purchase=p2)
-            kb = purchases_workflow_kb(purchase_id=int(p2.id), status=getattr(p2, "status", PurchaseStatus.NEW))
-
-            tg_file_id = str(getattr(p2, "tg_photo_file_id", None) or getattr(p2, "photo_file_id", None) or "").strip()
-            photo_path = str(getattr(p2, "photo_path", None) or "").strip()
-            photo_url = str(getattr(p2, "photo_url", None) or "").strip()
-
-            caption, extra_text = _purchase_caption_safe(str(text))
-
-            if tg_file_id:
-                sent = await bot.send_photo(chat_id=chat_id, photo=tg_file_id, caption=caption, reply_markup=kb)
-                if extra_text:
-                    await bot.send_message(chat_id=chat_id, text=extra_text)
-            elif photo_path:
-                # photo_path stored as /crm/static/uploads/...
-                rel = str(photo_path).replace("/crm/static/uploads/", "").lstrip("/")
-                fs_path = (Path(__file__).resolve().parents[3] / "web" / "app" / "static" / "uploads" / rel)
-                sent = await bot.send_photo(chat_id=chat_id, photo=FSInputFile(str(fs_path)), caption=caption, reply_markup=kb)
-                if extra_text:
-                    await bot.send_message(chat_id=chat_id, text=extra_text)
-            elif photo_url:
-                sent = await bot.send_photo(chat_id=chat_id, photo=photo_url, caption=caption, reply_markup=kb)
-                if extra_text:
-                    await bot.send_message(chat_id=chat_id, text=extra_text)
-            else:
-                sent = await bot.send_message(chat_id=chat_id, text=text, reply_markup=kb)
+        bot = get_bot()
+        text = purchases_chat_message_text(user=u2, purchase=p2)
+        kb = purchases_workflow_kb(purchase_id=int(p2.id), status=getattr(p2, "status", PurchaseStatus.NEW))
+
+        tg_file_id = str(getattr(p2, "tg_photo_file_id", None) or getattr(p2, "photo_file_id", None) or "").strip()
+        photo_path = str(getattr(p2, "photo_path", None) or "").strip()
+        photo_url = str(getattr(p2, "photo_url", None) or "").strip()
+
+        caption, extra_text = _purchase_caption_safe(str(text))
+
+        if tg_file_id:
+            sent = await bot.send_photo(chat_id=chat_id, photo=tg_file_id, caption=caption, reply_markup=kb)
+            if extra_text:
+                await bot.send_message(chat_id=chat_id, text=extra_text)
+        elif photo_path:
+            # photo_path stored as /crm/static/uploads/...
+            rel = str(photo_path).replace("/crm/static/uploads/", "").lstrip("/")
+            fs_path = (Path(__file__).resolve().parents[3] / "web" / "app" / "static" / "uploads" / rel)
+            sent = await bot.send_photo(chat_id=chat_id, photo=FSInputFile(str(fs_path)), caption=caption, reply_markup=kb)
+            if extra_text:
+                await bot.send_message(chat_id=chat_id, text=extra_text)
+        elif photo_url:
+            sent = await bot.send_photo(chat_id=chat_id, photo=photo_url, caption=caption, reply_markup=kb)
+            if extra_text:
+                await bot.send_message(chat_id=chat_id, text=extra_text)
+        else:
+            sent = await bot.send_message(chat_id=chat_id, text=text, reply_markup=kb)
 
-            try:
-                await prepo.update_tg_message_link(
-                    purchase_id=int(p2.id),
-                    tg_chat_id=int(chat_id),
-                    tg_message_id=int(getattr(sent, "message_id", 0) or 0),
-                )
-            except Exception:
-                logging.getLogger(__name__).exception(
-                    "failed to save purchase tg message link",
-                    extra={"purchase_id": int(p2.id)},
-                )
-        finally:
-            await bot.session.close()
+        try:
+            await prepo.update_tg_message_link(
+                purchase_id=int(p2.id),
+                tg_chat_id=int(chat_id),
+                tg_message_id=int(getattr(sent, "message_id", 0) or 0),
+            )
+        except Exception:
+            logging.getLogger(__name__).exception(
+                "failed to save purchase tg message link",
+                extra={"purchase_id": int(p2.id)},
+            )
 
 
 def _purchase_status_suffix(status: PurchaseStatus) -> str:
@@ -282,7 +279,7 @@ async def _notify_admins_about_purchase(user, purchase) -> None:
         if pid > 0:
             await enqueue_purchase_notify(purchase_id=int(pid))
             try:
-                asyncio.create_task(telegram_outbox_job())
+                await spawn_background("outbox_nudge", telegram_outbox_job, name="telegram_outbox_job")
             except Exception:
                 pass
     except Exception:
@@ -324,11 +321,8 @@ async def _notify_purchase_creator_status(*, purchase_id: int) -> None:
     else:
         return
 
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-    try:
-        await bot.send_message(chat_id=tg_id, text=body)
-    finally:
-        await bot.session.close()
+    bot = get_bot()
+    await bot.send_message(chat_id=tg_id, text=body)
 
 
 @router.message(F.text.in_({"Закупки", "🛒 Закупки"}))
@@ -462,13 +456,10 @@ async def purchases_receive_input(message: Message, state: FSMContext):
     user = None
     purchase = None
     try:
-        bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+        bot = get_bot()
         downloaded = None
-        try:
-            if photo_file_id:
-                downloaded = await _download_tg_photo_to_uploads(bot=bot, tg_file_id=str(photo_file_id))
-        finally:
-            await bot.session.close()
+        if photo_file_id:
+            downloaded = await _download_tg_photo_to_uploads(bot=bot, tg_file_id=str(photo_file_id))
 
         photo_key = downloaded[0] if downloaded else None
         photo_path = downloaded[1] if downloaded else None
@@ -504,7 +495,7 @@ async def purchases_receive_input(message: Message, state: FSMContext):
         try:
             await enqueue_purchase_notify(purchase_id=int(purchase.id))
             try:
-                asyncio.create_task(telegram_outbox_job())
+                await spawn_background("outbox_nudge", telegram_outbox_job, name="telegram_outbox_job")
             except Exception:
                 pass
         except Exception:
@@ -551,13 +542,10 @@ async def purchases_receive_text_after_photo(message: Message, state: FSMContext
     user = None
     purchase = None
     try:
-        bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+        bot = get_bot()
         downloaded = None
-        try:
-            if stored_photo:
-                downloaded = await _download_tg_photo_to_uploads(bot=bot, tg_file_id=str(stored_photo))
-        finally:
-            await bot.session.close()
+        if stored_photo:
+            downloaded = await _download_tg_photo_to_uploads(bot=bot, tg_file_id=str(stored_photo))
 
         photo_key = downloaded[0] if downloaded else None
         photo_path = downloaded[1] if downloaded else None
@@ -592,7 +580,7 @@ async def purchases_receive_text_after_photo(message: Message, state: FSMContext
         try:
             await enqueue_purchase_notify(purchase_id=int(purchase.id))
             try:
-                asyncio.create_task(telegram_outbox_job())
+                await spawn_background("outbox_nudge", telegram_outbox_job, name="telegram_outbox_job")
             except Exception:
                 pass
         except Exception:
@@ -690,7 +678,7 @@ async def purchases_admin_actions(cb: CallbackQuery):
         try:
             await enqueue_purchase_notify(purchase_id=int(purchase_id))
             try:
-                asyncio.create_task(telegram_outbox_job())
+                await spawn_background("outbox_nudge", telegram_outbox_job, name="telegram_outbox_job")
             except Exception:
                 pass
         except Exception:
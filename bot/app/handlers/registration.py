@@ -375,11 +375,10 @@ async def reg_position_cb(cb: CallbackQuery, state: FSMContext):
 
     # notify admins
     from shared.config import settings
-    from aiogram import Bot
-    from aiogram.client.default import DefaultBotProperties
+    from shared.services.bot_clients import get_bot
     from bot.app.keyboards.inline import approve_reject_kb
 
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+    bot = get_bot()
     bd = format_date(user.birth_date)
     rate = f"{user.rate_k} ₽" if user.rate_k is not None else ''
     text = (
@@ -398,7 +397,6 @@ async def reg_position_cb(cb: CallbackQuery, state: FSMContext):
             logging.getLogger(__name__).debug("sent application to admin", extra={"tg_id": cb.from_user.id, "admin_tg_id": admin_id})
         except Exception:
             logging.getLogger(__name__).exception("failed to notify admin", extra={"tg_id": cb.from_user.id, "admin_tg_id": admin_id})
-    await bot.session.close()
 
 
 @router.message(F.text.in_({"Профиль", "🧾 Профиль"}))
@@ -14,7 +14,6 @@ from shared.db import get_async_session
 from shared.enums import UserStatus, Position
 from bot.app.keyboards.main import main_menu_kb
 from bot.app.keyboards.reports_reminders import rr_menu_kb, rr_report_kb, rr_period_presets_kb, rr_settings_kb
-from bot.app.repository.users import UserRepository
 from bot.app.repository.reminders_settings import ReminderSettingsRepository
 from bot.app.services.stocks_reports import build_report
 from bot.app.services.stocks_reports_format import format_report_html
@@ -24,6 +23,7 @@ from bot.app.utils.telegram import edit_html, edit_html_by_id_from_message
 from bot.app.utils.datetime_fmt import format_date_ru
 from shared.permissions import can_access_reports
 from bot.app.guards.user_guard import ensure_registered_or_reply
+from bot.app.services.user_principals import get_active_user_principal
 from shared.permissions import role_flags
 
 
@@ -43,9 +43,7 @@ def _is_admin(tg_id: int) -> bool:
 
 
 async def _get_user(tg_id: int):
-    async with get_async_session() as session:
-        urepo = UserRepository(session)
-        return await urepo.get_by_tg_id(tg_id)
+    return await get_active_user_principal(tg_id)
 
 
 def _can_manage(user) -> bool:
@@ -7,8 +7,6 @@ from datetime import time as dtime
 
 from aiogram import Router, F
 from aiogram.filters import Command
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 
@@ -30,6 +28,7 @@ from shared.models import WorkShiftDay, User, ShiftInstance
 from shared.enums import ShiftInstanceStatus
 from shared.utils import MOSCOW_TZ
 from shared.utils import utc_now
+from shared.services.bot_clients import get_bot
 from shared.services.shifts_service import get_shifts_for_date
 from bot.app.utils.access import is_admin_or_manager
 
@@ -76,52 +75,49 @@ async def _notify_shift_if_due_after_commit(*, user_id: int, day, start_time: dt
             if wsd is None:
                 return
 
-            bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-            try:
-                iso_day = str(day)
-
-                if now_msk >= end_dt:
-                    if getattr(wsd, "end_notified_at", None) is not None:
-                        return
-                    text = (
-                        f"🏁 <b>Смена по графику закончилась</b>\n\n"
-                        f"Конец по графику: <b>{end_time.strftime('%H:%M')}</b>.\n"
-                        f"Завершить смену?"
-                    )
-                    kb = {
-                        "inline_keyboard": [
-                            [{"text": "✅ Завершить", "callback_data": f"shift:close_by_day:{iso_day}"}],
-                            [{"text": "⏰ Ещё работаю", "callback_data": f"shift:end_snooze:{iso_day}"}],
-                            [{"text": "📅 Меню графика", "callback_data": "sched_menu:open"}],
-                        ]
-                    }
-                    await bot.send_message(chat_id=chat_id, text=text, reply_markup=kb)
-                    wsd.end_notified_at = utc_now()
-                    wsd.end_snooze_until = None
-                    wsd.end_followup_notified_at = None
-                    await session.flush()
+            bot = get_bot()
+            iso_day = str(day)
+
+            if now_msk >= end_dt:
+                if getattr(wsd, "end_notified_at", None) is not None:
                     return
+                text = (
+                    f"🏁 <b>Смена по графику закончилась</b>\n\n"
+                    f"Конец по графику: <b>{end_time.strftime('%H:%M')}</b>.\n"
+                    f"Завершить смену?"
+                )
+                kb = {
+                    "inline_keyboard": [
+                        [{"text": "✅ Завершить", "callback_data": f"shift:close_by_day:{iso_day}"}],
+                        [{"text": "⏰ Ещё работаю", "callback_data": f"shift:end_snooze:{iso_day}"}],
+                        [{"text": "📅 Меню графика", "callback_data": "sched_menu:open"}],
+                    ]
+                }
+                await bot.send_message(chat_id=chat_id, text=text, reply_markup=kb)
+                wsd.end_notified_at = utc_now()
+                wsd.end_snooze_until = None
+                wsd.end_followup_notified_at = None
+                await session.flush()
+                return
 
-                if now_msk >= start_dt:
-                    if getattr(wsd, "start_notified_at", None) is not None:
-                        return
-                    hrs = format_hours_from_times_int(start_time=start_time, end_time=end_time)
-                    text = (
-                        f"⏰ <b>Начало смены</b>\n\n"
-                        f"Сегодня у тебя смена: <b>{start_time.strftime('%H:%M')}–{end_time.strftime('%H:%M')}</b> ({hrs} часов).\n"
-                        f"Начать смену?"
-                    )
-                    kb = {
-                        "inline_keyboard": [
-                            [{"text": "✅ Начать", "callback_data": f"shift:start:{iso_day}"}],
-                            [{"text": "📅 Меню графика", "callback_data": "sched_menu:open"}],
-                        ]
-                    }
-                    await bot.send_message(chat_id=chat_id, text=text, reply_markup=kb)
-                    wsd.start_notified_at = utc_now()
-                    await session.flush()
-            finally:
-                await bot.session.close()
+            if now_msk >= start_dt:
+                if getattr(wsd, "start_notified_at", None) is not None:
+                    return
+                hrs = format_hours_from_times_int(start_time=start_time, end_time=end_time)
+                text = (
+                    f"⏰ <b>Начало смены</b>\n\n"
+                    f"Сегодня у тебя смена: <b>{start_time.strftime('%H:%M')}–{end_time.strftime('%H:%M')}</b> ({hrs} часов).\n"
+                    f"Начать смену?"
+                )
+                kb = {
+                    "inline_keyboard": [
+                        [{"text": "✅ Начать", "callback_data": f"shift:start:{iso_day}"}],
+                        [{"text": "📅 Меню графика", "callback_data": "sched_menu:open"}],
+                    ]
+                }
+                await bot.send_message(chat_id=chat_id, text=text, reply_markup=kb)
+                wsd.start_notified_at = utc_now()
+                await session.flush()
     except Exception:
         _logger.exception("failed to send immediate shift notification")
 
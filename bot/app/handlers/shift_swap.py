@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
@@ -15,6 +15,7 @@ from shared.enums import UserStatus, Position, ShiftInstanceStatus, ShiftSwapReq
 from shared.permissions import role_flags
 from shared.utils import MOSCOW_TZ, utc_now
 from shared.models import User, WorkShiftDay, ShiftInstance, ShiftSwapRequest
+from shared.services.shift_swap_candidates import enqueue_swap_offers, plan_swap_waves, rank_swap_candidates
 
 from bot.app.guards.user_guard import ensure_registered_or_reply
 from bot.app.states.shift_swap import ShiftSwapCreateState
@@ -73,14 +74,15 @@ def _kb_confirm(day: str) -> InlineKeyboardMarkup:
     )
 
 
-def _kb_call_to_colleagues(*, req_id: int, day: str, web_link: str) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Я выйду на замену", callback_data=f"swap:accept:{req_id}")],
-            [InlineKeyboardButton(text="❌ Не могу", callback_data=f"swap:decline:{req_id}")],
-            [InlineKeyboardButton(text="🔗 Открыть график", url=web_link)],
+def _kb_call_to_colleagues(*, req_id: int, day: str, web_link: str) -> dict:
+    # Plain dict: the offer is queued in telegram_outbox and rendered by the bot's outbox worker.
+    return {
+        "inline_keyboard": [
+            [{"text": "✅ Я выйду на замену", "callback_data": f"swap:accept:{req_id}"}],
+            [{"text": "❌ Не могу", "callback_data": f"swap:decline:{req_id}"}],
+            [{"text": "🔗 Открыть график", "url": web_link}],
         ]
-    )
+    }
 
 
 def _is_manager_or_admin(user: User, tg_id: int) -> bool:
@@ -326,46 +328,47 @@ async def swap_send(cb: CallbackQuery, state: FSMContext):
         )
         web_link = url
 
-        # recipients: all approved staff except managers/admins and except requester
-        res = await session.execute(
-            select(User).where(User.status == UserStatus.APPROVED).where(User.is_deleted == False)
+        bonus_txt = "без доплаты" if not req.bonus_amount else f"+{int(req.bonus_amount)} ₽"
+        hours_txt = f"{int(req.planned_hours)}ч" if req.planned_hours else ""
+
+        who = (" ".join([str(user.first_name or "").strip(), str(user.last_name or "").strip()]).strip()) or f"User #{int(user.id)}"
+        txt = (
+            f"🆘 <b>Нужна замена на смену</b>\n\n"
+            f"Кто: <b>{esc(who)}</b>\n"
+            f"Дата: <b>{day_s}</b>\n"
+            + (f"Длительность: <b>{esc(hours_txt)}</b>\n" if hours_txt else "")
+            + f"Причина: {REASONS.get(reason_key, reason_key)}\n"
+            + f"Доплата: <b>{esc(bonus_txt)}</b>"
         )
-        users = [u for (u,) in res.all()]
-
-    bonus_txt = "без доплаты" if not req.bonus_amount else f"+{int(req.bonus_amount)} ₽"
-    hours_txt = f"{int(req.planned_hours)}ч" if req.planned_hours else ""
-
-    who = (" ".join([str(user.first_name or "").strip(), str(user.last_name or "").strip()]).strip()) or f"User #{int(user.id)}"
-    txt = (
-        f"🆘 <b>Нужна замена на смену</b>\n\n"
-        f"Кто: <b>{esc(who)}</b>\n"
-        f"Дата: <b>{day_s}</b>\n"
-        + (f"Длительность: <b>{esc(hours_txt)}</b>\n" if hours_txt else "")
-        + f"Причина: {REASONS.get(reason_key, reason_key)}\n"
-        + f"Доплата: <b>{esc(bonus_txt)}</b>"
-    )
 
-    kb = _kb_call_to_colleagues(req_id=int(req.id), day=day_s, web_link=web_link)
-
-    sent_cnt = 0
-    for u in users:
-        if int(getattr(u, "id")) == int(user.id):
-            continue
-        if int(getattr(u, "tg_id", 0) or 0) in set(int(x) for x in settings.admin_ids):
-            continue
-        if getattr(u, "position", None) == Position.MANAGER:
-            continue
-        chat_id = int(getattr(u, "tg_id", 0) or 0)
-        if not chat_id:
-            continue
-        try:
-            await cb.bot.send_message(chat_id=chat_id, text=txt, reply_markup=kb)
-            sent_cnt += 1
-        except Exception:
-            _logger.exception("failed to send swap broadcast", extra={"chat_id": chat_id})
+        # Only colleagues free that day, best-ranked first; the outbox sends them in waves
+        # and drops the remaining waves once someone accepts.
+        candidates = await rank_swap_candidates(session, day=d, from_user_id=int(user.id))
+        wave_size = int(getattr(settings, "SHIFT_SWAP_WAVE_SIZE", 5) or 5)
+        waves = plan_swap_waves(
+            candidates,
+            wave_size=wave_size,
+            wave_interval=timedelta(minutes=int(getattr(settings, "SHIFT_SWAP_WAVE_INTERVAL_MINUTES", 10) or 0)),
+            now=utc_now(),
+        )
+        queued = await enqueue_swap_offers(
+            session,
+            request_id=int(req.id),
+            waves=waves,
+            text=txt,
+            reply_markup=_kb_call_to_colleagues(req_id=int(req.id), day=day_s, web_link=web_link),
+        )
 
     await state.clear()
-    await edit_html(cb, f"Готово. Запрос замены отправлен — ждём отклика.\n\nРазослано: {sent_cnt}")
+    if not queued:
+        await edit_html(cb, "Запрос замены создан, но свободных коллег на этот день нет. Обратитесь к руководителю.")
+        return
+    first_wave = min(queued, max(1, wave_size))
+    await edit_html(
+        cb,
+        "Готово. Запрос замены отправлен — ждём отклика.\n\n"
+        f"Свободных коллег: {queued}, первым отправлено: {first_wave}",
+    )
 
 
 @router.callback_query(F.data.startswith("swap:decline:"))
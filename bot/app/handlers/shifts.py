@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import logging
-import asyncio
 from datetime import datetime, date, timedelta, time as _time
 
 from aiogram import Router, F
@@ -18,8 +17,25 @@ from shared.permissions import role_flags
 from shared.utils import MOSCOW_TZ, utc_now
 from shared.models import User, WorkShiftDay, ShiftInstance, ShiftInstanceEvent
 
+from shared.services.shift_events import (
+    SHIFT_AMOUNT_APPROVED,
+    SHIFT_AMOUNT_SUBMITTED,
+    SHIFT_CLOSED,
+    SHIFT_REWORK_REQUESTED,
+    SHIFT_STARTED,
+    ShiftEvent,
+    publish,
+    publish_shift_event,
+)
+from shared.services.shift_review_queue import (
+    format_review_cursor,
+    load_review_page,
+    parse_review_cursor,
+    review_cursor_before,
+)
 from shared.services.shifts_domain import is_shift_active_status, is_shift_final_status
 from shared.services.shifts_service import get_today_working_staff_with_open_state
+from shared.services.telegram_outbox import enqueue_message
 from shared.services.shifts_rating import (
     schedule_shift_rating_request_after_commit,
     set_shift_rating,
@@ -95,14 +111,13 @@ def _fmt_work_line(*, name: str, start_time: object | None, end_time: object | N
 
 async def _notify_admins_and_managers_about_shift_event(
     *,
-    bot,
     actor_user_id: int,
     text: str,
 ) -> None:
     try:
         async with get_async_session() as session:
             q = (
-                select(User)
+                select(User.tg_id)
                 .where(User.is_deleted == False)  # noqa: E712
                 .where(
                     (User.tg_id.in_([int(x) for x in (settings.admin_ids or [])]))
@@ -110,22 +125,9 @@ async def _notify_admins_and_managers_about_shift_event(
                 )
                 .where(User.id != int(actor_user_id))
             )
-            users = list((await session.execute(q)).scalars().all())
-
-        chat_ids: list[int] = []
-        for u in users:
-            tg_id = getattr(u, "tg_id", None)
-            if not tg_id:
-                continue
-            chat_ids.append(int(tg_id))
-
-        async def _send_one(cid: int):
-            try:
-                await bot.send_message(chat_id=int(cid), text=str(text))
-            except Exception:
-                _logger.warning("failed to send shift notify", extra={"chat_id": int(cid)}, exc_info=True)
-
-        await asyncio.gather(*[_send_one(cid) for cid in chat_ids], return_exceptions=True)
+            chat_ids = sorted({int(x) for x in (await session.execute(q)).scalars().all() if x})
+            for cid in chat_ids:
+                await enqueue_message(session, chat_id=int(cid), text=str(text), disable_web_page_preview=False)
     except Exception:
         _logger.exception("shift notify failed")
 
@@ -205,22 +207,15 @@ def _kb_schedule_return() -> InlineKeyboardMarkup:
     )
 
 
-def _kb_pending_nav(*, page: int, has_prev: bool, has_next: bool) -> InlineKeyboardMarkup:
-    nav: list[InlineKeyboardButton] = []
-    if has_prev:
-        nav.append(InlineKeyboardButton(text="←", callback_data=f"sched_pending:page:{page-1}"))
-    nav.append(InlineKeyboardButton(text=f"Стр. {page+1}", callback_data="noop"))
-    if has_next:
-        nav.append(InlineKeyboardButton(text="→", callback_data=f"sched_pending:page:{page+1}"))
-
+def _kb_pending_nav(*, prev_cursor: str | None) -> InlineKeyboardMarkup:
     rows: list[list[InlineKeyboardButton]] = []
-    if nav:
-        rows.append(nav)
+    if prev_cursor is not None:
+        rows.append([InlineKeyboardButton(text="←", callback_data=f"sched_pending:page:{prev_cursor}")])
     rows.append([InlineKeyboardButton(text="📅 Меню графика", callback_data="sched_menu:open")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def _kb_pending_item(*, shift_id: int, page: int) -> InlineKeyboardMarkup:
+def _kb_pending_item(*, shift_id: int, page: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
@@ -233,39 +228,34 @@ def _kb_pending_item(*, shift_id: int, page: int) -> InlineKeyboardMarkup:
     )
 
 
-async def _render_pending_page(*, session, page: int) -> tuple[str, InlineKeyboardMarkup]:
-    size = 1
-    offset = max(0, int(page)) * size
-    res = await session.execute(
-        select(ShiftInstance, User)
-        .join(User, User.id == ShiftInstance.user_id)
-        .where(ShiftInstance.status == ShiftInstanceStatus.PENDING_APPROVAL)
-        .order_by(ShiftInstance.day.desc(), ShiftInstance.id.desc())
-        .offset(offset)
-        .limit(size + 1)
-    )
-    rows = list(res.all())
-    has_next = len(rows) > size
-    rows = rows[:size]
-    has_prev = offset > 0
+async def _render_pending_page(*, session, page: str) -> tuple[str, InlineKeyboardMarkup]:
+    """One shift of the approval queue; ``page`` is the keyset cursor of the item before it ("0" = head).
 
-    if not rows:
+    The cursor stays valid when the shown item is approved, so the same call then shows the next one.
+    """
+    try:
+        after = parse_review_cursor(page)
+    except ValueError:
+        after = None
+    items, _ = await load_review_page(session, after=after, limit=1, include_salary=False)
+
+    if not items:
+        prev_cursor = None
+        if after is not None:
+            has_prev, prev_key = await review_cursor_before(session, key=after, include_salary=False)
+            prev_cursor = format_review_cursor(prev_key) if has_prev else None
         text = "✅ <b>На подтверждении</b>\n\nНет смен на подтверждении."
-        return text, _kb_pending_nav(page=page, has_prev=has_prev, has_next=has_next)
+        return text, _kb_pending_nav(prev_cursor=prev_cursor)
 
-    shift, staff = rows[0]
-    staff_name = (
-        " ".join([str(getattr(staff, "first_name", "") or "").strip(), str(getattr(staff, "last_name", "") or "").strip()]).strip()
-        or f"User #{int(getattr(staff, 'id'))}"
-    )
+    item = items[0]
     text = (
         "✅ <b>На подтверждении</b>\n\n"
-        f"🧾 <b>{esc(staff_name)}</b>\n"
-        f"Дата: <b>{shift.day}</b>\n"
-        f"Расчёт: <b>{int(getattr(shift,'amount_default',0) or 0)} ₽</b>\n"
-        f"Заявка: <b>{int(getattr(shift,'amount_submitted',0) or 0)} ₽</b>\n"
+        f"🧾 <b>{esc(item.full_name)}</b>\n"
+        f"Дата: <b>{item.day}</b>\n"
+        f"Расчёт: <b>{int(item.amount_default or 0)} ₽</b>\n"
+        f"Заявка: <b>{int(item.amount_submitted or 0)} ₽</b>\n"
     )
-    return text, _kb_pending_item(shift_id=int(shift.id), page=page)
+    return text, _kb_pending_item(shift_id=item.shift_id, page=format_review_cursor(after))
 
 
 def _kb_open_shift(*, day: str) -> InlineKeyboardMarkup:
@@ -453,6 +443,7 @@ async def shift_start(cb: CallbackQuery, state: FSMContext):
             session.add(row)
             await session.flush()
             await _log_event(session, shift_id=int(row.id), actor_user_id=int(user.id), type="Смена открыта")
+            await publish_shift_event(session, SHIFT_STARTED, row, actor_user_id=int(user.id))
             shift = row
         else:
             existing.started_at = now
@@ -461,6 +452,7 @@ async def shift_start(cb: CallbackQuery, state: FSMContext):
                 existing.base_rate = int(getattr(user, "rate_k", 0) or 0)
             await session.flush()
             await _log_event(session, shift_id=int(existing.id), actor_user_id=int(user.id), type="Смена открыта")
+            await publish_shift_event(session, SHIFT_STARTED, existing, actor_user_id=int(user.id))
             shift = existing
 
         interval = _fmt_plan_interval(day=d, start_time=start_time, end_time=end_time, is_emergency=bool(is_emergency))
@@ -469,7 +461,6 @@ async def shift_start(cb: CallbackQuery, state: FSMContext):
 
         async def _after_commit() -> None:
             await _notify_admins_and_managers_about_shift_event(
-                bot=cb.bot,
                 actor_user_id=int(user.id),
                 text=str(notify_text),
             )
@@ -731,6 +722,11 @@ async def shift_close_ok(cb: CallbackQuery, state: FSMContext):
         schedule_shift_rating_request_after_commit(session=session, shift_id=int(shift.id))
         await _log_event(session, shift_id=int(shift.id), actor_user_id=int(user.id), type="Смена закрыта")
         await _log_event(session, shift_id=int(shift.id), actor_user_id=int(user.id), type="Сумма подтверждена руководителем")
+        await publish(
+            session,
+            ShiftEvent.of(SHIFT_CLOSED, shift, actor_user_id=int(user.id)),
+            ShiftEvent.of(SHIFT_AMOUNT_APPROVED, shift, actor_user_id=int(user.id)),
+        )
 
         interval = _fmt_plan_interval(day=getattr(shift, "day", None), start_time=start_time, end_time=end_time, is_emergency=is_emergency)
         staff_name = _user_name(user)
@@ -751,7 +747,6 @@ async def shift_close_ok(cb: CallbackQuery, state: FSMContext):
 
         async def _after_commit() -> None:
             await _notify_admins_and_managers_about_shift_event(
-                bot=cb.bot,
                 actor_user_id=int(user.id),
                 text=str(notify_text),
             )
@@ -1003,6 +998,13 @@ async def shift_close_edit_comment_skip(cb: CallbackQuery, state: FSMContext):
             )
         else:
             await _log_event(session, shift_id=int(shift.id), actor_user_id=int(user.id), type="Сумма подтверждена руководителем")
+        await publish(
+            session,
+            ShiftEvent.of(SHIFT_CLOSED, shift, actor_user_id=int(user.id)),
+            ShiftEvent.of(
+                SHIFT_AMOUNT_SUBMITTED if amount != amount_default else SHIFT_AMOUNT_APPROVED, shift, actor_user_id=int(user.id)
+            ),
+        )
 
         interval = _fmt_plan_interval(day=getattr(shift, "day", None), start_time=start_time, end_time=end_time, is_emergency=is_emergency)
         staff_name = _user_name(user)
@@ -1023,7 +1025,6 @@ async def shift_close_edit_comment_skip(cb: CallbackQuery, state: FSMContext):
 
         async def _after_commit() -> None:
             await _notify_admins_and_managers_about_shift_event(
-                bot=cb.bot,
                 actor_user_id=int(user.id),
                 text=str(notify_text),
             )
@@ -1047,7 +1048,7 @@ async def shift_close_edit_comment(message: Message, state: FSMContext):
 
     data = await state.get_data()
     shift_id = int(data.get("shift_id") or 0)
-    page = int(data.get("pending_page") or 0)
+    page = str(data.get("pending_page") or "0")
     extra_hours = int(data.get("extra_hours") or 0)
     overtime_hours = int(data.get("overtime_hours") or 0)
     amount = int(data.get("amount") or 0)
@@ -1119,6 +1120,13 @@ async def shift_close_edit_comment(message: Message, state: FSMContext):
             )
         else:
             await _log_event(session, shift_id=int(shift.id), actor_user_id=int(user.id), type="Сумма подтверждена руководителем")
+        await publish(
+            session,
+            ShiftEvent.of(SHIFT_CLOSED, shift, actor_user_id=int(user.id)),
+            ShiftEvent.of(
+                SHIFT_AMOUNT_SUBMITTED if amount != amount_default else SHIFT_AMOUNT_APPROVED, shift, actor_user_id=int(user.id)
+            ),
+        )
 
         # Notify managers/admins if pending approval
         if shift.status == ShiftInstanceStatus.PENDING_APPROVAL:
@@ -1164,7 +1172,7 @@ async def shift_close_edit_comment(message: Message, state: FSMContext):
                 + f"\n{link_text}"
             )
 
-            kb = _kb_pending_item(shift_id=int(shift.id), page=0)
+            kb = _kb_pending_item(shift_id=int(shift.id), page="0")
             for chat_id in sorted(recipients):
                 try:
                     await message.bot.send_message(chat_id=chat_id, text=txt, reply_markup=kb)
@@ -1206,10 +1214,7 @@ async def sched_pending_page(cb: CallbackQuery, state: FSMContext):
         await edit_html(cb, "⛔ Нет доступа.")
         return
 
-    try:
-        page = int(str(cb.data).split(":", 2)[2])
-    except Exception:
-        page = 0
+    page = str(cb.data).split(":", 2)[2] if str(cb.data).count(":") >= 2 else "0"
 
     async with get_async_session() as session:
         text, kb = await _render_pending_page(session=session, page=page)
@@ -1234,7 +1239,7 @@ async def mgr_approve(cb: CallbackQuery, state: FSMContext):
 
     parts = str(cb.data).split(":", 3)
     shift_id = int(parts[2]) if len(parts) >= 3 else 0
-    page = int(parts[3]) if len(parts) == 4 else 0
+    page = parts[3] if len(parts) == 4 else "0"
     async with get_async_session() as session:
         shift = (
             await session.execute(select(ShiftInstance).where(ShiftInstance.id == int(shift_id)))
@@ -1251,6 +1256,7 @@ async def mgr_approve(cb: CallbackQuery, state: FSMContext):
         await session.flush()
         schedule_shift_rating_request_after_commit(session=session, shift_id=int(shift.id))
         await _log_event(session, shift_id=int(shift.id), actor_user_id=int(actor.id), type="Сумма подтверждена руководителем")
+        await publish_shift_event(session, SHIFT_AMOUNT_APPROVED, shift, actor_user_id=int(actor.id))
 
         staff = (
             await session.execute(select(User).where(User.id == int(shift.user_id)))
@@ -1282,7 +1288,7 @@ async def mgr_edit(cb: CallbackQuery, state: FSMContext):
 
     parts = str(cb.data).split(":", 3)
     shift_id = int(parts[2]) if len(parts) >= 3 else 0
-    page = int(parts[3]) if len(parts) == 4 else 0
+    page = parts[3] if len(parts) == 4 else "0"
     await state.clear()
     await state.set_state(ShiftManagerEditState.amount)
     await state.update_data(
@@ -1343,7 +1349,7 @@ async def mgr_edit_comment_skip(cb: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     shift_id = int(data.get("shift_id") or 0)
     amt = int(data.get("amount") or 0)
-    page = int(data.get("pending_page") or 0)
+    page = str(data.get("pending_page") or "0")
     comment = None
 
     async with get_async_session() as session:
@@ -1369,6 +1375,7 @@ async def mgr_edit_comment_skip(cb: CallbackQuery, state: FSMContext):
             type="Сумма изменена руководителем",
             payload={"amount_approved": amt, "comment": comment},
         )
+        await publish_shift_event(session, SHIFT_AMOUNT_APPROVED, shift, actor_user_id=int(actor.id))
 
     await state.clear()
     async with get_async_session() as session:
@@ -1400,7 +1407,7 @@ async def mgr_edit_comment(message: Message, state: FSMContext):
     data = await state.get_data()
     shift_id = int(data.get("shift_id") or 0)
     amt = int(data.get("amount") or 0)
-    page = int(data.get("pending_page") or 0)
+    page = str(data.get("pending_page") or "0")
     comment_raw = str(message.text or "").strip()
     comment = None if (not comment_raw or comment_raw == "-") else comment_raw
 
@@ -1430,6 +1437,7 @@ async def mgr_edit_comment(message: Message, state: FSMContext):
             type="Сумма изменена руководителем",
             payload={"amount_approved": amt, "comment": comment},
         )
+        await publish_shift_event(session, SHIFT_AMOUNT_APPROVED, shift, actor_user_id=int(actor.id))
 
         staff = (
             await session.execute(select(User).where(User.id == int(shift.user_id)))
@@ -1465,7 +1473,7 @@ async def mgr_rework(cb: CallbackQuery, state: FSMContext):
 
     parts = str(cb.data).split(":", 3)
     shift_id = int(parts[2]) if len(parts) >= 3 else 0
-    page = int(parts[3]) if len(parts) == 4 else 0
+    page = parts[3] if len(parts) == 4 else "0"
     await state.clear()
     await state.set_state(ShiftManagerEditState.comment)
     await state.update_data(
@@ -1507,7 +1515,7 @@ async def mgr_rework_comment(message: Message, state: FSMContext):
         await send_new_and_delete_active(message=message, state=state, text="Комментарий обязателен.", reply_markup=_kb_cancel())
         return
 
-    page = int(data.get("pending_page") or 0)
+    page = str(data.get("pending_page") or "0")
 
     async with get_async_session() as session:
         shift = (
@@ -1527,6 +1535,7 @@ async def mgr_rework_comment(message: Message, state: FSMContext):
         shift.comment = comment
         await session.flush()
         await _log_event(session, shift_id=int(shift.id), actor_user_id=int(actor.id), type="Отправлено на доработку", payload={"comment": comment})
+        await publish_shift_event(session, SHIFT_REWORK_REQUESTED, shift, actor_user_id=int(actor.id))
 
         staff = (
             await session.execute(select(User).where(User.id == int(shift.user_id)))
@@ -29,6 +29,7 @@ from bot.app.repository.users import UserRepository
 from bot.app.states.stocks import StocksState
 from shared.permissions import can_manage_stock_op, can_view_stocks, role_flags
 from bot.app.guards.user_guard import ensure_registered_or_reply
+from bot.app.services.user_principals import get_active_user_principal
 from bot.app.utils.urls import build_expense_magic_link
 
 router = Router()
@@ -52,16 +53,12 @@ async def _load_user_or_deny(message: Message) -> tuple[bool, UserStatus | None]
 
 
 async def _get_user_status(tg_id: int) -> UserStatus | None:
-    async with get_async_session() as session:
-        urepo = UserRepository(session)
-        user = await urepo.get_by_tg_id(tg_id)
-        return user.status if user else None
+    user = await get_active_user_principal(tg_id)
+    return user.status if user else None
 
 
 async def _get_user_for_ops(tg_id: int):
-    async with get_async_session() as session:
-        urepo = UserRepository(session)
-        return await urepo.get_by_tg_id(tg_id)
+    return await get_active_user_principal(tg_id)
 
 
 async def _render_stocks_text(tg_id: int, limit: int | None = 8) -> str:
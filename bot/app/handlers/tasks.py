@@ -4,8 +4,6 @@ import logging
 import calendar
 from datetime import datetime, timedelta, timezone
 
-import httpx
-
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -15,6 +13,7 @@ from shared.config import settings
 from shared.db import get_async_session
 from shared.enums import TaskStatus, TaskPriority, UserStatus
 from shared.permissions import role_flags
+from shared.services.bot_clients import get_http_client
 from shared.utils import MOSCOW_TZ
 
 from bot.app.keyboards.main import main_menu_kb
@@ -133,10 +132,10 @@ async def _resolve_task_menu_photo(task) -> str | BufferedInputFile | None:
         return None
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.get(str(download_url))
-            if r.status_code == 200 and r.content:
-                return BufferedInputFile(bytes(r.content), filename="task.jpg")
+        client = get_http_client()
+        r = await client.get(str(download_url), timeout=30)
+        if r.status_code == 200 and r.content:
+            return BufferedInputFile(bytes(r.content), filename="task.jpg")
     except Exception:
         pass
     return None
@@ -153,13 +152,13 @@ async def _download_tg_file_bytes(*, bot, file_id: str) -> tuple[bytes | None, s
 
     url = f"https://api.telegram.org/file/bot{settings.BOT_TOKEN}/{file_path}"
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.get(url)
-            if r.status_code != 200:
-                return None, None
-            data = bytes(r.content)
-            name = str(file_path).split("/")[-1] if file_path else None
-            return data, name
+        client = get_http_client()
+        r = await client.get(url, timeout=20)
+        if r.status_code != 200:
+            return None, None
+        data = bytes(r.content)
+        name = str(file_path).split("/")[-1] if file_path else None
+        return data, name
     except Exception:
         return None, None
 
@@ -181,12 +180,12 @@ async def _upload_tg_photo_to_web_storage(*, tg_file_id: str, bot) -> dict | Non
 
     url = base + "/crm/api/internal/tasks/upload-photo"
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            files = {"photo": (name or "photo.jpg", data, "image/jpeg")}
-            resp = await client.post(url, files=files, headers={"X-Internal-Token": token})
-            if resp.status_code != 200:
-                return None
-            return dict(resp.json() or {})
+        client = get_http_client()
+        files = {"photo": (name or "photo.jpg", data, "image/jpeg")}
+        resp = await client.post(url, files=files, headers={"X-Internal-Token": token}, timeout=30)
+        if resp.status_code != 200:
+            return None
+        return dict(resp.json() or {})
     except Exception:
         return None
 
@@ -1281,36 +1280,36 @@ async def _show_task_detail(cb: CallbackQuery, state: FSMContext, *, task_id: in
         # bytes fallback (works for web-created tasks even with 127.0.0.1 URLs)
         if download_url:
             try:
-                async with httpx.AsyncClient(timeout=30) as client:
-                    r = await client.get(str(download_url))
-                    if r.status_code == 200 and r.content:
-                        up = BufferedInputFile(bytes(r.content), filename="task.jpg")
-                        mid, has_media = await render_tasks_screen_on_message(
-                            bot=cb.bot,
-                            chat_id=cb_chat_id,
-                            message_id=cb_message_id,
-                            has_media=bool(cb_has_media),
-                            text=html,
-                            reply_markup=kb,
-                            photo=up,
-                        )
-                        await state.update_data(tasks_chat_id=int(cb_chat_id), tasks_message_id=int(mid), tasks_has_media=bool(has_media))
+                client = get_http_client()
+                r = await client.get(str(download_url), timeout=30)
+                if r.status_code == 200 and r.content:
+                    up = BufferedInputFile(bytes(r.content), filename="task.jpg")
+                    mid, has_media = await render_tasks_screen_on_message(
+                        bot=cb.bot,
+                        chat_id=cb_chat_id,
+                        message_id=cb_message_id,
+                        has_media=bool(cb_has_media),
+                        text=html,
+                        reply_markup=kb,
+                        photo=up,
+                    )
+                    await state.update_data(tasks_chat_id=int(cb_chat_id), tasks_message_id=int(mid), tasks_has_media=bool(has_media))
+                    try:
+                        fid = None
+                    except Exception:
+                        fid = None
+                    if fid:
                         try:
-                            fid = None
+                            await repo.update_task_photo_storage(
+                                task_id=int(task.id),
+                                photo_key=None,
+                                photo_url=None,
+                                photo_path=None,
+                                tg_photo_file_id=str(fid),
+                            )
                         except Exception:
-                            fid = None
-                        if fid:
-                            try:
-                                await repo.update_task_photo_storage(
-                                    task_id=int(task.id),
-                                    photo_key=None,
-                                    photo_url=None,
-                                    photo_path=None,
-                                    tg_photo_file_id=str(fid),
-                                )
-                            except Exception:
-                                pass
-                        return
+                            pass
+                    return
             except Exception:
                 logging.exception("Failed to download/send task photo", extra={"task_id": int(getattr(task, "id", 0) or 0)})
 
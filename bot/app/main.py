@@ -3,7 +3,6 @@ import logging
 from aiogram import Bot, Dispatcher
 from aiogram.types import BotCommand, BotCommandScopeAllPrivateChats, BotCommandScopeAllGroupChats
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from shared.config import settings
 from shared.logging import setup_logging
 from bot.app.handlers.registration import router as registration_router
@@ -17,7 +16,17 @@ from bot.app.handlers.schedule import router as schedule_router
 from bot.app.handlers.shifts import router as shifts_router
 from bot.app.handlers.shift_swap import router as shift_swap_router
 from bot.app.services.reminders_scheduler import start_scheduler, reschedule_from_db
+from bot.app.services.pg_listen_hub import get_listen_hub
+from bot.app.services.shift_timers import SHIFT_SCHEDULE_CHANNEL, shift_timers_listener
 from bot.app.services.task_notifications_worker import notifications_worker
+from bot.app.services.telegram_outbox import outbox_worker
+from bot.app.services.user_principals import USER_PRINCIPAL_CHANNEL, get_principal_cache
+from bot.app.services.webhook_runner import run_webhook
+from shared.services.background_tasks import drain_background_tasks
+from shared.services.bot_clients import close_bot_clients, register_bot, unregister_bot
+from shared.services.fsm_storage import FSM_NOTIFY_CHANNEL, PostgresStorage, build_fsm_storage
+from shared.services.shift_events import SHIFT_EVENTS_CHANNEL, on_notify as on_shift_event_notify
+from shared.services.shifts_service import invalidate_day_staff
 
 
 async def main() -> None:
@@ -39,9 +48,20 @@ async def main() -> None:
     except Exception:
         pass
     bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-    dp = Dispatcher(storage=MemoryStorage())
+    # Jobs, handlers and shared services reuse this client (and its connection pool) via get_bot().
+    register_bot(bot)
+    storage = build_fsm_storage(notify=True)
+    if isinstance(storage, PostgresStorage):
+        get_listen_hub().on_payload(FSM_NOTIFY_CHANNEL, storage.evict)
+    dp = Dispatcher(storage=storage)
+    get_listen_hub().on_payload(USER_PRINCIPAL_CHANNEL, get_principal_cache().on_notify)
+    get_listen_hub().on_payload(SHIFT_SCHEDULE_CHANNEL, invalidate_day_staff)
+    get_listen_hub().on_payload(SHIFT_EVENTS_CHANNEL, on_shift_event_notify)
 
     notif_task: asyncio.Task | None = None
+    outbox_task: asyncio.Task | None = None
+    listen_task: asyncio.Task | None = None
+    timers_task: asyncio.Task | None = None
 
     dp.include_router(registration_router)
     dp.include_router(admin_router)
@@ -81,6 +101,18 @@ async def main() -> None:
         # Do not fail startup if commands setup fails
         pass
 
+    try:
+        logging.getLogger(__name__).info("starting pg listen hub")
+        listen_task = asyncio.create_task(get_listen_hub().run())
+    except Exception:
+        logging.getLogger(__name__).exception("failed to start pg listen hub")
+
+    try:
+        logging.getLogger(__name__).info("starting shift timers listener")
+        timers_task = asyncio.create_task(shift_timers_listener())
+    except Exception:
+        logging.getLogger(__name__).exception("failed to start shift timers listener")
+
     try:
         logging.getLogger(__name__).info("starting task notifications worker")
         notif_task = asyncio.create_task(notifications_worker(bot=bot))
@@ -88,7 +120,22 @@ async def main() -> None:
         logging.getLogger(__name__).exception("failed to start task notifications worker")
 
     try:
-        await dp.start_polling(bot)
+        logging.getLogger(__name__).info("starting telegram outbox worker")
+        outbox_task = asyncio.create_task(outbox_worker(bot=bot))
+    except Exception:
+        logging.getLogger(__name__).exception("failed to start telegram outbox worker")
+
+    try:
+        if str(getattr(settings, "BOT_WEBHOOK_URL", "") or "").strip():
+            logging.getLogger(__name__).info("starting webhook mode")
+            await run_webhook(dp=dp, bot=bot)
+        else:
+            try:
+                # A webhook left over from webhook mode makes getUpdates fail.
+                await bot.delete_webhook(drop_pending_updates=False)
+            except Exception:
+                logging.getLogger(__name__).exception("failed to delete webhook before polling")
+            await dp.start_polling(bot)
     finally:
         if notif_task is not None:
             notif_task.cancel()
@@ -96,6 +143,27 @@ async def main() -> None:
                 await notif_task
             except Exception:
                 pass
+        if outbox_task is not None:
+            outbox_task.cancel()
+            try:
+                await outbox_task
+            except Exception:
+                pass
+        if timers_task is not None:
+            timers_task.cancel()
+            try:
+                await timers_task
+            except Exception:
+                pass
+        if listen_task is not None:
+            listen_task.cancel()
+            try:
+                await listen_task
+            except Exception:
+                pass
+        await drain_background_tasks()
+        unregister_bot()
+        await close_bot_clients()
         logging.getLogger(__name__).info("bot stopped")
 
 
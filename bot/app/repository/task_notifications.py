@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy import or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -52,6 +52,22 @@ class TaskNotificationRepository:
         res = await self.session.execute(q)
         return list(res.scalars().unique().all())
 
+    async def next_due_at(self) -> datetime | None:
+        """When the earliest pending row becomes due (digest windows, working-hours holds, retries)."""
+        res = await self.session.execute(
+            select(
+                func.min(
+                    func.greatest(
+                        TaskNotification.scheduled_at,
+                        func.coalesce(TaskNotification.next_retry_at, TaskNotification.scheduled_at),
+                    )
+                )
+            ).where(
+                TaskNotification.status == "pending"
+            )
+        )
+        return res.scalar_one_or_none()
+
     async def mark_sent(self, *, n: TaskNotification, now: datetime) -> None:
         n.status = "sent"
         n.sent_at = now
@@ -0,0 +1 @@
+"""Administrative scripts for the bot."""
@@ -0,0 +1,77 @@
+"""Benchmark: FSM step latency with MemoryStorage vs. PostgresStorage (cached and uncached).
+
+Each simulated update does what a multi-step handler does: read state, read data, merge data,
+move to the next state. Needs a reachable DATABASE_URL with the fsm_states table; rows are
+written under a dedicated bot_id and deleted afterwards.
+
+Usage: python -m bot.app.scripts.bench_fsm_storage [--users 50] [--steps 20]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete
+
+from shared.db import get_async_session
+from shared.enums import Schedule
+from shared.models import FsmState
+from shared.services.fsm_storage import PostgresStorage
+
+
+BENCH_BOT_ID = -424242
+
+
+async def _user_flow(storage: BaseStorage, user_id: int, steps: int, out: list[float]) -> None:
+    key = StorageKey(bot_id=BENCH_BOT_ID, chat_id=user_id, user_id=user_id)
+    for step in range(steps):
+        t0 = time.perf_counter()
+        await storage.get_state(key)
+        await storage.get_data(key)
+        await storage.update_data(key, {f"f{step}": step, "day": date(2026, 1, 1), "schedule": Schedule.TWO_TWO})
+        await storage.set_state(key, f"Bench:step{step}")
+        out.append(time.perf_counter() - t0)
+    await storage.set_state(key, None)
+    await storage.set_data(key, {})
+
+
+async def _bench(storage: BaseStorage, *, users: int, steps: int) -> list[float]:
+    samples: list[float] = []
+    await asyncio.gather(*[_user_flow(storage, 1_000_000 + i, steps, samples) for i in range(users)])
+    await storage.close()
+    return samples
+
+
+def _fmt(name: str, samples: list[float]) -> str:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return f"{name:<22} p50={statistics.median(ms):7.2f} ms  p95={p95:7.2f} ms  n={len(ms)}"
+
+
+async def _main(users: int, steps: int) -> None:
+    try:
+        print(_fmt("memory", await _bench(MemoryStorage(), users=users, steps=steps)))
+        print(_fmt("postgres (cache)", await _bench(PostgresStorage(cache_ttl=300), users=users, steps=steps)))
+        print(_fmt("postgres (no cache)", await _bench(PostgresStorage(cache_ttl=0), users=users, steps=steps)))
+    finally:
+        async with get_async_session() as session:
+            await session.execute(delete(FsmState).where(FsmState.bot_id == BENCH_BOT_ID))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--steps", type=int, default=20)
+    args = ap.parse_args()
+    print(f"users={args.users} steps={args.steps} (one step = get_state + get_data + update_data + set_state)")
+    asyncio.run(_main(int(args.users), int(args.steps)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
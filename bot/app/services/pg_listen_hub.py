@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable
+
+import asyncpg
+
+from shared.config import settings
+
+
+_logger = logging.getLogger(__name__)
+
+
+def asyncpg_dsn() -> str:
+    dsn = str(getattr(settings, "DATABASE_URL", "") or "")
+    # SQLAlchemy URL -> asyncpg URL
+    if dsn.startswith("postgresql+asyncpg://"):
+        dsn = "postgresql://" + dsn[len("postgresql+asyncpg://") :]
+    return dsn
+
+
+class PgListenHub:
+    """One dedicated LISTEN connection shared by every queue consumer in the process.
+
+    Consumers ``subscribe(channel)`` and wait on the returned event; the hub sets it on each
+    NOTIFY. Signals only mean "look at the table again" (consumers still read DB state), so
+    after every (re)connect all events are set to cover notifications missed while offline.
+    Consumers that need the payload (cache invalidation) register ``on_payload`` callbacks.
+    """
+
+    def __init__(self, *, dsn: str | None = None, keepalive_seconds: float = 30.0, reconnect_seconds: float = 2.0):
+        self._dsn = dsn
+        self._keepalive = float(keepalive_seconds)
+        self._reconnect = float(reconnect_seconds)
+        self._events: dict[str, list[asyncio.Event]] = {}
+        self._callbacks: dict[str, list[Callable[[str], None]]] = {}
+        self._conn: asyncpg.Connection | None = None
+
+    def _ensure_listening(self, channel: str) -> None:
+        if self._conn is not None and channel not in self.channels():
+            asyncio.create_task(self._listen(self._conn, channel))
+
+    def subscribe(self, channel: str) -> asyncio.Event:
+        ev = asyncio.Event()
+        ch = str(channel)
+        self._ensure_listening(ch)
+        self._events.setdefault(ch, []).append(ev)
+        return ev
+
+    def on_payload(self, channel: str, callback: Callable[[str], None]) -> None:
+        ch = str(channel)
+        self._ensure_listening(ch)
+        self._callbacks.setdefault(ch, []).append(callback)
+
+    def channels(self) -> list[str]:
+        return list(dict.fromkeys([*self._events.keys(), *self._callbacks.keys()]))
+
+    def dispatch(self, channel: str, payload: str = "") -> None:
+        for ev in self._events.get(str(channel), []):
+            ev.set()
+        for cb in self._callbacks.get(str(channel), []):
+            try:
+                cb(str(payload or ""))
+            except Exception:
+                _logger.exception("pg listen callback failed", extra={"channel": str(channel)})
+
+    def wake_all(self) -> None:
+        # Payload callbacks get "" here: anything on the channel may have changed meanwhile.
+        for ch in self.channels():
+            self.dispatch(ch)
+
+    def _on_notify(self, _conn, _pid, channel, payload) -> None:
+        try:
+            self.dispatch(channel, payload)
+        except Exception:
+            pass
+
+    async def _listen(self, conn: asyncpg.Connection, channel: str) -> None:
+        try:
+            await conn.add_listener(channel, self._on_notify)
+        except Exception:
+            _logger.exception("pg listen failed", extra={"channel": channel})
+
+    async def run(self) -> None:
+        dsn = self._dsn or asyncpg_dsn()
+        if not dsn:
+            _logger.warning("pg listen hub disabled: empty DATABASE_URL")
+            return
+
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                for ch in self.channels():
+                    await conn.add_listener(ch, self._on_notify)
+                self._conn = conn
+                _logger.info("pg listen hub connected", extra={"channels": self.channels()})
+                self.wake_all()
+
+                # Ping so a silently dropped connection is noticed and replaced.
+                while True:
+                    await asyncio.sleep(self._keepalive)
+                    await conn.fetchval("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _logger.exception("pg listen hub error; reconnecting")
+                await asyncio.sleep(self._reconnect)
+            finally:
+                self._conn = None
+                if conn is not None:
+                    try:
+                        await conn.close()
+                    except Exception:
+                        pass
+
+
+_hub: PgListenHub | None = None
+
+
+def get_listen_hub() -> PgListenHub:
+    global _hub
+    if _hub is None:
+        _hub = PgListenHub()
+    return _hub
@@ -1,11 +1,9 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime, date, time
+from datetime import datetime, date
 from zoneinfo import ZoneInfo
 
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
 from apscheduler.triggers.cron import CronTrigger
@@ -14,15 +12,24 @@ from sqlalchemy import select, func
 
 from shared.config import settings
 from shared.db import get_async_session
-from shared.enums import Position, ShiftInstanceStatus, UserStatus
-from shared.models import MaterialSupply, MaterialConsumption, User, WorkShiftDay, ShiftInstance
-from shared.services.magic_links import create_magic_token
-from shared.services.shifts_domain import calc_shift_default_amount, format_hours_from_times_int, is_shift_active_status, is_shift_final_status
-from shared.utils import utc_now
-from bot.app.utils.urls import get_schedule_url
+from shared.enums import Position, UserStatus
+from shared.models import MaterialSupply, MaterialConsumption, User
+from shared.services.fsm_storage import cleanup_fsm_states
+from shared.services.magic_links import cleanup_magic_links, issue_magic_tokens
+from shared.services.partitions import run_history_maintenance
+from shared.services.shift_coverage import (
+    coverage_thresholds,
+    format_understaffed_alert,
+    hourly_headcount,
+    plan_interval,
+    understaffed_hours,
+)
+from shared.services.shifts_service import get_day_staff
+from shared.services.telegram_outbox import KIND_MESSAGE, OutboxItem, enqueue_many, enqueue_message, message_payload
 from bot.app.repository.reminders_settings import ReminderSettingsRepository
 from bot.app.services.stocks_reports import build_report
 from bot.app.services.stocks_reports_format import format_report_html
+from bot.app.services.shift_timers import install_shift_timers, reconcile_shift_timers, shift_auto_close_job
 from bot.app.services.telegram_outbox import telegram_outbox_job
 
 
@@ -37,208 +44,6 @@ def _tz() -> ZoneInfo:
         return ZoneInfo("Europe/Moscow")
 
 
-def _wsd_effective_times(wsd: WorkShiftDay) -> tuple[time, time]:
-    st = getattr(wsd, "start_time", None) or time(10, 0)
-    et = getattr(wsd, "end_time", None) or time(18, 0)
-    return st, et
-
-
-def _dt_msk_for_day_time(day: date, t: time, tz: ZoneInfo) -> datetime:
-    return datetime(
-        year=day.year,
-        month=day.month,
-        day=day.day,
-        hour=t.hour,
-        minute=t.minute,
-        second=0,
-        microsecond=0,
-        tzinfo=tz,
-    )
-
-
-async def shift_time_notifications_job() -> None:
-    tz = _tz()
-    now = datetime.now(tz)
-    today = now.date()
-
-    _logger.info("shift_time_notifications_job tick", extra={"now": now.isoformat(), "day": str(today)})
-
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-    try:
-        async with get_async_session() as session:
-            rows = list(
-                (
-                    await session.execute(
-                        select(WorkShiftDay, User)
-                        .join(User, User.id == WorkShiftDay.user_id)
-                        .where(WorkShiftDay.day == today)
-                        .where(WorkShiftDay.kind == "work")
-                        .where(User.is_deleted == False)
-                        .where(User.status == UserStatus.APPROVED)
-                    )
-                ).all()
-            )
-
-            for wsd, u in rows:
-                chat_id = int(getattr(u, "tg_id", 0) or 0)
-                if not chat_id:
-                    continue
-
-                # Do not send start reminders if there is already a factual shift (started or finished) for today.
-                shift = (
-                    await session.execute(
-                        select(ShiftInstance)
-                        .where(ShiftInstance.user_id == int(getattr(u, "id")))
-                        .where(ShiftInstance.day == today)
-                    )
-                ).scalar_one_or_none()
-                shift_exists_block_start = False
-                if shift is not None:
-                    if is_shift_active_status(getattr(shift, "status", None), ended_at=getattr(shift, "ended_at", None)):
-                        shift_exists_block_start = True
-                    if is_shift_final_status(getattr(shift, "status", None), ended_at=getattr(shift, "ended_at", None)):
-                        shift_exists_block_start = True
-
-                # Do not send end reminders if factual shift is already finished/final.
-                shift_exists_block_end = False
-                if shift is not None:
-                    if is_shift_final_status(getattr(shift, "status", None), ended_at=getattr(shift, "ended_at", None)):
-                        shift_exists_block_end = True
-
-                st, et = _wsd_effective_times(wsd)
-                start_dt = _dt_msk_for_day_time(today, st, tz)
-                end_dt = _dt_msk_for_day_time(today, et, tz)
-
-                # START notification
-                if (not shift_exists_block_start) and getattr(wsd, "start_notified_at", None) is None and now >= start_dt:
-                    hrs = format_hours_from_times_int(start_time=st, end_time=et)
-                    text = (
-                        f"⏰ <b>Начало смены</b>\n\n"
-                        f"Сегодня у тебя смена: <b>{st.strftime('%H:%M')}–{et.strftime('%H:%M')}</b> ({hrs} часов).\n"
-                        f"Начать смену?"
-                    )
-                    kb = {
-                        "inline_keyboard": [
-                            [{"text": "✅ Начать", "callback_data": f"shift:start:{today.isoformat()}"}],
-                            [{"text": "📅 Меню графика", "callback_data": "sched_menu:open"}],
-                        ]
-                    }
-                    try:
-                        await bot.send_message(chat_id=chat_id, text=text, reply_markup=kb)
-                        wsd.start_notified_at = now
-                        await session.flush()
-                        _logger.info("shift start notified", extra={"user_id": int(getattr(u, 'id')), "wsd_id": int(getattr(wsd, 'id'))})
-                    except Exception:
-                        _logger.exception("failed to send shift start notification", extra={"chat_id": chat_id})
-
-                # END notification — prompt removed; auto-close is handled by shift_auto_close_job.
-                if getattr(wsd, "end_notified_at", None) is None and now >= end_dt:
-                    wsd.end_notified_at = now
-                    wsd.end_snooze_until = None
-                    wsd.end_followup_notified_at = None
-                    await session.flush()
-
-    finally:
-        await bot.session.close()
-
-
-async def shift_auto_close_job() -> None:
-    tz = _tz()
-    now = datetime.now(tz)
-    now_utc = utc_now()
-    today = now.date()
-
-    _logger.info("shift_auto_close_job tick", extra={"now": now.isoformat(), "day": str(today)})
-
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-    try:
-        async with get_async_session() as session:
-            rows = list(
-                (
-                    await session.execute(
-                        select(WorkShiftDay, User)
-                        .join(User, User.id == WorkShiftDay.user_id)
-                        .where(WorkShiftDay.day == today)
-                        .where(WorkShiftDay.kind == "work")
-                        .where(User.is_deleted == False)
-                        .where(User.status == UserStatus.APPROVED)
-                    )
-                ).all()
-            )
-
-            for wsd, u in rows:
-                chat_id = int(getattr(u, "tg_id", 0) or 0)
-                if not chat_id:
-                    continue
-
-                shift = (
-                    await session.execute(
-                        select(ShiftInstance)
-                        .where(ShiftInstance.user_id == int(getattr(u, "id")))
-                        .where(ShiftInstance.day == today)
-                        .order_by(ShiftInstance.id.desc())
-                    )
-                ).scalars().first()
-
-                if shift is None:
-                    continue
-
-                # Idempotency: do nothing if already finished.
-                if is_shift_final_status(getattr(shift, "status", None), ended_at=getattr(shift, "ended_at", None)):
-                    continue
-                if not is_shift_active_status(getattr(shift, "status", None), ended_at=getattr(shift, "ended_at", None)):
-                    continue
-
-                st, et = _wsd_effective_times(wsd)
-                end_dt = _dt_msk_for_day_time(today, et, tz)
-                if now < end_dt:
-                    continue
-
-                # Respect user snooze (if they clicked "Ещё работаю")
-                snooze_until = getattr(wsd, "end_snooze_until", None)
-                if snooze_until is not None and now < snooze_until.astimezone(tz):
-                    continue
-
-                base_rate = int(getattr(shift, "base_rate", None) or int(getattr(u, "rate_k", 0) or 0))
-                extra_hours = int(getattr(shift, "extra_hours", 0) or 0)
-                overtime_hours = int(getattr(shift, "overtime_hours", 0) or 0)
-                extra_rate = int(getattr(shift, "extra_hour_rate", 300) or 300)
-                overtime_rate = int(getattr(shift, "overtime_hour_rate", 400) or 400)
-                amount_default = int(
-                    getattr(shift, "amount_default", 0)
-                    or calc_shift_default_amount(
-                        base_rate=base_rate,
-                        extra_hours=extra_hours,
-                        extra_hour_rate=extra_rate,
-                        overtime_hours=overtime_hours,
-                        overtime_hour_rate=overtime_rate,
-                    )
-                )
-
-                shift.base_rate = base_rate
-                shift.amount_default = amount_default
-                shift.amount_submitted = amount_default
-                shift.amount_approved = amount_default
-                shift.approval_required = False
-                shift.status = ShiftInstanceStatus.APPROVED
-                shift.ended_at = now_utc
-                await session.flush()
-
-                text = f"✅ Смена завершена, ваш баланс пополнен на <b>{int(amount_default)} ₽</b>."
-                kb = {
-                    "inline_keyboard": [
-                        [{"text": "✏️ Изменить сумму", "callback_data": f"shift:close_edit:{int(getattr(shift, 'id'))}"}],
-                    ]
-                }
-
-                try:
-                    await bot.send_message(chat_id=int(chat_id), text=text, reply_markup=kb)
-                except Exception:
-                    _logger.exception("failed to send auto shift close message", extra={"chat_id": int(chat_id)})
-    finally:
-        await bot.session.close()
-
-
 def _is_weekend(d: date) -> bool:
     return d.weekday() >= 5
 
@@ -303,15 +108,103 @@ async def reminder_job() -> None:
         _logger.info("reminder has no recipients")
         return
 
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
     text = "⏰ <b>Напоминание</b>\n\nСегодня ещё не внесены операции по складу (расход/пополнение)." 
-    for chat_id in ids:
-        try:
-            await bot.send_message(chat_id=chat_id, text=text)
-            _logger.info("reminder sent", extra={"chat_id": chat_id})
-        except Exception:
-            _logger.exception("failed to send reminder", extra={"chat_id": chat_id})
-    await bot.session.close()
+    async with get_async_session() as session:
+        for chat_id in ids:
+            await enqueue_message(
+                session,
+                chat_id=int(chat_id),
+                text=text,
+                disable_web_page_preview=False,
+                dedupe_key=f"stocks_reminder:{now.date().isoformat()}:{int(chat_id)}",
+            )
+            _logger.info("reminder queued", extra={"chat_id": chat_id})
+
+
+async def magic_links_cleanup_job() -> None:
+    async with get_async_session() as session:
+        deleted = await cleanup_magic_links(session)
+    _logger.info("magic links cleanup", extra={"deleted": deleted})
+
+
+async def fsm_states_cleanup_job() -> None:
+    async with get_async_session() as session:
+        deleted = await cleanup_fsm_states(session)
+    _logger.info("fsm states cleanup", extra={"deleted": deleted})
+
+
+def _web_base_url() -> str:
+    base = str(getattr(settings, "INTERNAL_WEB_BASE_URL", "") or "").strip() or "http://web:8000"
+    return base[:-1] if base.endswith("/") else base
+
+
+def build_morning_shift_messages(rows, *, day: date, tokens: dict[int, str], base_url: str) -> list[OutboxItem]:
+    """Outbox messages of the 08:00 "shift today" notice, one per working employee with a chat."""
+    items: list[OutboxItem] = []
+    for wsd in rows:
+        chat_id = int(getattr(wsd, "tg_id", 0) or 0)
+        tok = tokens.get(int(wsd.user_id))
+        if not chat_id or not tok:
+            continue
+
+        hours = getattr(wsd, "hours", None)
+        h_txt = f" ({int(hours)}ч)" if hours else ""
+        # Use tg-auth route to set cookie
+        web_link = base_url + f"/crm/auth/tg?t={tok}&next=%2Fcrm%2Fschedule%2Fpublic&scope=schedule"
+
+        text = (
+            f"⏰ <b>Смена сегодня</b>\n\n"
+            f"Сегодня у вас смена{h_txt}.\n"
+            f"Откройте меню графика, чтобы начать или закрыть смену.\n"
+            f"\n🔗 График: {web_link}"
+        )
+
+        kb = {
+            "inline_keyboard": [
+                [
+                    {"text": "✅ Начать смену", "callback_data": f"shift:start:{day.isoformat()}"},
+                ],
+                [
+                    {"text": "📅 Меню графика", "callback_data": "sched_menu:open"},
+                ],
+                [
+                    {"text": "🔗 Открыть график", "url": web_link},
+                ],
+            ]
+        }
+        items.append(
+            OutboxItem(
+                kind=KIND_MESSAGE,
+                chat_id=chat_id,
+                payload=message_payload(text=text, reply_markup=kb, disable_web_page_preview=False),
+                dedupe_key=f"shifts_morning:{int(wsd.id)}",
+            )
+        )
+    return items
+
+
+def coverage_alert_text(staff, *, day: date) -> str | None:
+    """Understaffed-hours alert for today's planned staff; None when covered or nobody is planned."""
+    if not staff:
+        return None
+    min_staff, open_h, close_h = coverage_thresholds()
+    planned = hourly_headcount([plan_interval(day, r.start_time, r.end_time)[1:] for r in staff])
+    short = understaffed_hours(planned, min_staff=min_staff, open_hour=open_h, close_hour=close_h)
+    if not short:
+        return None
+    return format_understaffed_alert(day=day, hours=short, planned=planned)
+
+
+def build_coverage_alerts(text: str, *, day: date, recipients: list[int]) -> list[OutboxItem]:
+    return [
+        OutboxItem(
+            kind=KIND_MESSAGE,
+            chat_id=int(chat_id),
+            payload=message_payload(text=text),
+            dedupe_key=f"shift_coverage_alert:{day.isoformat()}:{int(chat_id)}",
+        )
+        for chat_id in recipients
+    ]
 
 
 async def shifts_morning_job() -> None:
@@ -321,64 +214,23 @@ async def shifts_morning_job() -> None:
 
     _logger.info("shifts_morning_job tick", extra={"now": now.isoformat(), "day": str(today)})
 
+    # Read, build and queue in two short transactions; the outbox worker does the rate-limited,
+    # per-chat concurrent sending after commit, with no session held during the Telegram fan-out.
     async with get_async_session() as session:
-        rows = list(
-            (
-                await session.execute(
-                    select(WorkShiftDay, User)
-                    .join(User, User.id == WorkShiftDay.user_id)
-                    .where(WorkShiftDay.day == today)
-                    .where(WorkShiftDay.kind == "work")
-                    .where(User.is_deleted == False)
-                    .where(User.status == UserStatus.APPROVED)
-                )
-            ).all()
-        )
-
-        bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-        try:
-            for wsd, u in rows:
-                chat_id = int(getattr(u, "tg_id", 0) or 0)
-                if not chat_id:
-                    continue
-
-                hours = getattr(wsd, "hours", None)
-                h_txt = f" ({int(hours)}ч)" if hours else ""
-
-                tok = await create_magic_token(session, user_id=int(getattr(u, "id")), ttl_minutes=60, scope="schedule")
-                link = f"{get_schedule_url(is_admin=False, is_manager=False)}"
-                # Use tg-auth route to set cookie
-                base = str(getattr(settings, "INTERNAL_WEB_BASE_URL", "") or "").strip() or "http://web:8000"
-                if base.endswith("/"):
-                    base = base[:-1]
-                web_link = base + f"/crm/auth/tg?t={tok}&next=%2Fcrm%2Fschedule%2Fpublic&scope=schedule"
-
-                text = (
-                    f"⏰ <b>Смена сегодня</b>\n\n"
-                    f"Сегодня у вас смена{h_txt}.\n"
-                    f"Откройте меню графика, чтобы начать или закрыть смену.\n"
-                    f"\n🔗 График: {web_link}"
-                )
-
-                kb = {
-                    "inline_keyboard": [
-                        [
-                            {"text": "✅ Начать смену", "callback_data": f"shift:start:{today.isoformat()}"},
-                        ],
-                        [
-                            {"text": "📅 Меню графика", "callback_data": "sched_menu:open"},
-                        ],
-                        [
-                            {"text": "🔗 Открыть график", "url": web_link},
-                        ],
-                    ]
-                }
-                try:
-                    await bot.send_message(chat_id=chat_id, text=text, reply_markup=kb)
-                except Exception:
-                    _logger.exception("failed to send shift morning msg", extra={"chat_id": chat_id})
-        finally:
-            await bot.session.close()
+        staff = [r for r in await get_day_staff(session, day=today) if r.is_approved]
+    rows = [r for r in staff if r.tg_id]
+
+    tokens = issue_magic_tokens(user_ids=[int(r.user_id) for r in rows], ttl_minutes=60, scope="schedule")
+    items = build_morning_shift_messages(rows, day=today, tokens=tokens, base_url=_web_base_url())
+    # Coverage is checked against everyone planned, with or without a chat.
+    alert = coverage_alert_text(staff, day=today)
+    if alert:
+        items += build_coverage_alerts(alert, day=today, recipients=await _recipient_tg_ids(True, True))
+    if not items:
+        return
+    async with get_async_session() as session:
+        queued = await enqueue_many(session, items)
+    _logger.info("shifts_morning_job queued", extra={"day": str(today), "staff": len(rows), "queued": queued})
 
 
 async def daily_report_job() -> None:
@@ -408,13 +260,15 @@ async def daily_report_job() -> None:
 
     text = format_report_html("Авто-отчёт за сегодня", data)
 
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-    try:
-        await bot.send_message(chat_id=chat_id, text=text)
-        _logger.info("daily report sent", extra={"chat_id": chat_id})
-    except Exception:
-        _logger.exception("failed to send daily report", extra={"chat_id": chat_id})
-    await bot.session.close()
+    async with get_async_session() as session:
+        await enqueue_message(
+            session,
+            chat_id=chat_id,
+            text=text,
+            disable_web_page_preview=False,
+            dedupe_key=f"stocks_daily_report:{now.date().isoformat()}",
+        )
+    _logger.info("daily report queued", extra={"chat_id": chat_id})
 
 
 def get_scheduler() -> AsyncIOScheduler:
@@ -446,6 +300,29 @@ def get_scheduler() -> AsyncIOScheduler:
     return _scheduler
 
 
+def _schedule_shift_timer_jobs(sched: AsyncIOScheduler, tz: ZoneInfo) -> None:
+    install_shift_timers(sched)
+    sched.add_job(
+        reconcile_shift_timers,
+        CronTrigger(hour=0, minute=0, second=30, timezone=tz),
+        id="shift_timers_new_day",
+        replace_existing=True,
+    )
+    sched.add_job(
+        reconcile_shift_timers,
+        IntervalTrigger(minutes=15, timezone=tz),
+        id="shift_timers_reconcile",
+        next_run_time=datetime.now(tz),
+        replace_existing=True,
+    )
+    sched.add_job(
+        shift_auto_close_job,
+        IntervalTrigger(minutes=1, timezone=tz),
+        id="shift_auto_close",
+        replace_existing=True,
+    )
+
+
 def schedule_jobs() -> None:
     sched = get_scheduler()
     if getattr(sched, "_nikcrm_jobs_added", False):
@@ -474,27 +351,37 @@ def schedule_jobs() -> None:
         replace_existing=True,
     )
 
-    # Shift start/end notifications by planned time (polling)
+    # Shift start reminders / auto close run as one-shot timers (see shift_timers); these jobs
+    # only rebuild them: right away, after midnight for the new day, and as a slow safety net.
+    _schedule_shift_timer_jobs(sched, tz)
+
+    # Telegram outbox safety net: wakes the bot's outbox worker (or drains a batch without one)
     sched.add_job(
-        shift_time_notifications_job,
-        IntervalTrigger(minutes=1, timezone=tz),
-        id="shift_time_notifications",
+        telegram_outbox_job,
+        IntervalTrigger(minutes=5, timezone=tz),
+        id="telegram_outbox",
         replace_existing=True,
     )
 
-    # Shift auto close by planned end time (polling)
     sched.add_job(
-        shift_auto_close_job,
-        IntervalTrigger(minutes=1, timezone=tz),
-        id="shift_auto_close",
+        magic_links_cleanup_job,
+        CronTrigger(hour=4, minute=5, timezone=tz),
+        id="magic_links_cleanup",
         replace_existing=True,
     )
 
-    # Telegram outbox retry (best-effort) for network/DNS issues
     sched.add_job(
-        telegram_outbox_job,
-        IntervalTrigger(seconds=30, timezone=tz),
-        id="telegram_outbox",
+        fsm_states_cleanup_job,
+        CronTrigger(hour=4, minute=10, timezone=tz),
+        id="fsm_states_cleanup",
+        replace_existing=True,
+    )
+
+    # Event/audit partitions and queue retention (off-peak)
+    sched.add_job(
+        run_history_maintenance,
+        CronTrigger(hour=4, minute=15, timezone=tz),
+        id="history_maintenance",
         replace_existing=True,
     )
 
@@ -541,19 +428,7 @@ async def reschedule_from_db() -> None:
         replace_existing=True,
     )
 
-    sched.add_job(
-        shift_time_notifications_job,
-        IntervalTrigger(minutes=1, timezone=tz),
-        id="shift_time_notifications",
-        replace_existing=True,
-    )
-
-    sched.add_job(
-        shift_auto_close_job,
-        IntervalTrigger(minutes=1, timezone=tz),
-        id="shift_auto_close",
-        replace_existing=True,
-    )
+    _schedule_shift_timer_jobs(sched, tz)
 
     _logger.info(
         "scheduler jobs rescheduled from db",
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.date import DateTrigger
+from sqlalchemy import select
+
+from shared.config import settings
+from shared.db import get_async_session
+from shared.enums import UserStatus
+from shared.models import ShiftInstance, User, WorkShiftDay
+from shared.services.shift_auto_close import close_overdue_shifts
+from shared.services.shifts_domain import (
+    DEFAULT_SHIFT_END,
+    DEFAULT_SHIFT_START,
+    format_hours_from_times_int,
+    is_shift_active_status,
+    is_shift_final_status,
+)
+from shared.services.shifts_service import get_day_staff
+from shared.services.telegram_outbox import enqueue_message
+
+from bot.app.services.pg_listen_hub import get_listen_hub
+
+
+_logger = logging.getLogger(__name__)
+
+# NOTIFY channel fired by DB triggers on work_shift_days / shift_instances edits (migration 0057).
+SHIFT_SCHEDULE_CHANNEL = "shift_schedule"
+
+KIND_START = "start"
+KIND_END = "end"
+
+_JOB_PREFIX = "shift_timer:"
+_sched: AsyncIOScheduler | None = None
+
+
+def _tz() -> ZoneInfo:
+    try:
+        return ZoneInfo(getattr(settings, "TIMEZONE", "Europe/Moscow"))
+    except Exception:
+        return ZoneInfo("Europe/Moscow")
+
+
+def wsd_effective_times(wsd: WorkShiftDay) -> tuple[time, time]:
+    st = getattr(wsd, "start_time", None) or DEFAULT_SHIFT_START
+    et = getattr(wsd, "end_time", None) or DEFAULT_SHIFT_END
+    return st, et
+
+
+def dt_for_day_time(day: date, t: time, tz: ZoneInfo) -> datetime:
+    return datetime(day.year, day.month, day.day, t.hour, t.minute, tzinfo=tz)
+
+
+def timer_job_id(kind: str, wsd_id: int) -> str:
+    return f"{_JOB_PREFIX}{kind}:{int(wsd_id)}"
+
+
+def shift_timer_plan(*, wsd: WorkShiftDay, shift: ShiftInstance | None, tz: ZoneInfo) -> dict[str, datetime]:
+    """When the start reminder and the end handling (auto close) of a planned shift are due.
+
+    A kind is missing when nothing is left to do for it; times may be in the past (fire now).
+    """
+    st, et = wsd_effective_times(wsd)
+    day = wsd.day
+    status = getattr(shift, "status", None)
+    ended_at = getattr(shift, "ended_at", None)
+    active = shift is not None and is_shift_active_status(status, ended_at=ended_at)
+    final = shift is not None and is_shift_final_status(status, ended_at=ended_at)
+
+    plan: dict[str, datetime] = {}
+    if not active and not final and getattr(wsd, "start_notified_at", None) is None:
+        plan[KIND_START] = dt_for_day_time(day, st, tz)
+
+    if getattr(wsd, "end_notified_at", None) is None or (active and not final):
+        due = dt_for_day_time(day, et, tz)
+        snooze = getattr(wsd, "end_snooze_until", None)
+        if getattr(wsd, "end_notified_at", None) is not None and snooze is not None:
+            due = max(due, snooze.astimezone(tz))
+        plan[KIND_END] = due
+    return plan
+
+
+def timer_is_current(next_run_time: datetime | None, *, due: datetime, now: datetime) -> bool:
+    """Whether a scheduled job already covers ``due``: same time, or both are past (it fires now)."""
+    if next_run_time is None:
+        return False
+    if next_run_time == due:
+        return True
+    return due <= now and next_run_time <= now
+
+
+def _schedule(kind: str, wsd_id: int, run_at: datetime) -> None:
+    if _sched is None:
+        return
+    _sched.add_job(
+        fire_shift_timer,
+        DateTrigger(run_date=run_at, timezone=run_at.tzinfo),
+        args=[kind, int(wsd_id)],
+        id=timer_job_id(kind, wsd_id),
+        replace_existing=True,
+        misfire_grace_time=None,
+    )
+
+
+async def reconcile_shift_timers() -> int:
+    """Recompute today's start/end timers from the plan in one query and sync scheduler jobs."""
+    if _sched is None:
+        return 0
+    tz = _tz()
+    now = datetime.now(tz)
+    today = now.date()
+
+    # Runs right after shift_schedule NOTIFYs, so always read the committed state afresh.
+    async with get_async_session() as session:
+        rows = await get_day_staff(session, day=today, max_age=0)
+    latest = {int(r.id): (r, r.shift) for r in rows if r.is_approved and r.tg_id}
+
+    wanted: dict[str, tuple[str, int, datetime]] = {}
+    for wsd_id, (wsd, shift) in latest.items():
+        for kind, due in shift_timer_plan(wsd=wsd, shift=shift, tz=tz).items():
+            wanted[timer_job_id(kind, wsd_id)] = (kind, wsd_id, due)
+
+    existing = {j.id: j for j in _sched.get_jobs() if str(j.id).startswith(_JOB_PREFIX)}
+    for job_id in set(existing) - set(wanted):
+        try:
+            _sched.remove_job(job_id)
+        except Exception:
+            pass
+    for job_id, (kind, wsd_id, due) in wanted.items():
+        job = existing.get(job_id)
+        if job is not None and timer_is_current(getattr(job, "next_run_time", None), due=due, now=now):
+            continue
+        _schedule(kind, wsd_id, max(due, now))
+
+    _logger.info("shift timers reconciled", extra={"day": str(today), "timers": len(wanted)})
+    return len(wanted)
+
+
+async def _send_start(session, *, wsd: WorkShiftDay, user: User, now: datetime) -> None:
+    st, et = wsd_effective_times(wsd)
+    hrs = format_hours_from_times_int(start_time=st, end_time=et)
+    text = (
+        f"⏰ <b>Начало смены</b>\n\n"
+        f"Сегодня у тебя смена: <b>{st.strftime('%H:%M')}–{et.strftime('%H:%M')}</b> ({hrs} часов).\n"
+        f"Начать смену?"
+    )
+    kb = {
+        "inline_keyboard": [
+            [{"text": "✅ Начать", "callback_data": f"shift:start:{wsd.day.isoformat()}"}],
+            [{"text": "📅 Меню графика", "callback_data": "sched_menu:open"}],
+        ]
+    }
+    await enqueue_message(
+        session,
+        chat_id=int(user.tg_id),
+        text=text,
+        reply_markup=kb,
+        disable_web_page_preview=False,
+        dedupe_key=f"shift_start:{int(wsd.id)}",
+    )
+    wsd.start_notified_at = now
+    await session.flush()
+    _logger.info("shift start notified", extra={"user_id": int(user.id), "wsd_id": int(wsd.id)})
+
+
+async def fire_shift_timer(kind: str, wsd_id: int) -> None:
+    """One-shot timer: re-check the plan row and send the start reminder or close the shift."""
+    tz = _tz()
+    now = datetime.now(tz)
+    async with get_async_session() as session:
+        row = (
+            await session.execute(
+                select(WorkShiftDay, User)
+                .join(User, User.id == WorkShiftDay.user_id)
+                .where(WorkShiftDay.id == int(wsd_id))
+                .where(WorkShiftDay.kind == "work")
+                .where(User.is_deleted == False)  # noqa: E712
+                .where(User.status == UserStatus.APPROVED)
+                .with_for_update(of=WorkShiftDay)
+            )
+        ).first()
+        if row is None:
+            return
+        wsd, user = row
+        if not int(getattr(user, "tg_id", 0) or 0):
+            return
+        shift = (
+            await session.execute(
+                select(ShiftInstance)
+                .where(ShiftInstance.user_id == int(wsd.user_id))
+                .where(ShiftInstance.day == wsd.day)
+                .order_by(ShiftInstance.id.desc())
+                .limit(1)
+            )
+        ).scalar_one_or_none()
+
+        due = shift_timer_plan(wsd=wsd, shift=shift, tz=tz).get(kind)
+        if due is None:
+            return
+        if due > now:
+            # Plan moved or the user snoozed: try again at the new time.
+            _schedule(kind, int(wsd.id), due)
+            return
+
+        if kind == KIND_START:
+            await _send_start(session, wsd=wsd, user=user, now=now)
+            return
+
+        # END: the prompt was removed; mark it handled and auto close an open shift.
+        if getattr(wsd, "end_notified_at", None) is None:
+            wsd.end_notified_at = now
+            wsd.end_snooze_until = None
+            wsd.end_followup_notified_at = None
+            await session.flush()
+        if shift is not None and not is_shift_final_status(shift.status, ended_at=shift.ended_at) and is_shift_active_status(
+            shift.status, ended_at=shift.ended_at
+        ):
+            await close_overdue_shifts(session, now=now, tz_name=tz.key, wsd_ids=[int(wsd.id)])
+
+
+async def shift_auto_close_job() -> None:
+    """Sweep: close every overdue open shift in one statement (timers that were lost or snoozed)."""
+    tz = _tz()
+    async with get_async_session() as session:
+        closed = await close_overdue_shifts(session, now=datetime.now(tz), tz_name=tz.key)
+    if closed:
+        _logger.info("shifts auto closed", extra={"count": len(closed), "shift_ids": [c.shift_id for c in closed]})
+
+
+def install_shift_timers(sched: AsyncIOScheduler) -> None:
+    global _sched
+    _sched = sched
+
+
+async def shift_timers_listener(*, debounce_seconds: float = 1.0) -> None:
+    """Reconcile timers whenever the plan or a shift changes (NOTIFY shift_schedule)."""
+    wakeup = get_listen_hub().subscribe(SHIFT_SCHEDULE_CHANNEL)
+    while True:
+        await wakeup.wait()
+        # Coalesce bursts (bulk schedule edits fire one NOTIFY per row).
+        await asyncio.sleep(float(debounce_seconds))
+        wakeup.clear()
+        try:
+            await reconcile_shift_timers()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _logger.exception("shift timers reconcile failed")
@@ -2,24 +2,31 @@ from __future__ import annotations
 
 import asyncio
 import logging
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Any
 
-import asyncpg
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.types import FSInputFile
 
 from shared.config import settings
 from shared.db import get_async_session
-from shared.enums import TaskStatus
+from shared.enums import TaskPriority, TaskStatus
 from shared.utils import format_moscow, utc_now
 from shared.permissions import role_flags
+from shared.services.task_bulk import render_bulk_assigned_text, render_bulk_status_text
+from shared.services.task_notifications import NOTIFY_CHANNEL as TASK_NOTIFY_CHANNEL
+from shared.services.task_notifications import digest_window, is_digestible, is_force_new
 
 from bot.app.repository.task_notifications import TaskNotificationRepository
 from bot.app.repository.tasks import TaskRepository
 from bot.app.services.tasks import TasksService
 from bot.app.keyboards.tasks import task_detail_kb
 from bot.app.utils.html import esc, format_plain_url
+from bot.app.services.pg_listen_hub import get_listen_hub
+from bot.app.utils.rate_limit import AsyncRateLimiter, telegram_send_limiter
 from bot.app.utils.task_message import render_task_message
 from bot.app.utils.urls import build_task_board_magic_link, build_tasks_board_magic_link
 
@@ -207,55 +214,6 @@ def _created_notification_photo_links(*, task, payload: dict) -> list[str]:
     return out
 
 
-def _asyncpg_dsn() -> str:
-    dsn = str(getattr(settings, "DATABASE_URL", "") or "")
-    # SQLAlchemy URL -> asyncpg URL
-    if dsn.startswith("postgresql+asyncpg://"):
-        dsn = "postgresql://" + dsn[len("postgresql+asyncpg://") :]
-    return dsn
-
-
-async def notifications_listener(*, wakeup: asyncio.Event) -> None:
-    """Listen for NOTIFY from web/bot after commit and wake up worker loop.
-
-    We still rely on DB state (pending + scheduled_at <= now), so spurious signals are safe.
-    """
-
-    dsn = _asyncpg_dsn()
-    if not dsn:
-        _logger.warning("task notifications listener disabled: empty DATABASE_URL")
-        return
-
-    while True:
-        conn = None
-        try:
-            conn = await asyncpg.connect(dsn)
-
-            def _on_notify(_conn, _pid, _channel, _payload):
-                try:
-                    wakeup.set()
-                except Exception:
-                    pass
-
-            await conn.add_listener("task_notifications", _on_notify)
-            _logger.info("task notifications listener started")
-
-            # keep connection alive
-            while True:
-                await asyncio.sleep(3600)
-        except asyncio.CancelledError:
-            raise
-        except Exception:
-            _logger.exception("task notifications listener error; reconnecting")
-            await asyncio.sleep(2)
-        finally:
-            if conn is not None:
-                try:
-                    await conn.close()
-                except Exception:
-                    pass
-
-
 def _format_task_short(task) -> str:
     title = (getattr(task, "title", "") or "").strip()
     st = getattr(task, "status", None)
@@ -386,6 +344,10 @@ def render_notification_html(*, n) -> str:
         return f"{head}\n\n👤 <b>{esc(actor_name)}:</b> {esc(snippet)}"
     if typ == "remind":
         return f"🔔 <b>Напоминание</b>\n\n{base}\n\n<b>Инициатор:</b> {esc(actor_name)}"
+    if typ == "bulk_status_changed":
+        return render_bulk_status_text(payload)
+    if typ == "bulk_assigned":
+        return render_bulk_assigned_text(payload)
 
     return f"🔔 <b>Уведомление</b>\n\n{base}"
 
@@ -443,295 +405,546 @@ def _format_status_changed_compact(*, task, payload: dict, board_url: str) -> st
     return "\n".join(lines)
 
 
-async def notifications_worker(*, bot, poll_seconds: int = 20, batch_size: int = 30) -> None:
-    _logger.info("task notifications worker started", extra={"poll_seconds": poll_seconds})
+def _find_actor_user(*, task, actor_uid: int):
+    if actor_uid <= 0:
+        return None
+    if int(getattr(task, "created_by_user_id", 0) or 0) == actor_uid:
+        return getattr(task, "created_by_user", None)
+    if int(getattr(task, "started_by_user_id", 0) or 0) == actor_uid:
+        return getattr(task, "started_by_user", None)
+    if int(getattr(task, "completed_by_user_id", 0) or 0) == actor_uid:
+        return getattr(task, "completed_by_user", None)
+    for u in list(getattr(task, "assignees", None) or []):
+        if int(getattr(u, "id", 0) or 0) == actor_uid:
+            return u
+    return None
+
+
+@dataclass
+class _Outgoing:
+    """One rendered notification waiting for (or after) delivery."""
+
+    n: Any
+    chat_id: int
+    task_id: int
+    typ: str
+    text: str
+    kb: Any
+    task: Any
+    payload: dict
+    force_new: bool = True
+    edit_target: tuple[int, int] | None = None
+    fallback: bool = False
+    delivered: tuple[int, int] | None = None
+    edited: bool = False
+    error: BaseException | None = None
+    retry_after: int | None = None
+    board_url: str | None = None
+    # Notifications folded into this one (digest); they share its delivery outcome.
+    merged: list = field(default_factory=list)
+    digest_tasks: int = 0
+
+
+class _BatchLookups:
+    """DB lookups shared by all notifications of one batch.
+
+    A burst (e.g. a task created for many assignees) hits the same task and the same
+    recipients repeatedly; each task, actor and board link is resolved once per batch.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.tasks_repo = TaskRepository(session)
+        self.tasks_svc = TasksService(self.tasks_repo)
+        self._actors: dict[int, Any] = {}
+        self._tasks: dict[int, Any] = {}
+        self._board_urls: dict[int, str] = {}
+
+    async def actor(self, chat_id: int):
+        if chat_id not in self._actors:
+            self._actors[chat_id] = await self.tasks_svc.get_actor_or_none(int(chat_id))
+        return self._actors[chat_id]
+
+    async def task(self, task_id: int):
+        if task_id not in self._tasks:
+            self._tasks[task_id] = await self.tasks_repo.get_task_full(int(task_id))
+        return self._tasks[task_id]
+
+    async def detail(self, *, chat_id: int, task_id: int):
+        actor = await self.actor(chat_id)
+        if not actor:
+            return None, None, None
+        task = await self.task(task_id)
+        if not task:
+            return actor, None, None
+        return self.tasks_svc.detail_for_actor(tg_id=int(chat_id), actor=actor, task=task)
+
+    async def board_url(self, *, chat_id: int, actor, is_admin: bool, is_manager: bool) -> str:
+        url = self._board_urls.get(chat_id)
+        if url is None:
+            url = await build_tasks_board_magic_link(
+                session=self.session,
+                user=actor,
+                is_admin=bool(is_admin),
+                is_manager=bool(is_manager),
+                ttl_minutes=60,
+            )
+            self._board_urls[chat_id] = str(url)
+        return url
+
+
+async def _prepare_notification(*, n, repo: TaskNotificationRepository, lookups: _BatchLookups, now: datetime) -> _Outgoing | None:
+    """Render a due notification (all DB work happens here, before any Telegram call)."""
+    recipient = getattr(n, "recipient_user", None)
+    chat_id = int(getattr(recipient, "tg_id", 0) or 0)
+    if chat_id <= 0:
+        try:
+            _logger.info(
+                "TASK_NOTIFY_SKIP reason=no_tg_id source=worker notification_id=%s type=%s task_id=%s recipient_user_id=%s",
+                int(getattr(n, "id", 0) or 0),
+                str(getattr(n, "type", "")),
+                int(getattr(n, "task_id", 0) or 0),
+                int(getattr(recipient, "id", 0) or 0),
+            )
+        except Exception:
+            pass
+        await repo.mark_failed(n=n, now=now, error="no tg_id for recipient", retry_at=None)
+        return None
+    task = getattr(n, "task", None)
+    task_id = int(getattr(task, "id")) if task is not None else int(getattr(n, "task_id"))
 
-    wakeup = asyncio.Event()
-    listener_task: asyncio.Task | None = None
     try:
+        _logger.info(
+            "TASK_NOTIFY_PROCESS source=worker notification_id=%s type=%s task_id=%s recipient_user_id=%s chat_id=%s",
+            int(getattr(n, "id", 0) or 0),
+            str(getattr(n, "type", "")),
+            int(task_id),
+            int(getattr(recipient, "id", 0) or 0),
+            int(chat_id),
+        )
+    except Exception:
+        pass
+
+    payload = dict(getattr(n, "payload", None) or {})
+    n_type = str(getattr(n, "type", ""))
+    event_type = _notification_event_type(n_type=n_type, payload=payload)
+
+    # Build the same keyboard as in task detail view, using existing permissions logic.
+    actor, task2, perms = await lookups.detail(chat_id=chat_id, task_id=int(task_id))
+    if not actor or not task2 or not perms:
+        task_fallback = getattr(n, "task", None)
+        if task_fallback is not None and event_type is not None:
+            text, _kb0 = render_task_message(
+                task=task_fallback,
+                context=str(event_type),
+                viewer_user=None,
+                actor_user=None,
+                board_url=None,
+                can_take=False,
+            )
+        else:
+            text = render_notification_html(n=n)
+        return _Outgoing(
+            n=n,
+            chat_id=chat_id,
+            task_id=int(task_id),
+            typ=n_type,
+            text=str(text),
+            kb=None,
+            task=task_fallback,
+            payload=payload,
+            fallback=True,
+        )
+
+    r = role_flags(
+        tg_id=int(chat_id),
+        admin_ids=settings.admin_ids,
+        status=getattr(actor, "status", None),
+        position=getattr(actor, "position", None),
+    )
+    board_url = await lookups.board_url(
+        chat_id=chat_id, actor=actor, is_admin=bool(r.is_admin), is_manager=bool(r.is_manager)
+    )
+
+    can_edit = bool(r.is_admin or r.is_manager)
+    is_archived = str(task2.status.value if hasattr(task2.status, "value") else str(task2.status)) == TaskStatus.ARCHIVED.value
+    kb = task_detail_kb(
+        task_id=int(task2.id),
+        can_take=bool(perms.take_in_progress),
+        can_to_review=bool(perms.finish_to_review),
+        can_accept_done=bool(perms.accept_done),
+        can_send_back=bool(perms.send_back),
+        can_edit=bool(can_edit),
+        can_archive=bool(perms.archive),
+        can_unarchive=bool(perms.unarchive),
+        is_archived=bool(is_archived),
+        back_cb="tasks:menu",
+    )
+
+    if event_type is not None:
+        actor_user = _find_actor_user(task=task2, actor_uid=int(payload.get("actor_user_id") or 0))
+        text, kb = render_task_message(
+            task=task2,
+            context=str(event_type),
+            viewer_user=actor,
+            actor_user=actor_user,
+            board_url=str(board_url),
+            can_take=bool(perms.take_in_progress),
+            can_accept_done=bool(perms.accept_done),
+        )
+    elif n_type == "status_changed":
+        # Special-case 'return to rework' to guarantee comment is visible.
+        action = str(payload.get("action") or "")
+        fr = str(payload.get("from") or "")
+        to = str(payload.get("to") or "")
+        is_rework = action == "return_to_rework" or (
+            fr == TaskStatus.REVIEW.value and to == TaskStatus.IN_PROGRESS.value and str(payload.get("comment") or "").strip()
+        )
+        if is_rework:
+            text = render_notification_html(n=n) + "\n\n" + format_plain_url("🔗 Открыть задачу:", str(board_url))
+        else:
+            text = _format_status_changed_compact(task=task2, payload=payload, board_url=board_url)
+    else:
+        # Keep existing formats for other notification types, but append board URL explicitly.
+        text = render_notification_html(n=n) + "\n\n" + format_plain_url("🌐 Доска задач:", str(board_url))
+
+    if n_type in {"bulk_status_changed", "bulk_assigned"}:
+        # Digest covers several tasks; per-task action buttons would be misleading.
+        kb = None
+
+    if n_type == "comment":
+        task_url = ""
         try:
-            listener_task = asyncio.create_task(notifications_listener(wakeup=wakeup))
+            task_url = await build_task_board_magic_link(
+                session=lookups.session,
+                user=actor,
+                task_id=int(task_id),
+                is_admin=bool(r.is_admin),
+                is_manager=bool(r.is_manager),
+                ttl_minutes=60,
+            )
         except Exception:
-            _logger.exception("failed to start task notifications listener")
+            task_url = ""
+        if str(task_url).strip():
+            text = str(text) + "\n" + format_plain_url("🔗 Открыть задачу:", str(task_url))
+
+    # Prefer edit of last sent notification for this task+recipient.
+    # BUT: for some types we must send a new message to ensure the user gets a visible notification.
+    force_new = is_force_new(typ=n_type, payload=payload)
+    edit_target: tuple[int, int] | None = None
+    if not force_new:
+        last_sent = await repo.get_last_sent_for_task_recipient(task_id=int(task_id), recipient_user_id=int(getattr(recipient, "id")))
+        if last_sent is not None:
+            lp = dict(getattr(last_sent, "payload", None) or {})
+            if lp.get("tg_chat_id") and lp.get("tg_message_id"):
+                edit_target = (int(lp["tg_chat_id"]), int(lp["tg_message_id"]))
+
+    return _Outgoing(
+        n=n,
+        chat_id=chat_id,
+        task_id=int(task_id),
+        typ=n_type,
+        text=str(text),
+        kb=kb,
+        task=task2,
+        payload=payload,
+        force_new=force_new,
+        edit_target=edit_target,
+        board_url=str(board_url),
+    )
 
-        while True:
-            try:
-                # Coalesce bursts of signals.
-                wakeup.clear()
-
-                now = utc_now()
-                async with get_async_session() as session:
-                    repo = TaskNotificationRepository(session)
-                    items = await repo.fetch_due_pending(now=now, limit=batch_size)
-
-                    for n in items:
-                        await repo.inc_attempts(n=n)
-                        try:
-                            recipient = getattr(n, "recipient_user", None)
-                            chat_id = int(getattr(recipient, "tg_id", 0) or 0)
-                            if chat_id <= 0:
-                                try:
-                                    _logger.info(
-                                        "TASK_NOTIFY_SKIP reason=no_tg_id source=worker notification_id=%s type=%s task_id=%s recipient_user_id=%s",
-                                        int(getattr(n, "id", 0) or 0),
-                                        str(getattr(n, "type", "")),
-                                        int(getattr(n, "task_id", 0) or 0),
-                                        int(getattr(recipient, "id", 0) or 0),
-                                    )
-                                except Exception:
-                                    pass
-                                await repo.mark_failed(n=n, now=now, error="no tg_id for recipient", retry_at=None)
-                                continue
-                            task = getattr(n, "task", None)
-                            task_id = int(getattr(task, "id")) if task is not None else int(getattr(n, "task_id"))
-
-                            try:
-                                _logger.info(
-                                    "TASK_NOTIFY_PROCESS source=worker notification_id=%s type=%s task_id=%s recipient_user_id=%s chat_id=%s",
-                                    int(getattr(n, "id", 0) or 0),
-                                    str(getattr(n, "type", "")),
-                                    int(task_id),
-                                    int(getattr(recipient, "id", 0) or 0),
-                                    int(chat_id),
-                                )
-                            except Exception:
-                                pass
-
-                            # Build the same keyboard as in task detail view, using existing permissions logic.
-                            tasks_repo = TaskRepository(session)
-                            tasks_svc = TasksService(tasks_repo)
-                            actor, task2, perms = await tasks_svc.get_detail(tg_id=chat_id, task_id=int(task_id))
-                            if not actor or not task2 or not perms:
-                                payload = dict(getattr(n, "payload", None) or {})
-                                n_type = str(getattr(n, "type", ""))
-                                event_type = _notification_event_type(n_type=n_type, payload=payload)
-                                task_fallback = getattr(n, "task", None)
-                                if task_fallback is not None and event_type is not None:
-                                    text, _kb0 = render_task_message(
-                                        task=task_fallback,
-                                        context=str(event_type),
-                                        viewer_user=None,
-                                        actor_user=None,
-                                        board_url=None,
-                                        can_take=False,
-                                    )
-                                else:
-                                    text = render_notification_html(n=n)
-                                sent = await _send_task_notification(
-                                    bot=bot,
-                                    chat_id=int(chat_id),
-                                    typ=str(n_type),
-                                    text=str(text),
-                                    reply_markup=None,
-                                    task=task_fallback,
-                                    payload=payload,
-                                )
-                                await repo.store_delivery_info(n=n, chat_id=int(chat_id), message_id=int(sent.message_id))
-                                await repo.mark_sent(n=n, now=now)
-                                try:
-                                    _logger.info(
-                                        "TASK_NOTIFY_SENT source=worker notification_id=%s type=%s task_id=%s chat_id=%s message_id=%s mode=send_fallback",
-                                        int(getattr(n, "id", 0) or 0),
-                                        str(getattr(n, "type", "")),
-                                        int(task_id),
-                                        int(chat_id),
-                                        int(sent.message_id),
-                                    )
-                                except Exception:
-                                    pass
-                                continue
-
-                            r = role_flags(
-                                tg_id=int(chat_id),
-                                admin_ids=settings.admin_ids,
-                                status=getattr(actor, "status", None),
-                                position=getattr(actor, "position", None),
-                            )
-                            board_url = await build_tasks_board_magic_link(
-                                session=session,
-                                user=actor,
-                                is_admin=bool(r.is_admin),
-                                is_manager=bool(r.is_manager),
-                                ttl_minutes=60,
-                            )
-
-                            task_url = ""
-                            try:
-                                task_url = await build_task_board_magic_link(
-                                    session=session,
-                                    user=actor,
-                                    task_id=int(task_id),
-                                    is_admin=bool(r.is_admin),
-                                    is_manager=bool(r.is_manager),
-                                    ttl_minutes=60,
-                                )
-                            except Exception:
-                                task_url = ""
-
-                            can_edit = bool(r.is_admin or r.is_manager)
-                            is_archived = str(task2.status.value if hasattr(task2.status, "value") else str(task2.status)) == TaskStatus.ARCHIVED.value
-                            kb = task_detail_kb(
-                                task_id=int(task2.id),
-                                can_take=bool(perms.take_in_progress),
-                                can_to_review=bool(perms.finish_to_review),
-                                can_accept_done=bool(perms.accept_done),
-                                can_send_back=bool(perms.send_back),
-                                can_edit=bool(can_edit),
-                                can_archive=bool(perms.archive),
-                                can_unarchive=bool(perms.unarchive),
-                                is_archived=bool(is_archived),
-                                back_cb="tasks:menu",
-                            )
-
-                            payload = dict(getattr(n, "payload", None) or {})
-                            n_type = str(getattr(n, "type", ""))
-                            event_type = _notification_event_type(n_type=n_type, payload=payload)
-                            if event_type is not None:
-                                actor_uid = int(payload.get("actor_user_id") or 0)
-                                actor_user = None
-                                if actor_uid > 0:
-                                    if int(getattr(task2, "created_by_user_id", 0) or 0) == actor_uid:
-                                        actor_user = getattr(task2, "created_by_user", None)
-                                    elif int(getattr(task2, "started_by_user_id", 0) or 0) == actor_uid:
-                                        actor_user = getattr(task2, "started_by_user", None)
-                                    elif int(getattr(task2, "completed_by_user_id", 0) or 0) == actor_uid:
-                                        actor_user = getattr(task2, "completed_by_user", None)
-                                    else:
-                                        for u in list(getattr(task2, "assignees", None) or []):
-                                            if int(getattr(u, "id", 0) or 0) == actor_uid:
-                                                actor_user = u
-                                                break
-
-                                text, kb = render_task_message(
-                                    task=task2,
-                                    context=str(event_type),
-                                    viewer_user=actor,
-                                    actor_user=actor_user,
-                                    board_url=str(board_url),
-                                    can_take=bool(perms.take_in_progress),
-                                    can_accept_done=bool(perms.accept_done),
-                                )
-                            elif n_type == "status_changed":
-                                # Special-case 'return to rework' to guarantee comment is visible.
-                                action = str(payload.get("action") or "")
-                                fr = str(payload.get("from") or "")
-                                to = str(payload.get("to") or "")
-                                is_rework = action == "return_to_rework" or (
-                                    fr == TaskStatus.REVIEW.value and to == TaskStatus.IN_PROGRESS.value and str(payload.get("comment") or "").strip()
-                                )
-                                if is_rework:
-                                    text = render_notification_html(n=n) + "\n\n" + format_plain_url("🔗 Открыть задачу:", str(board_url))
-                                else:
-                                    text = _format_status_changed_compact(task=task2, payload=payload, board_url=board_url)
-                            else:
-                                # Keep existing formats for other notification types, but append board URL explicitly.
-                                text = render_notification_html(n=n) + "\n\n" + format_plain_url("🌐 Доска задач:", str(board_url))
-
-                            if str(n_type) == "comment" and str(task_url).strip():
-                                text = str(text) + "\n" + format_plain_url("🔗 Открыть задачу:", str(task_url))
-
-                            # Prefer edit of last sent notification for this task+recipient.
-                            # BUT: for some types we must send a new message to ensure the user gets a visible notification.
-                            typ = str(getattr(n, "type", ""))
-                            force_new = False
-                            if typ == "created":
-                                force_new = True
-                            if typ in {"taken_in_work", "sent_to_review"}:
-                                force_new = True
-                            if typ == "status_changed":
-                                try:
-                                    action = str(payload.get("action") or "")
-                                    fr = str(payload.get("from") or "")
-                                    to = str(payload.get("to") or "")
-                                    if action == "return_to_rework":
-                                        force_new = True
-                                    elif fr == TaskStatus.REVIEW.value and to == TaskStatus.IN_PROGRESS.value:
-                                        force_new = True
-                                except Exception:
-                                    pass
-
-                            edited = False
-                            if not force_new:
-                                last_sent = await repo.get_last_sent_for_task_recipient(task_id=int(task_id), recipient_user_id=int(getattr(recipient, "id")))
-                                if last_sent is not None:
-                                    lp = dict(getattr(last_sent, "payload", None) or {})
-                                    last_chat_id = lp.get("tg_chat_id")
-                                    last_message_id = lp.get("tg_message_id")
-                                    if last_chat_id and last_message_id:
-                                        try:
-                                            await bot.edit_message_text(
-                                                chat_id=int(last_chat_id),
-                                                message_id=int(last_message_id),
-                                                text=text,
-                                                parse_mode="HTML",
-                                                reply_markup=kb,
-                                                disable_web_page_preview=True,
-                                            )
-                                            await repo.store_delivery_info(n=n, chat_id=int(last_chat_id), message_id=int(last_message_id))
-                                            edited = True
-                                        except Exception:
-                                            edited = False
-
-                            if not edited:
-                                sent = await _send_task_notification(
-                                    bot=bot,
-                                    chat_id=int(chat_id),
-                                    typ=str(typ),
-                                    text=str(text),
-                                    reply_markup=kb,
-                                    task=task2,
-                                    payload=payload,
-                                )
-                                await repo.store_delivery_info(n=n, chat_id=int(chat_id), message_id=int(sent.message_id))
-                                try:
-                                    _logger.info(
-                                        "TASK_NOTIFY_SENT source=worker notification_id=%s type=%s task_id=%s chat_id=%s message_id=%s mode=send",
-                                        int(getattr(n, "id", 0) or 0),
-                                        str(getattr(n, "type", "")),
-                                        int(task_id),
-                                        int(chat_id),
-                                        int(sent.message_id),
-                                    )
-                                except Exception:
-                                    pass
-                            else:
-                                try:
-                                    _logger.info(
-                                        "TASK_NOTIFY_SENT source=worker notification_id=%s type=%s task_id=%s chat_id=%s message_id=%s mode=edit",
-                                        int(getattr(n, "id", 0) or 0),
-                                        str(getattr(n, "type", "")),
-                                        int(task_id),
-                                        int(chat_id),
-                                        int(getattr(n, "tg_message_id", 0) or 0),
-                                    )
-                                except Exception:
-                                    pass
-
-                            await repo.mark_sent(n=n, now=now)
-                        except Exception as e:
-                            # basic 3 attempts with simple backoff
-                            attempts = int(getattr(n, "attempts", 0) or 0)
-                            err = repr(e)
-                            retry_at = None
-                            if attempts < 3:
-                                retry_at = now + timedelta(minutes=2 * attempts)
-                            await repo.mark_failed(n=n, now=now, error=err, retry_at=retry_at)
-
-            except asyncio.CancelledError:
-                _logger.info("task notifications worker cancelled")
-                raise
-            except Exception:
-                _logger.exception("task notifications worker loop error")
-
-            # Event-driven wakeup + fallback polling.
-            try:
-                await asyncio.wait_for(wakeup.wait(), timeout=int(poll_seconds))
-            except asyncio.TimeoutError:
-                pass
-    finally:
-        if listener_task is not None:
-            listener_task.cancel()
-            try:
-                await listener_task
-            except Exception:
-                pass
+
+DIGEST_MAX_LINES = 25
+
+
+def _digest_line(o: _Outgoing) -> str:
+    payload = o.payload or {}
+    actor = esc(str(payload.get("actor_name") or "—"))
+    if o.typ == "comment":
+        text = str(payload.get("text") or "").strip()
+        if len(text) > 200:
+            text = text[:200] + "…"
+        return f"💬 {actor}: {esc(text)}"
+    fr = _status_human_local(str(payload.get("from") or ""))
+    to = _status_human_local(str(payload.get("to") or ""))
+    return f"🔄 {esc(fr)} → {esc(to)} ({actor})"
+
+
+def render_digest_html(items: list[_Outgoing]) -> str:
+    """One message for several routine updates of one recipient, grouped by task in event order."""
+    by_task: dict[int, list[_Outgoing]] = {}
+    for o in items:
+        by_task.setdefault(int(o.task_id), []).append(o)
+
+    lines: list[str] = [f"🔔 <b>Обновления по задачам</b> ({len(items)})"]
+    shown = 0
+    for task_id, its in by_task.items():
+        first = its[0]
+        title = str(getattr(first.task, "title", "") or "").strip() or str(first.payload.get("task_title") or "").strip()
+        lines.append("")
+        lines.append(f"📌 <b>{esc(title or f'Задача #{int(task_id)}')}</b>")
+        for o in its:
+            if shown >= DIGEST_MAX_LINES:
+                break
+            lines.append(_digest_line(o))
+            shown += 1
+    if shown < len(items):
+        lines.append("")
+        lines.append(f"… и ещё {len(items) - shown}")
+    board_url = next((o.board_url for o in reversed(items) if o.board_url), None)
+    if board_url:
+        lines.append("")
+        lines.append(format_plain_url("🌐 Доска задач:", str(board_url)))
+    return "\n".join(lines)
+
+
+def _coalesce_digests(outgoing: list[_Outgoing]) -> list[_Outgoing]:
+    """Fold each chat's routine updates of this batch into one digest.
+
+    The digest takes the place of the chat's last folded item, so force-new messages around it
+    keep their order. For a single task it edits that task's last message (like a plain update);
+    a digest spanning several tasks is always sent as a new message.
+    """
+    positions: dict[int, list[int]] = {}
+    for i, o in enumerate(outgoing):
+        if not o.fallback and not o.force_new and is_digestible(typ=o.typ, payload=o.payload):
+            positions.setdefault(int(o.chat_id), []).append(i)
+
+    replace: dict[int, _Outgoing] = {}
+    drop: set[int] = set()
+    for idxs in positions.values():
+        if len(idxs) < 2:
+            continue
+        items = [outgoing[i] for i in idxs]
+        last = items[-1]
+        tasks = {int(o.task_id) for o in items}
+        single = len(tasks) == 1
+        replace[idxs[-1]] = _Outgoing(
+            n=last.n,
+            chat_id=last.chat_id,
+            task_id=last.task_id,
+            typ="digest",
+            text=render_digest_html(items),
+            kb=(last.kb if single else None),
+            task=last.task,
+            payload=last.payload,
+            force_new=not single,
+            edit_target=(last.edit_target if single else None),
+            board_url=last.board_url,
+            merged=[o.n for o in items[:-1]],
+            digest_tasks=len(tasks),
+        )
+        drop.update(idxs[:-1])
+
+    return [replace.get(i, o) for i, o in enumerate(outgoing) if i not in drop]
+
+
+async def _deliver_one(*, bot, o: _Outgoing, limiter: AsyncRateLimiter, last: dict[int, tuple[int, int]]) -> None:
+    target = None if o.force_new else (last.get(o.task_id) or o.edit_target)
+    if target is not None:
+        await limiter.acquire()
+        try:
+            await bot.edit_message_text(
+                chat_id=int(target[0]),
+                message_id=int(target[1]),
+                text=o.text,
+                parse_mode="HTML",
+                reply_markup=o.kb,
+                disable_web_page_preview=True,
+            )
+            o.delivered = (int(target[0]), int(target[1]))
+            o.edited = True
+        except TelegramRetryAfter:
+            raise
+        except Exception:
+            o.edited = False
+
+    if not o.edited:
+        await limiter.acquire()
+        sent = await _send_task_notification(
+            bot=bot,
+            chat_id=int(o.chat_id),
+            typ=str(o.typ),
+            text=str(o.text),
+            reply_markup=o.kb,
+            task=o.task,
+            payload=o.payload,
+        )
+        o.delivered = (int(o.chat_id), int(sent.message_id))
+    last[o.task_id] = o.delivered
+
+
+async def _deliver_chat(*, bot, items: list[_Outgoing], limiter: AsyncRateLimiter) -> None:
+    """Deliver one chat's notifications strictly in order.
+
+    On flood control the rest of the chat's queue is deferred as a whole, so a later
+    message never overtakes an earlier one.
+    """
+    last: dict[int, tuple[int, int]] = {}
+    for i, o in enumerate(items):
+        try:
+            await _deliver_one(bot=bot, o=o, limiter=limiter, last=last)
+        except TelegramRetryAfter as e:
+            for rest in items[i:]:
+                rest.retry_after = max(1, int(getattr(e, "retry_after", 1) or 1))
+            break
+        except Exception as e:
+            o.error = e
+
+
+async def _dispatch(*, bot, outgoing: list[_Outgoing], limiter: AsyncRateLimiter, max_concurrent_chats: int) -> None:
+    by_chat: dict[int, list[_Outgoing]] = {}
+    for o in outgoing:
+        by_chat.setdefault(int(o.chat_id), []).append(o)
+
+    sem = asyncio.Semaphore(max(1, int(max_concurrent_chats)))
+
+    async def _run(items: list[_Outgoing]) -> None:
+        async with sem:
+            await _deliver_chat(bot=bot, items=items, limiter=limiter)
+
+    await asyncio.gather(*[_run(items) for items in by_chat.values()])
+
+
+async def _finalize_notification(*, o: _Outgoing, repo: TaskNotificationRepository, now: datetime) -> None:
+    for n in [o.n, *o.merged]:
+        await _finalize_one(o=o, n=n, repo=repo, now=now)
+
+
+async def _finalize_one(*, o: _Outgoing, n, repo: TaskNotificationRepository, now: datetime) -> None:
+    if o.retry_after is not None:
+        # Flood control is not the message's fault: do not burn an attempt.
+        n.attempts = max(0, int(getattr(n, "attempts", 0) or 0) - 1)
+        await repo.mark_failed(
+            n=n,
+            now=now,
+            error=f"telegram retry_after={int(o.retry_after)}",
+            retry_at=now + timedelta(seconds=int(o.retry_after)),
+        )
+        return
+    if o.error is not None or o.delivered is None:
+        # basic 3 attempts with simple backoff
+        attempts = int(getattr(n, "attempts", 0) or 0)
+        retry_at = None
+        if attempts < 3:
+            retry_at = now + timedelta(minutes=2 * attempts)
+        await repo.mark_failed(n=n, now=now, error=repr(o.error), retry_at=retry_at)
+        return
+
+    if o.digest_tasks <= 1:
+        # A multi-task digest is not an edit target: the next update of any of its tasks comes as a new message.
+        await repo.store_delivery_info(n=n, chat_id=int(o.delivered[0]), message_id=int(o.delivered[1]))
+    mode = "send_fallback" if o.fallback else ("edit" if o.edited else "send")
+    if o.merged:
+        mode = f"{mode}_digest"
+    try:
+        _logger.info(
+            "TASK_NOTIFY_SENT source=worker notification_id=%s type=%s task_id=%s chat_id=%s message_id=%s mode=%s",
+            int(getattr(n, "id", 0) or 0),
+            str(o.typ),
+            int(o.task_id),
+            int(o.delivered[0]),
+            int(o.delivered[1]),
+            mode,
+        )
+    except Exception:
+        pass
+    await repo.mark_sent(n=n, now=now)
+
+
+# First wait after an empty claim; doubles per empty claim up to the poll interval.
+_EMPTY_CLAIM_BACKOFF_SECONDS = 0.5
+
+
+def _next_wait_seconds(*, due_at: datetime | None, now: datetime, poll_seconds: float, empty_claims: int) -> float:
+    """How long to sleep until the next claim unless NOTIFY wakes the worker first.
+
+    A row that is due but was not claimed is locked by another replica (SKIP LOCKED): back off
+    exponentially on consecutive empty claims instead of polling it every half second.
+    """
+    floor = min(float(poll_seconds), _EMPTY_CLAIM_BACKOFF_SECONDS * (2 ** min(max(0, int(empty_claims)), 16)))
+    if due_at is None:
+        return float(poll_seconds)
+    return min(float(poll_seconds), max(floor, (due_at - now).total_seconds()))
+
+
+async def notifications_worker(
+    *,
+    bot,
+    poll_seconds: int = 20,
+    batch_size: int = 30,
+    max_concurrent_chats: int = 8,
+    send_rate_per_sec: float = 25.0,
+) -> None:
+    """Deliver due task notifications.
+
+    Each batch is rendered first (DB work shared across recipients of the same task),
+    then sent with different chats in parallel under a global rate limit while every
+    chat keeps its own order, and finally the outcome is written back.
+    """
+    _logger.info("task notifications worker started", extra={"poll_seconds": poll_seconds})
+
+    limiter = telegram_send_limiter(rate_per_sec=float(send_rate_per_sec))
+    # Producers NOTIFY on commit (see TaskNotificationService); polling is the safety net.
+    wakeup = get_listen_hub().subscribe(TASK_NOTIFY_CHANNEL)
+    empty_claims = 0
+    while True:
+        try:
+            # Coalesce bursts of signals.
+            wakeup.clear()
+
+            now = utc_now()
+            async with get_async_session() as session:
+                repo = TaskNotificationRepository(session)
+                items = await repo.fetch_due_pending(now=now, limit=batch_size)
+                empty_claims = 0 if items else empty_claims + 1
+                lookups = _BatchLookups(session)
+
+                outgoing: list[_Outgoing] = []
+                for n in items:
+                    await repo.inc_attempts(n=n)
+                    try:
+                        o = await _prepare_notification(n=n, repo=repo, lookups=lookups, now=now)
+                    except Exception as e:
+                        attempts = int(getattr(n, "attempts", 0) or 0)
+                        retry_at = None
+                        if attempts < 3:
+                            retry_at = now + timedelta(minutes=2 * attempts)
+                        await repo.mark_failed(n=n, now=now, error=repr(e), retry_at=retry_at)
+                        continue
+                    if o is not None:
+                        outgoing.append(o)
+
+                if outgoing and digest_window() > timedelta(0):
+                    outgoing = _coalesce_digests(outgoing)
+
+                if outgoing:
+                    await _dispatch(
+                        bot=bot,
+                        outgoing=outgoing,
+                        limiter=limiter,
+                        max_concurrent_chats=max_concurrent_chats,
+                    )
+                    for o in outgoing:
+                        await _finalize_notification(o=o, repo=repo, now=now)
+
+        except asyncio.CancelledError:
+            _logger.info("task notifications worker cancelled")
+            raise
+        except Exception:
+            _logger.exception("task notifications worker loop error")
+
+        # Event-driven wakeup + fallback polling; digest windows close at their scheduled_at.
+        timeout = float(poll_seconds)
+        try:
+            async with get_async_session() as session:
+                due_at = await TaskNotificationRepository(session).next_due_at()
+            timeout = _next_wait_seconds(
+                due_at=due_at, now=utc_now(), poll_seconds=poll_seconds, empty_claims=empty_claims
+            )
+        except Exception:
+            pass
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
@@ -139,7 +139,10 @@ class TasksService:
         task = await self.repo.get_task_full(task_id)
         if not task:
             return actor, None, None
+        return self.detail_for_actor(tg_id=tg_id, actor=actor, task=task)
 
+    def detail_for_actor(self, *, tg_id: int, actor, task):
+        """Visibility + permissions for an already loaded actor/task (no DB access)."""
         r = role_flags(
             tg_id=tg_id,
             admin_ids=settings.admin_ids,
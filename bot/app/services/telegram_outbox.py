@@ -2,17 +2,52 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
-
-from sqlalchemy import select, or_
+import os
+import socket
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy import func, or_, select, text, update
 
 from shared.config import settings
 from shared.db import get_async_session
-from shared.models import TelegramOutbox
+from shared.enums import ShiftSwapRequestStatus
+from shared.models import Broadcast, BroadcastDelivery, ShiftSwapRequest, TelegramOutbox
+from shared.services.bot_clients import get_bot
+from shared.services.shifts_rating import mark_shift_rating_requested
+from shared.services.telegram_outbox import (
+    KIND_BROADCAST_DELIVERY,
+    KIND_MESSAGE,
+    KIND_PURCHASE_CHAT_NOTIFY,
+    KIND_SALARY_LINE,
+    KIND_SHIFT_RATING_REQUEST,
+    KIND_SHIFT_SWAP_OFFER,
+    NOTIFY_CHANNEL,
+    enqueue_purchase_notify,  # noqa: F401  (re-exported for bot handlers)
+    render_salary_digest,
+)
+
+from bot.app.services.pg_listen_hub import get_listen_hub
+from bot.app.services.task_notifications_worker import _photo_input_from_path
+from bot.app.utils.rate_limit import AsyncRateLimiter, telegram_send_limiter
 
 
 _logger = logging.getLogger(__name__)
 
+MAX_ATTEMPTS = 10
+# How long a claimed row stays reserved for the instance sending it; renewed every third of
+# it while the batch is still sending.
+LEASE = timedelta(seconds=120)
+# pg_advisory_xact_lock key serializing outbox claims across bot instances.
+CLAIM_LOCK_KEY = 7_400_031
+# Telegram caption limit; longer broadcast texts go as media + separate message.
+CAPTION_LIMIT = 1024
+
 
 def _now() -> datetime:
     # Use naive utc to match utc_now usage; DB column is timezone-aware anyway.
@@ -58,102 +93,725 @@ def _is_retryable_error(exc: BaseException) -> bool:
     return isinstance(exc, (asyncio.TimeoutError, OSError))
 
 
-async def enqueue_purchase_notify(*, purchase_id: int) -> None:
-    pid = int(purchase_id)
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(round(q * (len(vals) - 1)))))
+    return vals[idx]
+
+
+@dataclass
+class OutboxMetrics:
+    """In-process counters and recent latency samples; logged as TG_OUTBOX_METRICS."""
+
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    rate_limited: int = 0
+    cancelled: int = 0
+    send_ms: deque = field(default_factory=lambda: deque(maxlen=500))
+    queue_ms: deque = field(default_factory=lambda: deque(maxlen=500))
+
+    def observe_sent(self, *, send_ms: float, queue_ms: float) -> None:
+        self.sent += 1
+        self.send_ms.append(float(send_ms))
+        self.queue_ms.append(float(queue_ms))
+
+    def snapshot(self) -> dict[str, Any]:
+        send = list(self.send_ms)
+        queue = list(self.queue_ms)
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+            "cancelled": self.cancelled,
+            "send_p50_ms": _percentile(send, 0.5),
+            "send_p95_ms": _percentile(send, 0.95),
+            "queue_p50_ms": _percentile(queue, 0.5),
+            "queue_p95_ms": _percentile(queue, 0.95),
+        }
+
+
+METRICS = OutboxMetrics()
+
+
+@dataclass
+class _Item:
+    rows: list[TelegramOutbox]
+    kind: str
+    chat_id: int | None
+    payload: dict
+    ctx: dict = field(default_factory=dict)
+    message_id: int | None = None
+    sent: bool = False
+    error: BaseException | None = None
+    retry_after: int | None = None
+    # Not attempted because the chat's lease was lost mid-batch; goes back to pending as is.
+    deferred: bool = False
+    # No longer worth sending (swap offer of a closed request): finalized as cancelled, unsent.
+    cancelled: bool = False
+    send_ms: float | None = None
+
+    @property
+    def head(self) -> TelegramOutbox:
+        return self.rows[0]
+
+    @property
+    def chat_key(self) -> str:
+        return str(self.chat_id) if self.chat_id else f"row:{int(self.head.id)}"
+
+
+def _markup(raw: Any):
+    if not raw:
+        return None
+    if isinstance(raw, dict) and "inline_keyboard" in raw:
+        return InlineKeyboardMarkup.model_validate(raw)
+    return raw
+
+
+async def _send_message_kind(bot, item: _Item) -> int | None:
+    p = item.payload
+    msg = await bot.send_message(
+        chat_id=int(item.chat_id),
+        text=str(p.get("text") or ""),
+        parse_mode=p.get("parse_mode"),
+        reply_markup=_markup(p.get("reply_markup")),
+        disable_web_page_preview=bool(p.get("disable_web_page_preview", False)),
+    )
+    return int(getattr(msg, "message_id", 0) or 0) or None
+
+
+async def _send_salary_digest(bot, item: _Item) -> int | None:
+    lines = [str((r.payload or {}).get("line") or "") for r in item.rows]
+    msg = await bot.send_message(
+        chat_id=int(item.chat_id),
+        text=render_salary_digest(lines),
+        parse_mode="HTML",
+        disable_web_page_preview=True,
+    )
+    return int(getattr(msg, "message_id", 0) or 0) or None
+
+
+async def _send_purchase_chat_notify(bot, item: _Item) -> int | None:
+    # Reuse web-side notifier implementation (already reloads purchase from DB and saves tg link).
+    from web.app.main import _notify_purchases_chat_status_after_commit
+
+    pid = int(item.payload.get("purchase_id") or 0)
     if pid <= 0:
-        return
+        raise ValueError("bad purchase_id")
+    await _notify_purchases_chat_status_after_commit(purchase_id=int(pid))
+    return None
 
-    async with get_async_session() as session:
-        row = TelegramOutbox(
-            kind="purchase_chat_notify",
-            payload={"purchase_id": int(pid)},
-            status="pending",
-            attempts=0,
-            next_retry_at=_now(),
-        )
-        session.add(row)
-        await session.flush()
 
+# Telegram file_id of already uploaded broadcast media, keyed by media_path.
+_broadcast_file_ids: dict[str, str] = {}
 
-async def _send_purchase_notify_once(*, purchase_id: int) -> None:
-    # Reuse web-side after-commit notifier implementation (already reloads purchase from DB and saves tg link).
-    from web.app.main import _notify_purchases_chat_status_after_commit
 
-    await _notify_purchases_chat_status_after_commit(purchase_id=int(purchase_id))
+def _remember_file_id(media_path: str, msg: Any) -> None:
+    try:
+        if getattr(msg, "photo", None):
+            _broadcast_file_ids[media_path] = str(msg.photo[-1].file_id)
+        elif getattr(msg, "video", None):
+            _broadcast_file_ids[media_path] = str(msg.video.file_id)
+    except Exception:
+        pass
 
 
-async def process_outbox_batch(*, limit: int = 20) -> None:
-    lim = max(1, int(limit))
+async def _send_broadcast_delivery(bot, item: _Item) -> int | None:
+    b = item.ctx.get("broadcast")
+    if b is None:
+        raise ValueError("broadcast not found")
+    text = str(b.get("text") or "")
+    kb = _markup(item.payload.get("reply_markup"))
+    chat_id = int(item.chat_id)
+    media_type = str(b.get("media_type") or "")
+    media_path = str(b.get("media_path") or "")
+
+    media = None
+    if media_type in {"photo", "video"} and media_path:
+        media = _broadcast_file_ids.get(media_path) or _photo_input_from_path(media_path)
+    if media is None:
+        msg = await bot.send_message(chat_id=chat_id, text=text, parse_mode="HTML", reply_markup=kb)
+        return int(msg.message_id)
+
+    send_media = bot.send_photo if media_type == "photo" else bot.send_video
+    kwargs = {"photo": media} if media_type == "photo" else {"video": media}
+    if len(text) > CAPTION_LIMIT:
+        m1 = await send_media(chat_id=chat_id, **kwargs)
+        _remember_file_id(media_path, m1)
+        msg = await bot.send_message(chat_id=chat_id, text=text, parse_mode="HTML", reply_markup=kb)
+        return int(msg.message_id)
+    msg = await send_media(chat_id=chat_id, caption=text, parse_mode="HTML", reply_markup=kb, **kwargs)
+    _remember_file_id(media_path, msg)
+    return int(msg.message_id)
+
+
+async def _prepare_broadcasts(session, items: list[_Item]) -> None:
+    ids = {int(i.payload.get("broadcast_id") or 0) for i in items if i.kind == KIND_BROADCAST_DELIVERY}
+    ids.discard(0)
+    if not ids:
+        return
+    rows = (await session.execute(select(Broadcast).where(Broadcast.id.in_(ids)))).scalars().all()
+    by_id = {
+        int(b.id): {"text": b.text, "media_type": b.media_type, "media_path": b.media_path}
+        for b in rows
+    }
+    for i in items:
+        if i.kind == KIND_BROADCAST_DELIVERY:
+            i.ctx["broadcast"] = by_id.get(int(i.payload.get("broadcast_id") or 0))
+
+
+async def _prepare_swap_offers(session, items: list[_Item]) -> None:
+    ids = {int(i.payload.get("request_id") or 0) for i in items if i.kind == KIND_SHIFT_SWAP_OFFER}
+    ids.discard(0)
+    if not ids:
+        return
+    open_ids = set(
+        (
+            await session.execute(
+                select(ShiftSwapRequest.id)
+                .where(ShiftSwapRequest.id.in_(ids))
+                .where(ShiftSwapRequest.status == ShiftSwapRequestStatus.OPEN)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    # Later waves of a request that was accepted (or cancelled) meanwhile are dropped unsent,
+    # before they take a rate limiter token.
+    for i in items:
+        if i.kind == KIND_SHIFT_SWAP_OFFER and int(i.payload.get("request_id") or 0) not in open_ids:
+            i.cancelled = True
+            _logger.info("[tg_outbox] swap offer cancelled", extra={"outbox_id": int(i.head.id), "request_id": i.payload.get("request_id")})
+
+
+async def _after_broadcast_delivery(session, item: _Item, *, final: bool) -> None:
+    if not item.sent and not final:
+        return
+    did = int(item.payload.get("delivery_id") or 0)
+    bid = int(item.payload.get("broadcast_id") or 0)
+    if did <= 0 or bid <= 0:
+        return
     now = _now()
+    if item.sent:
+        values = dict(
+            delivery_status="success",
+            tg_chat_id=int(item.chat_id),
+            tg_message_id=item.message_id,
+            delivered_at=now,
+            error_text=None,
+        )
+        counter = {"delivered_count": Broadcast.delivered_count + 1}
+    else:
+        values = dict(
+            delivery_status="failed",
+            tg_chat_id=int(item.chat_id),
+            tg_message_id=None,
+            delivered_at=None,
+            error_text=(str(item.error) if item.error is not None else "send failed")[:2000],
+        )
+        counter = {"failed_count": Broadcast.failed_count + 1}
+    await session.execute(
+        update(BroadcastDelivery)
+        .where(BroadcastDelivery.id == did)
+        .where(BroadcastDelivery.delivery_status == "pending")
+        .values(**values)
+    )
+    await session.execute(update(Broadcast).where(Broadcast.id == bid).values(**counter))
+    left = (
+        await session.execute(
+            select(func.count(BroadcastDelivery.id))
+            .where(BroadcastDelivery.broadcast_id == bid)
+            .where(BroadcastDelivery.delivery_status == "pending")
+        )
+    ).scalar_one()
+    if int(left or 0) == 0:
+        await session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == bid)
+            .where(Broadcast.status == "sending")
+            .values(status="sent", sent_at=now)
+        )
+
+
+async def _after_shift_rating_request(session, item: _Item, *, final: bool) -> None:
+    if not item.sent:
+        return
+    await mark_shift_rating_requested(
+        session,
+        shift_id=int(item.payload.get("shift_id") or 0),
+        message_id=item.message_id,
+    )
+
+
+Renderer = Callable[[Any, _Item], Awaitable[int | None]]
+
+RENDERERS: dict[str, Renderer] = {
+    KIND_MESSAGE: _send_message_kind,
+    KIND_SALARY_LINE: _send_salary_digest,
+    KIND_PURCHASE_CHAT_NOTIFY: _send_purchase_chat_notify,
+    KIND_BROADCAST_DELIVERY: _send_broadcast_delivery,
+    KIND_SHIFT_RATING_REQUEST: _send_message_kind,
+    KIND_SHIFT_SWAP_OFFER: _send_message_kind,
+}
+
+# Run in the worker's session after a send attempt (final=True when the row gives up).
+AFTER_SEND = {
+    KIND_BROADCAST_DELIVERY: _after_broadcast_delivery,
+    KIND_SHIFT_RATING_REQUEST: _after_shift_rating_request,
+}
+
+
+def build_items(rows: list[TelegramOutbox]) -> list[_Item]:
+    """Turn claimed rows into send items; due salary lines of one chat become one digest."""
+    items: list[_Item] = []
+    digest: dict[int, _Item] = {}
+    for row in rows:
+        kind = str(row.kind or "").strip()
+        chat_id = int(row.chat_id) if row.chat_id else None
+        if kind == KIND_SALARY_LINE and chat_id:
+            it = digest.get(chat_id)
+            if it is not None:
+                it.rows.append(row)
+                continue
+            it = _Item(rows=[row], kind=kind, chat_id=chat_id, payload=dict(row.payload or {}))
+            digest[chat_id] = it
+            items.append(it)
+            continue
+        items.append(_Item(rows=[row], kind=kind, chat_id=chat_id, payload=dict(row.payload or {})))
+    return items
+
+
+async def _send_item(bot, item: _Item, limiter: AsyncRateLimiter) -> None:
+    renderer = RENDERERS.get(item.kind)
+    if renderer is None:
+        raise ValueError(f"unknown kind {item.kind!r}")
+    if item.kind != KIND_PURCHASE_CHAT_NOTIFY and not item.chat_id:
+        raise ValueError("chat_id is not set")
+    await limiter.acquire()
+    t0 = time.monotonic()
+    item.message_id = await renderer(bot, item)
+    item.send_ms = (time.monotonic() - t0) * 1000.0
+    item.sent = True
+
+
+async def _deliver_chat(*, bot, items: list[_Item], limiter: AsyncRateLimiter, lost: set[int] | None = None) -> None:
+    """Send one chat's items in order; on flood control the rest of the chat waits as a whole.
+
+    Stops at the first item whose lease was lost: another instance owns the chat now.
+    """
+    for i, it in enumerate(items):
+        if lost and any(int(r.id) in lost for r in it.rows):
+            for rest in items[i:]:
+                rest.deferred = True
+            break
+        try:
+            await _send_item(bot, it, limiter)
+        except TelegramRetryAfter as e:
+            for rest in items[i:]:
+                rest.retry_after = max(1, int(getattr(e, "retry_after", 1) or 1))
+            break
+        except Exception as e:
+            it.error = e
+
+
+async def dispatch(
+    *, bot, items: list[_Item], limiter: AsyncRateLimiter, max_concurrent_chats: int, lost: set[int] | None = None
+) -> None:
+    by_chat: dict[str, list[_Item]] = {}
+    for it in items:
+        if it.cancelled:
+            continue
+        by_chat.setdefault(it.chat_key, []).append(it)
+
+    sem = asyncio.Semaphore(max(1, int(max_concurrent_chats)))
+
+    async def _run(chat_items: list[_Item]) -> None:
+        async with sem:
+            await _deliver_chat(bot=bot, items=chat_items, limiter=limiter, lost=lost)
+
+    await asyncio.gather(*[_run(v) for v in by_chat.values()])
+
+
+def _age_ms(created: datetime | None, now: datetime) -> float:
+    if created is None:
+        return 0.0
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    return max(0.0, (now - created).total_seconds() * 1000.0)
+
+
+async def _finalize(session, item: _Item, *, now: datetime) -> None:
+    final = False
+    for row in item.rows:
+        row.claimed_by = None
+        row.lease_until = None
+        if item.cancelled:
+            row.status = "cancelled"
+            row.next_retry_at = None
+            row.last_error = None
+        elif item.deferred:
+            row.attempts = max(0, int(row.attempts or 0) - 1)
+            row.status = "pending"
+            row.next_retry_at = None
+        elif item.retry_after is not None:
+            # Flood control is not the message's fault: do not burn an attempt.
+            row.attempts = max(0, int(row.attempts or 0) - 1)
+            row.status = "pending"
+            row.next_retry_at = now + timedelta(seconds=int(item.retry_after))
+            row.last_error = f"telegram retry_after={int(item.retry_after)}"
+        elif item.sent:
+            row.status = "sent"
+            row.sent_at = now
+            row.tg_message_id = item.message_id
+            row.next_retry_at = None
+            row.last_error = None
+        else:
+            err = item.error
+            if err is not None and _is_retryable_error(err) and int(row.attempts or 0) < MAX_ATTEMPTS:
+                row.status = "pending"
+                row.next_retry_at = now + timedelta(seconds=int(_next_delay(int(row.attempts or 0))))
+            else:
+                row.status = "failed"
+                row.next_retry_at = None
+                final = True
+            row.last_error = (str(err) or type(err).__name__)[:2000] if err is not None else "send failed"
 
+    if item.deferred:
+        return
+    if item.cancelled:
+        METRICS.cancelled += 1
+        return
+    if item.retry_after is not None:
+        METRICS.rate_limited += 1
+    elif item.sent:
+        for row in item.rows:
+            METRICS.observe_sent(send_ms=float(item.send_ms or 0.0), queue_ms=_age_ms(row.created_at, now))
+    elif final:
+        METRICS.failed += 1
+        _logger.warning(
+            "[tg_outbox] send failed",
+            extra={"outbox_id": int(item.head.id), "kind": item.kind, "attempts": int(item.head.attempts or 0), "error": item.head.last_error},
+        )
+    else:
+        METRICS.retried += 1
+
+    after = AFTER_SEND.get(item.kind)
+    if after is not None and (item.sent or final):
+        try:
+            async with session.begin_nested():
+                await after(session, item, final=final)
+        except Exception:
+            _logger.exception("[tg_outbox] after-send hook failed", extra={"outbox_id": int(item.head.id), "kind": item.kind})
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"[:64]
+
+
+async def claim_outbox_rows(
+    session,
+    *,
+    worker_id: str,
+    limit: int,
+    lease: timedelta = LEASE,
+    now: datetime | None = None,
+) -> list[TelegramOutbox]:
+    """Lease due rows to ``worker_id`` and return them (commit the session before sending).
+
+    Claims are serialized with a transaction-level advisory lock and skip chats that have a
+    live lease elsewhere, so several bot instances never send to one chat at the same time
+    and per-chat order holds across instances. A crashed instance's rows become claimable
+    again once their lease expires.
+    """
+    now = now or _now()
+    await session.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": CLAIM_LOCK_KEY})
+
+    busy_chats = (
+        select(TelegramOutbox.chat_id)
+        .where(TelegramOutbox.status == "pending")
+        .where(TelegramOutbox.lease_until > now)
+        .where(TelegramOutbox.chat_id != None)
+    )
+    due_ids = (
+        select(TelegramOutbox.id)
+        .where(TelegramOutbox.status == "pending")
+        .where(or_(TelegramOutbox.next_retry_at == None, TelegramOutbox.next_retry_at <= now))
+        .where(or_(TelegramOutbox.lease_until == None, TelegramOutbox.lease_until <= now))
+        .where(or_(TelegramOutbox.chat_id == None, TelegramOutbox.chat_id.not_in(busy_chats)))
+        .order_by(TelegramOutbox.id.asc())
+        .limit(max(1, int(limit)))
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(TelegramOutbox)
+        .where(TelegramOutbox.id.in_(due_ids.scalar_subquery()))
+        .values(
+            claimed_by=str(worker_id),
+            lease_until=now + lease,
+            attempts=TelegramOutbox.attempts + 1,
+            updated_at=now,
+        )
+        .returning(TelegramOutbox)
+        .execution_options(synchronize_session=False)
+    )
+    rows = list((await session.execute(stmt)).scalars().all())
+    rows.sort(key=lambda r: int(r.id))
+    return rows
+
+
+async def renew_outbox_leases(
+    session, *, worker_id: str, ids: list[int], lease: timedelta = LEASE, now: datetime | None = None
+) -> set[int]:
+    """Extend the lease of rows still claimed by ``worker_id``; returns the ids it no longer holds."""
+    now = now or _now()
+    kept = (
+        await session.execute(
+            update(TelegramOutbox)
+            .where(TelegramOutbox.id.in_([int(x) for x in ids]))
+            .where(TelegramOutbox.claimed_by == str(worker_id))
+            .where(TelegramOutbox.status == "pending")
+            .values(lease_until=now + lease)
+            .returning(TelegramOutbox.id)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalars().all()
+    return {int(x) for x in ids} - {int(x) for x in kept}
+
+
+async def _keep_leases(*, worker_id: str, ids: list[int], lease: timedelta, lost: set[int]) -> None:
+    """Renew the batch's leases every third of ``lease`` until cancelled (when the sends are done)."""
+    while True:
+        await asyncio.sleep(max(1.0, lease.total_seconds() / 3))
+        try:
+            async with get_async_session() as session:
+                gone = await renew_outbox_leases(session, worker_id=worker_id, ids=ids, lease=lease)
+            if gone - lost:
+                _logger.warning("[tg_outbox] lease lost while sending", extra={"outbox_ids": sorted(gone - lost), "worker_id": worker_id})
+            lost.update(gone)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _logger.exception("[tg_outbox] lease renewal failed", extra={"worker_id": worker_id})
+
+
+async def process_outbox_batch(
+    *,
+    bot,
+    limit: int = 50,
+    limiter: AsyncRateLimiter | None = None,
+    max_concurrent_chats: int = 8,
+    worker_id: str | None = None,
+    lease: timedelta = LEASE,
+) -> int:
+    """Send one batch of due outbox rows; returns the number of rows handled.
+
+    Three steps: claim (short transaction, committed before any network I/O), send without
+    a DB session, finalize (short transaction, only rows still leased to this worker).
+    """
+    limiter = limiter or telegram_send_limiter()
+    worker_id = worker_id or _worker_id()
+
+    async with get_async_session() as session:
+        rows = await claim_outbox_rows(session, worker_id=worker_id, limit=limit, lease=lease)
+        if not rows:
+            return 0
+        items = build_items(rows)
+        await _prepare_broadcasts(session, items)
+        await _prepare_swap_offers(session, items)
+
+    # A long batch (rate limit, slow uploads) must not outlive its lease: another instance
+    # would claim the unsent rows and send them as well.
+    lost: set[int] = set()
+    keeper = asyncio.create_task(
+        _keep_leases(worker_id=worker_id, ids=[int(r.id) for r in rows], lease=lease, lost=lost)
+    )
+    try:
+        await dispatch(bot=bot, items=items, limiter=limiter, max_concurrent_chats=max_concurrent_chats, lost=lost)
+    finally:
+        keeper.cancel()
+        await asyncio.gather(keeper, return_exceptions=True)
+
+    now = _now()
     async with get_async_session() as session:
-        rows = list(
-            (
+        ids = [int(r.id) for it in items for r in it.rows]
+        fresh = {
+            int(r.id): r
+            for r in (
                 await session.execute(
                     select(TelegramOutbox)
-                    .where(TelegramOutbox.status == "pending")
-                    .where(or_(TelegramOutbox.next_retry_at == None, TelegramOutbox.next_retry_at <= now))
-                    .order_by(TelegramOutbox.id.asc())
-                    .limit(lim)
+                    .where(TelegramOutbox.id.in_(ids))
+                    .where(TelegramOutbox.claimed_by == worker_id)
+                    .with_for_update()
                 )
             )
             .scalars()
             .all()
-        )
+        }
+        for it in items:
+            lost = [int(r.id) for r in it.rows if int(r.id) not in fresh]
+            if lost:
+                _logger.warning("[tg_outbox] lease lost before finalize", extra={"outbox_ids": lost, "worker_id": worker_id})
+            it.rows = [fresh[int(r.id)] for r in it.rows if int(r.id) in fresh]
+            if not it.rows:
+                continue
+            await _finalize(session, it, now=now)
+        await session.flush()
+    return len(rows)
 
-        if not rows:
-            return
 
-        for row in rows:
-            payload = row.payload or {}
-            kind = str(row.kind or "").strip()
-            if kind != "purchase_chat_notify":
-                row.status = "failed"
-                row.last_error = "unknown kind"
-                continue
+async def log_outbox_metrics() -> None:
+    async with get_async_session() as session:
+        depth, oldest = (
+            await session.execute(
+                select(func.count(TelegramOutbox.id), func.min(TelegramOutbox.created_at)).where(
+                    TelegramOutbox.status == "pending"
+                )
+            )
+        ).one()
+    snap = METRICS.snapshot()
+    oldest_age_s = None
+    if oldest is not None:
+        oldest_age_s = int(_age_ms(oldest, _now()) / 1000)
+    try:
+        _logger.info(
+            "TG_OUTBOX_METRICS depth=%s oldest_age_s=%s sent=%s failed=%s retried=%s rate_limited=%s cancelled=%s "
+            "send_p50_ms=%s send_p95_ms=%s queue_p50_ms=%s queue_p95_ms=%s",
+            int(depth or 0),
+            oldest_age_s,
+            snap["sent"],
+            snap["failed"],
+            snap["retried"],
+            snap["rate_limited"],
+            snap["cancelled"],
+            snap["send_p50_ms"],
+            snap["send_p95_ms"],
+            snap["queue_p50_ms"],
+            snap["queue_p95_ms"],
+        )
+    except Exception:
+        pass
 
-            pid = int(payload.get("purchase_id") or 0)
-            if pid <= 0:
-                row.status = "failed"
-                row.last_error = "bad purchase_id"
-                continue
 
-            row.attempts = int(row.attempts or 0) + 1
+async def _seconds_until_next_due(now: datetime | None = None) -> float | None:
+    """Seconds until the earliest pending row becomes claimable (retry backoff or lease expiry)."""
+    now = now or _now()
+    async with get_async_session() as session:
+        due = (
+            await session.execute(
+                select(
+                    func.min(
+                        func.greatest(
+                            func.coalesce(TelegramOutbox.next_retry_at, now),
+                            func.coalesce(TelegramOutbox.lease_until, now),
+                        )
+                    )
+                ).where(TelegramOutbox.status == "pending")
+            )
+        ).scalar_one_or_none()
+    if due is None:
+        return None
+    if due.tzinfo is None:
+        due = due.replace(tzinfo=timezone.utc)
+    return max(0.0, (due - now).total_seconds())
+
+
+# Shortest wait between batches; after empty claims it doubles from _EMPTY_CLAIM_BACKOFF_SECONDS.
+_MIN_WAIT_SECONDS = 0.05
+_EMPTY_CLAIM_BACKOFF_SECONDS = 0.5
+
+
+def _next_wait_seconds(*, due_in: float | None, poll_seconds: float, empty_claims: int) -> float:
+    """How long the worker sleeps unless NOTIFY wakes it first.
+
+    Rows of a chat leased by another instance look due but cannot be claimed: back off
+    exponentially on consecutive empty claims instead of re-claiming every 50 ms.
+    """
+    if due_in is None:
+        return float(poll_seconds)
+    k = max(0, int(empty_claims))
+    floor = _MIN_WAIT_SECONDS if k == 0 else _EMPTY_CLAIM_BACKOFF_SECONDS * (2 ** min(k - 1, 16))
+    return min(float(poll_seconds), max(floor, float(due_in)))
+
+
+_wakeup: asyncio.Event | None = None
+
+
+async def outbox_worker(
+    *,
+    bot,
+    poll_seconds: int = 30,
+    batch_size: int = 50,
+    max_concurrent_chats: int = 8,
+    send_rate_per_sec: float = 25.0,
+    metrics_every_seconds: int = 60,
+) -> None:
+    """Drain the Telegram outbox for the lifetime of the bot process.
+
+    Woken by NOTIFY telegram_outbox (sent on commit by ``enqueue``) and by the earliest retry
+    deadline; ``poll_seconds`` is only a safety net.
+    """
+    global _wakeup
+    _logger.info("telegram outbox worker started", extra={"poll_seconds": poll_seconds})
+
+    limiter = telegram_send_limiter(rate_per_sec=float(send_rate_per_sec))
+    wakeup = get_listen_hub().subscribe(NOTIFY_CHANNEL)
+    _wakeup = wakeup
+    last_metrics = time.monotonic()
+    empty_claims = 0
+    try:
+        while True:
+            timeout = float(poll_seconds)
             try:
-                await _send_purchase_notify_once(purchase_id=pid)
-                row.status = "sent"
-                row.last_error = None
-                row.next_retry_at = None
-                _logger.info("[tg_outbox] sent", extra={"outbox_id": int(row.id), "purchase_id": int(pid), "attempts": int(row.attempts)})
-            except Exception as e:
-                retryable = _is_retryable_error(e)
-                if retryable and int(row.attempts) < 10:
-                    delay_s = _next_delay(int(row.attempts))
-                    row.status = "pending"
-                    row.next_retry_at = now + timedelta(seconds=int(delay_s))
-                else:
-                    row.status = "failed"
-                    row.next_retry_at = None
-                row.last_error = (str(e) or type(e).__name__)[:2000]
-                _logger.exception(
-                    "[tg_outbox] send failed",
-                    extra={
-                        "outbox_id": int(row.id),
-                        "purchase_id": int(pid),
-                        "attempts": int(row.attempts),
-                        "retryable": bool(retryable),
-                    },
+                wakeup.clear()
+                n = await process_outbox_batch(
+                    bot=bot,
+                    limit=batch_size,
+                    limiter=limiter,
+                    max_concurrent_chats=max_concurrent_chats,
                 )
+                if time.monotonic() - last_metrics >= int(metrics_every_seconds):
+                    last_metrics = time.monotonic()
+                    await log_outbox_metrics()
+                if n >= int(batch_size):
+                    # Backlog: go straight to the next batch.
+                    empty_claims = 0
+                    continue
+                empty_claims = 0 if n else empty_claims + 1
+                timeout = _next_wait_seconds(
+                    due_in=await _seconds_until_next_due(), poll_seconds=poll_seconds, empty_claims=empty_claims
+                )
+            except asyncio.CancelledError:
+                _logger.info("telegram outbox worker cancelled")
+                raise
+            except Exception:
+                _logger.exception("telegram outbox worker loop error")
 
-        await session.flush()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if _wakeup is wakeup:
+            _wakeup = None
 
 
 async def telegram_outbox_job() -> None:
+    """Nudge the outbox: wake the in-process worker, or send one batch when none is running."""
+    if _wakeup is not None:
+        _wakeup.set()
+        return
+
     # quick guard
-    if not str(getattr(settings, "BOT_TOKEN", "") or "").strip():
+    token = str(getattr(settings, "BOT_TOKEN", "") or "").strip()
+    if not token:
         return
 
     try:
-        await process_outbox_batch(limit=25)
+        await process_outbox_batch(bot=get_bot(), limit=25)
     except Exception:
         _logger.exception("[tg_outbox] job failed")
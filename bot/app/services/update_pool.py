@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+
+_logger = logging.getLogger(__name__)
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(round(q * (len(vals) - 1)))))
+    return vals[idx]
+
+
+@dataclass
+class UpdatePoolMetrics:
+    """In-process counters and recent latency samples; logged as BOT_UPDATES_METRICS."""
+
+    submitted: int = 0
+    processed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    max_pending: int = 0
+    wait_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+    handle_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def snapshot(self) -> dict[str, Any]:
+        wait = list(self.wait_ms)
+        handle = list(self.handle_ms)
+        return {
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "max_pending": self.max_pending,
+            "wait_p50_ms": _percentile(wait, 0.5),
+            "wait_p95_ms": _percentile(wait, 0.95),
+            "handle_p50_ms": _percentile(handle, 0.5),
+            "handle_p95_ms": _percentile(handle, 0.95),
+        }
+
+
+class KeyedUpdatePool:
+    """Bounded worker pool: items with the same key run in submit order, different keys in parallel.
+
+    Each key has its own lane; a lane is owned by at most one worker at a time and is put back
+    on the ready queue after every item, so a chatty user cannot starve the others. ``submit``
+    waits while ``max_pending`` items are queued or running (backpressure) and gives up after
+    ``timeout`` seconds.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[Any]], *, workers: int = 16, max_pending: int = 1000):
+        self._handler = handler
+        self._workers_n = max(1, int(workers))
+        self._max_pending = max(1, int(max_pending))
+        self._slots = asyncio.Semaphore(self._max_pending)
+        self._lanes: dict[Hashable, deque[tuple[Any, float]]] = {}
+        self._ready: asyncio.Queue[Hashable] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._pending = 0
+        self._active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+        self.metrics = UpdatePoolMetrics()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._closed = False
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self._workers_n)]
+
+    async def submit(self, key: Hashable, item: Any, *, timeout: float | None = None) -> bool:
+        """Queue ``item`` behind earlier items of ``key``; False if the pool stayed full for ``timeout``."""
+        if self._closed:
+            self.metrics.rejected += 1
+            return False
+        try:
+            if timeout is None:
+                await self._slots.acquire()
+            else:
+                await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, float(timeout)))
+        except asyncio.TimeoutError:
+            self.metrics.rejected += 1
+            return False
+
+        self._pending += 1
+        self._idle.clear()
+        self.metrics.submitted += 1
+        self.metrics.max_pending = max(self.metrics.max_pending, self._pending)
+        lane = self._lanes.get(key)
+        if lane is None:
+            self._lanes[key] = deque([(item, time.monotonic())])
+            self._ready.put_nowait(key)
+        else:
+            # The lane is already queued or being worked on; its owner picks this up next.
+            lane.append((item, time.monotonic()))
+        return True
+
+    async def _worker(self, idx: int) -> None:
+        while True:
+            key = await self._ready.get()
+            lane = self._lanes[key]
+            item, enqueued = lane.popleft()
+            started = time.monotonic()
+            self.metrics.wait_ms.append((started - enqueued) * 1000.0)
+            self._active += 1
+            try:
+                await self._handler(item)
+                self.metrics.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.metrics.failed += 1
+                _logger.exception("update handler failed", extra={"worker": idx})
+            finally:
+                self._active -= 1
+                self.metrics.handle_ms.append((time.monotonic() - started) * 1000.0)
+                self._pending -= 1
+                self._slots.release()
+                if lane:
+                    self._ready.put_nowait(key)
+                else:
+                    self._lanes.pop(key, None)
+                if self._pending == 0:
+                    self._idle.set()
+
+    async def stop(self, *, drain_timeout: float = 10.0) -> None:
+        """Stop accepting items, let queued ones finish for up to ``drain_timeout`` seconds, cancel workers."""
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=max(0.0, float(drain_timeout)))
+        except asyncio.TimeoutError:
+            _logger.warning("update pool stopped with pending items", extra={"pending": self._pending})
+        workers, self._workers = self._workers, []
+        for t in workers:
+            t.cancel()
+        for t in workers:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                pass
+
+    def log_metrics(self) -> None:
+        snap = self.metrics.snapshot()
+        try:
+            _logger.info(
+                "BOT_UPDATES_METRICS pending=%s active=%s lanes=%s max_pending=%s submitted=%s processed=%s "
+                "failed=%s rejected=%s wait_p50_ms=%s wait_p95_ms=%s handle_p50_ms=%s handle_p95_ms=%s",
+                self._pending,
+                self._active,
+                len(self._lanes),
+                snap["max_pending"],
+                snap["submitted"],
+                snap["processed"],
+                snap["failed"],
+                snap["rejected"],
+                snap["wait_p50_ms"],
+                snap["wait_p95_ms"],
+                snap["handle_p50_ms"],
+                snap["handle_p95_ms"],
+            )
+        except Exception:
+            pass
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import time as _time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from shared.config import settings
+from shared.db import get_async_session
+from shared.enums import Position, Schedule, UserStatus
+from shared.models import User
+from shared.permissions import UserRoleFlags, role_flags
+
+
+# NOTIFY channel fired by the users table trigger (migration 0059); payload is the tg_id.
+USER_PRINCIPAL_CHANNEL = "user_principal"
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Read-only snapshot of a ``users`` row, safe to share between handlers (not bound to a session)."""
+
+    id: int
+    tg_id: int
+    first_name: str | None
+    last_name: str | None
+    birth_date: date | None
+    rate_k: int | None
+    hour_rate: Decimal | None
+    schedule: Schedule | None
+    position: Position | None
+    status: UserStatus
+    color: str | None
+    is_deleted: bool
+    created_at: datetime | None
+    updated_at: datetime | None
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(
+            id=int(user.id),
+            tg_id=int(user.tg_id),
+            first_name=user.first_name,
+            last_name=user.last_name,
+            birth_date=user.birth_date,
+            rate_k=user.rate_k,
+            hour_rate=user.hour_rate,
+            schedule=user.schedule,
+            position=user.position,
+            status=user.status,
+            color=user.color,
+            is_deleted=bool(user.is_deleted),
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+    @property
+    def flags(self) -> UserRoleFlags:
+        return role_flags(tg_id=self.tg_id, admin_ids=settings.admin_ids, status=self.status, position=self.position)
+
+
+class UserPrincipalCache:
+    """Per-process tg_id -> ``UserPrincipal`` cache with a short TTL.
+
+    Entries are dropped on NOTIFY ``user_principal`` (any write to the user's row); the TTL only
+    bounds staleness when the LISTEN connection is down. Unknown tg_ids are not cached, so a
+    fresh registration is visible on the next update.
+    """
+
+    def __init__(self, *, ttl: float = 60.0, size: int = 5_000):
+        self._ttl = float(ttl)
+        self._size = int(size)
+        self._entries: OrderedDict[int, tuple[UserPrincipal, float]] = OrderedDict()
+
+    def peek(self, tg_id: int) -> UserPrincipal | None:
+        hit = self._entries.get(int(tg_id))
+        if hit is None:
+            return None
+        principal, expires = hit
+        if expires <= _time.monotonic():
+            self._entries.pop(int(tg_id), None)
+            return None
+        self._entries.move_to_end(int(tg_id))
+        return principal
+
+    def put(self, principal: UserPrincipal) -> None:
+        if self._ttl <= 0:
+            return
+        self._entries[principal.tg_id] = (principal, _time.monotonic() + self._ttl)
+        self._entries.move_to_end(principal.tg_id)
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tg_id: int | None = None) -> None:
+        if tg_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(int(tg_id), None)
+
+    def on_notify(self, payload: str) -> None:
+        """LISTEN callback: payload is a tg_id ("" after a reconnect: drop everything)."""
+        try:
+            tg_id = int(str(payload or "").strip())
+        except ValueError:
+            self.invalidate()
+            return
+        self.invalidate(tg_id)
+
+    async def get(self, tg_id: int) -> UserPrincipal | None:
+        cached = self.peek(tg_id)
+        if cached is not None:
+            return cached
+        async with get_async_session() as session:
+            user = (await session.execute(select(User).where(User.tg_id == int(tg_id)))).scalar_one_or_none()
+        if user is None:
+            return None
+        principal = UserPrincipal.from_user(user)
+        self.put(principal)
+        return principal
+
+
+_cache: UserPrincipalCache | None = None
+
+
+def get_principal_cache() -> UserPrincipalCache:
+    global _cache
+    if _cache is None:
+        _cache = UserPrincipalCache(ttl=float(getattr(settings, "USER_CACHE_TTL_SECONDS", 60) or 0))
+    return _cache
+
+
+async def get_user_principal(tg_id: int) -> UserPrincipal | None:
+    """User by tg_id including deleted ones (like ``UserRepository.get_by_tg_id_any``), cached."""
+    return await get_principal_cache().get(int(tg_id))
+
+
+async def get_active_user_principal(tg_id: int) -> UserPrincipal | None:
+    """Non-deleted user by tg_id (like ``UserRepository.get_by_tg_id``), cached."""
+    principal = await get_user_principal(tg_id)
+    if principal is None or principal.is_deleted:
+        return None
+    return principal
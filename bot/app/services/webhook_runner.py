@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from shared.config import settings
+
+from bot.app.services.update_pool import KeyedUpdatePool
+
+
+_logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def update_key(update: Update) -> Any:
+    """Ordering key of an update: the acting user, else the chat, else the update itself (no ordering)."""
+    try:
+        event = update.event
+    except Exception:
+        event = None
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    if user is not None and getattr(user, "id", None) is not None:
+        return ("user", int(user.id))
+    chat = getattr(event, "chat", None)
+    if chat is not None and getattr(chat, "id", None) is not None:
+        return ("chat", int(chat.id))
+    return ("update", int(update.update_id))
+
+
+def webhook_path() -> str:
+    path = str(getattr(settings, "BOT_WEBHOOK_PATH", "") or "/tg/webhook").strip()
+    return path if path.startswith("/") else f"/{path}"
+
+
+def build_webhook_app(*, dp: Dispatcher, bot: Bot, pool: KeyedUpdatePool) -> web.Application:
+    secret = str(getattr(settings, "BOT_WEBHOOK_SECRET", "") or "")
+    enqueue_timeout = float(getattr(settings, "BOT_UPDATE_ENQUEUE_TIMEOUT_SECONDS", 5) or 0)
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except Exception:
+            _logger.warning("invalid webhook update body")
+            return web.Response(status=400)
+        # Answer only once the update is queued; a non-2xx makes Telegram redeliver it later.
+        if not await pool.submit(update_key(update), update, timeout=enqueue_timeout):
+            _logger.warning("update queue full, asking telegram to retry", extra={"update_id": update.update_id})
+            return web.Response(status=503)
+        return web.Response(status=200)
+
+    async def handle_health(_request: web.Request) -> web.Response:
+        return web.json_response({"pending": pool.pending, "active": pool.active, **pool.metrics.snapshot()})
+
+    app = web.Application()
+    app.router.add_post(webhook_path(), handle_update)
+    app.router.add_get("/healthz", handle_health)
+    return app
+
+
+async def _metrics_loop(pool: KeyedUpdatePool, every_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(every_seconds)
+        pool.log_metrics()
+
+
+async def run_webhook(*, dp: Dispatcher, bot: Bot, metrics_every_seconds: int = 60) -> None:
+    """Serve Telegram webhook updates until cancelled.
+
+    Updates are handed to a ``KeyedUpdatePool``: one user's taps are processed in order, different
+    users concurrently on ``BOT_UPDATE_WORKERS`` workers, with at most ``BOT_UPDATE_QUEUE_MAX``
+    updates queued. The webhook is left registered on shutdown so other replicas keep receiving.
+    """
+
+    async def _feed(update: Update) -> None:
+        await dp.feed_update(bot, update)
+
+    pool = KeyedUpdatePool(
+        _feed,
+        workers=int(getattr(settings, "BOT_UPDATE_WORKERS", 16) or 16),
+        max_pending=int(getattr(settings, "BOT_UPDATE_QUEUE_MAX", 1000) or 1000),
+    )
+    app = build_webhook_app(dp=dp, bot=bot, pool=pool)
+    runner = web.AppRunner(app)
+    metrics_task: asyncio.Task | None = None
+
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    pool.start()
+    try:
+        await runner.setup()
+        host = str(getattr(settings, "BOT_WEBHOOK_HOST", "0.0.0.0") or "0.0.0.0")
+        port = int(getattr(settings, "BOT_WEBHOOK_PORT", 8081) or 8081)
+        await web.TCPSite(runner, host=host, port=port).start()
+        url = str(settings.BOT_WEBHOOK_URL).rstrip("/") + webhook_path()
+        await bot.set_webhook(
+            url=url,
+            secret_token=(str(getattr(settings, "BOT_WEBHOOK_SECRET", "") or "") or None),
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=int(getattr(settings, "BOT_WEBHOOK_MAX_CONNECTIONS", 40) or 40),
+        )
+        _logger.info("webhook serving", extra={"host": host, "port": port, "path": webhook_path()})
+        metrics_task = asyncio.create_task(_metrics_loop(pool, float(metrics_every_seconds)))
+        await asyncio.Event().wait()
+    finally:
+        if metrics_task is not None:
+            metrics_task.cancel()
+        # Stop taking requests first so Telegram redelivers to another replica, then drain.
+        await runner.cleanup()
+        await pool.stop()
+        pool.log_metrics()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """Token bucket shared by concurrent senders (e.g. the global Telegram send rate).
+
+    ``acquire()`` waits until a token is available; tokens refill continuously at
+    ``rate_per_sec`` up to ``burst``.
+    """
+
+    def __init__(self, *, rate_per_sec: float, burst: int | None = None):
+        self.rate = max(0.1, float(rate_per_sec))
+        self.capacity = float(burst if burst is not None else max(1, int(self.rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+_telegram_limiter: AsyncRateLimiter | None = None
+
+
+def telegram_send_limiter(*, rate_per_sec: float = 25.0) -> AsyncRateLimiter:
+    """Process-wide limiter for the bot token: every sender in the process shares one budget."""
+    global _telegram_limiter
+    if _telegram_limiter is None:
+        _telegram_limiter = AsyncRateLimiter(rate_per_sec=float(rate_per_sec))
+    return _telegram_limiter
@@ -6,11 +6,11 @@ import logging
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand, BotCommandScopeAllPrivateChats
 
 from shared.config import settings
 from shared.logging import setup_logging
+from shared.services.fsm_storage import build_fsm_storage
 from finance_bot.app.handlers.operations import router as ops_router, ALLOWED_TG_IDS
 
 
@@ -34,7 +34,8 @@ async def main() -> None:
     log.info("finance_bot allowed tg_ids: %s", ALLOWED_TG_IDS or "all (open)")
 
     bot = Bot(token=token, default=DefaultBotProperties(parse_mode="HTML"))
-    dp = Dispatcher(storage=MemoryStorage())
+    # No LISTEN hub in this process to evict cached states, so every read goes to the table.
+    dp = Dispatcher(storage=build_fsm_storage(cache_ttl=0))
     dp.include_router(ops_router)
 
     try:
@@ -0,0 +1,123 @@
+"""event/audit tables: monthly range partitions by created_at
+
+Revision ID: 20260401_0053
+Revises: 20260320_0052
+Create Date: 2026-04-01
+
+"""
+
+from __future__ import annotations
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260401_0053"
+down_revision = "20260320_0052"
+branch_labels = None
+depends_on = None
+
+
+TABLES = (
+    "task_events",
+    "purchase_events",
+    "shift_instance_events",
+    "salary_shift_audit",
+    "salary_payout_audit",
+    "admin_actions",
+)
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, months: int) -> date:
+    idx = d.year * 12 + (d.month - 1) + int(months)
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def _snapshot(conn, table: str) -> tuple[str | None, list[tuple[str, str]], list[str]]:
+    """Return (pk name, [(fk name, fk definition)], [index DDL]) of ``table``."""
+    pk = conn.execute(
+        sa.text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass) AND contype = 'p'"),
+        {"t": table},
+    ).scalar()
+    fks = [
+        (str(r[0]), str(r[1]))
+        for r in conn.execute(
+            sa.text(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = CAST(:t AS regclass) AND contype = 'f' ORDER BY conname"
+            ),
+            {"t": table},
+        ).all()
+    ]
+    indexes = [
+        str(r[1])
+        for r in conn.execute(
+            sa.text(
+                "SELECT indexname, indexdef FROM pg_indexes "
+                "WHERE schemaname = current_schema() AND tablename = :t ORDER BY indexname"
+            ),
+            {"t": table},
+        ).all()
+        if str(r[0]) != str(pk or "")
+    ]
+    return (str(pk) if pk else None), fks, indexes
+
+
+def _rebuild(conn, table: str, *, partitioned: bool) -> None:
+    old = f"{table}__old"
+    pk, fks, indexes = _snapshot(conn, table)
+    seq = conn.execute(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+
+    op.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    if pk:
+        op.execute(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{pk}" TO "{pk}__old"')
+
+    if partitioned:
+        op.execute(f'UPDATE "{old}" SET created_at = now() WHERE created_at IS NULL')
+        op.execute(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+        op.execute(f'ALTER TABLE "{table}" ALTER COLUMN created_at SET NOT NULL')
+        op.execute(f'ALTER TABLE "{table}" ALTER COLUMN created_at SET DEFAULT now()')
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "pk_{table}" PRIMARY KEY (id, created_at)')
+
+        first = conn.execute(sa.text(f'SELECT min(created_at) FROM "{old}"')).scalar()
+        today = date.today()
+        start = date((first or today).year, (first or today).month, 1)
+        stop = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+        while start <= stop:
+            end = _add_months(start, 1)
+            op.execute(
+                f'CREATE TABLE "{table}_p{start.year:04d}{start.month:02d}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+            )
+            start = end
+        # Safety net if the maintenance job falls behind; rows here are still readable.
+        op.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+    else:
+        op.execute(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS)')
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "pk_{table}" PRIMARY KEY (id)')
+
+    op.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    if seq:
+        op.execute(f'ALTER SEQUENCE {seq} OWNED BY "{table}".id')
+    op.execute(f'DROP TABLE "{old}"')
+
+    for name, definition in fks:
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+    for ddl in indexes:
+        op.execute(ddl)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    for table in TABLES:
+        _rebuild(conn, table, partitioned=True)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for table in TABLES:
+        _rebuild(conn, table, partitioned=False)
@@ -0,0 +1,36 @@
+"""telegram outbox: chat, dedupe key and delivery columns for all outbound kinds
+
+Revision ID: 20260403_0055
+Revises: 20260401_0053
+Create Date: 2026-04-03
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260403_0055"
+down_revision = "20260401_0053"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("telegram_outbox", sa.Column("chat_id", sa.BigInteger(), nullable=True))
+    op.add_column("telegram_outbox", sa.Column("dedupe_key", sa.String(128), nullable=True))
+    op.add_column("telegram_outbox", sa.Column("tg_message_id", sa.BigInteger(), nullable=True))
+    op.add_column("telegram_outbox", sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_unique_constraint("uq_telegram_outbox_dedupe_key", "telegram_outbox", ["dedupe_key"])
+    op.create_index("ix_telegram_outbox_chat_id", "telegram_outbox", ["chat_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_telegram_outbox_chat_id", table_name="telegram_outbox")
+    op.drop_constraint("uq_telegram_outbox_dedupe_key", "telegram_outbox", type_="unique")
+    op.drop_column("telegram_outbox", "sent_at")
+    op.drop_column("telegram_outbox", "tg_message_id")
+    op.drop_column("telegram_outbox", "dedupe_key")
+    op.drop_column("telegram_outbox", "chat_id")
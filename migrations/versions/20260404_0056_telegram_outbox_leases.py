@@ -0,0 +1,35 @@
+"""telegram outbox: lease columns for multi-replica claiming
+
+Revision ID: 20260404_0056
+Revises: 20260403_0055
+Create Date: 2026-04-04
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260404_0056"
+down_revision = "20260403_0055"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("telegram_outbox", sa.Column("claimed_by", sa.String(64), nullable=True))
+    op.add_column("telegram_outbox", sa.Column("lease_until", sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        "ix_telegram_outbox_chat_id_lease_until",
+        "telegram_outbox",
+        ["chat_id", "lease_until"],
+        postgresql_where=sa.text("status = 'pending' AND lease_until IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_telegram_outbox_chat_id_lease_until", table_name="telegram_outbox")
+    op.drop_column("telegram_outbox", "lease_until")
+    op.drop_column("telegram_outbox", "claimed_by")
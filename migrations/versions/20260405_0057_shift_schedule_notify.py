@@ -0,0 +1,56 @@
+"""shift plan / shift instance triggers: NOTIFY shift_schedule for the bot's shift timers
+
+Revision ID: 20260405_0057
+Revises: 20260404_0056
+Create Date: 2026-04-05
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20260405_0057"
+down_revision = "20260404_0056"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_shift_schedule() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('shift_schedule', OLD.day::text);
+            ELSE
+                PERFORM pg_notify('shift_schedule', NEW.day::text);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_work_shift_days_notify
+        AFTER INSERT OR DELETE OR UPDATE OF day, kind, start_time, end_time, user_id, end_snooze_until
+        ON work_shift_days
+        FOR EACH ROW EXECUTE FUNCTION notify_shift_schedule()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_shift_instances_notify
+        AFTER INSERT OR DELETE OR UPDATE OF status, ended_at
+        ON shift_instances
+        FOR EACH ROW EXECUTE FUNCTION notify_shift_schedule()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_shift_instances_notify ON shift_instances")
+    op.execute("DROP TRIGGER IF EXISTS trg_work_shift_days_notify ON work_shift_days")
+    op.execute("DROP FUNCTION IF EXISTS notify_shift_schedule()")
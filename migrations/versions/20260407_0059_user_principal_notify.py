@@ -0,0 +1,51 @@
+"""users trigger: NOTIFY user_principal so bot processes drop cached user principals
+
+Revision ID: 20260407_0059
+Revises: 20260406_0058
+Create Date: 2026-04-07
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20260407_0059"
+down_revision = "20260406_0058"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_user_principal() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM pg_notify('user_principal', NEW.tg_id::text);
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('user_principal', OLD.tg_id::text);
+            ELSE
+                PERFORM pg_notify('user_principal', OLD.tg_id::text);
+                IF NEW.tg_id IS DISTINCT FROM OLD.tg_id THEN
+                    PERFORM pg_notify('user_principal', NEW.tg_id::text);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_users_principal_notify
+        AFTER INSERT OR UPDATE OR DELETE ON users
+        FOR EACH ROW EXECUTE FUNCTION notify_user_principal()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_users_principal_notify ON users")
+    op.execute("DROP FUNCTION IF EXISTS notify_user_principal()")
@@ -0,0 +1,137 @@
+"""schedule_month_versions: per-month version bumped by plan/fact triggers (schedule month ETag)
+
+Revision ID: 20260408_0060
+Revises: 20260407_0059
+Create Date: 2026-04-08
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260408_0060"
+down_revision = "20260407_0059"
+branch_labels = None
+depends_on = None
+
+
+# Columns whose change alters the schedule month payload (updates of other columns, such as
+# the reminder bookkeeping, leave the version alone).
+WSD_COLUMNS = ("user_id", "day", "kind", "hours", "start_time", "end_time", "is_emergency", "comment")
+SHIFT_COLUMNS = (
+    "user_id",
+    "day",
+    "status",
+    "is_emergency",
+    "approval_required",
+    "amount_default",
+    "amount_submitted",
+    "amount_approved",
+    "rating",
+)
+
+TABLES = {
+    "work_shift_days": "work_shift_days_month_version_upd",
+    "shift_instances": "shift_instances_month_version_upd",
+}
+
+
+def update_function_sql(name: str, columns: tuple[str, ...]) -> str:
+    """Statement-level UPDATE trigger function: bump the old and new month of every row whose
+    tracked columns changed, once per statement."""
+    old_cols = ", ".join(f"o.{c}" for c in columns)
+    new_cols = ", ".join(f"n.{c}" for c in columns)
+    return f"""
+        CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+        BEGIN
+            PERFORM bump_schedule_months(ARRAY(
+                SELECT unnest(ARRAY[date_trunc('month', o.day)::date, date_trunc('month', n.day)::date])
+                FROM old_rows o
+                JOIN new_rows n ON n.id = o.id
+                WHERE ({old_cols}) IS DISTINCT FROM ({new_cols})
+            ));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+
+
+def upgrade() -> None:
+    op.create_table(
+        "schedule_month_versions",
+        sa.Column("month", sa.Date(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    # Statement-level triggers with transition tables: a statement touching many rows (bulk
+    # autofill, the auto-close UPDATE) bumps each affected month once, not once per row.
+    # Months are upserted in order so concurrent statements lock them in the same order.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_schedule_months(months date[]) RETURNS void AS $$
+            INSERT INTO schedule_month_versions (month, version, updated_at)
+            SELECT DISTINCT m, 1, now() FROM unnest(months) AS m WHERE m IS NOT NULL ORDER BY m
+            ON CONFLICT (month) DO UPDATE
+            SET version = schedule_month_versions.version + 1, updated_at = now()
+        $$ LANGUAGE sql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION schedule_month_version_ins() RETURNS trigger AS $$
+        BEGIN
+            PERFORM bump_schedule_months(ARRAY(SELECT date_trunc('month', day)::date FROM new_rows));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION schedule_month_version_del() RETURNS trigger AS $$
+        BEGIN
+            PERFORM bump_schedule_months(ARRAY(SELECT date_trunc('month', day)::date FROM old_rows));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(update_function_sql(TABLES["work_shift_days"], WSD_COLUMNS))
+    op.execute(update_function_sql(TABLES["shift_instances"], SHIFT_COLUMNS))
+    # Transition tables allow one event per trigger and no column list.
+    for table, upd_function in TABLES.items():
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_month_version_ins
+            AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION schedule_month_version_ins()
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_month_version_upd
+            AFTER UPDATE ON {table} REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {upd_function}()
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_month_version_del
+            AFTER DELETE ON {table} REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION schedule_month_version_del()
+            """
+        )
+
+
+def downgrade() -> None:
+    for table, upd_function in TABLES.items():
+        for op_name in ("ins", "upd", "del"):
+            op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_month_version_{op_name} ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {upd_function}()")
+    op.execute("DROP FUNCTION IF EXISTS schedule_month_version_del()")
+    op.execute("DROP FUNCTION IF EXISTS schedule_month_version_ins()")
+    op.execute("DROP FUNCTION IF EXISTS bump_schedule_months(date[])")
+    op.drop_table("schedule_month_versions")
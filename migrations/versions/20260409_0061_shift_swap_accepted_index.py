@@ -0,0 +1,32 @@
+"""shift_swap_requests: partial index on accepted_by_user_id for swap candidate ranking
+
+Revision ID: 20260409_0061
+Revises: 20260408_0060
+Create Date: 2026-04-09
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260409_0061"
+down_revision = "20260408_0060"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_shift_swap_requests_accepted_by",
+        "shift_swap_requests",
+        ["accepted_by_user_id", "closed_at"],
+        unique=False,
+        postgresql_where=sa.text("accepted_by_user_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_shift_swap_requests_accepted_by", table_name="shift_swap_requests")
@@ -0,0 +1,42 @@
+"""shift_instances / salary_shift_state: partial indexes for the manager review queue
+
+Revision ID: 20260410_0062
+Revises: 20260409_0061
+Create Date: 2026-04-10
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260410_0062"
+down_revision = "20260409_0061"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_shift_instances_review_queue",
+        "shift_instances",
+        ["day", "id"],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending_approval' OR (approval_required AND status <> 'needs_rework')"),
+    )
+    op.create_index(
+        "ix_salary_shift_state_unconfirmed",
+        "salary_shift_state",
+        ["shift_id"],
+        unique=False,
+        postgresql_where=sa.text(
+            "confirmed_at IS NULL AND (state <> 'worked' OR manual_hours <> 0 OR manual_amount_override <> 0)"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_salary_shift_state_unconfirmed", table_name="salary_shift_state")
+    op.drop_index("ix_shift_instances_review_queue", table_name="shift_instances")
@@ -0,0 +1,60 @@
+"""schedule month version: also bump on shift_instances started_at / ended_at (coverage ETag)
+
+Revision ID: 20260411_0063
+Revises: 20260410_0062
+Create Date: 2026-04-11
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20260411_0063"
+down_revision = "20260410_0062"
+branch_labels = None
+depends_on = None
+
+
+SHIFT_COLUMNS = (
+    "user_id",
+    "day",
+    "status",
+    "is_emergency",
+    "approval_required",
+    "amount_default",
+    "amount_submitted",
+    "amount_approved",
+    "rating",
+)
+
+
+def _replace_update_function(columns: tuple[str, ...]) -> None:
+    # Same statement-level function as in 0060, with a different tracked column list.
+    old_cols = ", ".join(f"o.{c}" for c in columns)
+    new_cols = ", ".join(f"n.{c}" for c in columns)
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION shift_instances_month_version_upd() RETURNS trigger AS $$
+        BEGIN
+            PERFORM bump_schedule_months(ARRAY(
+                SELECT unnest(ARRAY[date_trunc('month', o.day)::date, date_trunc('month', n.day)::date])
+                FROM old_rows o
+                JOIN new_rows n ON n.id = o.id
+                WHERE ({old_cols}) IS DISTINCT FROM ({new_cols})
+            ));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+
+def upgrade() -> None:
+    # The hourly coverage is built from started_at / ended_at and shares the month version.
+    _replace_update_function(SHIFT_COLUMNS + ("started_at", "ended_at"))
+
+
+def downgrade() -> None:
+    _replace_update_function(SHIFT_COLUMNS)
@@ -29,6 +29,8 @@ class Settings(BaseSettings):
     admin_panel_url: str = Field(default="http://localhost:8000/crm", alias="WEB_BASE_URL")
     WEB_JWT_SECRET: str = "change_me"
     JWT_TTL_MINUTES: int = 10
+    # Signing key for /auth/tg magic links; empty -> derived from WEB_JWT_SECRET.
+    MAGIC_LINK_SECRET: str = ""
 
     # Internal service-to-service auth/token and base URL for bot -> web calls over docker network
     INTERNAL_API_TOKEN: str = ""
@@ -39,6 +41,49 @@ class Settings(BaseSettings):
 
     LOG_LEVEL: str = "INFO"
 
+    # Event/audit history partitions (monthly by created_at) and retention.
+    # EVENT_RETENTION_MONTHS=0 keeps history forever; EVENT_ARCHIVE_DIR enables CSV.gz export before drop.
+    EVENT_PARTITIONS_MONTHS_AHEAD: int = 3
+    EVENT_RETENTION_MONTHS: int = 0
+    EVENT_ARCHIVE_DIR: str = ""
+    # Sent/failed rows of task_notifications / telegram_outbox older than this are deleted (0 = keep).
+    QUEUE_RETENTION_DAYS: int = 30
+
+    # Comments / plain status changes for one recipient within this window go out as one digest (0 = off).
+    TASK_NOTIFY_DIGEST_SECONDS: int = 60
+
+    # aiogram FSM storage: "postgres" (fsm_states, survives restarts, shared by replicas) or "memory".
+    FSM_STORAGE: str = "postgres"
+    # Per-process read cache; other bot replicas evict written keys via NOTIFY.
+    FSM_CACHE_TTL_SECONDS: int = 300
+    # Flows untouched for this long are deleted by the nightly cleanup (0 = keep).
+    FSM_STATE_TTL_DAYS: int = 7
+    # Bot-side tg_id -> user cache for guards; user row writes evict it via NOTIFY user_principal.
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    # Webhook mode for the bot (empty BOT_WEBHOOK_URL = long polling). Public base URL, e.g. https://domain
+    BOT_WEBHOOK_URL: str = ""
+    BOT_WEBHOOK_PATH: str = "/tg/webhook"
+    BOT_WEBHOOK_SECRET: str = ""
+    BOT_WEBHOOK_HOST: str = "0.0.0.0"
+    BOT_WEBHOOK_PORT: int = 8081
+    BOT_WEBHOOK_MAX_CONNECTIONS: int = 40
+    # Update worker pool: same user in order, different users in parallel.
+    BOT_UPDATE_WORKERS: int = 16
+    BOT_UPDATE_QUEUE_MAX: int = 1000
+    # How long a webhook request waits for queue room before answering 503 (Telegram retries).
+    BOT_UPDATE_ENQUEUE_TIMEOUT_SECONDS: int = 5
+
+    # Shift swap offers go to free colleagues in ranked waves of this size, this many minutes apart.
+    SHIFT_SWAP_WAVE_SIZE: int = 5
+    SHIFT_SWAP_WAVE_INTERVAL_MINUTES: int = 10
+
+    # Shift coverage: hours [open, close) with fewer planned people than this are flagged
+    # on /api/schedule/coverage and in the morning alert to admins/managers.
+    SHIFT_COVERAGE_MIN_STAFF: int = 1
+    SHIFT_COVERAGE_OPEN_HOUR: int = 10
+    SHIFT_COVERAGE_CLOSE_HOUR: int = 18
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, text
 from contextlib import asynccontextmanager
 from .config import settings
 import logging
@@ -31,12 +31,32 @@ AsyncSessionLocal = async_sessionmaker[
 ](bind=engine, expire_on_commit=False, autoflush=False, autocommit=False)
 
 
-def add_after_commit_callback(session: AsyncSession, cb: Callable[[], Awaitable[None]]) -> None:
+def add_after_commit_callback(
+    session: AsyncSession,
+    cb: Callable[[], Awaitable[None]],
+    *,
+    background: str | None = None,
+) -> None:
+    """Run ``cb`` after a successful commit.
+
+    By default it is awaited before ``get_async_session`` returns. With ``background=<queue>``
+    it runs on the process task supervisor instead (bounded, drained on shutdown); if that
+    queue is full the callback is awaited inline, so it is never lost.
+    """
     callbacks = session.info.get("after_commit_callbacks")
     if callbacks is None:
         callbacks = []
         session.info["after_commit_callbacks"] = callbacks
-    callbacks.append(cb)
+    callbacks.append((cb, background))
+
+
+async def notify_on_commit(session: AsyncSession, channel: str, payload: str = "") -> None:
+    """pg_notify inside the current transaction.
+
+    Postgres delivers it to LISTENers only when the transaction commits (never on rollback)
+    and folds identical channel/payload pairs, so a constant payload means one wake-up per commit.
+    """
+    await session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": str(channel), "payload": str(payload)})
 
 
 @asynccontextmanager
@@ -49,9 +69,14 @@ async def get_async_session() -> AsyncSession:
         logging.getLogger(__name__).debug("db session commit")
 
         callbacks = session.info.pop("after_commit_callbacks", None) or []
-        for cb in callbacks:
+        for cb, background in callbacks:
             try:
-                await cb()
+                if background:
+                    from shared.services.background_tasks import spawn_background
+
+                    await spawn_background(background, cb, name=getattr(cb, "__qualname__", ""), spill=cb)
+                else:
+                    await cb()
             except Exception:
                 logging.getLogger(__name__).exception("after_commit callback failed")
     except Exception:
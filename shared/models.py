@@ -2,7 +2,7 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import String, Integer, BigInteger, Date, ForeignKey, JSON, DateTime, Boolean, Index, Table, Column, Text, Time
 from sqlalchemy import Numeric
 from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM, JSONB
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, text
 from decimal import Decimal
 from datetime import datetime, date, time
 from typing import Optional
@@ -168,6 +168,16 @@ class WorkShiftDay(Base):
     )
 
 
+class ScheduleMonthVersion(Base):
+    """Per-month counter bumped by triggers on work_shift_days / shift_instances (migrations 0060, 0063)."""
+
+    __tablename__ = "schedule_month_versions"
+
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=1)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+
+
 class ShiftInstance(Base):
     __tablename__ = "shift_instances"
 
@@ -236,6 +246,13 @@ class ShiftInstance(Base):
         UniqueConstraint("user_id", "day", name="uq_shift_instances_user_day"),
         Index("ix_shift_instances_status", "status"),
         Index("ix_shift_instances_day_status", "day", "status"),
+        # Manager review queue (shared/services/shift_review_queue.py).
+        Index(
+            "ix_shift_instances_review_queue",
+            "day",
+            "id",
+            postgresql_where=text("status = 'pending_approval' OR (approval_required AND status <> 'needs_rework')"),
+        ),
     )
 
 
@@ -297,6 +314,17 @@ class SalaryShiftStateRow(Base):
     updated_by_user: Mapped[Optional["User"]] = relationship(lazy="selectin", foreign_keys=[updated_by_user_id])
     confirmed_by_user: Mapped[Optional["User"]] = relationship(lazy="selectin", foreign_keys=[confirmed_by_user_id])
 
+    __table_args__ = (
+        # Salary states still to be confirmed, for the manager review queue.
+        Index(
+            "ix_salary_shift_state_unconfirmed",
+            "shift_id",
+            postgresql_where=text(
+                "confirmed_at IS NULL AND (state <> 'worked' OR manual_hours <> 0 OR manual_amount_override <> 0)"
+            ),
+        ),
+    )
+
 
 class SalaryAdjustment(Base):
     __tablename__ = "salary_adjustments"
@@ -427,6 +455,12 @@ class ShiftSwapRequest(Base):
     __table_args__ = (
         Index("ix_shift_swap_requests_status", "status"),
         Index("ix_shift_swap_requests_day_status", "day", "status"),
+        Index(
+            "ix_shift_swap_requests_accepted_by",
+            "accepted_by_user_id",
+            "closed_at",
+            postgresql_where=text("accepted_by_user_id IS NOT NULL"),
+        ),
     )
 
 
@@ -704,15 +738,30 @@ class TelegramOutbox(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     kind: Mapped[str] = mapped_column(String(64))
+    chat_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    dedupe_key: Mapped[str | None] = mapped_column(String(128), nullable=True)
     status: Mapped[str] = mapped_column(String(16), default="pending")
     attempts: Mapped[int] = mapped_column(Integer, default=0)
     next_retry_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    tg_message_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Set while a bot instance is sending the row; an expired lease makes the row claimable again.
+    claimed_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now, onupdate=utc_now)
 
     __table_args__ = (
+        UniqueConstraint("dedupe_key", name="uq_telegram_outbox_dedupe_key"),
+        Index("ix_telegram_outbox_chat_id", "chat_id"),
+        Index(
+            "ix_telegram_outbox_chat_id_lease_until",
+            "chat_id",
+            "lease_until",
+            postgresql_where=text("status = 'pending' AND lease_until IS NOT NULL"),
+        ),
         Index("ix_telegram_outbox_kind", "kind"),
         Index("ix_telegram_outbox_status", "status"),
         Index("ix_telegram_outbox_next_retry_at", "next_retry_at"),
@@ -720,6 +769,25 @@ class TelegramOutbox(Base):
     )
 
 
+class FsmState(Base):
+    """aiogram FSM state/data of one chat participant (see shared/services/fsm_storage.py)."""
+
+    __tablename__ = "fsm_states"
+
+    bot_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # NULL-free key parts: 0 / "" stand for "no thread" / "no business connection".
+    thread_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, default=0)
+    business_connection_id: Mapped[str] = mapped_column(String(64), primary_key=True, default="")
+    destiny: Mapped[str] = mapped_column(String(64), primary_key=True, default="default")
+    state: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    data: Mapped[dict] = mapped_column(JSONB, default=dict)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now, onupdate=utc_now)
+
+    __table_args__ = (Index("ix_fsm_states_updated_at", "updated_at"),)
+
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+
+_logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[Any]]
+
+# queue -> (max concurrently running, max running + waiting[, log level of a drop]). Unknown
+# queues use "default"; drops log at WARNING unless the queue says otherwise.
+QueueSpec = tuple[int, int] | tuple[int, int, int]
+
+DEFAULT_QUEUES: dict[str, QueueSpec] = {
+    "default": (4, 200),
+    # after-commit side effects (shift rating requests, ...)
+    "after_commit": (8, 500),
+    # admin alerts sent straight to Telegram (PIN brute-force alerts)
+    "alerts": (2, 50),
+    # wake-ups of the in-process outbox worker; a dropped nudge is covered by the one in flight
+    "outbox_nudge": (1, 1, logging.DEBUG),
+}
+
+
+@dataclass
+class _QueueState:
+    limit: int
+    backlog: int
+    sem: asyncio.Semaphore
+    drop_level: int = logging.WARNING
+    running: int = 0
+    waiting: int = 0
+    done: int = 0
+    failed: int = 0
+    dropped: int = 0
+    spilled: int = 0
+    tasks: set = field(default_factory=set)
+
+
+class TaskSupervisor:
+    """Bounded, tracked replacement for fire-and-forget ``asyncio.create_task``.
+
+    Each named queue runs at most ``limit`` jobs at once and holds at most ``backlog`` jobs.
+    A job that does not fit (or arrives while draining) falls back to its ``spill`` coroutine,
+    awaited by the caller — typically a durable outbox write — or is dropped and counted.
+    ``drain`` lets running work finish on shutdown and spills jobs that never started.
+    """
+
+    def __init__(self, queues: dict[str, QueueSpec] | None = None):
+        self._limits = dict(DEFAULT_QUEUES if queues is None else queues)
+        self._queues: dict[str, _QueueState] = {}
+        self._closing = False
+
+    def _queue(self, name: str) -> _QueueState:
+        q = self._queues.get(name)
+        if q is None:
+            spec = self._limits.get(name) or self._limits.get("default") or (4, 200)
+            limit, backlog = spec[0], spec[1]
+            q = _QueueState(
+                limit=max(1, int(limit)),
+                backlog=max(1, int(backlog)),
+                sem=asyncio.Semaphore(max(1, int(limit))),
+                drop_level=(int(spec[2]) if len(spec) > 2 else logging.WARNING),
+            )
+            self._queues[name] = q
+        return q
+
+    async def submit(self, queue: str, job: Job, *, name: str = "", spill: Job | None = None) -> bool:
+        """Run ``job`` in the background on ``queue``; False if it was spilled or dropped instead."""
+        q = self._queue(str(queue))
+        if self._closing or q.running + q.waiting >= q.backlog:
+            await self._spill_or_drop(str(queue), q, name=name, spill=spill)
+            return False
+        q.waiting += 1
+        task = asyncio.create_task(self._run(str(queue), q, job, name=name, spill=spill))
+        q.tasks.add(task)
+        task.add_done_callback(q.tasks.discard)
+        return True
+
+    async def _spill_or_drop(self, queue: str, q: _QueueState, *, name: str, spill: Job | None) -> None:
+        if spill is None:
+            q.dropped += 1
+            _logger.log(
+                q.drop_level, "background task dropped", extra={"queue": queue, "task": name, "closing": self._closing}
+            )
+            return
+        q.spilled += 1
+        try:
+            await spill()
+        except Exception:
+            _logger.exception("background task spill failed", extra={"queue": queue, "task": name})
+
+    async def _run(self, queue: str, q: _QueueState, job: Job, *, name: str, spill: Job | None) -> None:
+        started = False
+        try:
+            async with q.sem:
+                q.waiting -= 1
+                q.running += 1
+                started = True
+                try:
+                    await job()
+                    q.done += 1
+                except Exception:
+                    q.failed += 1
+                    _logger.exception("background task failed", extra={"queue": queue, "task": name})
+                finally:
+                    q.running -= 1
+        except asyncio.CancelledError:
+            if not started:
+                q.waiting -= 1
+                # Cancelled by drain before it ever ran: hand it to the durable fallback.
+                await asyncio.shield(self._spill_or_drop(queue, q, name=name, spill=spill))
+            raise
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {
+                "running": q.running,
+                "waiting": q.waiting,
+                "done": q.done,
+                "failed": q.failed,
+                "dropped": q.dropped,
+                "spilled": q.spilled,
+            }
+            for name, q in self._queues.items()
+        }
+
+    def log_metrics(self) -> None:
+        for name, snap in self.snapshot().items():
+            _logger.info(
+                "BG_TASKS_METRICS queue=%s running=%s waiting=%s done=%s failed=%s dropped=%s spilled=%s",
+                name,
+                snap["running"],
+                snap["waiting"],
+                snap["done"],
+                snap["failed"],
+                snap["dropped"],
+                snap["spilled"],
+            )
+
+    async def drain(self, *, timeout: float = 10.0) -> None:
+        """Refuse new jobs, wait up to ``timeout`` seconds for queued ones, then cancel the rest."""
+        self._closing = True
+        tasks = [t for q in self._queues.values() for t in q.tasks]
+        if tasks:
+            _done, pending = await asyncio.wait(tasks, timeout=max(0.0, float(timeout)))
+            for t in pending:
+                t.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        self.log_metrics()
+
+
+_supervisor: TaskSupervisor | None = None
+
+
+def get_supervisor() -> TaskSupervisor:
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = TaskSupervisor()
+    return _supervisor
+
+
+async def spawn_background(queue: str, job: Job, *, name: str = "", spill: Job | None = None) -> bool:
+    return await get_supervisor().submit(queue, job, name=name, spill=spill)
+
+
+async def drain_background_tasks(*, timeout: float = 10.0) -> None:
+    global _supervisor
+    sup, _supervisor = _supervisor, None
+    if sup is not None:
+        await sup.drain(timeout=timeout)
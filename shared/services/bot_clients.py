@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import logging
+
+import httpx
+
+from shared.config import settings
+
+
+_logger = logging.getLogger(__name__)
+
+# Bot instance owned by the bot process (registered in bot/app/main.py, closed by aiogram).
+_registered_bot = None
+# Lazily created client for processes without a registered bot (web); closed by close_bot_clients().
+_pooled_bot = None
+_http_client: httpx.AsyncClient | None = None
+
+
+def register_bot(bot) -> None:
+    global _registered_bot
+    _registered_bot = bot
+
+
+def unregister_bot() -> None:
+    global _registered_bot
+    _registered_bot = None
+
+
+def get_bot():
+    """Shared aiogram Bot: the bot process's own instance, or one pooled client per process.
+
+    Callers must not close its session; connections are reused across jobs and requests.
+    """
+    global _pooled_bot
+    if _registered_bot is not None:
+        return _registered_bot
+    if _pooled_bot is None:
+        from aiogram import Bot
+        from aiogram.client.default import DefaultBotProperties
+
+        _pooled_bot = Bot(token=str(settings.BOT_TOKEN), default=DefaultBotProperties(parse_mode="HTML"))
+    return _pooled_bot
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide keep-alive client for raw Bot API calls (per-request timeouts are passed on each call)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _http_client
+
+
+async def close_bot_clients() -> None:
+    global _pooled_bot, _http_client
+    bot, _pooled_bot = _pooled_bot, None
+    client, _http_client = _http_client, None
+    if bot is not None:
+        try:
+            await bot.session.close()
+        except Exception:
+            _logger.exception("failed to close pooled bot session")
+    if client is not None:
+        try:
+            await client.aclose()
+        except Exception:
+            _logger.exception("failed to close pooled http client")
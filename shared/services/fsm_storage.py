@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import socket
+import time as _time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.config import settings
+from shared.db import get_async_session, notify_on_commit
+from shared.models import FsmState
+from shared.utils import utc_now
+
+
+_logger = logging.getLogger(__name__)
+
+# Other bot replicas evict their cached copy of a key when it is written (payload "<origin>|<key>").
+FSM_NOTIFY_CHANNEL = "fsm_state"
+
+_TAG = "__fsm__"
+# Enum classes are restored only from our own packages.
+_ENUM_PACKAGES = ("shared", "bot", "finance_bot", "web")
+
+
+def encode_data(value: Any) -> Any:
+    """JSON-ready copy of FSM data; dates, enums, decimals and int-keyed dicts survive a round trip."""
+    if isinstance(value, Enum):
+        cls = type(value)
+        return {_TAG: "enum", "cls": f"{cls.__module__}:{cls.__qualname__}", "v": encode_data(value.value)}
+    if isinstance(value, datetime):
+        return {_TAG: "datetime", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {_TAG: "date", "v": value.isoformat()}
+    if isinstance(value, time):
+        return {_TAG: "time", "v": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {_TAG: "decimal", "v": str(value)}
+    if isinstance(value, Mapping):
+        if _TAG not in value and all(isinstance(k, str) for k in value):
+            return {k: encode_data(v) for k, v in value.items()}
+        return {_TAG: "dict", "items": [[encode_data(k), encode_data(v)] for k, v in value.items()]}
+    if isinstance(value, tuple):
+        return {_TAG: "tuple", "items": [encode_data(v) for v in value]}
+    if isinstance(value, (set, frozenset)):
+        return {_TAG: "set", "items": [encode_data(v) for v in value]}
+    if isinstance(value, list):
+        return [encode_data(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"FSM data value of type {type(value).__name__} is not storable")
+
+
+def _enum_class(path: str):
+    module, _, qualname = str(path).partition(":")
+    if module.split(".", 1)[0] not in _ENUM_PACKAGES:
+        return None
+    try:
+        obj = importlib.import_module(module)
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+    except Exception:
+        return None
+    return obj if isinstance(obj, type) and issubclass(obj, Enum) else None
+
+
+def decode_data(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode_data(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    tag = value.get(_TAG)
+    if tag is None:
+        return {k: decode_data(v) for k, v in value.items()}
+    if tag == "enum":
+        raw = decode_data(value.get("v"))
+        cls = _enum_class(value.get("cls") or "")
+        try:
+            return cls(raw) if cls is not None else raw
+        except ValueError:
+            return raw
+    if tag == "datetime":
+        return datetime.fromisoformat(value["v"])
+    if tag == "date":
+        return date.fromisoformat(value["v"])
+    if tag == "time":
+        return time.fromisoformat(value["v"])
+    if tag == "decimal":
+        return Decimal(value["v"])
+    if tag == "dict":
+        return {decode_data(k): decode_data(v) for k, v in value.get("items") or []}
+    if tag == "tuple":
+        return tuple(decode_data(v) for v in value.get("items") or [])
+    if tag == "set":
+        return {decode_data(v) for v in value.get("items") or []}
+    return value
+
+
+def _key_parts(key: StorageKey) -> tuple[int, int, int, int, str, str]:
+    return (
+        int(key.bot_id),
+        int(key.chat_id),
+        int(key.user_id),
+        int(key.thread_id or 0),
+        str(key.business_connection_id or ""),
+        str(key.destiny),
+    )
+
+
+def _key_str(parts: tuple) -> str:
+    return ":".join(str(p) for p in parts)
+
+
+def _where_key(parts: tuple):
+    bot_id, chat_id, user_id, thread_id, bc_id, destiny = parts
+    return (
+        FsmState.bot_id == bot_id,
+        FsmState.chat_id == chat_id,
+        FsmState.user_id == user_id,
+        FsmState.thread_id == thread_id,
+        FsmState.business_connection_id == bc_id,
+        FsmState.destiny == destiny,
+    )
+
+
+@dataclass
+class _Entry:
+    state: str | None
+    data: dict  # encoded (JSON-ready) form
+    expires: float
+
+
+_UNSET: Any = object()
+
+
+class PostgresStorage(BaseStorage):
+    """FSM storage in ``fsm_states`` (JSONB data) with a per-process write-through cache.
+
+    Every write goes to Postgres in its own transaction, so flows survive restarts and any
+    replica can continue them. Reads are served from the cache for ``cache_ttl`` seconds;
+    with ``notify=True`` writes also NOTIFY ``FSM_NOTIFY_CHANNEL`` and other replicas evict
+    the key (wire ``evict`` to the LISTEN hub).
+    """
+
+    def __init__(self, *, cache_ttl: float = 300.0, cache_size: int = 10_000, notify: bool = False):
+        # Keyed by the same "<bot>:<chat>:<user>:..." string that is sent in NOTIFY payloads.
+        self._cache: OrderedDict[str, _Entry] = OrderedDict()
+        self._cache_ttl = float(cache_ttl)
+        self._cache_size = int(cache_size)
+        self._notify = bool(notify)
+        self._origin = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+
+    # --- cache ---------------------------------------------------------------------------
+
+    def _cached(self, ck: str) -> _Entry | None:
+        entry = self._cache.get(ck)
+        if entry is None:
+            return None
+        if entry.expires <= _time.monotonic():
+            self._cache.pop(ck, None)
+            return None
+        self._cache.move_to_end(ck)
+        return entry
+
+    def _remember(self, ck: str, *, state: str | None, data: dict) -> None:
+        if self._cache_ttl <= 0:
+            return
+        self._cache[ck] = _Entry(state=state, data=data, expires=_time.monotonic() + self._cache_ttl)
+        self._cache.move_to_end(ck)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def evict(self, payload: str) -> None:
+        """LISTEN callback: drop a key another process has written ("" after a reconnect: drop all)."""
+        origin, _, key = str(payload or "").partition("|")
+        if not key:
+            self._cache.clear()
+            return
+        if origin == self._origin:
+            return
+        self._cache.pop(key, None)
+
+    # --- db ------------------------------------------------------------------------------
+
+    async def _load(self, parts: tuple) -> _Entry:
+        ck = _key_str(parts)
+        entry = self._cached(ck)
+        if entry is not None:
+            return entry
+        async with get_async_session() as session:
+            row = (await session.execute(select(FsmState.state, FsmState.data).where(*_where_key(parts)))).first()
+        state, data = (row[0], dict(row[1] or {})) if row is not None else (None, {})
+        self._remember(ck, state=state, data=data)
+        return _Entry(state=state, data=data, expires=0.0)
+
+    async def _write(self, parts: tuple, *, state: Any = _UNSET, data: Any = _UNSET) -> None:
+        bot_id, chat_id, user_id, thread_id, bc_id, destiny = parts
+        ck = _key_str(parts)
+        now = utc_now()
+        values = {
+            "bot_id": bot_id,
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "thread_id": thread_id,
+            "business_connection_id": bc_id,
+            "destiny": destiny,
+            "state": (None if state is _UNSET else state),
+            "data": ({} if data is _UNSET else data),
+            "updated_at": now,
+        }
+        stmt = insert(FsmState).values(**values)
+        changed = {"updated_at": stmt.excluded.updated_at}
+        if state is not _UNSET:
+            changed["state"] = stmt.excluded.state
+        if data is not _UNSET:
+            changed["data"] = stmt.excluded.data
+        stmt = stmt.on_conflict_do_update(index_elements=list(FsmState.__table__.primary_key.columns), set_=changed)
+
+        async with get_async_session() as session:
+            await session.execute(stmt)
+            if self._notify:
+                await notify_on_commit(session, FSM_NOTIFY_CHANNEL, f"{self._origin}|{ck}")
+
+        cached = self._cache.get(ck)
+        if cached is not None:
+            self._remember(
+                ck,
+                state=(cached.state if state is _UNSET else state),
+                data=(cached.data if data is _UNSET else data),
+            )
+
+    # --- BaseStorage ---------------------------------------------------------------------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._write(_key_parts(key), state=(str(value) if value is not None else None))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._load(_key_parts(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._write(_key_parts(key), data=encode_data(dict(data)))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        # Decoding builds fresh objects, so callers never mutate the cached copy.
+        return decode_data((await self._load(_key_parts(key))).data)
+
+    async def close(self) -> None:
+        self._cache.clear()
+
+
+def build_fsm_storage(*, notify: bool = False, cache_ttl: float | None = None) -> BaseStorage:
+    """FSM storage selected by ``FSM_STORAGE`` ("postgres" by default, "memory" for local runs).
+
+    Caching is only safe where other replicas' writes evict it (``notify`` plus a listener on
+    ``FSM_NOTIFY_CHANNEL``); processes without a listener pass ``cache_ttl=0``.
+    """
+    kind = str(getattr(settings, "FSM_STORAGE", "postgres") or "postgres").strip().lower()
+    if kind == "memory":
+        return MemoryStorage()
+    if cache_ttl is None:
+        cache_ttl = float(getattr(settings, "FSM_CACHE_TTL_SECONDS", 300) or 0)
+    return PostgresStorage(cache_ttl=cache_ttl, notify=notify)
+
+
+async def cleanup_fsm_states(session: AsyncSession, *, ttl: timedelta | None = None, now: datetime | None = None) -> int:
+    """Delete empty rows and flows abandoned for longer than ``ttl`` (FSM_STATE_TTL_DAYS)."""
+    now = now or utc_now()
+    if ttl is None:
+        ttl = timedelta(days=int(getattr(settings, "FSM_STATE_TTL_DAYS", 7) or 0))
+    empty = text("state IS NULL AND data = '{}'::jsonb")
+    cond = or_(empty, FsmState.updated_at < now - ttl) if ttl > timedelta(0) else empty
+    res = await session.execute(delete(FsmState).where(cond))
+    return int(res.rowcount or 0)
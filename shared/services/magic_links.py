@@ -1,65 +1,163 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import hmac
+import secrets
 from datetime import datetime, timedelta, timezone
-from uuid import uuid4
 
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from shared.config import settings
 from shared.models import MagicLinkToken, User
 from shared.utils import utc_now
 
 
+# Signed tokens: "<user_id>.<scope>.<exp_unix>.<token_id>.<signature>".
+# They are validated without touching the DB, so issuing a link never writes a row and a
+# link stays valid (reusable) until it expires. Legacy uuid4 tokens in magic_link_tokens are
+# still accepted until they expire.
+_SIGNED_PARTS = 5
+_SIG_BYTES = 16
+
+# Per-recipient reuse: (user_id, scope, ttl_minutes) -> (token, expires_at).
+_issued: dict[tuple[int, str, int], tuple[str, datetime]] = {}
+_ISSUED_MAX = 10_000
+
+
+def _signing_key() -> bytes:
+    secret = str(getattr(settings, "MAGIC_LINK_SECRET", "") or "").strip() or str(settings.WEB_JWT_SECRET or "")
+    return hmac.new(secret.encode("utf-8"), b"nikcrm:magic-link:v1", hashlib.sha256).digest()
+
+
+def _sign(body: str) -> str:
+    sig = hmac.new(_signing_key(), body.encode("utf-8"), hashlib.sha256).digest()[:_SIG_BYTES]
+    return base64.urlsafe_b64encode(sig).decode("ascii").rstrip("=")
+
+
+def _scope_key(scope: str | None) -> str:
+    return str(scope or "").strip()
+
+
+def sign_magic_token(*, user_id: int, scope: str | None, expires_at: datetime, token_id: str | None = None) -> str:
+    body = ".".join(
+        [
+            str(int(user_id)),
+            _scope_key(scope),
+            str(int(expires_at.timestamp())),
+            str(token_id or secrets.token_hex(8)),
+        ]
+    )
+    return f"{body}.{_sign(body)}"
+
+
+def parse_signed_token(token: str, *, now: datetime | None = None) -> tuple[int, str, datetime, str] | None:
+    """Verify a signed token; return (user_id, scope, expires_at, token_id) or None."""
+    parts = str(token or "").strip().split(".")
+    if len(parts) != _SIGNED_PARTS:
+        return None
+    uid_s, scope, exp_s, token_id, sig = parts
+    body = ".".join(parts[:-1])
+    if not hmac.compare_digest(_sign(body), sig):
+        return None
+    try:
+        user_id = int(uid_s)
+        expires_at = datetime.fromtimestamp(int(exp_s), tz=timezone.utc)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if expires_at <= (now or utc_now()):
+        return None
+    return user_id, scope, expires_at, token_id
+
+
+def _issue(user_id: int, *, ttl_minutes: int, scope: str | None, now: datetime) -> str:
+    ttl = max(1, int(ttl_minutes))
+    key = (int(user_id), _scope_key(scope), ttl)
+    cached = _issued.get(key)
+    if cached is not None and cached[1] - now >= timedelta(minutes=ttl) / 2:
+        return cached[0]
+
+    expires_at = now + timedelta(minutes=ttl)
+    token = sign_magic_token(user_id=int(user_id), scope=scope, expires_at=expires_at)
+    if len(_issued) >= _ISSUED_MAX:
+        _issued.clear()
+    _issued[key] = (token, expires_at)
+    return token
+
+
 async def create_magic_token(
-    session: AsyncSession,
+    session: AsyncSession | None,
     *,
     user_id: int,
     ttl_minutes: int = 15,
     scope: str | None = None,
 ) -> str:
-    token = uuid4().hex
-    expires_at = utc_now() + timedelta(minutes=int(ttl_minutes))
-    row = MagicLinkToken(
-        token=str(token),
-        user_id=int(user_id),
-        expires_at=expires_at,
-        used_at=None,
-        scope=(str(scope) if scope is not None else None),
-    )
-    session.add(row)
-    await session.flush()
-    return str(token)
+    """Issue a signed link token (no DB write).
 
+    A token issued earlier for the same user/scope/TTL is reused while it still has at
+    least half of its lifetime left, so a burst of notifications shares one link.
+    """
+    return _issue(int(user_id), ttl_minutes=ttl_minutes, scope=scope, now=utc_now())
 
-async def validate_magic_token(
-    session: AsyncSession,
-    *,
-    token: str,
-    scope: str | None = None,
-) -> User | None:
-    tok = (token or "").strip()
-    if not tok:
-        return None
 
-    res = await session.execute(select(MagicLinkToken).where(MagicLinkToken.token == tok))
+def issue_magic_tokens(*, user_ids: list[int], ttl_minutes: int = 15, scope: str | None = None) -> dict[int, str]:
+    """``create_magic_token`` for many users at once, without a session (user_id -> token)."""
+    now = utc_now()
+    return {int(uid): _issue(int(uid), ttl_minutes=ttl_minutes, scope=scope, now=now) for uid in dict.fromkeys(user_ids)}
+
+
+async def _validate_legacy_token(session: AsyncSession, *, token: str, scope: str | None) -> int | None:
+    res = await session.execute(select(MagicLinkToken).where(MagicLinkToken.token == token))
     row = res.scalar_one_or_none()
     if not row:
         return None
 
-    now = utc_now()
     exp = getattr(row, "expires_at", None)
-    if exp is None or exp < now:
+    if exp is None or exp < utc_now():
         return None
 
     if scope is not None:
         row_scope = getattr(row, "scope", None)
         if str(row_scope or "") != str(scope):
             return None
+    return int(row.user_id)
+
+
+async def validate_magic_token(
+    session: AsyncSession,
+    *,
+    token: str,
+    scope: str | None = None,
+) -> User | None:
+    tok = (token or "").strip()
+    if not tok:
+        return None
+
+    user_id: int | None
+    if tok.count(".") == _SIGNED_PARTS - 1:
+        parsed = parse_signed_token(tok)
+        if parsed is None:
+            return None
+        user_id, tok_scope, _exp, _token_id = parsed
+        if scope is not None and tok_scope != str(scope):
+            return None
+    else:
+        user_id = await _validate_legacy_token(session, token=tok, scope=scope)
+        if user_id is None:
+            return None
 
-    res_u = await session.execute(select(User).where(User.id == int(row.user_id)).where(User.is_deleted == False))
+    res_u = await session.execute(select(User).where(User.id == int(user_id)).where(User.is_deleted == False))
     return res_u.scalar_one_or_none()
 
 
 async def consume_magic_token(session: AsyncSession, *, token: str) -> User | None:
     # Backward-compatible alias: token validity is now determined only by expires_at.
     return await validate_magic_token(session, token=str(token))
+
+
+async def cleanup_magic_links(session: AsyncSession, *, now: datetime | None = None) -> dict[str, int]:
+    """Delete expired legacy token rows."""
+    now = now or utc_now()
+    res_t = await session.execute(delete(MagicLinkToken).where(MagicLinkToken.expires_at < now))
+    return {"magic_link_tokens": int(res_t.rowcount or 0)}
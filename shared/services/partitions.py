@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import gzip
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from shared.utils import utc_now
+
+
+logger = logging.getLogger(__name__)
+
+
+# Append-only history tables, range-partitioned by month on created_at (see migration 0053).
+PARTITIONED_TABLES: tuple[str, ...] = (
+    "task_events",
+    "purchase_events",
+    "shift_instance_events",
+    "salary_shift_audit",
+    "salary_payout_audit",
+    "admin_actions",
+)
+
+# Queue tables keep a unique dedupe key that cannot include created_at, so they are not
+# partitioned; finished rows are pruned by age instead.
+QUEUE_RETENTION: dict[str, tuple[str, ...]] = {
+    "task_notifications": ("sent", "failed"),
+    "telegram_outbox": ("sent", "failed", "cancelled"),
+}
+
+# Child rows may be written a moment before the parent row's created_at is stamped
+# (Python-side defaults), so history lookups use a small safety margin.
+HISTORY_CLOCK_SKEW = timedelta(minutes=5)
+
+_PARTITION_RE = re.compile(r"^(?P<table>[a-z_]+)_p(?P<y>\d{4})(?P<m>\d{2})$")
+
+
+@dataclass(frozen=True)
+class PartitionInfo:
+    table: str
+    name: str
+    start: date
+    end: date
+
+
+def month_start(d: date | datetime) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    idx = d.year * 12 + (d.month - 1) + int(months)
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def partition_name(table: str, start: date) -> str:
+    return f"{table}_p{start.year:04d}{start.month:02d}"
+
+
+def parse_partition_name(name: str) -> tuple[str, date] | None:
+    m = _PARTITION_RE.match(str(name or ""))
+    if not m:
+        return None
+    return m.group("table"), date(int(m.group("y")), int(m.group("m")), 1)
+
+
+def create_partition_sql(table: str, start: date) -> str:
+    end = add_months(start, 1)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, start)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    )
+
+
+def history_since(created_at: datetime | None) -> datetime | None:
+    """Lower created_at bound for an entity's history rows.
+
+    History rows are never older than the entity they belong to; filtering on this bound
+    lets Postgres prune partitions that predate the entity.
+    """
+    if created_at is None:
+        return None
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at - HISTORY_CLOCK_SKEW
+
+
+async def load_history(
+    session: AsyncSession,
+    owner: Any,
+    attr: str,
+    model: Any,
+    owner_fk: Any,
+    *options: Any,
+) -> list:
+    """Load ``owner.<attr>`` history rows with a created_at bound and set them as loaded.
+
+    Used instead of ``selectinload`` for partitioned history tables: the bound lets the planner
+    skip partitions older than the owner.
+    """
+    stmt = select(model).where(owner_fk == int(owner.id))
+    since = history_since(getattr(owner, "created_at", None))
+    if since is not None:
+        stmt = stmt.where(model.created_at >= since)
+    if options:
+        stmt = stmt.options(*options)
+    rows = list((await session.execute(stmt.order_by(model.id))).scalars().all())
+    set_committed_value(owner, attr, rows)
+    return rows
+
+
+async def list_partitions(session: AsyncSession, table: str) -> list[PartitionInfo]:
+    res = await session.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :table
+            ORDER BY c.relname
+            """
+        ),
+        {"table": str(table)},
+    )
+    out: list[PartitionInfo] = []
+    for (name,) in res.all():
+        parsed = parse_partition_name(str(name))
+        if parsed is None or parsed[0] != table:
+            continue
+        start = parsed[1]
+        out.append(PartitionInfo(table=table, name=str(name), start=start, end=add_months(start, 1)))
+    return out
+
+
+async def ensure_future_partitions(
+    session: AsyncSession,
+    *,
+    months_ahead: int = 3,
+    today: date | None = None,
+) -> list[str]:
+    """Create monthly partitions from the current month up to ``months_ahead`` months ahead."""
+    today = today or utc_now().date()
+    first = month_start(today)
+    created: list[str] = []
+    for table in PARTITIONED_TABLES:
+        existing = {p.start for p in await list_partitions(session, table)}
+        for i in range(0, int(months_ahead) + 1):
+            start = add_months(first, i)
+            if start in existing:
+                continue
+            try:
+                async with session.begin_nested():
+                    await session.execute(text(create_partition_sql(table, start)))
+            except Exception:
+                # Typically rows for that month already sit in the DEFAULT partition.
+                logger.exception("partition create failed", extra={"table": table, "month": start.isoformat()})
+                continue
+            created.append(partition_name(table, start))
+    if created:
+        logger.info("partitions created", extra={"partitions": created})
+    return created
+
+
+async def _archive_partition(session: AsyncSession, *, name: str, archive_dir: Path) -> Path:
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"{name}.csv.gz"
+    tmp = path.with_suffix(".gz.tmp")
+
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    driver = raw.driver_connection  # asyncpg connection
+
+    with gzip.open(tmp, "wb") as fh:
+
+        async def _sink(chunk: bytes) -> None:
+            fh.write(chunk)
+
+        await driver.copy_from_table(name, output=_sink, format="csv", header=True)
+    tmp.replace(path)
+    return path
+
+
+async def drop_expired_partitions(
+    session: AsyncSession,
+    *,
+    retain_months: int,
+    archive_dir: str | Path | None = None,
+    today: date | None = None,
+) -> list[str]:
+    """Detach and drop partitions that ended more than ``retain_months`` months ago.
+
+    When ``archive_dir`` is set, every partition is first exported to ``<name>.csv.gz`` there;
+    a failed export keeps the partition in place.
+    """
+    if int(retain_months) <= 0:
+        return []
+    today = today or utc_now().date()
+    cutoff = add_months(month_start(today), -int(retain_months))
+    adir = Path(archive_dir) if archive_dir else None
+
+    dropped: list[str] = []
+    for table in PARTITIONED_TABLES:
+        for p in await list_partitions(session, table):
+            if p.end > cutoff:
+                continue
+            if adir is not None:
+                try:
+                    async with session.begin_nested():
+                        await _archive_partition(session, name=p.name, archive_dir=adir)
+                except Exception:
+                    logger.exception("partition archive failed; keeping partition", extra={"partition": p.name})
+                    continue
+            await session.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{p.name}"'))
+            await session.execute(text(f'DROP TABLE "{p.name}"'))
+            dropped.append(p.name)
+    if dropped:
+        logger.info("partitions dropped", extra={"partitions": dropped})
+    return dropped
+
+
+async def prune_queue_tables(
+    session: AsyncSession,
+    *,
+    retain_days: int,
+    batch_size: int = 5000,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """Delete finished queue rows older than ``retain_days`` in bounded batches."""
+    if int(retain_days) <= 0:
+        return {}
+    cutoff = (now or utc_now()) - timedelta(days=int(retain_days))
+    out: dict[str, int] = {}
+    for table, statuses in QUEUE_RETENTION.items():
+        total = 0
+        while True:
+            res = await session.execute(
+                text(
+                    f"""
+                    DELETE FROM "{table}"
+                    WHERE id IN (
+                        SELECT id FROM "{table}"
+                        WHERE status = ANY(:statuses) AND created_at < :cutoff
+                        ORDER BY id
+                        LIMIT :limit
+                    )
+                    """
+                ),
+                {"statuses": list(statuses), "cutoff": cutoff, "limit": int(batch_size)},
+            )
+            n = int(res.rowcount or 0)
+            total += n
+            if n < int(batch_size):
+                break
+        out[table] = total
+    return out
+
+
+async def run_history_maintenance() -> None:
+    """Daily job: pre-create upcoming partitions, drop expired ones, prune finished queue rows."""
+    from shared.config import settings
+    from shared.db import get_async_session
+
+    async with get_async_session() as session:
+        await ensure_future_partitions(
+            session, months_ahead=int(getattr(settings, "EVENT_PARTITIONS_MONTHS_AHEAD", 3) or 3)
+        )
+    retain_months = int(getattr(settings, "EVENT_RETENTION_MONTHS", 0) or 0)
+    if retain_months > 0:
+        async with get_async_session() as session:
+            await drop_expired_partitions(
+                session,
+                retain_months=retain_months,
+                archive_dir=(str(getattr(settings, "EVENT_ARCHIVE_DIR", "") or "").strip() or None),
+            )
+    retain_days = int(getattr(settings, "QUEUE_RETENTION_DAYS", 0) or 0)
+    if retain_days > 0:
+        async with get_async_session() as session:
+            pruned = await prune_queue_tables(session, retain_days=retain_days)
+        logger.info("queue tables pruned", extra={"deleted": pruned})
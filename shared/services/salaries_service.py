@@ -1,17 +1,14 @@
 from __future__ import annotations
 
-import asyncio
 import html
 from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal
 
-import httpx
 from sqlalchemy import select, func, exists
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shared.config import settings
 from shared.enums import SalaryShiftState, ShiftInstanceStatus
 from shared.models import (
     User,
@@ -28,57 +25,10 @@ from shared.models import (
 from shared.services.salaries_calc import calc_shift_salary, q2, DEC_0
 from shared.services.salaries_pin import get_salary_settings
 from shared.services.finance_sync import sync_salary_payout_operation, remove_salary_payout_operation
+from shared.services.telegram_outbox import enqueue_message, enqueue_salary_line
 from shared.utils import utc_now
 
 
-_TG_SALARY_AGG_WINDOW_SEC = 30
-_tg_salary_agg_lock: asyncio.Lock | None = None
-_tg_salary_agg: dict[int, dict] = {}
-
-
-def _tg_salary_get_lock() -> asyncio.Lock:
-    global _tg_salary_agg_lock
-    if _tg_salary_agg_lock is None:
-        _tg_salary_agg_lock = asyncio.Lock()
-    return _tg_salary_agg_lock
-
-
-async def _tg_salary_agg_flush(chat_id: int) -> None:
-    try:
-        await asyncio.sleep(int(_TG_SALARY_AGG_WINDOW_SEC))
-        lock = _tg_salary_get_lock()
-        async with lock:
-            st = _tg_salary_agg.get(int(chat_id)) or {}
-            lines = list(st.get("lines") or [])
-            _tg_salary_agg.pop(int(chat_id), None)
-        if not lines:
-            return
-        txt = "🧾 <b>Изменения по зарплате</b>\n\n" + "\n".join(lines)
-        await _tg_send_html(chat_id=int(chat_id), text=txt)
-    except Exception:
-        try:
-            lock = _tg_salary_get_lock()
-            async with lock:
-                _tg_salary_agg.pop(int(chat_id), None)
-        except Exception:
-            pass
-
-
-async def _tg_salary_enqueue(chat_id: int, line_html: str) -> None:
-    try:
-        lock = _tg_salary_get_lock()
-        async with lock:
-            st = _tg_salary_agg.get(int(chat_id))
-            if st is None:
-                st = {"lines": [], "task": None}
-                _tg_salary_agg[int(chat_id)] = st
-            st["lines"].append(str(line_html))
-            t = st.get("task")
-            if t is None or getattr(t, "done", lambda: True)():
-                st["task"] = asyncio.create_task(_tg_salary_agg_flush(int(chat_id)))
-    except Exception:
-        pass
-
 @dataclass(frozen=True)
 class SalaryPeriodTotals:
     accrued: Decimal
@@ -131,22 +81,6 @@ async def get_balance_cutoff_date(*, session: AsyncSession) -> date:
     return floor
 
 
-async def _tg_send_html(*, chat_id: int, text: str) -> None:
-    token = str(getattr(settings, "BOT_TOKEN", "") or "").strip()
-    if not token:
-        return
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {
-        "chat_id": int(chat_id),
-        "text": str(text),
-        "parse_mode": "HTML",
-        "disable_web_page_preview": True,
-    }
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.post(url, data=payload)
-        r.raise_for_status()
-
-
 def _money(v: Decimal) -> str:
     return f"{q2(v):.2f} ₽"
 
@@ -661,7 +595,12 @@ async def update_salary_shift_state(
                         txt_lines.append(balance_txt)
                 if cmt:
                     txt_lines.append(f"Комментарий: {_esc(cmt)}")
-                await _tg_salary_enqueue(int(tg_id), "\n".join([x for x in txt_lines if str(x).strip()]))
+                async with session.begin_nested():
+                    await enqueue_salary_line(
+                        session,
+                        chat_id=int(tg_id),
+                        line_html="\n".join([x for x in txt_lines if str(x).strip()]),
+                    )
             except Exception:
                 pass
 
@@ -761,7 +700,12 @@ async def create_salary_adjustment(
                     except Exception:
                         txt_lines.append(balance_txt)
                 txt_lines.append(f"Комментарий: {_esc(cmt)}")
-                await _tg_salary_enqueue(int(tg_id), "\n".join([x for x in txt_lines if str(x).strip()]))
+                async with session.begin_nested():
+                    await enqueue_salary_line(
+                        session,
+                        chat_id=int(tg_id),
+                        line_html="\n".join([x for x in txt_lines if str(x).strip()]),
+                    )
             except Exception:
                 pass
 
@@ -941,7 +885,13 @@ async def create_salary_payout(
                 "",
                 "Спасибо за работу! ❤️",
             ]
-            await _tg_send_html(chat_id=int(notify_tg_id), text="\n".join(txt_lines))
+            async with session.begin_nested():
+                await enqueue_message(
+                    session,
+                    chat_id=int(notify_tg_id),
+                    text="\n".join(txt_lines),
+                    dedupe_key=f"salary_payout:{int(p.id)}",
+                )
         except Exception:
             pass
 
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.models import ShiftInstance, User, WorkShiftDay
+from shared.utils import utc_now
+
+
+MAX_AUTOFILL_USERS = 200
+MAX_AUTOFILL_DAYS = 366
+# asyncpg caps a statement at 32767 bind parameters; a row binds 9 of them.
+_INSERT_CHUNK_ROWS = 3000
+# Dry-run previews list at most this many changed days (counters are always exact).
+MAX_DIFF_ITEMS = 5000
+
+
+@dataclass(frozen=True)
+class CyclePattern:
+    """x working days then y days off, counted from ``anchor_day``."""
+
+    user_id: int
+    x: int
+    y: int
+    anchor_day: date
+    anchor_is_work: bool = True
+
+    def is_work(self, d: date) -> bool:
+        cycle = int(self.x + self.y)
+        pos = int((d - self.anchor_day).days) % cycle
+        return (pos < self.x) if self.anchor_is_work else (pos >= self.y)
+
+
+# (kind, start_time, end_time, hours) of a plan row; what autofill compares and writes.
+PlanValue = tuple[str, time | None, time | None, int | None]
+
+
+@dataclass
+class AutofillPlan:
+    rows: list[dict] = field(default_factory=list)
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped_existing: int = 0
+    skipped_fact: int = 0
+    diff: list[dict] = field(default_factory=list)
+
+    def as_dict(self, *, dry_run: bool) -> dict:
+        out = {
+            "ok": True,
+            "dry_run": bool(dry_run),
+            "created": int(self.created),
+            "updated": int(self.updated),
+            "unchanged": int(self.unchanged),
+            "skipped": int(self.skipped_existing + self.skipped_fact),
+            "skipped_existing": int(self.skipped_existing),
+            "skipped_fact": int(self.skipped_fact),
+        }
+        if dry_run:
+            out["diff"] = list(self.diff)
+            out["diff_truncated"] = bool(self.created + self.updated > len(self.diff))
+        return out
+
+
+def _parse_day(raw, *, detail: str) -> date:
+    try:
+        return datetime.strptime(str(raw or "").strip(), "%Y-%m-%d").date()
+    except Exception:
+        raise HTTPException(status_code=422, detail=detail)
+
+
+def _parse_pattern(raw: dict, *, user_id) -> CyclePattern:
+    try:
+        uid = int(user_id)
+    except Exception:
+        raise HTTPException(status_code=422, detail="Неверный user_id")
+    try:
+        x = int(raw.get("x"))
+        y = int(raw.get("y"))
+    except Exception:
+        raise HTTPException(status_code=422, detail="Неверный шаблон")
+    if x <= 0 or y <= 0:
+        raise HTTPException(status_code=422, detail="Неверный шаблон")
+    if not str(raw.get("anchor_day") or "").strip():
+        raise HTTPException(status_code=422, detail="Не задана якорная дата")
+    anchor_day = _parse_day(raw.get("anchor_day"), detail="Неверная якорная дата")
+    return CyclePattern(
+        user_id=uid,
+        x=x,
+        y=y,
+        anchor_day=anchor_day,
+        anchor_is_work=bool(raw.get("anchor_is_work", True)),
+    )
+
+
+def parse_bulk_autofill_body(body) -> tuple[list[CyclePattern], date, date]:
+    """Validate a bulk autofill request.
+
+    Per-user patterns come in ``patterns`` (each with its own ``user_id``); ``user_ids`` plus a
+    shared ``pattern`` fills the rest. A user listed twice keeps the first pattern.
+    """
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="Неверный формат")
+
+    date_from = _parse_day(body.get("date_from"), detail="Неверный период")
+    date_to = _parse_day(body.get("date_to"), detail="Неверный период")
+    if date_to < date_from:
+        raise HTTPException(status_code=422, detail="Неверный период")
+    if (date_to - date_from).days + 1 > MAX_AUTOFILL_DAYS:
+        raise HTTPException(status_code=422, detail=f"Период не длиннее {MAX_AUTOFILL_DAYS} дней")
+
+    patterns: list[CyclePattern] = []
+    seen: set[int] = set()
+
+    raw_patterns = body.get("patterns") or []
+    if not isinstance(raw_patterns, list):
+        raise HTTPException(status_code=422, detail="patterns должен быть массивом")
+    for raw in raw_patterns:
+        if not isinstance(raw, dict):
+            raise HTTPException(status_code=422, detail="Неверный шаблон")
+        p = _parse_pattern(raw, user_id=raw.get("user_id"))
+        if p.user_id not in seen:
+            seen.add(p.user_id)
+            patterns.append(p)
+
+    raw_user_ids = body.get("user_ids") or []
+    if not isinstance(raw_user_ids, list):
+        raise HTTPException(status_code=422, detail="user_ids должен быть массивом")
+    if raw_user_ids:
+        shared = body.get("pattern")
+        if not isinstance(shared, dict):
+            raise HTTPException(status_code=422, detail="Не задан шаблон")
+        for uid in raw_user_ids:
+            p = _parse_pattern(shared, user_id=uid)
+            if p.user_id not in seen:
+                seen.add(p.user_id)
+                patterns.append(p)
+
+    if not patterns:
+        raise HTTPException(status_code=422, detail="Не выбраны сотрудники")
+    if len(patterns) > MAX_AUTOFILL_USERS:
+        raise HTTPException(status_code=422, detail=f"Не более {MAX_AUTOFILL_USERS} сотрудников за раз")
+    return patterns, date_from, date_to
+
+
+def plan_autofill(
+    *,
+    patterns: list[CyclePattern],
+    date_from: date,
+    date_to: date,
+    existing: dict[tuple[int, date], PlanValue],
+    fact_days: set[tuple[int, date]],
+    overwrite: bool,
+    skip_fact_days: bool,
+    work_start: time,
+    work_end: time,
+    work_hours: int = 8,
+) -> AutofillPlan:
+    """Target plan rows for every (user, day) in the range, diffed against what is stored.
+
+    Without ``overwrite`` days that already have a plan row or a fact are left alone (same as the
+    single-user autofill). With it, plan rows are replaced, except days with a fact when
+    ``skip_fact_days`` is set. Rows whose values already match are not written at all.
+    """
+    plan = AutofillPlan()
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    for p in patterns:
+        for d in days:
+            key = (int(p.user_id), d)
+            current = existing.get(key)
+            has_fact = key in fact_days
+            if not overwrite and (current is not None or has_fact):
+                if current is not None:
+                    plan.skipped_existing += 1
+                else:
+                    plan.skipped_fact += 1
+                continue
+            if has_fact and skip_fact_days:
+                plan.skipped_fact += 1
+                continue
+
+            if p.is_work(d):
+                target: PlanValue = ("work", work_start, work_end, int(work_hours))
+            else:
+                target = ("off", None, None, None)
+            if current == target:
+                plan.unchanged += 1
+                continue
+
+            if current is None:
+                plan.created += 1
+            else:
+                plan.updated += 1
+            kind, start_time, end_time, hours = target
+            plan.rows.append(
+                {
+                    "user_id": int(p.user_id),
+                    "day": d,
+                    "kind": kind,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "hours": hours,
+                }
+            )
+            if len(plan.diff) < MAX_DIFF_ITEMS:
+                plan.diff.append(
+                    {
+                        "user_id": int(p.user_id),
+                        "day": d.isoformat(),
+                        "from": (current[0] if current is not None else None),
+                        "to": kind,
+                    }
+                )
+    return plan
+
+
+async def _load_existing(
+    session: AsyncSession, *, user_ids: list[int], date_from: date, date_to: date
+) -> tuple[dict[tuple[int, date], PlanValue], set[tuple[int, date]]]:
+    plan_res = await session.execute(
+        select(
+            WorkShiftDay.user_id,
+            WorkShiftDay.day,
+            WorkShiftDay.kind,
+            WorkShiftDay.start_time,
+            WorkShiftDay.end_time,
+            WorkShiftDay.hours,
+        )
+        .where(WorkShiftDay.user_id.in_(user_ids))
+        .where(WorkShiftDay.day >= date_from)
+        .where(WorkShiftDay.day <= date_to)
+    )
+    existing = {
+        (int(r[0]), r[1]): (str(r[2]), r[3], r[4], (int(r[5]) if r[5] is not None else None)) for r in plan_res.all()
+    }
+    fact_res = await session.execute(
+        select(ShiftInstance.user_id, ShiftInstance.day)
+        .where(ShiftInstance.user_id.in_(user_ids))
+        .where(ShiftInstance.day >= date_from)
+        .where(ShiftInstance.day <= date_to)
+        .distinct()
+    )
+    fact_days = {(int(r[0]), r[1]) for r in fact_res.all()}
+    return existing, fact_days
+
+
+async def bulk_autofill_schedule(
+    session: AsyncSession,
+    *,
+    patterns: list[CyclePattern],
+    date_from: date,
+    date_to: date,
+    overwrite: bool,
+    skip_fact_days: bool,
+    dry_run: bool,
+    work_start: time,
+    work_end: time,
+) -> AutofillPlan:
+    """Fill plan rows for many users at once: two range reads, then one upsert statement.
+
+    The upsert re-checks the rules in SQL (no overwrite -> DO NOTHING; fact days excluded from the
+    UPDATE), so a row or fact that appeared after the preview read is still respected.
+    """
+    user_ids = sorted({int(p.user_id) for p in patterns})
+    known = set(
+        (
+            await session.scalars(select(User.id).where(User.id.in_(user_ids)).where(User.is_deleted.is_(False)))
+        ).all()
+    )
+    missing = [uid for uid in user_ids if uid not in known]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Сотрудник не найден: {missing[0]}")
+
+    existing, fact_days = await _load_existing(session, user_ids=user_ids, date_from=date_from, date_to=date_to)
+    plan = plan_autofill(
+        patterns=patterns,
+        date_from=date_from,
+        date_to=date_to,
+        existing=existing,
+        fact_days=fact_days,
+        overwrite=overwrite,
+        skip_fact_days=skip_fact_days,
+        work_start=work_start,
+        work_end=work_end,
+    )
+    if dry_run or not plan.rows:
+        return plan
+
+    now = utc_now()
+    for start in range(0, len(plan.rows), _INSERT_CHUNK_ROWS):
+        chunk = [{**r, "is_emergency": False, "updated_at": now} for r in plan.rows[start : start + _INSERT_CHUNK_ROWS]]
+        stmt = insert(WorkShiftDay).values(chunk)
+        if not overwrite:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[WorkShiftDay.user_id, WorkShiftDay.day])
+        else:
+            excluded = stmt.excluded
+            guard = or_(
+                WorkShiftDay.kind.is_distinct_from(excluded.kind),
+                WorkShiftDay.start_time.is_distinct_from(excluded.start_time),
+                WorkShiftDay.end_time.is_distinct_from(excluded.end_time),
+                WorkShiftDay.hours.is_distinct_from(excluded.hours),
+            )
+            if skip_fact_days:
+                fact_exists = (
+                    select(ShiftInstance.id)
+                    .where(ShiftInstance.user_id == excluded.user_id)
+                    .where(ShiftInstance.day == excluded.day)
+                    .exists()
+                )
+                guard = guard & ~fact_exists
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[WorkShiftDay.user_id, WorkShiftDay.day],
+                set_={
+                    "kind": excluded.kind,
+                    "start_time": excluded.start_time,
+                    "end_time": excluded.end_time,
+                    "hours": excluded.hours,
+                    "updated_at": excluded.updated_at,
+                },
+                where=guard,
+            )
+        await session.execute(stmt)
+    return plan
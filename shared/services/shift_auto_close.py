@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import DateTime, func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.enums import ShiftInstanceStatus, UserStatus
+from shared.models import ShiftInstance, User, WorkShiftDay
+from shared.services.shifts_domain import DEFAULT_SHIFT_END
+from shared.services.shift_events import SHIFT_AMOUNT_APPROVED, SHIFT_CLOSED, ShiftEvent, publish
+from shared.services.telegram_outbox import KIND_MESSAGE, OutboxItem, enqueue_many, message_payload
+
+
+# Row defaults of ShiftInstance.extra_hour_rate / overtime_hour_rate.
+DEFAULT_EXTRA_HOUR_RATE = 300
+DEFAULT_OVERTIME_HOUR_RATE = 400
+
+
+@dataclass(frozen=True)
+class AutoClosedShift:
+    shift_id: int
+    wsd_id: int
+    user_id: int
+    tg_id: int
+    amount: int
+    day: date | None = None
+
+
+def overdue_close_stmt(*, now: datetime, tz_name: str, wsd_ids: list[int] | None = None):
+    """UPDATE shift_instances ... FROM work_shift_days, users ... RETURNING for every overdue open shift.
+
+    Only today's plan rows (local ``tz_name``) count, like the timers: older shifts left open
+    are for a manager to settle, never auto-approved in bulk.
+
+    Overdue: still started, planned end (local ``tz_name``) reached and no snooze pending. The
+    default amount is ``calc_shift_default_amount`` in SQL; SET sees the pre-update row, so
+    all three amounts get the same value. Re-running it (or running it on another replica at
+    the same time) closes nothing twice: the row lock re-checks ``status = started``.
+    """
+    due_at = func.timezone(
+        tz_name,
+        WorkShiftDay.day + func.coalesce(WorkShiftDay.end_time, DEFAULT_SHIFT_END),
+        type_=DateTime(timezone=True),
+    )
+    base_rate = func.coalesce(func.nullif(ShiftInstance.base_rate, 0), User.rate_k, 0)
+    amount = func.coalesce(
+        func.nullif(ShiftInstance.amount_default, 0),
+        base_rate
+        + func.coalesce(ShiftInstance.extra_hours, 0)
+        * func.coalesce(func.nullif(ShiftInstance.extra_hour_rate, 0), DEFAULT_EXTRA_HOUR_RATE)
+        + func.coalesce(ShiftInstance.overtime_hours, 0)
+        * func.coalesce(func.nullif(ShiftInstance.overtime_hour_rate, 0), DEFAULT_OVERTIME_HOUR_RATE),
+    )
+    today = now.astimezone(ZoneInfo(tz_name)).date()
+    stmt = (
+        update(ShiftInstance)
+        .where(ShiftInstance.user_id == WorkShiftDay.user_id)
+        .where(ShiftInstance.day == WorkShiftDay.day)
+        .where(User.id == WorkShiftDay.user_id)
+        .where(ShiftInstance.status == ShiftInstanceStatus.STARTED)
+        .where(ShiftInstance.ended_at == None)  # noqa: E711
+        .where(WorkShiftDay.kind == "work")
+        .where(WorkShiftDay.day == today)
+        .where(due_at <= now)
+        .where(or_(WorkShiftDay.end_snooze_until == None, WorkShiftDay.end_snooze_until <= now))  # noqa: E711
+        .where(User.is_deleted == False)  # noqa: E712
+        .where(User.status == UserStatus.APPROVED)
+        .where(User.tg_id != None)  # noqa: E711
+        .values(
+            base_rate=base_rate,
+            amount_default=amount,
+            amount_submitted=amount,
+            amount_approved=amount,
+            approval_required=False,
+            status=ShiftInstanceStatus.APPROVED,
+            ended_at=now,
+        )
+        .returning(ShiftInstance.id, WorkShiftDay.id, User.id, User.tg_id, ShiftInstance.amount_approved, ShiftInstance.day)
+        .execution_options(synchronize_session=False)
+    )
+    if wsd_ids is not None:
+        stmt = stmt.where(WorkShiftDay.id.in_([int(x) for x in wsd_ids]))
+    return stmt
+
+
+def auto_close_message(closed: AutoClosedShift) -> OutboxItem:
+    text = f"✅ Смена завершена, ваш баланс пополнен на <b>{int(closed.amount)} ₽</b>."
+    kb = {
+        "inline_keyboard": [
+            [{"text": "✏️ Изменить сумму", "callback_data": f"shift:close_edit:{int(closed.shift_id)}"}],
+        ]
+    }
+    return OutboxItem(
+        kind=KIND_MESSAGE,
+        chat_id=int(closed.tg_id),
+        payload=message_payload(text=text, reply_markup=kb, disable_web_page_preview=False),
+        dedupe_key=f"shift_auto_close:{int(closed.shift_id)}",
+    )
+
+
+async def close_overdue_shifts(
+    session: AsyncSession, *, now: datetime, tz_name: str, wsd_ids: list[int] | None = None
+) -> list[AutoClosedShift]:
+    """Auto close overdue open shifts (all of them, or of ``wsd_ids``) in the caller's transaction.
+
+    One UPDATE closes the shifts, one marks their plan rows' end as handled, and the
+    confirmations go to the outbox in the same transaction, so they are sent only after commit.
+    Each closed shift publishes shift.closed and shift.amount_approved.
+    """
+    rows = (await session.execute(overdue_close_stmt(now=now, tz_name=tz_name, wsd_ids=wsd_ids))).all()
+    closed = [
+        AutoClosedShift(
+            shift_id=int(r[0]), wsd_id=int(r[1]), user_id=int(r[2]), tg_id=int(r[3]), amount=int(r[4] or 0), day=r[5]
+        )
+        for r in rows
+    ]
+    if not closed:
+        return []
+    await session.execute(
+        update(WorkShiftDay)
+        .where(WorkShiftDay.id.in_(sorted({c.wsd_id for c in closed})))
+        .where(WorkShiftDay.end_notified_at == None)  # noqa: E711
+        .values(end_notified_at=now, end_snooze_until=None, end_followup_notified_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await enqueue_many(session, [auto_close_message(c) for c in closed])
+    await publish(
+        session,
+        *[
+            ShiftEvent(type=t, shift_id=c.shift_id, user_id=c.user_id, day=c.day, amount=c.amount)
+            for c in closed
+            for t in (SHIFT_CLOSED, SHIFT_AMOUNT_APPROVED)
+        ],
+    )
+    return closed
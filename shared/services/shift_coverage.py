@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import calendar
+from datetime import date, datetime, time
+from itertools import accumulate
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.config import settings
+from shared.enums import UserStatus
+from shared.models import ShiftInstance, User, WorkShiftDay
+from shared.services.shifts_domain import DEFAULT_SHIFT_END, DEFAULT_SHIFT_START
+from shared.utils import MOSCOW_TZ
+
+
+HOURS = 24
+
+# (day, start minute, end minute) in local time; end == 1440 means "until midnight".
+Interval = tuple[date, int, int]
+
+
+def _minute(t: time) -> int:
+    return int(t.hour) * 60 + int(t.minute)
+
+
+def coverage_thresholds() -> tuple[int, int, int]:
+    """(min staff, open hour, close hour) from settings: hours [open, close) need ``min`` people."""
+    min_staff = max(0, int(getattr(settings, "SHIFT_COVERAGE_MIN_STAFF", 1) or 0))
+    open_h = min(HOURS, max(0, int(getattr(settings, "SHIFT_COVERAGE_OPEN_HOUR", 10) or 0)))
+    close_h = min(HOURS, max(open_h, int(getattr(settings, "SHIFT_COVERAGE_CLOSE_HOUR", 18) or 0)))
+    return min_staff, open_h, close_h
+
+
+def hourly_headcount(spans: list[tuple[int, int]]) -> list[int]:
+    """Headcount per hour for (start, end) minute spans, via a difference array and one prefix sum.
+
+    A person counts for every hour their span overlaps, so 09:30-18:00 covers hours 9..17.
+    """
+    diff = [0] * (HOURS + 1)
+    for start, end in spans:
+        start = max(0, min(24 * 60, int(start)))
+        end = max(0, min(24 * 60, int(end)))
+        if end <= start:
+            continue
+        diff[start // 60] += 1
+        diff[-(-end // 60)] -= 1
+    return list(accumulate(diff[:HOURS]))
+
+
+def understaffed_hours(counts: list[int], *, min_staff: int, open_hour: int, close_hour: int) -> list[int]:
+    return [h for h in range(open_hour, close_hour) if counts[h] < min_staff]
+
+
+def build_coverage(
+    *,
+    days: list[date],
+    planned: list[Interval],
+    actual: list[Interval],
+    min_staff: int,
+    open_hour: int,
+    close_hour: int,
+) -> dict:
+    """Per-day hourly planned vs actual headcount plus the understaffed (planned) hours.
+
+    Days nobody is planned for (days off, months not scheduled yet) are never understaffed.
+    """
+    plan_by_day: dict[date, list[tuple[int, int]]] = {}
+    for d, s, e in planned:
+        plan_by_day.setdefault(d, []).append((s, e))
+    fact_by_day: dict[date, list[tuple[int, int]]] = {}
+    for d, s, e in actual:
+        fact_by_day.setdefault(d, []).append((s, e))
+
+    out_days: dict[str, dict] = {}
+    understaffed: list[dict] = []
+    for d in days:
+        p = hourly_headcount(plan_by_day.get(d, []))
+        a = hourly_headcount(fact_by_day.get(d, []))
+        short = (
+            understaffed_hours(p, min_staff=min_staff, open_hour=open_hour, close_hour=close_hour)
+            if plan_by_day.get(d)
+            else []
+        )
+        out_days[d.isoformat()] = {
+            "planned": p,
+            "actual": a,
+            "planned_staff": len(plan_by_day.get(d, [])),
+            "started_staff": len(fact_by_day.get(d, [])),
+            "understaffed_hours": short,
+        }
+        if short:
+            understaffed.append({"day": d.isoformat(), "hours": short})
+    return {
+        "min_staff": int(min_staff),
+        "open_hour": int(open_hour),
+        "close_hour": int(close_hour),
+        "days": out_days,
+        "understaffed": understaffed,
+    }
+
+
+def plan_interval(day: date, start_time: time | None, end_time: time | None) -> Interval:
+    st = start_time or DEFAULT_SHIFT_START
+    et = end_time or DEFAULT_SHIFT_END
+    end = _minute(et)
+    return day, _minute(st), (end if end > _minute(st) else 24 * 60)
+
+
+def fact_interval(day: date, *, started_at: datetime, ended_at: datetime | None, plan_end: time | None) -> Interval:
+    """Local-time span a started shift covered on ``day``.
+
+    A shift that is still open counts until its planned end, so the result depends only on stored
+    rows and can be cached per month version.
+    """
+    st = started_at.astimezone(MOSCOW_TZ)
+    start = _minute(st.timetz()) if st.date() == day else 0
+    if ended_at is None:
+        end = _minute(plan_end or DEFAULT_SHIFT_END)
+        return day, start, (end if end > start else 24 * 60)
+    en = ended_at.astimezone(MOSCOW_TZ)
+    end = _minute(en.timetz()) if en.date() == day else 24 * 60
+    return day, start, max(start, end)
+
+
+async def load_month_coverage(session: AsyncSession, *, year: int, month: int) -> dict:
+    """Coverage of one month from two range queries (work plans, started shifts)."""
+    last = calendar.monthrange(int(year), int(month))[1]
+    start, end = date(int(year), int(month), 1), date(int(year), int(month), last)
+
+    plan_rows = (
+        await session.execute(
+            select(WorkShiftDay.user_id, WorkShiftDay.day, WorkShiftDay.start_time, WorkShiftDay.end_time)
+            .join(User, User.id == WorkShiftDay.user_id)
+            .where(WorkShiftDay.day >= start)
+            .where(WorkShiftDay.day <= end)
+            .where(WorkShiftDay.kind == "work")
+            .where(User.is_deleted == False)  # noqa: E712
+            .where(User.status == UserStatus.APPROVED)
+        )
+    ).all()
+    fact_rows = (
+        await session.execute(
+            select(ShiftInstance.user_id, ShiftInstance.day, ShiftInstance.started_at, ShiftInstance.ended_at)
+            .where(ShiftInstance.day >= start)
+            .where(ShiftInstance.day <= end)
+            .where(ShiftInstance.started_at != None)  # noqa: E711
+        )
+    ).all()
+
+    plan_end = {(int(uid), d): et for uid, d, _st, et in plan_rows}
+    min_staff, open_h, close_h = coverage_thresholds()
+    payload = build_coverage(
+        days=[date(int(year), int(month), i) for i in range(1, last + 1)],
+        planned=[plan_interval(d, st, et) for _uid, d, st, et in plan_rows],
+        actual=[
+            fact_interval(d, started_at=sa, ended_at=ea, plan_end=plan_end.get((int(uid), d)))
+            for uid, d, sa, ea in fact_rows
+        ],
+        min_staff=min_staff,
+        open_hour=open_h,
+        close_hour=close_h,
+    )
+    payload.update({"year": int(year), "month": int(month)})
+    return payload
+
+
+def format_understaffed_alert(*, day: date, hours: list[int], planned: list[int]) -> str:
+    """Morning alert text for managers; hours are grouped into ranges (10:00–12:00 · 1 чел.)."""
+    ranges: list[tuple[int, int]] = []
+    for h in hours:
+        if ranges and ranges[-1][1] == h and planned[h] == planned[ranges[-1][0]]:
+            ranges[-1] = (ranges[-1][0], h + 1)
+        else:
+            ranges.append((h, h + 1))
+    lines = [f"{a:02d}:00–{b:02d}:00 · {int(planned[a])} чел." for a, b in ranges]
+    return "⚠️ <b>Нехватка персонала сегодня</b> (" + day.strftime("%d.%m") + ")\n\n" + "\n".join(lines)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.db import add_after_commit_callback
+
+
+_logger = logging.getLogger(__name__)
+
+# LISTEN/NOTIFY channel carrying shift domain events to other processes.
+SHIFT_EVENTS_CHANNEL = "shift_events"
+
+SHIFT_STARTED = "shift.started"
+SHIFT_CLOSED = "shift.closed"
+SHIFT_AMOUNT_SUBMITTED = "shift.amount_submitted"
+SHIFT_AMOUNT_APPROVED = "shift.amount_approved"
+SHIFT_REWORK_REQUESTED = "shift.rework_requested"
+# Sent to remote subscribers when the listener reconnects: events may have been missed.
+SHIFT_RESYNC = "shift.resync"
+
+ALL_EVENTS = "*"
+
+# Tells this process's own NOTIFYs apart (they were already dispatched after commit).
+_ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+@dataclass(frozen=True)
+class ShiftEvent:
+    type: str
+    shift_id: int
+    user_id: int
+    day: date | None
+    actor_user_id: int | None = None
+    amount: int | None = None
+
+    @classmethod
+    def of(cls, type: str, shift: Any, *, actor_user_id: int | None = None) -> "ShiftEvent":
+        """Event about a ShiftInstance; ``amount`` is the approved or submitted sum where it applies."""
+        amount = None
+        if type == SHIFT_AMOUNT_APPROVED:
+            amount = getattr(shift, "amount_approved", None)
+        elif type in {SHIFT_CLOSED, SHIFT_AMOUNT_SUBMITTED}:
+            amount = getattr(shift, "amount_submitted", None)
+        return cls(
+            type=str(type),
+            shift_id=int(getattr(shift, "id", 0) or 0),
+            user_id=int(getattr(shift, "user_id", 0) or 0),
+            day=getattr(shift, "day", None),
+            actor_user_id=(int(actor_user_id) if actor_user_id is not None else None),
+            amount=(int(amount) if amount is not None else None),
+        )
+
+    def to_payload(self, origin: str = _ORIGIN) -> str:
+        return json.dumps(
+            {
+                "o": origin,
+                "t": self.type,
+                "s": self.shift_id,
+                "u": self.user_id,
+                "d": (self.day.isoformat() if self.day else None),
+                "a": self.actor_user_id,
+                "m": self.amount,
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_payload(cls, raw: str) -> tuple[str, "ShiftEvent"] | None:
+        """(origin, event) of a NOTIFY payload, or None when it is not one of ours."""
+        try:
+            d = json.loads(raw)
+            event = cls(
+                type=str(d["t"]),
+                shift_id=int(d["s"]),
+                user_id=int(d["u"]),
+                day=(date.fromisoformat(d["d"]) if d.get("d") else None),
+                actor_user_id=(int(d["a"]) if d.get("a") is not None else None),
+                amount=(int(d["m"]) if d.get("m") is not None else None),
+            )
+            return str(d.get("o") or ""), event
+        except Exception:
+            return None
+
+
+Handler = Callable[[ShiftEvent], "Awaitable[None] | None"]
+
+# event type (or "*") -> [(handler, remote)]
+_subscribers: dict[str, list[tuple[Handler, bool]]] = {}
+_remote_tasks: set[asyncio.Task] = set()
+
+
+def subscribe(event_type: str, handler: Handler, *, remote: bool = False) -> None:
+    """Call ``handler`` (sync or async) for ``event_type`` events ("*" for all) after they commit.
+
+    By default a handler runs once, in the process that published the event: use that for side
+    effects. ``remote=True`` handlers also get other processes' events over NOTIFY: use that
+    for per-process caches and expect SHIFT_RESYNC after a reconnect. Keep handlers quick.
+    """
+    _subscribers.setdefault(str(event_type), []).append((handler, bool(remote)))
+
+
+def unsubscribe(event_type: str, handler: Handler) -> None:
+    subs = _subscribers.get(str(event_type), [])
+    _subscribers[str(event_type)] = [(h, r) for h, r in subs if h is not handler]
+
+
+async def dispatch(event: ShiftEvent, *, remote: bool = False) -> None:
+    for handler, wants_remote in [*_subscribers.get(event.type, []), *_subscribers.get(ALL_EVENTS, [])]:
+        if remote and not wants_remote:
+            continue
+        try:
+            res = handler(event)
+            if inspect.isawaitable(res):
+                await res
+        except Exception:
+            _logger.exception("shift event handler failed", extra={"event": event.type, "shift_id": event.shift_id})
+
+
+async def publish(session: AsyncSession, *events: ShiftEvent) -> None:
+    """Publish events with the caller's transaction: nothing is delivered if it rolls back.
+
+    Other processes get them from one pg_notify statement (delivered on commit); local
+    subscribers run after ``get_async_session`` commits.
+    """
+    if not events:
+        return
+    await session.execute(
+        text("SELECT pg_notify(:channel, p) FROM unnest(CAST(:payloads AS text[])) AS p"),
+        {"channel": SHIFT_EVENTS_CHANNEL, "payloads": [e.to_payload() for e in events]},
+    )
+
+    async def _dispatch_local() -> None:
+        for e in events:
+            await dispatch(e)
+
+    add_after_commit_callback(session, _dispatch_local)
+
+
+async def publish_shift_event(session: AsyncSession, type: str, shift: Any, *, actor_user_id: int | None = None) -> None:
+    await publish(session, ShiftEvent.of(type, shift, actor_user_id=actor_user_id))
+
+
+def on_notify(payload: str) -> None:
+    """PgListenHub callback for SHIFT_EVENTS_CHANNEL: hand other processes' events to remote subscribers."""
+    if not payload:
+        event = ShiftEvent(type=SHIFT_RESYNC, shift_id=0, user_id=0, day=None)
+    else:
+        parsed = ShiftEvent.from_payload(payload)
+        if parsed is None or parsed[0] == _ORIGIN:
+            return
+        event = parsed[1]
+    task = asyncio.get_running_loop().create_task(dispatch(event, remote=True))
+    _remote_tasks.add(task)
+    task.add_done_callback(_remote_tasks.discard)
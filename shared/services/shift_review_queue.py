@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import select, text, tuple_, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.enums import SalaryShiftState, ShiftInstanceStatus
+from shared.models import SalaryShiftStateRow, ShiftInstance, User
+
+
+# Predicates of the partial indexes behind the queue (migration 0062). Queries use the very same
+# text so Postgres can match them to the index; keep both in sync.
+# Shifts waiting for a manager's decision on the amount. approval_required is set whenever the
+# requested amount differs from the rate; needs_rework waits on the employee, not on a manager.
+REVIEW_PENDING_WHERE = "status = 'pending_approval' OR (approval_required AND status <> 'needs_rework')"
+# Salary states a manager still has to confirm (same rule as the salary grid's needs_review).
+SALARY_UNCONFIRMED_WHERE = (
+    "confirmed_at IS NULL AND (state <> 'worked' OR manual_hours <> 0 OR manual_amount_override <> 0)"
+)
+
+MAX_REVIEW_PAGE = 100
+
+# Position in the queue: (day, shift id) of the last item seen; newest day first.
+ReviewKey = tuple[date, int]
+
+
+@dataclass(frozen=True)
+class ReviewQueueItem:
+    shift_id: int
+    user_id: int
+    full_name: str
+    day: date
+    status: str
+    amount_default: int | None
+    amount_submitted: int | None
+    salary_state: str | None
+    approval_pending: bool
+    salary_unconfirmed: bool
+
+    @property
+    def key(self) -> ReviewKey:
+        return self.day, self.shift_id
+
+
+def format_review_cursor(key: ReviewKey | None) -> str:
+    """Opaque cursor (also fits Telegram callback data); "0" is the queue head."""
+    if key is None:
+        return "0"
+    return f"{key[0].strftime('%Y%m%d')}-{int(key[1])}"
+
+
+def parse_review_cursor(raw: str | None) -> ReviewKey | None:
+    s = str(raw or "").strip()
+    if not s or s == "0":
+        return None
+    try:
+        d, sid = s.split("-", 1)
+        return datetime.strptime(d, "%Y%m%d").date(), int(sid)
+    except Exception:
+        raise ValueError(f"bad review cursor: {s!r}")
+
+
+def is_approval_pending(status: object, approval_required: bool | None) -> bool:
+    st = str(getattr(status, "value", status) or "")
+    return st == ShiftInstanceStatus.PENDING_APPROVAL or (
+        bool(approval_required) and st != ShiftInstanceStatus.NEEDS_REWORK
+    )
+
+
+def is_salary_unconfirmed(
+    state: object, manual_hours: Decimal | None, manual_amount_override: Decimal | None, confirmed_at: object
+) -> bool:
+    if state is None or confirmed_at is not None:
+        return False
+    st = str(getattr(state, "value", state) or "")
+    return st != SalaryShiftState.WORKED or bool(manual_hours) or bool(manual_amount_override)
+
+
+def _queue_keys(*, after: ReviewKey | None, at_or_above: ReviewKey | None, include_salary: bool):
+    """(day, id) of queue entries past ``after`` (or at/above ``at_or_above``), one index-driven branch per source."""
+    branches = [select(ShiftInstance.day, ShiftInstance.id).where(text(REVIEW_PENDING_WHERE))]
+    if include_salary:
+        unconfirmed = select(SalaryShiftStateRow.shift_id).where(text(SALARY_UNCONFIRMED_WHERE))
+        branches.append(select(ShiftInstance.day, ShiftInstance.id).where(ShiftInstance.id.in_(unconfirmed)))
+    key = tuple_(ShiftInstance.day, ShiftInstance.id)
+    if after is not None:
+        branches = [b.where(key < tuple_(after[0], int(after[1]))) for b in branches]
+    if at_or_above is not None:
+        branches = [b.where(key >= tuple_(at_or_above[0], int(at_or_above[1]))) for b in branches]
+    if len(branches) == 1:
+        return branches[0].subquery("review_keys")
+    return union(*branches).subquery("review_keys")
+
+
+async def load_review_page(
+    session: AsyncSession,
+    *,
+    after: ReviewKey | None = None,
+    limit: int = 20,
+    include_salary: bool = True,
+) -> tuple[list[ReviewQueueItem], ReviewKey | None]:
+    """One keyset page of the review queue (newest day first) and the key to continue from.
+
+    Cost depends on the page size and the queue length, not on the shift history: both branches
+    are scans of small partial indexes.
+    """
+    size = max(1, min(int(limit), MAX_REVIEW_PAGE))
+    keys = _queue_keys(after=after, at_or_above=None, include_salary=include_salary)
+    q = (
+        select(
+            ShiftInstance.id,
+            ShiftInstance.user_id,
+            User.first_name,
+            User.last_name,
+            ShiftInstance.day,
+            ShiftInstance.status,
+            ShiftInstance.approval_required,
+            ShiftInstance.amount_default,
+            ShiftInstance.amount_submitted,
+            SalaryShiftStateRow.state,
+            SalaryShiftStateRow.manual_hours,
+            SalaryShiftStateRow.manual_amount_override,
+            SalaryShiftStateRow.confirmed_at,
+        )
+        .select_from(keys)
+        .join(ShiftInstance, ShiftInstance.id == keys.c.id)
+        .join(User, User.id == ShiftInstance.user_id)
+        .outerjoin(SalaryShiftStateRow, SalaryShiftStateRow.shift_id == ShiftInstance.id)
+        .order_by(keys.c.day.desc(), keys.c.id.desc())
+        .limit(size + 1)
+    )
+    rows = (await session.execute(q)).all()
+    items = [
+        ReviewQueueItem(
+            shift_id=int(r.id),
+            user_id=int(r.user_id),
+            full_name=(f"{(r.first_name or '').strip()} {(r.last_name or '').strip()}".strip() or f"User #{int(r.user_id)}"),
+            day=r.day,
+            status=str(getattr(r.status, "value", r.status) or ""),
+            amount_default=(int(r.amount_default) if r.amount_default is not None else None),
+            amount_submitted=(int(r.amount_submitted) if r.amount_submitted is not None else None),
+            salary_state=(str(getattr(r.state, "value", r.state)) if r.state is not None else None),
+            approval_pending=is_approval_pending(r.status, r.approval_required),
+            salary_unconfirmed=is_salary_unconfirmed(r.state, r.manual_hours, r.manual_amount_override, r.confirmed_at),
+        )
+        for r in rows
+    ]
+    next_key = items[size - 1].key if len(items) > size else None
+    return items[:size], next_key
+
+
+async def review_cursor_before(
+    session: AsyncSession, *, key: ReviewKey, include_salary: bool = True
+) -> tuple[bool, ReviewKey | None]:
+    """Step back from cursor ``key``: (found, cursor) re-opening the nearest entry at or above ``key``.
+
+    The cursor is the key of the entry just above that one, or None for the queue head.
+    """
+    keys = _queue_keys(after=None, at_or_above=key, include_salary=include_salary)
+    q = select(keys.c.day, keys.c.id).order_by(keys.c.day.asc(), keys.c.id.asc()).limit(2)
+    newer = [(r[0], int(r[1])) for r in (await session.execute(q)).all()]
+    if not newer:
+        return False, None
+    return True, (newer[1] if len(newer) > 1 else None)
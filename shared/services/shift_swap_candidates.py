@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.config import settings
+from shared.enums import Position, ShiftSwapRequestStatus, UserStatus
+from shared.models import ShiftInstance, ShiftSwapRequest, User, WorkShiftDay
+from shared.services.telegram_outbox import KIND_SHIFT_SWAP_OFFER, OutboxItem, enqueue_many, message_payload
+from shared.utils import utc_now
+
+
+# Work days around the requested one that count as a colleague's "recent load".
+LOAD_WINDOW_BEFORE = timedelta(days=14)
+LOAD_WINDOW_AFTER = timedelta(days=7)
+# Swap acceptance history that still counts for ranking.
+ACCEPT_HISTORY = timedelta(days=180)
+
+
+@dataclass(frozen=True)
+class SwapCandidate:
+    user_id: int
+    tg_id: int
+    recent_load: int
+    accepted_swaps: int
+
+
+async def rank_swap_candidates(session: AsyncSession, *, day: date, from_user_id: int) -> list[SwapCandidate]:
+    """Staff free on ``day`` who may take the shift, best first, in one query.
+
+    Free means no work plan row and no shift fact that day. Managers, admins and the requester
+    never get offers. Ranking: fewest work days around ``day``, then most swaps accepted lately.
+    Every subquery is an index lookup on (user_id, day) or accepted_by_user_id.
+    """
+    busy_plan = exists().where(
+        and_(WorkShiftDay.user_id == User.id, WorkShiftDay.day == day, WorkShiftDay.kind == "work")
+    )
+    busy_fact = exists().where(and_(ShiftInstance.user_id == User.id, ShiftInstance.day == day))
+    recent_load = (
+        select(func.count(WorkShiftDay.id))
+        .where(WorkShiftDay.user_id == User.id)
+        .where(WorkShiftDay.kind == "work")
+        .where(WorkShiftDay.day >= day - LOAD_WINDOW_BEFORE)
+        .where(WorkShiftDay.day <= day + LOAD_WINDOW_AFTER)
+        .scalar_subquery()
+    )
+    accepted = (
+        select(func.count(ShiftSwapRequest.id))
+        .where(ShiftSwapRequest.accepted_by_user_id == User.id)
+        .where(ShiftSwapRequest.status == ShiftSwapRequestStatus.ACCEPTED)
+        .where(ShiftSwapRequest.closed_at >= utc_now() - ACCEPT_HISTORY)
+        .scalar_subquery()
+    )
+    admin_ids = [int(x) for x in settings.admin_ids]
+    q = (
+        select(User.id, User.tg_id, recent_load.label("recent_load"), accepted.label("accepted"))
+        .where(User.status == UserStatus.APPROVED)
+        .where(User.is_deleted == False)
+        .where(User.id != int(from_user_id))
+        .where(User.tg_id != None)
+        .where(or_(User.position == None, User.position != Position.MANAGER))
+        .where(~busy_plan)
+        .where(~busy_fact)
+        .order_by(recent_load.asc(), accepted.desc(), User.id.asc())
+    )
+    if admin_ids:
+        q = q.where(User.tg_id.not_in(admin_ids))
+    rows = (await session.execute(q)).all()
+    return [
+        SwapCandidate(user_id=int(r[0]), tg_id=int(r[1]), recent_load=int(r[2] or 0), accepted_swaps=int(r[3] or 0))
+        for r in rows
+        if r[1]
+    ]
+
+
+def plan_swap_waves(
+    candidates: list[SwapCandidate], *, wave_size: int, wave_interval: timedelta, now: datetime
+) -> list[tuple[SwapCandidate, datetime]]:
+    """Send time for every candidate: the first ``wave_size`` now, the next ones ``wave_interval`` later, ..."""
+    size = max(1, int(wave_size))
+    return [(c, now + wave_interval * (i // size)) for i, c in enumerate(candidates)]
+
+
+async def enqueue_swap_offers(
+    session: AsyncSession,
+    *,
+    request_id: int,
+    waves: list[tuple[SwapCandidate, datetime]],
+    text: str,
+    reply_markup: dict | None,
+) -> int:
+    """Queue the offer to every candidate in the caller's transaction; later waves wait for ``not_before``.
+
+    The bot skips queued offers once the request is no longer open, so a quick accept stops the fan-out.
+    """
+    items: list[OutboxItem] = []
+    for cand, not_before in waves:
+        payload = message_payload(text=text, reply_markup=reply_markup)
+        payload["request_id"] = int(request_id)
+        items.append(
+            OutboxItem(
+                kind=KIND_SHIFT_SWAP_OFFER,
+                chat_id=int(cand.tg_id),
+                payload=payload,
+                dedupe_key=f"swap_offer:{int(request_id)}:{int(cand.user_id)}",
+                not_before=not_before,
+            )
+        )
+    return await enqueue_many(session, items)
@@ -4,6 +4,11 @@ from datetime import time
 from typing import Optional
 
 
+# Times of a work plan row saved without explicit start/end.
+DEFAULT_SHIFT_START = time(10, 0)
+DEFAULT_SHIFT_END = time(18, 0)
+
+
 def normalize_shift_times(*, kind: str, start_time: Optional[time], end_time: Optional[time]) -> tuple[Optional[time], Optional[time]]:
     k = str(kind or "").strip()
     if k != "work":
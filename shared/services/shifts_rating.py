@@ -1,20 +1,18 @@
 from __future__ import annotations
 
 import html
-import json
 import logging
 import calendar
 from datetime import date
 
-import httpx
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shared.config import settings
 from shared.db import add_after_commit_callback, get_async_session
 from shared.enums import ShiftInstanceStatus
 from shared.models import ShiftInstance, User
 from shared.services.salaries_service import calc_user_period_totals
+from shared.services.telegram_outbox import KIND_SHIFT_RATING_REQUEST, enqueue, message_payload
 from shared.utils import utc_now
 
 
@@ -132,75 +130,78 @@ async def set_shift_rating(
     return shift, "ok"
 
 
-async def _send_shift_rating_request_now(*, shift_id: int) -> None:
-    async with get_async_session() as session:
-        shift = (
-            await session.execute(
-                select(ShiftInstance).where(ShiftInstance.id == int(shift_id))
-            )
-        ).scalar_one_or_none()
-        if shift is None:
-            return
+async def build_shift_rating_request(session: AsyncSession, *, shift_id: int) -> tuple[int, str, dict] | None:
+    """(chat_id, text, keyboard) of the rating request, or None if the shift needs none."""
+    shift = (
+        await session.execute(
+            select(ShiftInstance).where(ShiftInstance.id == int(shift_id))
+        )
+    ).scalar_one_or_none()
+    if shift is None:
+        return None
 
-        if not _is_shift_closed(shift):
-            return
+    if not _is_shift_closed(shift):
+        return None
 
-        if getattr(shift, "rating", None) is not None:
-            return
+    if getattr(shift, "rating", None) is not None:
+        return None
 
-        if getattr(shift, "rating_requested_at", None) is not None:
-            return
+    if getattr(shift, "rating_requested_at", None) is not None:
+        return None
 
-        user = (
-            await session.execute(select(User).where(User.id == int(getattr(shift, "user_id", 0) or 0)))
-        ).scalar_one_or_none()
-        if user is None:
-            return
-        chat_id = int(getattr(user, "tg_id", 0) or 0)
-        if chat_id <= 0:
-            return
+    user = (
+        await session.execute(select(User).where(User.id == int(getattr(shift, "user_id", 0) or 0)))
+    ).scalar_one_or_none()
+    if user is None:
+        return None
+    chat_id = int(getattr(user, "tg_id", 0) or 0)
+    if chat_id <= 0:
+        return None
 
-        token = str(getattr(settings, "BOT_TOKEN", "") or "").strip()
-        if not token:
-            return
+    balance_rub = _fmt_rub(0)
+    try:
+        ps, pe = _month_period_for_day(date.today())
+        totals = await calc_user_period_totals(
+            session=session,
+            user_id=int(getattr(user, "id", 0) or 0),
+            period_start=ps,
+            period_end=pe,
+        )
+        balance_rub = _fmt_rub(getattr(totals, "balance", 0) or 0)
+    except Exception:
+        pass
 
-        balance_rub = _fmt_rub(0)
-        try:
-            ps, pe = _month_period_for_day(date.today())
-            totals = await calc_user_period_totals(
-                session=session,
-                user_id=int(getattr(user, "id", 0) or 0),
-                period_start=ps,
-                period_end=pe,
-            )
-            balance_rub = _fmt_rub(getattr(totals, "balance", 0) or 0)
-        except Exception:
-            pass
-
-        text = shift_rating_request_text(shift=shift, balance_rub=balance_rub)
-        kb = shift_rating_keyboard_payload(shift_id=int(getattr(shift, "id", 0) or 0))
-
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        payload = {
-            "chat_id": int(chat_id),
-            "text": str(text),
-            "parse_mode": "HTML",
-            "disable_web_page_preview": True,
-            "reply_markup": json.dumps(kb, ensure_ascii=False),
-        }
-
-        async with httpx.AsyncClient(timeout=10) as client:
-            r = await client.post(url, data=payload)
-            r.raise_for_status()
-            data = r.json() if r.content else {}
-
-        if not bool((data or {}).get("ok")):
-            return
+    text = shift_rating_request_text(shift=shift, balance_rub=balance_rub)
+    kb = shift_rating_keyboard_payload(shift_id=int(getattr(shift, "id", 0) or 0))
+    return int(chat_id), str(text), kb
+
+
+async def mark_shift_rating_requested(session: AsyncSession, *, shift_id: int, message_id: int | None) -> None:
+    shift = (
+        await session.execute(select(ShiftInstance).where(ShiftInstance.id == int(shift_id)))
+    ).scalar_one_or_none()
+    if shift is None:
+        return
+    shift.rating_message_id = int(message_id or 0) or None
+    shift.rating_requested_at = utc_now()
+    await session.flush()
 
-        msg = (data or {}).get("result") or {}
-        shift.rating_message_id = int(msg.get("message_id", 0) or 0) or None
-        shift.rating_requested_at = utc_now()
-        await session.flush()
+
+async def _enqueue_shift_rating_request(*, shift_id: int) -> None:
+    async with get_async_session() as session:
+        req = await build_shift_rating_request(session, shift_id=int(shift_id))
+        if req is None:
+            return
+        chat_id, text, kb = req
+        payload = message_payload(text=text, reply_markup=kb)
+        payload["shift_id"] = int(shift_id)
+        await enqueue(
+            session,
+            kind=KIND_SHIFT_RATING_REQUEST,
+            chat_id=int(chat_id),
+            payload=payload,
+            dedupe_key=f"shift_rating:{int(shift_id)}",
+        )
 
 
 def schedule_shift_rating_request_after_commit(*, session: AsyncSession, shift_id: int) -> None:
@@ -208,8 +209,9 @@ def schedule_shift_rating_request_after_commit(*, session: AsyncSession, shift_i
 
     async def _cb() -> None:
         try:
-            await _send_shift_rating_request_now(shift_id=int(sid))
+            await _enqueue_shift_rating_request(shift_id=int(sid))
         except Exception:
             logger.exception("shift rating request failed", extra={"shift_id": int(sid)})
 
-    add_after_commit_callback(session, _cb)
+    # The callback only writes an outbox row, so running it inline on overflow loses nothing.
+    add_after_commit_callback(session, _cb, background="after_commit")
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+import time as _time
 from dataclasses import dataclass
-from datetime import date, time
+from datetime import date, datetime, time
 from typing import Optional
 
-from sqlalchemy import and_, case, literal, select
+from sqlalchemy import select, true
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shared.enums import ShiftInstanceStatus
+from shared.enums import ShiftInstanceStatus, UserStatus
 from shared.models import ShiftInstance, User, WorkShiftDay
+from shared.services.shift_events import ALL_EVENTS, ShiftEvent, subscribe
 from shared.services.shifts_domain import is_shift_active_status, is_shift_final_status
 
 
+# How long a day's staff state may be served from the per-process memo.
+DAY_STAFF_MEMO_SECONDS = 60.0
+
+
 @dataclass(frozen=True)
 class TodayWorkingStaffRow:
     user_id: int
@@ -37,171 +43,248 @@ class ShiftForDateRow:
     finished: bool
 
 
-async def get_today_working_staff_with_open_state(
-    *,
-    session: AsyncSession,
-    day: date,
-) -> list[TodayWorkingStaffRow]:
-    """Return staff who have a WORK plan for the given day (exclude off-days).
+@dataclass(frozen=True)
+class DayShiftFact:
+    id: int
+    status: Optional[ShiftInstanceStatus]
+    started_at: Optional[datetime]
+    ended_at: Optional[datetime]
+    approval_required: bool
 
-    is_opened=True if user has a shift instance for that day with started_at set
-    or status == STARTED.
 
-    This function is used by bot/web and should not rely on Telegram IDs.
+@dataclass(frozen=True)
+class DayStaffState:
+    """One planned work day with its user and latest shift fact (read-only, not session-bound).
+
+    Carries the plan columns under their WorkShiftDay names, so it can stand in for the row
+    in read-only helpers such as ``shift_timer_plan``.
     """
 
-    opened_expr = case(
-        (
-            and_(
-                ShiftInstance.id.is_not(None),
-                (
-                    (ShiftInstance.status == ShiftInstanceStatus.STARTED)
-                    | (ShiftInstance.started_at.is_not(None))
-                ),
-            ),
-            literal(True),
-        ),
-        else_=literal(False),
-    )
+    id: int
+    day: date
+    user_id: int
+    tg_id: Optional[int]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    color: Optional[str]
+    user_status: Optional[UserStatus]
+    kind: str
+    hours: Optional[int]
+    start_time: Optional[time]
+    end_time: Optional[time]
+    is_emergency: bool
+    start_notified_at: Optional[datetime]
+    end_notified_at: Optional[datetime]
+    end_snooze_until: Optional[datetime]
+    shift: Optional[DayShiftFact]
+
+    @property
+    def full_name(self) -> str:
+        fio = f"{(self.first_name or '').strip()} {(self.last_name or '').strip()}".strip()
+        return fio or f"#{int(self.user_id)}"
 
+    @property
+    def is_approved(self) -> bool:
+        return self.user_status == UserStatus.APPROVED
+
+    @property
+    def is_opened(self) -> bool:
+        f = self.shift
+        return f is not None and (f.status == ShiftInstanceStatus.STARTED or f.started_at is not None)
+
+    @property
+    def is_finished(self) -> bool:
+        f = self.shift
+        return f is not None and is_shift_final_status(f.status, ended_at=f.ended_at)
+
+
+async def load_day_staff(session: AsyncSession, *, day: date) -> list[DayStaffState]:
+    """Work plan rows of ``day`` for non-deleted users, each with the user and the latest fact.
+
+    A single statement: plan JOIN users LEFT JOIN LATERAL (latest shift_instances row).
+    Ordered by start time, then name.
+    """
+    latest = (
+        select(
+            ShiftInstance.id.label("shift_id"),
+            ShiftInstance.status.label("shift_status"),
+            ShiftInstance.started_at.label("shift_started_at"),
+            ShiftInstance.ended_at.label("shift_ended_at"),
+            ShiftInstance.approval_required.label("shift_approval_required"),
+        )
+        .where(ShiftInstance.user_id == WorkShiftDay.user_id)
+        .where(ShiftInstance.day == WorkShiftDay.day)
+        .order_by(ShiftInstance.id.desc())
+        .limit(1)
+        .lateral("latest_shift")
+    )
     q = (
         select(
-            User.id,
+            WorkShiftDay.id,
+            WorkShiftDay.day,
+            WorkShiftDay.user_id,
+            User.tg_id,
             User.first_name,
             User.last_name,
+            User.color,
+            User.status,
+            WorkShiftDay.kind,
+            WorkShiftDay.hours,
             WorkShiftDay.start_time,
             WorkShiftDay.end_time,
-            WorkShiftDay.hours,
-            opened_expr.label("is_opened"),
+            WorkShiftDay.is_emergency,
+            WorkShiftDay.start_notified_at,
+            WorkShiftDay.end_notified_at,
+            WorkShiftDay.end_snooze_until,
+            latest.c.shift_id,
+            latest.c.shift_status,
+            latest.c.shift_started_at,
+            latest.c.shift_ended_at,
+            latest.c.shift_approval_required,
         )
         .join(User, User.id == WorkShiftDay.user_id)
-        .outerjoin(
-            ShiftInstance,
-            and_(ShiftInstance.user_id == WorkShiftDay.user_id, ShiftInstance.day == WorkShiftDay.day),
-        )
+        .outerjoin(latest, true())
         .where(WorkShiftDay.day == day)
         .where(WorkShiftDay.kind == "work")
         .where(User.is_deleted == False)  # noqa: E712
         .order_by(WorkShiftDay.start_time.asc().nullslast(), User.last_name.asc().nullslast(), User.first_name.asc().nullslast(), User.id.asc())
     )
-
-    rows = (await session.execute(q)).all()
-
-    out: list[TodayWorkingStaffRow] = []
-    for user_id, first_name, last_name, start_time, end_time, hours, is_opened in rows:
-        fio = f"{(first_name or '').strip()} {(last_name or '').strip()}".strip()
+    out: list[DayStaffState] = []
+    for r in (await session.execute(q)).all():
+        shift = None
+        if r.shift_id is not None:
+            shift = DayShiftFact(
+                id=int(r.shift_id),
+                status=r.shift_status,
+                started_at=r.shift_started_at,
+                ended_at=r.shift_ended_at,
+                approval_required=bool(r.shift_approval_required),
+            )
         out.append(
-            TodayWorkingStaffRow(
-                user_id=int(user_id),
-                full_name=fio or f"#{int(user_id)}",
-                start_time=start_time,
-                end_time=end_time,
-                planned_hours=int(hours) if hours is not None else None,
-                is_opened=bool(is_opened),
+            DayStaffState(
+                id=int(r.id),
+                day=r.day,
+                user_id=int(r.user_id),
+                tg_id=(int(r.tg_id) if r.tg_id else None),
+                first_name=r.first_name,
+                last_name=r.last_name,
+                color=r.color,
+                user_status=r.status,
+                kind=str(r.kind or ""),
+                hours=(int(r.hours) if r.hours is not None else None),
+                start_time=r.start_time,
+                end_time=r.end_time,
+                is_emergency=bool(r.is_emergency),
+                start_notified_at=r.start_notified_at,
+                end_notified_at=r.end_notified_at,
+                end_snooze_until=r.end_snooze_until,
+                shift=shift,
             )
         )
-
     return out
 
 
-async def get_shifts_for_date(*, session: AsyncSession, day: date) -> list[ShiftForDateRow]:
-    """Return schedule rows for a day with user data and opened/finished flags.
+_day_staff_memo: dict[date, tuple[float, tuple[DayStaffState, ...]]] = {}
 
-    The result is based on planned WORK days. If a user has multiple ShiftInstance
-    rows for the same day, each instance is returned as a separate row.
+
+async def get_day_staff(
+    session: AsyncSession, *, day: date, max_age: float = DAY_STAFF_MEMO_SECONDS
+) -> tuple[DayStaffState, ...]:
+    """``load_day_staff`` memoised per process for ``max_age`` seconds.
+
+    ``max_age=0`` always queries and leaves the memo alone, for callers that must see (and not
+    publish) their own uncommitted writes. The bot drops the memo on NOTIFY shift_schedule.
     """
+    if max_age <= 0:
+        return tuple(await load_day_staff(session, day=day))
+    now = _time.monotonic()
+    hit = _day_staff_memo.get(day)
+    if hit is not None and now - hit[0] < float(max_age):
+        return hit[1]
+    rows = tuple(await load_day_staff(session, day=day))
+    for d in [d for d, (at, _rows) in _day_staff_memo.items() if now - at >= DAY_STAFF_MEMO_SECONDS]:
+        _day_staff_memo.pop(d, None)
+    _day_staff_memo[day] = (now, rows)
+    return rows
 
-    plans_rows = (
-        await session.execute(
-            select(
-                WorkShiftDay.user_id,
-                User.first_name,
-                User.last_name,
-                WorkShiftDay.start_time,
-                WorkShiftDay.end_time,
-                WorkShiftDay.hours,
-            )
-            .join(User, User.id == WorkShiftDay.user_id)
-            .where(WorkShiftDay.day == day)
-            .where(WorkShiftDay.kind == "work")
-            .where(User.is_deleted == False)  # noqa: E712
-            .order_by(WorkShiftDay.start_time.asc().nullslast(), User.last_name.asc().nullslast(), User.first_name.asc().nullslast(), User.id.asc())
-        )
-    ).all()
-
-    if not plans_rows:
-        return []
-
-    user_ids = [int(r[0]) for r in plans_rows]
-    shifts_rows = (
-        await session.execute(
-            select(
-                ShiftInstance.id,
-                ShiftInstance.user_id,
-                ShiftInstance.status,
-                ShiftInstance.started_at,
-                ShiftInstance.ended_at,
-            )
-            .where(ShiftInstance.day == day)
-            .where(ShiftInstance.user_id.in_(user_ids))
-            .order_by(ShiftInstance.user_id.asc(), ShiftInstance.id.asc())
+
+def invalidate_day_staff(payload: str | None = None) -> None:
+    """Drop memoised day states (LISTEN callback for shift_schedule, whose payload is the day).
+
+    An empty or unknown payload drops every day.
+    """
+    try:
+        day = date.fromisoformat(str(payload or ""))
+    except ValueError:
+        _day_staff_memo.clear()
+        return
+    _day_staff_memo.pop(day, None)
+
+
+def _on_shift_event(event: ShiftEvent) -> None:
+    # Shift writes of this process (web has no shift_schedule listener) and of other replicas.
+    invalidate_day_staff(event.day.isoformat() if event.day else None)
+
+
+subscribe(ALL_EVENTS, _on_shift_event, remote=True)
+
+
+async def get_today_working_staff_with_open_state(
+    *,
+    session: AsyncSession,
+    day: date,
+) -> list[TodayWorkingStaffRow]:
+    """Return staff who have a WORK plan for the given day (exclude off-days).
+
+    is_opened=True if user has a shift instance for that day with started_at set
+    or status == STARTED.
+
+    This function is used by bot/web and should not rely on Telegram IDs.
+    Callers run it right after opening a shift in the same transaction, so it is never memoised.
+    """
+    rows = await get_day_staff(session, day=day, max_age=0)
+    return [
+        TodayWorkingStaffRow(
+            user_id=r.user_id,
+            full_name=r.full_name,
+            start_time=r.start_time,
+            end_time=r.end_time,
+            planned_hours=r.hours,
+            is_opened=r.is_opened,
         )
-    ).all()
+        for r in rows
+    ]
+
 
-    shifts_by_user: dict[int, list[tuple[int, object, object, object]]] = {}
-    for sid, uid, status, started_at, ended_at in shifts_rows:
-        uid_i = int(uid or 0)
-        if uid_i <= 0:
-            continue
-        shifts_by_user.setdefault(uid_i, []).append((int(sid), status, started_at, ended_at))
+async def get_shifts_for_date(*, session: AsyncSession, day: date) -> list[ShiftForDateRow]:
+    """Return schedule rows for a day with user data and opened/finished flags.
 
+    The result is based on planned WORK days, one row per plan with its latest
+    ShiftInstance (there is at most one per user and day).
+    """
     out: list[ShiftForDateRow] = []
-    for user_id, first_name, last_name, start_time, end_time, hours in plans_rows:
-        uid_i = int(user_id)
-        fio = f"{(first_name or '').strip()} {(last_name or '').strip()}".strip()
-        full_name = fio or f"#{uid_i}"
-        rows = shifts_by_user.get(uid_i) or []
-        if not rows:
-            out.append(
-                ShiftForDateRow(
-                    user_id=uid_i,
-                    full_name=full_name,
-                    start_time=start_time,
-                    end_time=end_time,
-                    planned_hours=(int(hours) if hours is not None else None),
-                    shift_id=None,
-                    status=None,
-                    started_at=None,
-                    ended_at=None,
-                    opened=False,
-                    finished=False,
-                )
-            )
-            continue
-
-        for sid, status, started_at, ended_at in rows:
-            status_s = str(status or "")
-            opened = bool(
-                started_at is not None
-                or is_shift_active_status(status)
-                or is_shift_final_status(status, ended_at=ended_at)
-                or status_s in {ShiftInstanceStatus.STARTED, ShiftInstanceStatus.CLOSED, ShiftInstanceStatus.APPROVED}
-            )
-            finished = bool(is_shift_final_status(status, ended_at=ended_at))
-            out.append(
-                ShiftForDateRow(
-                    user_id=uid_i,
-                    full_name=full_name,
-                    start_time=start_time,
-                    end_time=end_time,
-                    planned_hours=(int(hours) if hours is not None else None),
-                    shift_id=int(sid),
-                    status=(status_s or None),
-                    started_at=started_at,
-                    ended_at=ended_at,
-                    opened=opened,
-                    finished=finished,
-                )
+    for r in await get_day_staff(session, day=day):
+        f = r.shift
+        status_s = str(getattr(f.status, "value", f.status) or "") if f is not None else ""
+        opened = f is not None and bool(
+            f.started_at is not None
+            or is_shift_active_status(f.status)
+            or is_shift_final_status(f.status, ended_at=f.ended_at)
+            or status_s in {ShiftInstanceStatus.STARTED, ShiftInstanceStatus.CLOSED, ShiftInstanceStatus.APPROVED}
+        )
+        out.append(
+            ShiftForDateRow(
+                user_id=r.user_id,
+                full_name=r.full_name,
+                start_time=r.start_time,
+                end_time=r.end_time,
+                planned_hours=r.hours,
+                shift_id=(f.id if f is not None else None),
+                status=(status_s or None),
+                started_at=(f.started_at if f is not None else None),
+                ended_at=(f.ended_at if f is not None else None),
+                opened=opened,
+                finished=r.is_finished,
             )
-
+        )
     return out
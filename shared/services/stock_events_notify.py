@@ -6,10 +6,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
 
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
-
 from shared.config import settings
+from shared.services.telegram_outbox import KIND_MESSAGE, enqueue_standalone, message_payload
 from shared.utils import format_number, format_moscow, utc_now
 
 _logger = logging.getLogger(__name__)
@@ -101,13 +99,14 @@ async def notify_reports_chat_about_stock_event(
 
         text = "\n".join(lines2)
 
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
     try:
-        await bot.send_message(chat_id=chat_id, text=text)
+        await enqueue_standalone(
+            kind=KIND_MESSAGE,
+            chat_id=chat_id,
+            payload=message_payload(text=text, disable_web_page_preview=False),
+        )
     except Exception:
         _logger.exception(
             "failed to notify reports chat about stock event",
             extra={"chat_id": chat_id, "kind": kind, "material": material_name},
         )
-    finally:
-        await bot.session.close()
@@ -0,0 +1,647 @@
+from __future__ import annotations
+
+import html
+import logging
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.config import settings
+from shared.enums import TaskEventType, TaskPriority, TaskStatus, UserStatus
+from shared.models import Task, TaskComment, TaskEvent, User, task_assignees
+from shared.permissions import role_flags
+from shared.services.task_audit import STATUS_RU, diff_task_for_audit
+from shared.services.task_notifications import TaskNotificationService
+from shared.services.task_permissions import (
+    TaskPermissionSubject,
+    task_permissions_many,
+    validate_status_transition,
+)
+from shared.utils import utc_now
+
+
+logger = logging.getLogger(__name__)
+
+
+MAX_BULK_TASKS = 500
+
+BULK_STATUS_TARGETS = {TaskStatus.IN_PROGRESS.value, TaskStatus.REVIEW.value, TaskStatus.DONE.value}
+
+# task_assignees rows per INSERT: two bind params a row keeps it far below the asyncpg limit.
+_ASSIGNEE_INSERT_CHUNK = 5000
+
+
+@dataclass
+class BulkTaskResult:
+    updated_ids: list[int] = field(default_factory=list)
+    skipped: dict[int, str] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "ok": True,
+            "updated": [int(x) for x in self.updated_ids],
+            "updated_count": int(len(self.updated_ids)),
+            "skipped": [{"id": int(k), "reason": str(v)} for k, v in sorted(self.skipped.items())],
+        }
+
+
+@dataclass(frozen=True)
+class _TaskRow:
+    id: int
+    title: str
+    status: str
+    priority: str
+    created_by_user_id: int | None
+    started_by_user_id: int | None
+    assignee_ids: tuple[int, ...]
+
+
+def normalize_task_ids(raw) -> list[int]:
+    if not isinstance(raw, list):
+        raise HTTPException(status_code=422, detail="task_ids должен быть массивом")
+    out: list[int] = []
+    seen: set[int] = set()
+    for x in raw:
+        try:
+            tid = int(x)
+        except Exception:
+            raise HTTPException(status_code=422, detail="Неверный идентификатор задачи")
+        if tid > 0 and tid not in seen:
+            seen.add(tid)
+            out.append(tid)
+    if not out:
+        raise HTTPException(status_code=422, detail="Не выбраны задачи")
+    if len(out) > MAX_BULK_TASKS:
+        raise HTTPException(status_code=422, detail=f"Не более {MAX_BULK_TASKS} задач за раз")
+    return out
+
+
+def _actor_name(actor: User) -> str:
+    return (
+        f"{(actor.first_name or '').strip()} {(actor.last_name or '').strip()}".strip() or f"#{int(actor.id)}"
+    )
+
+
+def _actor_flags(actor: User) -> tuple[bool, bool]:
+    r = role_flags(
+        tg_id=int(getattr(actor, "tg_id", 0) or 0),
+        admin_ids=settings.admin_ids,
+        status=actor.status,
+        position=actor.position,
+    )
+    return bool(r.is_admin), bool(r.is_manager)
+
+
+def _require_editor(actor: User) -> tuple[bool, bool]:
+    is_admin, is_manager = _actor_flags(actor)
+    if not (is_admin or is_manager):
+        raise HTTPException(status_code=403, detail="Недостаточно прав для редактирования")
+    return is_admin, is_manager
+
+
+async def _load_task_rows(session: AsyncSession, task_ids: list[int]) -> dict[int, _TaskRow]:
+    """Two flat queries for the whole selection (no ORM object graph)."""
+    res = await session.execute(
+        select(
+            Task.id,
+            Task.title,
+            Task.status,
+            Task.priority,
+            Task.created_by_user_id,
+            Task.started_by_user_id,
+        ).where(Task.id.in_(task_ids))
+    )
+    base = res.all()
+    res_a = await session.execute(
+        select(task_assignees.c.task_id, task_assignees.c.user_id)
+        .where(task_assignees.c.task_id.in_(task_ids))
+        .order_by(task_assignees.c.task_id, task_assignees.c.user_id)
+    )
+    assignees: dict[int, list[int]] = {}
+    for tid, uid in res_a.all():
+        assignees.setdefault(int(tid), []).append(int(uid))
+
+    out: dict[int, _TaskRow] = {}
+    for tid, title, st, pr, created_by, started_by in base:
+        out[int(tid)] = _TaskRow(
+            id=int(tid),
+            title=str(title or ""),
+            status=(st.value if hasattr(st, "value") else str(st)),
+            priority=(pr.value if hasattr(pr, "value") else str(pr)),
+            created_by_user_id=(int(created_by) if created_by is not None else None),
+            started_by_user_id=(int(started_by) if started_by is not None else None),
+            assignee_ids=tuple(assignees.get(int(tid), [])),
+        )
+    return out
+
+
+def _permissions_by_id(rows: list[_TaskRow], *, actor_id: int, is_admin: bool, is_manager: bool) -> dict:
+    perms = task_permissions_many(
+        subjects=[
+            TaskPermissionSubject(
+                status=r.status,
+                created_by_user_id=r.created_by_user_id,
+                assignee_user_ids=r.assignee_ids,
+                started_by_user_id=r.started_by_user_id,
+            )
+            for r in rows
+        ],
+        actor_user_id=int(actor_id),
+        is_admin=is_admin,
+        is_manager=is_manager,
+    )
+    return {r.id: p for r, p in zip(rows, perms)}
+
+
+async def _insert_events(session: AsyncSession, rows: list[dict]) -> dict[int, int]:
+    """Multi-row insert of TaskEvent rows; returns task_id -> event_id."""
+    if not rows:
+        return {}
+    res = await session.execute(insert(TaskEvent).values(rows).returning(TaskEvent.task_id, TaskEvent.id))
+    return {int(tid): int(eid) for tid, eid in res.all()}
+
+
+def _missing(task_ids: list[int], rows: dict[int, _TaskRow], result: BulkTaskResult) -> None:
+    for tid in task_ids:
+        if tid not in rows:
+            result.skipped[int(tid)] = "not_found"
+
+
+async def bulk_archive_tasks(*, session: AsyncSession, actor: User, task_ids: list[int]) -> BulkTaskResult:
+    return await _bulk_archive_toggle(session=session, actor=actor, task_ids=task_ids, archive=True)
+
+
+async def bulk_unarchive_tasks(*, session: AsyncSession, actor: User, task_ids: list[int]) -> BulkTaskResult:
+    return await _bulk_archive_toggle(session=session, actor=actor, task_ids=task_ids, archive=False)
+
+
+async def _bulk_archive_toggle(
+    *,
+    session: AsyncSession,
+    actor: User,
+    task_ids: list[int],
+    archive: bool,
+) -> BulkTaskResult:
+    is_admin, is_manager = _actor_flags(actor)
+    rows = await _load_task_rows(session, task_ids)
+    result = BulkTaskResult()
+    _missing(task_ids, rows, result)
+
+    perms = _permissions_by_id(list(rows.values()), actor_id=int(actor.id), is_admin=is_admin, is_manager=is_manager)
+    allowed: list[int] = []
+    for tid in task_ids:
+        p = perms.get(tid)
+        if p is None:
+            continue
+        if (archive and p.archive) or (not archive and p.unarchive):
+            allowed.append(int(tid))
+        else:
+            result.skipped[int(tid)] = "forbidden"
+    if not allowed:
+        return result
+
+    now = utc_now()
+    await session.execute(
+        update(Task)
+        .where(Task.id.in_(allowed))
+        .values(
+            status=(TaskStatus.ARCHIVED if archive else TaskStatus.DONE),
+            archived_at=(now if archive else None),
+            updated_at=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    ev_type = TaskEventType.ARCHIVED if archive else TaskEventType.UNARCHIVED
+    await _insert_events(
+        session,
+        [
+            {"task_id": int(tid), "actor_user_id": int(actor.id), "type": ev_type, "payload": None, "created_at": now}
+            for tid in allowed
+        ],
+    )
+    result.updated_ids = allowed
+    logger.info(
+        "TASK_BULK_%s actor_user_id=%s updated=%s skipped=%s",
+        "ARCHIVE" if archive else "UNARCHIVE",
+        int(actor.id),
+        len(allowed),
+        len(result.skipped),
+    )
+    return result
+
+
+async def bulk_change_task_status(
+    *,
+    session: AsyncSession,
+    actor: User,
+    task_ids: list[int],
+    to_status: str,
+    comment: str | None = None,
+) -> BulkTaskResult:
+    to_status = (to_status or "").strip()
+    comment_str = (comment or "").strip()
+    if to_status not in BULK_STATUS_TARGETS:
+        raise HTTPException(status_code=400, detail="Неподдерживаемый статус")
+    is_admin, is_manager = _actor_flags(actor)
+    rows = await _load_task_rows(session, task_ids)
+    result = BulkTaskResult()
+    _missing(task_ids, rows, result)
+
+    perms = _permissions_by_id(list(rows.values()), actor_id=int(actor.id), is_admin=is_admin, is_manager=is_manager)
+    allowed: list[_TaskRow] = []
+    for tid in task_ids:
+        row = rows.get(tid)
+        if row is None:
+            continue
+        if row.status == to_status:
+            result.skipped[int(tid)] = "unchanged"
+            continue
+        ok, code, msg = validate_status_transition(
+            from_status=row.status,
+            to_status=to_status,
+            perms=perms[tid],
+            comment=comment_str,
+        )
+        if not ok:
+            result.skipped[int(tid)] = "forbidden" if code == 403 else str(msg or "invalid")
+            continue
+        allowed.append(row)
+    if not allowed:
+        return result
+
+    now = utc_now()
+    ids = [r.id for r in allowed]
+    values: dict = {"status": TaskStatus(to_status), "updated_at": now}
+    if to_status == TaskStatus.REVIEW.value:
+        values["completed_by_user_id"] = int(actor.id)
+        values["completed_at"] = now
+    await session.execute(
+        update(Task).where(Task.id.in_(ids)).values(**values).execution_options(synchronize_session=False)
+    )
+
+    if to_status == TaskStatus.IN_PROGRESS.value:
+        # Common (unassigned) tasks remember who took them, as in the single-task flow.
+        common_ids = [r.id for r in allowed if not r.assignee_ids]
+        if common_ids:
+            await session.execute(
+                update(Task)
+                .where(Task.id.in_(common_ids))
+                .values(started_by_user_id=int(actor.id), started_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        rework = [r.id for r in allowed if r.status == TaskStatus.REVIEW.value]
+        if rework and comment_str:
+            await session.execute(
+                insert(TaskComment).values(
+                    [
+                        {"task_id": int(tid), "author_user_id": int(actor.id), "text": comment_str, "created_at": now}
+                        for tid in rework
+                    ]
+                )
+            )
+
+    event_ids = await _insert_events(
+        session,
+        [
+            {
+                "task_id": int(r.id),
+                "actor_user_id": int(actor.id),
+                "type": TaskEventType.STATUS_CHANGED,
+                "payload": {"from": r.status, "to": to_status, "comment": comment_str or None, "bulk": True},
+                "created_at": now,
+            }
+            for r in allowed
+        ],
+    )
+    result.updated_ids = ids
+
+    try:
+        await _enqueue_bulk_status_notifications(
+            session=session,
+            actor=actor,
+            rows=allowed,
+            to_status=to_status,
+            comment=comment_str or None,
+            event_ids=event_ids,
+        )
+    except Exception:
+        logger.exception("TASK_NOTIFY_FAILED type=bulk_status actor_user_id=%s", int(actor.id))
+
+    logger.info(
+        "TASK_BULK_STATUS actor_user_id=%s to=%s updated=%s skipped=%s",
+        int(actor.id),
+        str(to_status),
+        len(ids),
+        len(result.skipped),
+    )
+    return result
+
+
+async def _enqueue_bulk_status_notifications(
+    *,
+    session: AsyncSession,
+    actor: User,
+    rows: list[_TaskRow],
+    to_status: str,
+    comment: str | None,
+    event_ids: dict[int, int],
+) -> None:
+    """Fold status notifications into one message per recipient.
+
+    Recipients per task follow the single-task rules (executors, started_by, creator and actor).
+    """
+    actor_id = int(actor.id)
+    by_recipient: dict[int, list[_TaskRow]] = {}
+    for r in rows:
+        executors = list(r.assignee_ids) or ([r.started_by_user_id] if r.started_by_user_id else [])
+        recipients = {int(x) for x in executors if x}
+        if r.started_by_user_id:
+            recipients.add(int(r.started_by_user_id))
+        if r.created_by_user_id:
+            recipients.add(int(r.created_by_user_id))
+        recipients.add(actor_id)
+        for rid in recipients:
+            by_recipient.setdefault(int(rid), []).append(r)
+    if not by_recipient:
+        return
+
+    ns = TaskNotificationService(session)
+    tg_map = await ns.resolve_recipients_tg_ids(user_ids=sorted(by_recipient.keys()))
+    actor_name = _actor_name(actor)
+    first_event_id = min(event_ids.values()) if event_ids else 0
+
+    for rid, items in sorted(by_recipient.items()):
+        if int(tg_map.get(int(rid), 0) or 0) <= 0:
+            logger.warning("TASK_NOTIFY_SKIP reason=no_tg_id type=bulk_status_changed user_id=%s", int(rid))
+            continue
+        await ns.enqueue(
+            task_id=int(items[0].id),
+            recipient_user_id=int(rid),
+            type="bulk_status_changed",
+            payload={
+                "task_id": int(items[0].id),
+                "task_ids": [int(r.id) for r in items],
+                "items": [{"task_id": int(r.id), "title": r.title, "from": r.status} for r in items],
+                "to": str(to_status),
+                "comment": comment,
+                "actor_user_id": actor_id,
+                "actor_name": actor_name,
+                "event_ids": [int(event_ids.get(r.id, 0)) for r in items],
+            },
+            dedupe_key=f"bulk_status:{int(first_event_id)}",
+        )
+
+
+def render_bulk_status_text(payload: dict, *, max_items: int = 30) -> str:
+    items = list(payload.get("items") or [])
+    to = str(payload.get("to") or "")
+    actor_name = str(payload.get("actor_name") or "—")
+    comment = str(payload.get("comment") or "").strip()
+
+    lines = [f"🔔 <b>Смена статуса: {len(items)} задач → {html.escape(STATUS_RU.get(to, to))}</b>", ""]
+    for it in items[:max_items]:
+        fr = str(it.get("from") or "")
+        lines.append(
+            f"• #{int(it.get('task_id') or 0)} {html.escape(str(it.get('title') or '').strip())}"
+            f" ({html.escape(STATUS_RU.get(fr, fr))})"
+        )
+    if len(items) > max_items:
+        lines.append(f"… и ещё {len(items) - max_items}")
+    lines.append("")
+    lines.append(f"<b>Инициатор:</b> {html.escape(actor_name)}")
+    if comment:
+        lines.append("")
+        lines.append(f"<b>Комментарий:</b>\n{html.escape(comment)}")
+    return "\n".join(lines)
+
+
+async def bulk_set_task_priority(
+    *,
+    session: AsyncSession,
+    actor: User,
+    task_ids: list[int],
+    priority: str,
+) -> BulkTaskResult:
+    _require_editor(actor)
+    p = (priority or "").strip()
+    if p not in {x.value for x in TaskPriority}:
+        raise HTTPException(status_code=422, detail="Неверный приоритет")
+
+    rows = await _load_task_rows(session, task_ids)
+    result = BulkTaskResult()
+    _missing(task_ids, rows, result)
+
+    changed: list[_TaskRow] = []
+    for tid in task_ids:
+        row = rows.get(tid)
+        if row is None:
+            continue
+        if row.priority == p:
+            result.skipped[int(tid)] = "unchanged"
+        else:
+            changed.append(row)
+    if not changed:
+        return result
+
+    now = utc_now()
+    await session.execute(
+        update(Task)
+        .where(Task.id.in_([r.id for r in changed]))
+        .values(priority=TaskPriority(p), updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    await _insert_events(
+        session,
+        [
+            _edited_event_row(
+                task_id=r.id,
+                actor_id=int(actor.id),
+                before={"priority": r.priority},
+                after={"priority": p},
+                now=now,
+            )
+            for r in changed
+        ],
+    )
+    result.updated_ids = [r.id for r in changed]
+    return result
+
+
+async def bulk_set_task_assignees(
+    *,
+    session: AsyncSession,
+    actor: User,
+    task_ids: list[int],
+    assignee_ids: list[int],
+) -> BulkTaskResult:
+    _require_editor(actor)
+    ids = sorted({int(x) for x in (assignee_ids or []) if int(x) > 0})
+    users: list[User] = []
+    if ids:
+        users = list(
+            (
+                await session.scalars(
+                    select(User)
+                    .where(User.id.in_(ids))
+                    .where(User.is_deleted == False)
+                    .where(User.status == UserStatus.APPROVED)
+                )
+            ).all()
+        )
+        if len(users) != len(ids):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Исполнители не найдены")
+
+    rows = await _load_task_rows(session, task_ids)
+    result = BulkTaskResult()
+    _missing(task_ids, rows, result)
+
+    changed: list[_TaskRow] = []
+    for tid in task_ids:
+        row = rows.get(tid)
+        if row is None:
+            continue
+        if sorted(row.assignee_ids) == ids:
+            result.skipped[int(tid)] = "unchanged"
+        else:
+            changed.append(row)
+    if not changed:
+        return result
+
+    # Names for audit snapshots of both old and new assignees, in one query.
+    name_ids = set(ids)
+    for r in changed:
+        name_ids.update(r.assignee_ids)
+    res_n = await session.execute(
+        select(User.id, User.first_name, User.last_name).where(User.id.in_(sorted(name_ids)))
+    )
+    names = {
+        int(uid): (f"{(fn or '').strip()} {(ln or '').strip()}".strip() or f"#{int(uid)}")
+        for uid, fn, ln in res_n.all()
+    }
+
+    def snap(uids) -> list[dict]:
+        return [{"id": int(u), "name": names.get(int(u), f"#{int(u)}")} for u in uids]
+
+    changed_ids = [r.id for r in changed]
+    await session.execute(delete(task_assignees).where(task_assignees.c.task_id.in_(changed_ids)))
+    links = [{"task_id": int(tid), "user_id": int(uid)} for tid in changed_ids for uid in ids]
+    for start in range(0, len(links), _ASSIGNEE_INSERT_CHUNK):
+        await session.execute(insert(task_assignees).values(links[start : start + _ASSIGNEE_INSERT_CHUNK]))
+    now = utc_now()
+    await session.execute(
+        update(Task).where(Task.id.in_(changed_ids)).values(updated_at=now).execution_options(synchronize_session=False)
+    )
+    event_ids = await _insert_events(
+        session,
+        [
+            _edited_event_row(
+                task_id=r.id,
+                actor_id=int(actor.id),
+                before={"assignees": snap(sorted(r.assignee_ids))},
+                after={"assignees": snap(ids)},
+                now=now,
+            )
+            for r in changed
+        ],
+    )
+    result.updated_ids = changed_ids
+
+    try:
+        await _enqueue_bulk_assigned_notifications(
+            session=session,
+            actor=actor,
+            by_recipient=newly_assigned(changed, ids, actor_id=int(actor.id)),
+            event_ids=event_ids,
+        )
+    except Exception:
+        logger.exception("TASK_NOTIFY_FAILED type=bulk_assigned actor_user_id=%s", int(actor.id))
+
+    logger.info(
+        "TASK_BULK_ASSIGNEES actor_user_id=%s updated=%s skipped=%s",
+        int(actor.id),
+        len(changed_ids),
+        len(result.skipped),
+    )
+    return result
+
+
+def newly_assigned(rows: list[_TaskRow], assignee_ids: list[int], *, actor_id: int) -> dict[int, list[_TaskRow]]:
+    """Recipient -> tasks they were added to; people already on a task and the actor are not notified."""
+    by_recipient: dict[int, list[_TaskRow]] = {}
+    for r in rows:
+        before = set(r.assignee_ids)
+        for uid in assignee_ids:
+            if int(uid) not in before and int(uid) != int(actor_id):
+                by_recipient.setdefault(int(uid), []).append(r)
+    return by_recipient
+
+
+async def _enqueue_bulk_assigned_notifications(
+    *,
+    session: AsyncSession,
+    actor: User,
+    by_recipient: dict[int, list[_TaskRow]],
+    event_ids: dict[int, int],
+) -> None:
+    """One folded "you were assigned" notification per new assignee, as for bulk status changes."""
+    if not by_recipient:
+        return
+
+    ns = TaskNotificationService(session)
+    tg_map = await ns.resolve_recipients_tg_ids(user_ids=sorted(by_recipient.keys()))
+    actor_name = _actor_name(actor)
+    first_event_id = min(event_ids.values()) if event_ids else 0
+
+    for rid, items in sorted(by_recipient.items()):
+        if int(tg_map.get(int(rid), 0) or 0) <= 0:
+            logger.warning("TASK_NOTIFY_SKIP reason=no_tg_id type=bulk_assigned user_id=%s", int(rid))
+            continue
+        await ns.enqueue(
+            task_id=int(items[0].id),
+            recipient_user_id=int(rid),
+            type="bulk_assigned",
+            payload={
+                "task_id": int(items[0].id),
+                "task_ids": [int(r.id) for r in items],
+                "items": [{"task_id": int(r.id), "title": r.title} for r in items],
+                "actor_user_id": int(actor.id),
+                "actor_name": actor_name,
+                "event_ids": [int(event_ids.get(r.id, 0)) for r in items],
+            },
+            dedupe_key=f"bulk_assigned:{int(first_event_id)}",
+        )
+
+
+def render_bulk_assigned_text(payload: dict, *, max_items: int = 30) -> str:
+    items = list(payload.get("items") or [])
+    actor_name = str(payload.get("actor_name") or "—")
+
+    lines = [f"🆕 <b>Вам назначены задачи: {len(items)}</b>", ""]
+    for it in items[:max_items]:
+        lines.append(f"• #{int(it.get('task_id') or 0)} {html.escape(str(it.get('title') or '').strip())}")
+    if len(items) > max_items:
+        lines.append(f"… и ещё {len(items) - max_items}")
+    lines.append("")
+    lines.append(f"<b>Инициатор:</b> {html.escape(actor_name)}")
+    return "\n".join(lines)
+
+
+def _edited_event_row(*, task_id: int, actor_id: int, before: dict, after: dict, now) -> dict:
+    changes, human = diff_task_for_audit(before=before, after=after)
+    return {
+        "task_id": int(task_id),
+        "actor_user_id": int(actor_id),
+        "type": TaskEventType.EDITED,
+        "payload": {
+            "changes": [
+                {"type": c.type, "field": c.field, "before": c.before, "after": c.after, "human": c.human}
+                for c in changes
+            ],
+            "human": list(human),
+            "bulk": True,
+        },
+        "created_at": now,
+    }
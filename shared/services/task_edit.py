@@ -8,12 +8,13 @@ from uuid import uuid4
 from fastapi import HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import noload, selectinload
 
 from shared.config import settings
 from shared.enums import TaskPriority, TaskStatus, TaskEventType, UserStatus
 from shared.models import Task, TaskEvent, TaskComment, TaskCommentPhoto, User
 from shared.permissions import role_flags
+from shared.services.partitions import load_history
 from shared.services.task_audit import diff_task_for_audit
 from shared.services.task_permissions import task_permissions, validate_status_transition
 from shared.utils import MOSCOW_TZ, utc_now
@@ -120,12 +121,13 @@ async def _load_task_full(session: AsyncSession, task_id: int) -> Task:
             selectinload(Task.created_by_user),
             selectinload(Task.comments).selectinload(TaskComment.author_user),
             selectinload(Task.comments).selectinload(TaskComment.photos),
-            selectinload(Task.events).selectinload(TaskEvent.actor_user),
+            noload(Task.events),
         )
     )
     t = res.scalar_one_or_none()
     if not t:
         raise HTTPException(status_code=404)
+    await load_history(session, t, "events", TaskEvent, TaskEvent.task_id, selectinload(TaskEvent.actor_user))
     return t
 
 
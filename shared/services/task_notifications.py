@@ -5,11 +5,12 @@ import logging
 from dataclasses import dataclass
 from datetime import datetime, time, timedelta, timezone
 
-from sqlalchemy import text
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shared.db import add_after_commit_callback
+from shared.config import settings
+from shared.db import notify_on_commit
+from shared.enums import TaskStatus
 from shared.models import Task, TaskNotification, User
 from shared.utils import MOSCOW_TZ, utc_now
 
@@ -17,9 +18,15 @@ from shared.utils import MOSCOW_TZ, utc_now
 logger = logging.getLogger(__name__)
 
 
+# LISTEN/NOTIFY channel that wakes the bot's task notifications worker.
+NOTIFY_CHANNEL = "task_notifications"
+
 WORK_START = time(8, 0)
 WORK_END = time(22, 0)
 
+# Notification types a recipient may get folded into one digest message (see is_digestible).
+DIGEST_TYPES = frozenset({"comment", "status_changed"})
+
 
 def next_allowed_send_at(*, now_utc: datetime) -> datetime:
     if now_utc.tzinfo is None:
@@ -38,6 +45,35 @@ def next_allowed_send_at(*, now_utc: datetime) -> datetime:
     return next_day_start.astimezone(timezone.utc)
 
 
+def is_force_new(*, typ: str, payload: dict) -> bool:
+    """Whether a notification must arrive as a new message instead of editing the last one."""
+    if typ == "created":
+        return True
+    if typ in {"taken_in_work", "sent_to_review", "bulk_status_changed", "bulk_assigned"}:
+        return True
+    if typ == "status_changed":
+        try:
+            action = str(payload.get("action") or "")
+            fr = str(payload.get("from") or "")
+            to = str(payload.get("to") or "")
+            if action == "return_to_rework":
+                return True
+            if fr == TaskStatus.REVIEW.value and to == TaskStatus.IN_PROGRESS.value:
+                return True
+        except Exception:
+            pass
+    return False
+
+
+def is_digestible(*, typ: str, payload: dict) -> bool:
+    """Routine updates (comments, plain status moves) may be coalesced; force-new ones never are."""
+    return str(typ) in DIGEST_TYPES and not is_force_new(typ=str(typ), payload=dict(payload or {}))
+
+
+def digest_window() -> timedelta:
+    return timedelta(seconds=max(0, int(getattr(settings, "TASK_NOTIFY_DIGEST_SECONDS", 0) or 0)))
+
+
 def _hash_dedupe_key(raw: str) -> str:
     # keep key short and index-friendly
     return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:40]
@@ -53,25 +89,41 @@ class TaskNotificationService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def _notify_after_commit(self, *, recipient_user_id: int, notification_id: int | None) -> None:
-        # Lightweight wake-up signal for bot worker. Actual sending is still driven by DB state.
-        payload = f"recipient={int(recipient_user_id)};id={int(notification_id or 0)}"
+    async def _signal_worker(self, *, recipient_user_id: int, notification_id: int | None) -> None:
+        # Lightweight wake-up signal for bot worker, delivered on commit. Actual sending is still driven by DB state.
         try:
-            try:
-                logger.info(
-                    "TASK_NOTIFY_AFTER_COMMIT recipient_user_id=%s notification_id=%s",
-                    int(recipient_user_id),
-                    int(notification_id or 0),
-                )
-            except Exception:
-                pass
-            await self.session.execute(
-                text("SELECT pg_notify(:channel, :payload)"),
-                {"channel": "task_notifications", "payload": payload},
+            logger.info(
+                "TASK_NOTIFY_SIGNAL recipient_user_id=%s notification_id=%s",
+                int(recipient_user_id),
+                int(notification_id or 0),
             )
         except Exception:
-            # Never fail core flows due to notification signal problems.
             pass
+        await notify_on_commit(self.session, NOTIFY_CHANNEL)
+
+    async def _digest_scheduled_at(self, *, recipient_user_id: int, now_utc: datetime, scheduled_at: datetime) -> datetime:
+        """Join the recipient's open digest window, or open one ``digest_window()`` from now.
+
+        Rows sharing a window become due together, so the worker sees them in one batch and
+        folds them into a single message. The working-hours rule still applies to the window end.
+        """
+        window = digest_window()
+        if window <= timedelta(0):
+            return scheduled_at
+        open_at = (
+            await self.session.execute(
+                select(func.min(TaskNotification.scheduled_at)).where(
+                    TaskNotification.recipient_user_id == int(recipient_user_id),
+                    TaskNotification.status == "pending",
+                    TaskNotification.attempts == 0,
+                    TaskNotification.type.in_(sorted(DIGEST_TYPES)),
+                    TaskNotification.scheduled_at > now_utc,
+                )
+            )
+        ).scalar_one_or_none()
+        if open_at is not None:
+            return open_at
+        return next_allowed_send_at(now_utc=max(scheduled_at, now_utc + window))
 
     async def enqueue(
         self,
@@ -111,6 +163,11 @@ class TaskNotificationService:
                     pass
                 return EnqueueResult(created=False, notification_id=int(existing_id))
 
+        if is_digestible(typ=str(type), payload=dict(payload or {})):
+            scheduled_at = await self._digest_scheduled_at(
+                recipient_user_id=int(recipient_user_id), now_utc=now_utc, scheduled_at=scheduled_at
+            )
+
         n = TaskNotification(
             task_id=int(task_id),
             recipient_user_id=int(recipient_user_id),
@@ -139,11 +196,8 @@ class TaskNotificationService:
         except Exception:
             pass
 
-        # Event-driven wake up (after commit).
-        add_after_commit_callback(
-            self.session,
-            lambda: self._notify_after_commit(recipient_user_id=int(recipient_user_id), notification_id=int(n.id)),
-        )
+        # Event-driven wake up (on commit).
+        await self._signal_worker(recipient_user_id=int(recipient_user_id), notification_id=int(n.id))
         return EnqueueResult(created=True, notification_id=int(n.id))
 
     async def resolve_recipients_tg_ids(self, *, user_ids: list[int]) -> dict[int, int]:
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Sequence
 
 from shared.enums import TaskStatus
 
@@ -66,6 +68,63 @@ def task_permissions(
     )
 
 
+@dataclass(frozen=True)
+class TaskPermissionSubject:
+    status: str
+    created_by_user_id: int | None
+    assignee_user_ids: Sequence[int]
+    started_by_user_id: int | None
+
+
+@lru_cache(maxsize=256)
+def _task_permissions_cached(
+    status: str,
+    is_admin_or_manager: bool,
+    is_assigned: bool,
+    is_common: bool,
+    is_started_by_me: bool,
+    is_creator: bool,
+) -> TaskPermissions:
+    # Permissions depend only on the status and a handful of actor relations,
+    # so the result space is tiny; evaluate every combination at most once.
+    return task_permissions(
+        status=status,
+        actor_user_id=1,
+        created_by_user_id=1 if is_creator else None,
+        assignee_user_ids=([] if is_common else [1] if is_assigned else [0]),
+        started_by_user_id=1 if is_started_by_me else None,
+        is_admin=is_admin_or_manager,
+        is_manager=False,
+    )
+
+
+def task_permissions_many(
+    *,
+    subjects: Iterable[TaskPermissionSubject],
+    actor_user_id: int,
+    is_admin: bool,
+    is_manager: bool,
+) -> list[TaskPermissions]:
+    """Evaluate permissions of one actor for many tasks (same rules as task_permissions)."""
+    actor_user_id = int(actor_user_id)
+    is_admin_or_manager = bool(is_admin or is_manager)
+
+    out: list[TaskPermissions] = []
+    for s in subjects:
+        assignee_ids = s.assignee_user_ids or ()
+        out.append(
+            _task_permissions_cached(
+                str(s.status),
+                is_admin_or_manager,
+                actor_user_id in assignee_ids,
+                len(assignee_ids) == 0,
+                s.started_by_user_id is not None and int(s.started_by_user_id) == actor_user_id,
+                s.created_by_user_id is not None and int(s.created_by_user_id) == actor_user_id,
+            )
+        )
+    return out
+
+
 def validate_status_transition(
     *,
     from_status: str,
@@ -4,7 +4,6 @@ import html
 import logging
 from urllib.parse import urlencode
 
-import httpx
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -12,6 +11,7 @@ from sqlalchemy.orm import selectinload
 from shared.config import settings
 from shared.enums import TaskEventType, TaskStatus
 from shared.models import Task, TaskComment, TaskCommentPhoto, TaskEvent
+from shared.services.bot_clients import get_http_client
 from shared.services.task_notifications import TaskNotificationService
 
 
@@ -74,11 +74,10 @@ async def _tg_send_message_http(*, chat_id: int, text: str) -> bool:
         "parse_mode": "HTML",
         "disable_web_page_preview": True,
     }
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.post(url, data=payload)
-        r.raise_for_status()
-        data = r.json()
-        return bool(data.get("ok"))
+    r = await get_http_client().post(url, data=payload, timeout=10)
+    r.raise_for_status()
+    data = r.json()
+    return bool(data.get("ok"))
 
 
 def _task_title_plain(task: Task) -> str:
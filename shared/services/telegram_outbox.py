@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.config import settings
+from shared.db import get_async_session, notify_on_commit
+from shared.models import TelegramOutbox
+from shared.utils import utc_now
+
+
+logger = logging.getLogger(__name__)
+
+
+# Outbox kinds; every kind has a renderer in bot/app/services/telegram_outbox.py.
+KIND_MESSAGE = "message"
+KIND_SALARY_LINE = "salary_line"
+KIND_BROADCAST_DELIVERY = "broadcast_delivery"
+KIND_SHIFT_RATING_REQUEST = "shift_rating_request"
+KIND_PURCHASE_CHAT_NOTIFY = "purchase_chat_notify"
+KIND_SHIFT_SWAP_OFFER = "shift_swap_offer"
+
+# LISTEN/NOTIFY channel that wakes the bot's outbox worker.
+NOTIFY_CHANNEL = "telegram_outbox"
+
+# Salary change lines for one chat are collected for this long and sent as one digest.
+SALARY_DIGEST_WINDOW = timedelta(seconds=30)
+
+
+def message_payload(
+    *,
+    text: str,
+    reply_markup: dict | None = None,
+    parse_mode: str | None = "HTML",
+    disable_web_page_preview: bool = True,
+) -> dict:
+    payload: dict[str, Any] = {"text": str(text), "parse_mode": parse_mode}
+    if reply_markup is not None:
+        payload["reply_markup"] = reply_markup
+    if disable_web_page_preview:
+        payload["disable_web_page_preview"] = True
+    return payload
+
+
+async def enqueue(
+    session: AsyncSession,
+    *,
+    kind: str,
+    chat_id: int | None,
+    payload: dict | None = None,
+    dedupe_key: str | None = None,
+    not_before: datetime | None = None,
+) -> int | None:
+    """Add an outbound Telegram message to the outbox in the caller's transaction.
+
+    The row becomes visible to the bot worker on commit, so the message is sent if and
+    only if the business change is committed. ``dedupe_key`` makes the call idempotent
+    (returns None when a row with that key already exists).
+    """
+    now = utc_now()
+    stmt = (
+        insert(TelegramOutbox)
+        .values(
+            kind=str(kind),
+            chat_id=(int(chat_id) if chat_id else None),
+            payload=dict(payload or {}),
+            status="pending",
+            attempts=0,
+            next_retry_at=(not_before or now),
+            dedupe_key=(str(dedupe_key)[:128] if dedupe_key else None),
+            created_at=now,
+            updated_at=now,
+        )
+        .on_conflict_do_nothing(index_elements=[TelegramOutbox.dedupe_key])
+        .returning(TelegramOutbox.id)
+    )
+    row_id = (await session.execute(stmt)).scalar_one_or_none()
+    if row_id is not None:
+        await notify_on_commit(session, NOTIFY_CHANNEL)
+    if row_id is None:
+        try:
+            logger.info("TG_OUTBOX_DEDUPED kind=%s dedupe_key=%s", str(kind), str(dedupe_key))
+        except Exception:
+            pass
+    return (int(row_id) if row_id is not None else None)
+
+
+@dataclass(frozen=True)
+class OutboxItem:
+    kind: str
+    chat_id: int | None
+    payload: dict
+    dedupe_key: str | None = None
+    not_before: datetime | None = None
+
+
+# Rows per multi-row INSERT in enqueue_many (9 bind parameters each, driver limit is 32767).
+_ENQUEUE_CHUNK = 2000
+
+
+async def enqueue_many(session: AsyncSession, items: list[OutboxItem]) -> int:
+    """``enqueue`` for many messages with one multi-row INSERT and a single wake-up.
+
+    Returns how many rows were added (deduped ones are skipped like in ``enqueue``).
+    """
+    if not items:
+        return 0
+    now = utc_now()
+    added = 0
+    for start in range(0, len(items), _ENQUEUE_CHUNK):
+        values = [
+            dict(
+                kind=str(it.kind),
+                chat_id=(int(it.chat_id) if it.chat_id else None),
+                payload=dict(it.payload or {}),
+                status="pending",
+                attempts=0,
+                next_retry_at=(it.not_before or now),
+                dedupe_key=(str(it.dedupe_key)[:128] if it.dedupe_key else None),
+                created_at=now,
+                updated_at=now,
+            )
+            for it in items[start : start + _ENQUEUE_CHUNK]
+        ]
+        stmt = (
+            insert(TelegramOutbox)
+            .values(values)
+            .on_conflict_do_nothing(index_elements=[TelegramOutbox.dedupe_key])
+            .returning(TelegramOutbox.id)
+        )
+        added += len((await session.execute(stmt)).scalars().all())
+    if added:
+        await notify_on_commit(session, NOTIFY_CHANNEL)
+    if added < len(items):
+        try:
+            logger.info("TG_OUTBOX_DEDUPED kind=%s count=%s", str(items[0].kind), int(len(items) - added))
+        except Exception:
+            pass
+    return added
+
+
+async def enqueue_message(
+    session: AsyncSession,
+    *,
+    chat_id: int,
+    text: str,
+    reply_markup: dict | None = None,
+    parse_mode: str | None = "HTML",
+    disable_web_page_preview: bool = True,
+    dedupe_key: str | None = None,
+    not_before: datetime | None = None,
+) -> int | None:
+    return await enqueue(
+        session,
+        kind=KIND_MESSAGE,
+        chat_id=int(chat_id),
+        payload=message_payload(
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode=parse_mode,
+            disable_web_page_preview=disable_web_page_preview,
+        ),
+        dedupe_key=dedupe_key,
+        not_before=not_before,
+    )
+
+
+async def enqueue_standalone(
+    *,
+    kind: str,
+    chat_id: int | None,
+    payload: dict | None = None,
+    dedupe_key: str | None = None,
+    not_before: datetime | None = None,
+) -> int | None:
+    """``enqueue`` in its own transaction (for after-commit hooks and code without a session)."""
+    async with get_async_session() as session:
+        return await enqueue(
+            session,
+            kind=kind,
+            chat_id=chat_id,
+            payload=payload,
+            dedupe_key=dedupe_key,
+            not_before=not_before,
+        )
+
+
+async def enqueue_salary_line(session: AsyncSession, *, chat_id: int, line_html: str) -> int | None:
+    """Queue one salary change line; lines of the same chat inside the window go out as one digest."""
+    now = utc_now()
+    due = (
+        await session.execute(
+            select(func.min(TelegramOutbox.next_retry_at))
+            .where(TelegramOutbox.kind == KIND_SALARY_LINE)
+            .where(TelegramOutbox.chat_id == int(chat_id))
+            .where(TelegramOutbox.status == "pending")
+            .where(TelegramOutbox.next_retry_at > now)
+        )
+    ).scalar_one_or_none()
+    return await enqueue(
+        session,
+        kind=KIND_SALARY_LINE,
+        chat_id=int(chat_id),
+        payload={"line": str(line_html)},
+        not_before=(due or (now + SALARY_DIGEST_WINDOW)),
+    )
+
+
+def render_salary_digest(lines: list[str]) -> str:
+    return "🧾 <b>Изменения по зарплате</b>\n\n" + "\n".join([str(x) for x in lines if str(x).strip()])
+
+
+async def enqueue_purchase_notify(*, purchase_id: int) -> None:
+    pid = int(purchase_id)
+    if pid <= 0:
+        return
+    await enqueue_standalone(
+        kind=KIND_PURCHASE_CHAT_NOTIFY,
+        chat_id=(int(getattr(settings, "PURCHASES_CHAT_ID", 0) or 0) or None),
+        payload={"purchase_id": int(pid)},
+    )
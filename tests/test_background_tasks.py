@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import unittest
+
+from shared.services.background_tasks import TaskSupervisor
+
+
+class TestTaskSupervisor(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrency_cap_per_queue(self):
+        sup = TaskSupervisor({"q": (2, 10)})
+        active = 0
+        max_active = 0
+
+        async def job():
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        for _ in range(6):
+            self.assertTrue(await sup.submit("q", job))
+        await sup.drain(timeout=1)
+        self.assertEqual(max_active, 2)
+        self.assertEqual(sup.snapshot()["q"]["done"], 6)
+
+    async def test_overflow_spills_or_drops(self):
+        sup = TaskSupervisor({"q": (1, 1)})
+        release = asyncio.Event()
+        spilled = []
+
+        async def slow():
+            await release.wait()
+
+        async def spill():
+            spilled.append(1)
+
+        self.assertTrue(await sup.submit("q", slow))
+        self.assertFalse(await sup.submit("q", slow, spill=spill))
+        self.assertFalse(await sup.submit("q", slow))
+        self.assertEqual(spilled, [1])
+        snap = sup.snapshot()["q"]
+        self.assertEqual((snap["spilled"], snap["dropped"]), (1, 1))
+        release.set()
+        await sup.drain(timeout=1)
+
+    async def test_drop_log_level_per_queue(self):
+        sup = TaskSupervisor({"loud": (1, 1), "quiet": (1, 1, logging.DEBUG)})
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+
+        for queue, level in (("loud", "WARNING"), ("quiet", "DEBUG")):
+            await sup.submit(queue, slow)
+            with self.assertLogs("shared.services.background_tasks", level="DEBUG") as logs:
+                self.assertFalse(await sup.submit(queue, slow))
+            self.assertEqual([r.levelname for r in logs.records], [level])
+        release.set()
+        await sup.drain(timeout=1)
+
+    async def test_drain_spills_jobs_that_never_started(self):
+        sup = TaskSupervisor({"q": (1, 10)})
+        ran = []
+        spilled = []
+
+        async def stuck():
+            await asyncio.sleep(10)
+
+        async def quick():
+            ran.append(1)
+
+        async def spill():
+            spilled.append(1)
+
+        await sup.submit("q", stuck)
+        await sup.submit("q", quick, spill=spill)
+        await sup.drain(timeout=0.01)
+        self.assertEqual(ran, [])
+        self.assertEqual(spilled, [1])
+        self.assertFalse(await sup.submit("q", stuck))
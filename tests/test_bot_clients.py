@@ -0,0 +1,22 @@
+import unittest
+
+from shared.services import bot_clients
+
+
+class TestBotClients(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        bot_clients.unregister_bot()
+        await bot_clients.close_bot_clients()
+
+    async def test_registered_bot_is_shared(self):
+        bot = object()
+        bot_clients.register_bot(bot)
+        self.assertIs(bot_clients.get_bot(), bot)
+        self.assertIs(bot_clients.get_bot(), bot)
+
+    async def test_http_client_is_pooled_until_closed(self):
+        client = bot_clients.get_http_client()
+        self.assertIs(bot_clients.get_http_client(), client)
+        await bot_clients.close_bot_clients()
+        self.assertTrue(client.is_closed)
+        self.assertIsNot(bot_clients.get_http_client(), client)
@@ -0,0 +1,84 @@
+import unittest
+from datetime import date, datetime, timezone
+from unittest import mock
+
+from shared.enums import ShiftInstanceStatus, UserStatus
+from shared.services import shifts_service
+from shared.services.shifts_service import DayShiftFact, DayStaffState, get_day_staff, invalidate_day_staff
+
+
+def _state(user_id: int = 1, *, shift: DayShiftFact | None = None) -> DayStaffState:
+    return DayStaffState(
+        id=10 + user_id,
+        day=date(2026, 4, 1),
+        user_id=user_id,
+        tg_id=1000 + user_id,
+        first_name="Анна",
+        last_name="",
+        color=None,
+        user_status=UserStatus.APPROVED,
+        kind="work",
+        hours=8,
+        start_time=None,
+        end_time=None,
+        is_emergency=False,
+        start_notified_at=None,
+        end_notified_at=None,
+        end_snooze_until=None,
+        shift=shift,
+    )
+
+
+class TestDayStaffState(unittest.TestCase):
+    def test_open_and_finished_flags(self):
+        started = DayShiftFact(id=1, status=ShiftInstanceStatus.STARTED, started_at=None, ended_at=None, approval_required=False)
+        closed = DayShiftFact(
+            id=2,
+            status=ShiftInstanceStatus.APPROVED,
+            started_at=datetime(2026, 4, 1, 7, tzinfo=timezone.utc),
+            ended_at=datetime(2026, 4, 1, 15, tzinfo=timezone.utc),
+            approval_required=False,
+        )
+        self.assertFalse(_state().is_opened)
+        self.assertTrue(_state(shift=started).is_opened)
+        self.assertFalse(_state(shift=started).is_finished)
+        self.assertTrue(_state(shift=closed).is_finished)
+        self.assertEqual(_state().full_name, "Анна")
+
+
+class TestDayStaffMemo(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        invalidate_day_staff()
+
+    async def test_memo_is_reused_until_invalidated(self):
+        load = mock.AsyncMock(return_value=[_state()])
+        with mock.patch.object(shifts_service, "load_day_staff", load):
+            a = await get_day_staff(None, day=date(2026, 4, 1))
+            b = await get_day_staff(None, day=date(2026, 4, 1))
+            self.assertIs(a, b)
+            self.assertEqual(load.await_count, 1)
+
+            invalidate_day_staff("")
+            await get_day_staff(None, day=date(2026, 4, 1))
+            self.assertEqual(load.await_count, 2)
+
+    async def test_shift_schedule_payload_drops_only_that_day(self):
+        load = mock.AsyncMock(return_value=[_state()])
+        with mock.patch.object(shifts_service, "load_day_staff", load):
+            await get_day_staff(None, day=date(2026, 4, 1))
+            await get_day_staff(None, day=date(2026, 4, 2))
+            invalidate_day_staff("2026-04-02")
+            await get_day_staff(None, day=date(2026, 4, 1))
+            await get_day_staff(None, day=date(2026, 4, 2))
+            self.assertEqual(load.await_count, 3)
+
+    async def test_fresh_reads_bypass_and_do_not_fill_memo(self):
+        load = mock.AsyncMock(return_value=[_state()])
+        with mock.patch.object(shifts_service, "load_day_staff", load):
+            await get_day_staff(None, day=date(2026, 4, 1), max_age=0)
+            await get_day_staff(None, day=date(2026, 4, 1))
+            self.assertEqual(load.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
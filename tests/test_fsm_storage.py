@@ -0,0 +1,47 @@
+import unittest
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from shared.enums import Schedule
+from shared.services.fsm_storage import PostgresStorage, build_fsm_storage, decode_data, encode_data
+
+
+class TestFsmStorage(unittest.TestCase):
+    def test_data_roundtrip_keeps_python_types(self):
+        data = {
+            "day": date(2026, 4, 6),
+            "at": datetime(2026, 4, 6, 9, 30, tzinfo=timezone.utc),
+            "amount": Decimal("12.50"),
+            "schedule": Schedule.TWO_TWO,
+            "by_id": {1: "a", 2: ["b", (3, 4)]},
+            "picked": {5, 6},
+            "plain": {"x": None, "y": 1.5},
+        }
+        self.assertEqual(decode_data(encode_data(data)), data)
+
+    def test_unknown_value_rejected(self):
+        with self.assertRaises(TypeError):
+            encode_data({"obj": object()})
+
+    def test_evict_ignores_own_writes(self):
+        storage = PostgresStorage(cache_ttl=60)
+        storage._remember("1:2:3:0::default", state="A:b", data={})
+        storage.evict(f"{storage._origin}|1:2:3:0::default")
+        self.assertIsNotNone(storage._cached("1:2:3:0::default"))
+        storage.evict("other:1|1:2:3:0::default")
+        self.assertIsNone(storage._cached("1:2:3:0::default"))
+
+    def test_reconnect_clears_cache(self):
+        storage = PostgresStorage(cache_ttl=60)
+        storage._remember("k1", state=None, data={"a": 1})
+        storage._remember("k2", state="S:x", data={})
+        storage.evict("")
+        self.assertIsNone(storage._cached("k1"))
+        self.assertIsNone(storage._cached("k2"))
+
+    def test_cache_can_be_disabled(self):
+        storage = build_fsm_storage(cache_ttl=0)
+        if not isinstance(storage, PostgresStorage):
+            self.skipTest("FSM_STORAGE is not postgres")
+        storage._remember("k1", state="S:x", data={})
+        self.assertIsNone(storage._cached("k1"))
@@ -0,0 +1,41 @@
+import unittest
+from datetime import timedelta
+
+from shared.services.magic_links import create_magic_token, issue_magic_tokens, parse_signed_token, sign_magic_token
+from shared.utils import utc_now
+
+
+class TestMagicLinks(unittest.IsolatedAsyncioTestCase):
+    def test_signed_token_roundtrip(self):
+        exp = utc_now() + timedelta(minutes=5)
+        tok = sign_magic_token(user_id=42, scope="tasks", expires_at=exp, token_id="abc")
+        parsed = parse_signed_token(tok)
+        self.assertIsNotNone(parsed)
+        self.assertEqual(parsed[0], 42)
+        self.assertEqual(parsed[1], "tasks")
+        self.assertEqual(parsed[3], "abc")
+
+    def test_tampered_or_expired_token_rejected(self):
+        exp = utc_now() + timedelta(minutes=5)
+        tok = sign_magic_token(user_id=42, scope="tasks", expires_at=exp)
+        self.assertIsNone(parse_signed_token(tok.replace("42.", "43.", 1)))
+        self.assertIsNone(parse_signed_token(tok.replace(".tasks.", ".schedule.", 1)))
+        self.assertIsNone(parse_signed_token(tok, now=exp + timedelta(seconds=1)))
+        self.assertIsNone(parse_signed_token("0123456789abcdef0123456789abcdef"))
+
+    async def test_token_reused_per_recipient(self):
+        a = await create_magic_token(None, user_id=7, ttl_minutes=60, scope="tasks")
+        b = await create_magic_token(None, user_id=7, ttl_minutes=60, scope="tasks")
+        c = await create_magic_token(None, user_id=8, ttl_minutes=60, scope="tasks")
+        d = await create_magic_token(None, user_id=7, ttl_minutes=60, scope="schedule")
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertNotEqual(a, d)
+
+    async def test_batch_issue_shares_the_per_recipient_cache(self):
+        single = await create_magic_token(None, user_id=17, ttl_minutes=60, scope="schedule")
+        batch = issue_magic_tokens(user_ids=[17, 18, 18], ttl_minutes=60, scope="schedule")
+        self.assertEqual(list(batch), [17, 18])
+        self.assertEqual(batch[17], single)
+        self.assertEqual(parse_signed_token(batch[18])[:2], (18, "schedule"))
+
@@ -0,0 +1,33 @@
+import unittest
+from datetime import date, datetime, timezone
+
+from shared.services.partitions import (
+    HISTORY_CLOCK_SKEW,
+    add_months,
+    create_partition_sql,
+    history_since,
+    parse_partition_name,
+    partition_name,
+)
+
+
+class TestPartitions(unittest.TestCase):
+    def test_add_months_crosses_years(self):
+        self.assertEqual(add_months(date(2026, 11, 1), 3), date(2027, 2, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+
+    def test_partition_name_roundtrip(self):
+        name = partition_name("shift_instance_events", date(2026, 3, 1))
+        self.assertEqual(name, "shift_instance_events_p202603")
+        self.assertEqual(parse_partition_name(name), ("shift_instance_events", date(2026, 3, 1)))
+        self.assertIsNone(parse_partition_name("task_events_default"))
+
+    def test_create_partition_sql_bounds(self):
+        sql = create_partition_sql("task_events", date(2026, 12, 1))
+        self.assertIn('"task_events_p202612" PARTITION OF "task_events"', sql)
+        self.assertIn("FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')", sql)
+
+    def test_history_since(self):
+        self.assertIsNone(history_since(None))
+        naive = datetime(2026, 3, 1, 12, 0)
+        self.assertEqual(history_since(naive), naive.replace(tzinfo=timezone.utc) - HISTORY_CLOCK_SKEW)
@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+
+from bot.app.services.pg_listen_hub import PgListenHub
+
+
+class TestPgListenHub(unittest.IsolatedAsyncioTestCase):
+    async def test_notify_wakes_only_subscribers_of_channel(self):
+        hub = PgListenHub(dsn="postgresql://unused")
+        a1 = hub.subscribe("telegram_outbox")
+        a2 = hub.subscribe("telegram_outbox")
+        b = hub.subscribe("task_notifications")
+
+        hub._on_notify(None, 1, "telegram_outbox", "")
+        self.assertTrue(a1.is_set())
+        self.assertTrue(a2.is_set())
+        self.assertFalse(b.is_set())
+
+    async def test_reconnect_wakes_everyone(self):
+        hub = PgListenHub(dsn="postgresql://unused")
+        events = [hub.subscribe("a"), hub.subscribe("b")]
+        hub.wake_all()
+        self.assertTrue(all(e.is_set() for e in events))
+        self.assertEqual(sorted(hub.channels()), ["a", "b"])
+
+    async def test_late_subscriber_listens_on_live_connection(self):
+        class _Conn:
+            def __init__(self):
+                self.channels = []
+
+            async def add_listener(self, channel, cb):
+                self.channels.append(channel)
+
+        hub = PgListenHub(dsn="postgresql://unused")
+        hub._conn = _Conn()
+        hub.subscribe("late")
+        await asyncio.sleep(0)
+        self.assertEqual(hub._conn.channels, ["late"])
+
+    async def test_payload_callbacks_receive_notify_payload(self):
+        hub = PgListenHub(dsn="postgresql://unused")
+        seen = []
+        hub.on_payload("fsm_state", seen.append)
+        hub._on_notify(None, 1, "fsm_state", "origin|1:2:3")
+        hub.wake_all()
+        self.assertEqual(seen, ["origin|1:2:3", ""])
+        self.assertEqual(hub.channels(), ["fsm_state"])
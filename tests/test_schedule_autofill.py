@@ -0,0 +1,111 @@
+import unittest
+from datetime import date, time
+
+from fastapi import HTTPException
+
+from shared.services.schedule_autofill import CyclePattern, parse_bulk_autofill_body, plan_autofill
+
+
+START = time(10, 0)
+END = time(18, 0)
+WORK = ("work", START, END, 8)
+OFF = ("off", None, None, None)
+
+
+def _plan(patterns, existing=None, facts=None, *, overwrite=False, skip_fact_days=True):
+    return plan_autofill(
+        patterns=patterns,
+        date_from=date(2026, 4, 1),
+        date_to=date(2026, 4, 4),
+        existing=dict(existing or {}),
+        fact_days=set(facts or ()),
+        overwrite=overwrite,
+        skip_fact_days=skip_fact_days,
+        work_start=START,
+        work_end=END,
+    )
+
+
+class TestCyclePattern(unittest.TestCase):
+    def test_matches_single_user_autofill_cycle(self):
+        p = CyclePattern(user_id=1, x=2, y=2, anchor_day=date(2026, 4, 1))
+        days = [date(2026, 3, 30), date(2026, 3, 31), date(2026, 4, 1), date(2026, 4, 2), date(2026, 4, 3)]
+        self.assertEqual([p.is_work(d) for d in days], [False, False, True, True, False])
+
+    def test_anchor_off_starts_with_days_off(self):
+        p = CyclePattern(user_id=1, x=1, y=2, anchor_day=date(2026, 4, 1), anchor_is_work=False)
+        self.assertEqual([p.is_work(date(2026, 4, d)) for d in (1, 2, 3, 4)], [False, False, True, False])
+
+
+class TestPlanAutofill(unittest.TestCase):
+    def test_creates_rows_for_every_user_and_day(self):
+        plan = _plan([CyclePattern(1, 2, 2, date(2026, 4, 1)), CyclePattern(2, 1, 1, date(2026, 4, 2))])
+        self.assertEqual(plan.created, 8)
+        self.assertEqual([r["kind"] for r in plan.rows if r["user_id"] == 2], ["off", "work", "off", "work"])
+        self.assertEqual(plan.rows[0]["start_time"], START)
+
+    def test_without_overwrite_existing_and_fact_days_are_skipped(self):
+        plan = _plan(
+            [CyclePattern(1, 2, 2, date(2026, 4, 1))],
+            existing={(1, date(2026, 4, 1)): OFF},
+            facts={(1, date(2026, 4, 2))},
+        )
+        self.assertEqual((plan.created, plan.skipped_existing, plan.skipped_fact), (2, 1, 1))
+        self.assertEqual({r["day"] for r in plan.rows}, {date(2026, 4, 3), date(2026, 4, 4)})
+
+    def test_overwrite_updates_changed_rows_only_and_respects_facts(self):
+        plan = _plan(
+            [CyclePattern(1, 2, 2, date(2026, 4, 1))],
+            existing={(1, date(2026, 4, 1)): OFF, (1, date(2026, 4, 2)): WORK, (1, date(2026, 4, 3)): WORK},
+            facts={(1, date(2026, 4, 3))},
+            overwrite=True,
+        )
+        self.assertEqual((plan.created, plan.updated, plan.unchanged, plan.skipped_fact), (1, 1, 1, 1))
+        self.assertEqual(plan.diff[0], {"user_id": 1, "day": "2026-04-01", "from": "off", "to": "work"})
+
+        forced = _plan(
+            [CyclePattern(1, 2, 2, date(2026, 4, 1))],
+            existing={(1, date(2026, 4, 3)): WORK},
+            facts={(1, date(2026, 4, 3))},
+            overwrite=True,
+            skip_fact_days=False,
+        )
+        self.assertEqual((forced.created, forced.updated, forced.skipped_fact), (3, 1, 0))
+
+    def test_dry_run_dict_includes_diff(self):
+        plan = _plan([CyclePattern(1, 2, 2, date(2026, 4, 1))])
+        self.assertIn("diff", plan.as_dict(dry_run=True))
+        self.assertNotIn("diff", plan.as_dict(dry_run=False))
+
+
+class TestParseBulkAutofillBody(unittest.TestCase):
+    def test_per_user_patterns_win_over_shared_one(self):
+        patterns, date_from, date_to = parse_bulk_autofill_body(
+            {
+                "date_from": "2026-04-01",
+                "date_to": "2026-06-30",
+                "patterns": [{"user_id": 2, "x": 5, "y": 2, "anchor_day": "2026-04-06"}],
+                "user_ids": [1, 2],
+                "pattern": {"x": 2, "y": 2, "anchor_day": "2026-04-01", "anchor_is_work": False},
+            }
+        )
+        self.assertEqual((date_from, date_to), (date(2026, 4, 1), date(2026, 6, 30)))
+        self.assertEqual([(p.user_id, p.x) for p in patterns], [(2, 5), (1, 2)])
+        self.assertFalse(patterns[1].anchor_is_work)
+
+    def test_rejects_bad_input(self):
+        ok = {"user_id": 1, "x": 2, "y": 2, "anchor_day": "2026-04-01"}
+        for body in (
+            None,
+            {"date_from": "2026-04-02", "date_to": "2026-04-01", "patterns": [ok]},
+            {"date_from": "2026-01-01", "date_to": "2027-06-01", "patterns": [ok]},
+            {"date_from": "2026-04-01", "date_to": "2026-04-30", "patterns": []},
+            {"date_from": "2026-04-01", "date_to": "2026-04-30", "patterns": [{**ok, "x": 0}]},
+            {"date_from": "2026-04-01", "date_to": "2026-04-30", "user_ids": [1]},
+        ):
+            with self.assertRaises(HTTPException):
+                parse_bulk_autofill_body(body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from web.app.services.schedule_month_cache import ScheduleMonthCache, etag_matches, schedule_month_etag
+
+
+class TestScheduleMonthCache(unittest.TestCase):
+    def test_entry_valid_only_for_its_stamp(self):
+        cache = ScheduleMonthCache()
+        cache.put((2026, 4, None), "3.100", b"{}")
+        self.assertEqual(cache.get((2026, 4, None), "3.100"), b"{}")
+        self.assertIsNone(cache.get((2026, 4, None), "4.100"))
+        self.assertIsNone(cache.get((2026, 4, 7), "3.100"))
+
+    def test_lru_bound(self):
+        cache = ScheduleMonthCache(size=2)
+        cache.put((2026, 1, None), "1.0", b"a")
+        cache.put((2026, 2, None), "1.0", b"b")
+        cache.get((2026, 1, None), "1.0")
+        cache.put((2026, 3, None), "1.0", b"c")
+        self.assertIsNotNone(cache.get((2026, 1, None), "1.0"))
+        self.assertIsNone(cache.get((2026, 2, None), "1.0"))
+
+    def test_etag_depends_on_mode_and_matches_if_none_match(self):
+        all_tag = schedule_month_etag(year=2026, month=4, target_user_id=None, stamp="3.100")
+        user_tag = schedule_month_etag(year=2026, month=4, target_user_id=7, stamp="3.100")
+        self.assertNotEqual(all_tag, user_tag)
+        self.assertTrue(etag_matches(f'"x", {all_tag}', all_tag))
+        self.assertTrue(etag_matches(all_tag.removeprefix("W/"), all_tag))
+        self.assertFalse(etag_matches(user_tag, all_tag))
+        self.assertFalse(etag_matches(None, all_tag))
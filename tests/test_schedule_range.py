@@ -0,0 +1,57 @@
+import unittest
+from datetime import date, time
+
+from fastapi import HTTPException
+
+from web.app.services.schedule_range import RANGE_COLUMNS, build_range_payload, parse_month_range, schedule_range_etag
+
+
+START = time(10, 0)
+END = time(18, 0)
+
+
+class TestParseMonthRange(unittest.TestCase):
+    def test_bounds_cover_whole_months(self):
+        self.assertEqual(parse_month_range("2026-11", "2027-02"), (date(2026, 11, 1), date(2027, 2, 28)))
+
+    def test_rejects_bad_ranges(self):
+        for start, end in (("2026-13", "2026-12"), ("2026-05", "2026-04"), ("2026-01", "2027-01"), ("x", "2026-01")):
+            with self.assertRaises(HTTPException):
+                parse_month_range(start, end)
+
+
+class TestBuildRangePayload(unittest.TestCase):
+    def test_columnar_payload(self):
+        payload = build_range_payload(
+            date_from=date(2026, 4, 1),
+            date_to=date(2026, 6, 30),
+            users=[(7, "Анна", "#f00"), (3, "Борис", "#0f0")],
+            plan_rows=[
+                (3, date(2026, 4, 2), "work", None, None),
+                (7, date(2026, 4, 2), "work", time(9, 0), time(21, 0)),
+                (7, date(2026, 4, 3), "off", time(9, 0), None),
+                (99, date(2026, 4, 3), "work", None, None),
+            ],
+            facts={(3, date(2026, 4, 2)): "closed", (7, date(2026, 5, 1)): "started"},
+            work_start=START,
+            work_end=END,
+        )
+        self.assertEqual(payload["columns"], list(RANGE_COLUMNS))
+        self.assertEqual([u["id"] for u in payload["users"]], [7, 3])
+        self.assertEqual(
+            payload["days"]["2026-04-02"],
+            [[0, "work", "09:00", "21:00", None], [1, "work", "10:00", "18:00", "closed"]],
+        )
+        self.assertEqual(payload["days"]["2026-04-03"], [[0, "off", None, None, None]])
+        self.assertEqual(payload["days"]["2026-05-01"], [[0, None, None, None, "started"]])
+        self.assertEqual(list(payload["days"]), ["2026-04-02", "2026-04-03", "2026-05-01"])
+
+    def test_etag_depends_on_mode_and_stamp(self):
+        a = schedule_range_etag(date_from=date(2026, 1, 1), date_to=date(2026, 12, 31), work_only=True, stamp="5.1")
+        b = schedule_range_etag(date_from=date(2026, 1, 1), date_to=date(2026, 12, 31), work_only=False, stamp="5.1")
+        c = schedule_range_etag(date_from=date(2026, 1, 1), date_to=date(2026, 12, 31), work_only=True, stamp="6.1")
+        self.assertEqual(len({a, b, c}), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
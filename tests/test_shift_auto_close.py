@@ -0,0 +1,54 @@
+import unittest
+from datetime import date, datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from shared.enums import ShiftInstanceStatus
+from shared.services.shift_auto_close import AutoClosedShift, auto_close_message, overdue_close_stmt
+from shared.services.telegram_outbox import KIND_MESSAGE
+
+
+NOW = datetime(2026, 4, 6, 15, 0, tzinfo=timezone.utc)
+
+
+class TestOverdueCloseStmt(unittest.TestCase):
+    def test_only_todays_plan_rows_are_closed_and_approved(self):
+        # 23:30 UTC on the 6th is already the 7th in Moscow.
+        late = datetime(2026, 4, 6, 23, 30, tzinfo=timezone.utc)
+        compiled = overdue_close_stmt(now=late, tz_name="Europe/Moscow").compile(dialect=postgresql.dialect())
+        sql, params = str(compiled), compiled.params
+        self.assertIn("work_shift_days.day = %(day_1)s", sql)
+        self.assertEqual(params["day_1"], date(2026, 4, 7))
+        self.assertIn("shift_instances.status = %(status_1)s", sql)
+        self.assertEqual(params["status_1"], ShiftInstanceStatus.STARTED)
+        self.assertIn("shift_instances.ended_at IS NULL", sql)
+
+        self.assertEqual(params["status"], ShiftInstanceStatus.APPROVED)
+        self.assertIs(params["approval_required"], False)
+        self.assertEqual(params["ended_at"], late)
+        for col in ("amount_default", "amount_submitted", "amount_approved"):
+            self.assertIn(f"{col}=coalesce(nullif(shift_instances.amount_default, ", sql)
+        self.assertTrue(
+            sql.rstrip().endswith(
+                "RETURNING shift_instances.id, work_shift_days.id AS id_1, users.id AS id_2, users.tg_id, "
+                "shift_instances.amount_approved, shift_instances.day"
+            )
+        )
+        self.assertNotIn("work_shift_days.id IN", sql)
+
+    def test_can_be_limited_to_plan_rows(self):
+        compiled = overdue_close_stmt(now=NOW, tz_name="Europe/Moscow", wsd_ids=[5]).compile(dialect=postgresql.dialect())
+        self.assertIn("work_shift_days.id IN", str(compiled))
+        self.assertEqual(compiled.params["day_1"], date(2026, 4, 6))
+
+
+class TestAutoCloseMessage(unittest.TestCase):
+    def test_confirmation_with_edit_button(self):
+        item = auto_close_message(AutoClosedShift(shift_id=7, wsd_id=3, user_id=2, tg_id=1002, amount=2500))
+        self.assertEqual((item.kind, item.chat_id, item.dedupe_key), (KIND_MESSAGE, 1002, "shift_auto_close:7"))
+        self.assertIn("<b>2500 ₽</b>", item.payload["text"])
+        self.assertEqual(item.payload["reply_markup"]["inline_keyboard"][0][0]["callback_data"], "shift:close_edit:7")
+
+
+if __name__ == "__main__":
+    unittest.main()
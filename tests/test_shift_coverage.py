@@ -0,0 +1,69 @@
+import unittest
+from datetime import date, datetime, time, timezone
+
+from shared.services.shift_coverage import (
+    build_coverage,
+    fact_interval,
+    format_understaffed_alert,
+    hourly_headcount,
+    plan_interval,
+    understaffed_hours,
+)
+
+
+DAY = date(2026, 4, 1)
+
+
+class TestHourlyHeadcount(unittest.TestCase):
+    def test_partial_hours_count_and_empty_spans_are_ignored(self):
+        counts = hourly_headcount([(9 * 60 + 30, 18 * 60), (10 * 60, 12 * 60), (15 * 60, 15 * 60)])
+        self.assertEqual(counts[8], 0)
+        self.assertEqual(counts[9], 1)
+        self.assertEqual(counts[10:12], [2, 2])
+        self.assertEqual(counts[12:18], [1] * 6)
+        self.assertEqual(counts[18], 0)
+        self.assertEqual(len(counts), 24)
+
+    def test_understaffed_hours_within_open_window(self):
+        counts = hourly_headcount([(11 * 60, 14 * 60)])
+        self.assertEqual(understaffed_hours(counts, min_staff=1, open_hour=10, close_hour=16), [10, 14, 15])
+
+
+class TestIntervals(unittest.TestCase):
+    def test_plan_defaults_and_overnight(self):
+        self.assertEqual(plan_interval(DAY, None, None), (DAY, 600, 1080))
+        self.assertEqual(plan_interval(DAY, time(20, 0), time(2, 0)), (DAY, 1200, 1440))
+
+    def test_fact_uses_local_time_and_plan_end_while_open(self):
+        started = datetime(2026, 4, 1, 7, 15, tzinfo=timezone.utc)  # 10:15 MSK
+        ended = datetime(2026, 4, 1, 14, 0, tzinfo=timezone.utc)  # 17:00 MSK
+        self.assertEqual(fact_interval(DAY, started_at=started, ended_at=ended, plan_end=None), (DAY, 615, 1020))
+        self.assertEqual(fact_interval(DAY, started_at=started, ended_at=None, plan_end=time(19, 0)), (DAY, 615, 1140))
+
+
+class TestBuildCoverage(unittest.TestCase):
+    def test_planned_vs_actual_and_alert(self):
+        other = date(2026, 4, 2)
+        payload = build_coverage(
+            days=[DAY, other],
+            planned=[(DAY, 600, 1080), (DAY, 600, 840)],
+            actual=[(DAY, 615, 1020)],
+            min_staff=2,
+            open_hour=10,
+            close_hour=18,
+        )
+        day = payload["days"]["2026-04-01"]
+        self.assertEqual(day["planned"][10:18], [2, 2, 2, 2, 1, 1, 1, 1])
+        self.assertEqual(day["actual"][10:18], [1] * 7 + [0])
+        self.assertEqual((day["planned_staff"], day["started_staff"]), (2, 1))
+        # Nobody is planned on the 2nd (a day off), so it is not reported as understaffed.
+        self.assertEqual(payload["days"]["2026-04-02"]["understaffed_hours"], [])
+        self.assertEqual(payload["understaffed"], [{"day": "2026-04-01", "hours": [14, 15, 16, 17]}])
+
+        text = format_understaffed_alert(day=DAY, hours=[10, 11, 14, 15], planned=[0] * 14 + [1, 1] + [0] * 8)
+        self.assertIn("10:00–12:00 · 0 чел.", text)
+        self.assertIn("14:00–16:00 · 1 чел.", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
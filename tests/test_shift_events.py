@@ -0,0 +1,69 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
+
+from shared.services import shift_events
+from shared.services.shift_events import (
+    ALL_EVENTS,
+    SHIFT_AMOUNT_APPROVED,
+    SHIFT_CLOSED,
+    SHIFT_RESYNC,
+    ShiftEvent,
+    dispatch,
+    subscribe,
+    unsubscribe,
+)
+
+
+DAY = date(2026, 4, 6)
+
+
+class TestShiftEvent(unittest.TestCase):
+    def test_of_shift_and_payload_round_trip(self):
+        shift = SimpleNamespace(id=7, user_id=3, day=DAY, amount_approved=2500, amount_submitted=3000)
+        ev = ShiftEvent.of(SHIFT_AMOUNT_APPROVED, shift, actor_user_id=1)
+        self.assertEqual((ev.shift_id, ev.user_id, ev.day, ev.amount), (7, 3, DAY, 2500))
+        self.assertEqual(ShiftEvent.of(SHIFT_CLOSED, shift).amount, 3000)
+
+        origin, back = ShiftEvent.from_payload(ev.to_payload(origin="p1"))
+        self.assertEqual((origin, back), ("p1", ev))
+        self.assertIsNone(ShiftEvent.from_payload("2026-04-06"))
+
+
+class TestDispatch(unittest.IsolatedAsyncioTestCase):
+    async def test_remote_events_reach_only_remote_subscribers(self):
+        local, remote = mock.Mock(), mock.AsyncMock()
+        subscribe(SHIFT_CLOSED, local)
+        subscribe(ALL_EVENTS, remote, remote=True)
+        try:
+            ev = ShiftEvent(type=SHIFT_CLOSED, shift_id=1, user_id=2, day=DAY)
+            await dispatch(ev)
+            await dispatch(ev, remote=True)
+            self.assertEqual(local.call_count, 1)
+            self.assertEqual(remote.await_count, 2)
+        finally:
+            unsubscribe(SHIFT_CLOSED, local)
+            unsubscribe(ALL_EVENTS, remote)
+
+    async def test_notify_skips_own_events_and_resyncs_on_reconnect(self):
+        seen: list[ShiftEvent] = []
+
+        def handler(event: ShiftEvent) -> None:
+            seen.append(event)
+
+        subscribe(ALL_EVENTS, handler, remote=True)
+        try:
+            ev = ShiftEvent(type=SHIFT_CLOSED, shift_id=1, user_id=2, day=DAY)
+            shift_events.on_notify(ev.to_payload())
+            shift_events.on_notify(ev.to_payload(origin="other"))
+            shift_events.on_notify("")
+            for task in list(shift_events._remote_tasks):
+                await task
+            self.assertEqual([e.type for e in seen if e.shift_id == 1 or e.type == SHIFT_RESYNC], [SHIFT_CLOSED, SHIFT_RESYNC])
+        finally:
+            unsubscribe(ALL_EVENTS, handler)
+
+
+if __name__ == "__main__":
+    unittest.main()
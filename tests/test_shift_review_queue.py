@@ -0,0 +1,58 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy.dialects import postgresql
+
+from shared.enums import SalaryShiftState, ShiftInstanceStatus
+from shared.services.shift_review_queue import (
+    _queue_keys,
+    format_review_cursor,
+    is_approval_pending,
+    is_salary_unconfirmed,
+    parse_review_cursor,
+)
+
+
+class TestReviewCursor(unittest.TestCase):
+    def test_round_trip_and_head(self):
+        key = (date(2026, 4, 6), 123)
+        self.assertEqual(format_review_cursor(key), "20260406-123")
+        self.assertEqual(parse_review_cursor(format_review_cursor(key)), key)
+        self.assertEqual(format_review_cursor(None), "0")
+        self.assertIsNone(parse_review_cursor("0"))
+        self.assertIsNone(parse_review_cursor(None))
+        with self.assertRaises(ValueError):
+            parse_review_cursor("2026-04-06")
+
+
+class TestReviewReasons(unittest.TestCase):
+    def test_approval_pending(self):
+        self.assertTrue(is_approval_pending(ShiftInstanceStatus.PENDING_APPROVAL, False))
+        self.assertTrue(is_approval_pending(ShiftInstanceStatus.CLOSED, True))
+        self.assertFalse(is_approval_pending(ShiftInstanceStatus.NEEDS_REWORK, True))
+        self.assertFalse(is_approval_pending(ShiftInstanceStatus.APPROVED, False))
+
+    def test_salary_unconfirmed(self):
+        self.assertFalse(is_salary_unconfirmed(None, None, None, None))
+        self.assertFalse(is_salary_unconfirmed(SalaryShiftState.WORKED, Decimal("0.00"), None, None))
+        self.assertTrue(is_salary_unconfirmed(SalaryShiftState.WORKED, Decimal("2"), None, None))
+        self.assertTrue(is_salary_unconfirmed(SalaryShiftState.SKIP, None, None, None))
+        self.assertFalse(is_salary_unconfirmed(SalaryShiftState.SKIP, None, None, object()))
+
+
+class TestQueueKeys(unittest.TestCase):
+    def test_branches_use_partial_index_predicates_and_keyset(self):
+        sql = str(
+            _queue_keys(after=(date(2026, 4, 6), 5), at_or_above=None, include_salary=True)
+            .element.compile(dialect=postgresql.dialect())
+        )
+        self.assertIn("status = 'pending_approval' OR (approval_required AND status <> 'needs_rework')", sql)
+        self.assertIn("confirmed_at IS NULL", sql)
+        self.assertIn("UNION", sql)
+        self.assertIn("(shift_instances.day, shift_instances.id) <", sql)
+        self.assertNotIn("OFFSET", sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
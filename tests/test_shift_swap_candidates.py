@@ -0,0 +1,26 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from shared.services.shift_swap_candidates import SwapCandidate, plan_swap_waves
+
+
+class TestPlanSwapWaves(unittest.TestCase):
+    def test_candidates_are_split_into_timed_waves_in_rank_order(self):
+        now = datetime(2026, 4, 1, 9, 0, tzinfo=timezone.utc)
+        cands = [SwapCandidate(user_id=i, tg_id=1000 + i, recent_load=i, accepted_swaps=0) for i in range(1, 6)]
+        waves = plan_swap_waves(cands, wave_size=2, wave_interval=timedelta(minutes=10), now=now)
+        self.assertEqual([c.user_id for c, _ in waves], [1, 2, 3, 4, 5])
+        self.assertEqual(
+            [int((at - now).total_seconds() // 60) for _, at in waves],
+            [0, 0, 10, 10, 20],
+        )
+
+    def test_zero_wave_size_still_sends_one_by_one(self):
+        now = datetime(2026, 4, 1, tzinfo=timezone.utc)
+        cands = [SwapCandidate(user_id=i, tg_id=i, recent_load=0, accepted_swaps=0) for i in (1, 2)]
+        waves = plan_swap_waves(cands, wave_size=0, wave_interval=timedelta(minutes=5), now=now)
+        self.assertEqual([at for _, at in waves], [now, now + timedelta(minutes=5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from datetime import date, datetime, time, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from bot.app.services.shift_timers import KIND_END, KIND_START, shift_timer_plan, timer_is_current
+from shared.enums import ShiftInstanceStatus
+
+
+TZ = ZoneInfo("Europe/Moscow")
+DAY = date(2026, 4, 6)
+
+
+def _wsd(**kw):
+    base = dict(
+        id=1,
+        day=DAY,
+        start_time=time(9, 0),
+        end_time=time(18, 0),
+        start_notified_at=None,
+        end_notified_at=None,
+        end_snooze_until=None,
+    )
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def _shift(status, ended_at=None):
+    return SimpleNamespace(status=status, ended_at=ended_at)
+
+
+class TestShiftTimerPlan(unittest.TestCase):
+    def test_fresh_plan_has_start_and_end(self):
+        plan = shift_timer_plan(wsd=_wsd(), shift=None, tz=TZ)
+        self.assertEqual(plan[KIND_START], datetime(2026, 4, 6, 9, 0, tzinfo=TZ))
+        self.assertEqual(plan[KIND_END], datetime(2026, 4, 6, 18, 0, tzinfo=TZ))
+
+    def test_started_shift_needs_no_start_reminder(self):
+        plan = shift_timer_plan(wsd=_wsd(), shift=_shift(ShiftInstanceStatus.STARTED), tz=TZ)
+        self.assertNotIn(KIND_START, plan)
+        self.assertIn(KIND_END, plan)
+
+    def test_done_after_end_handled_and_shift_closed(self):
+        wsd = _wsd(start_notified_at=datetime(2026, 4, 6, 6, 0, tzinfo=timezone.utc), end_notified_at=datetime(2026, 4, 6, 15, 0, tzinfo=timezone.utc))
+        plan = shift_timer_plan(wsd=wsd, shift=_shift(ShiftInstanceStatus.CLOSED, ended_at=datetime(2026, 4, 6, 15, 0, tzinfo=timezone.utc)), tz=TZ)
+        self.assertEqual(plan, {})
+
+    def test_snooze_moves_auto_close(self):
+        snooze = datetime(2026, 4, 6, 16, 30, tzinfo=timezone.utc)
+        wsd = _wsd(end_notified_at=datetime(2026, 4, 6, 15, 0, tzinfo=timezone.utc), end_snooze_until=snooze)
+        plan = shift_timer_plan(wsd=wsd, shift=_shift(ShiftInstanceStatus.STARTED), tz=TZ)
+        self.assertEqual(plan[KIND_END], snooze.astimezone(TZ))
+
+
+class TestTimerIsCurrent(unittest.TestCase):
+    def test_past_due_job_is_not_re_added(self):
+        now = datetime(2026, 4, 6, 12, 0, tzinfo=TZ)
+        due = datetime(2026, 4, 6, 9, 0, tzinfo=TZ)
+        # Added on an earlier reconcile at that run's "now"; still pending, fires immediately.
+        self.assertTrue(timer_is_current(datetime(2026, 4, 6, 11, 59, tzinfo=TZ), due=due, now=now))
+
+    def test_moved_or_missing_job_is_rescheduled(self):
+        now = datetime(2026, 4, 6, 12, 0, tzinfo=TZ)
+        due = datetime(2026, 4, 6, 18, 0, tzinfo=TZ)
+        self.assertTrue(timer_is_current(due, due=due, now=now))
+        self.assertFalse(timer_is_current(datetime(2026, 4, 6, 17, 0, tzinfo=TZ), due=due, now=now))
+        self.assertFalse(timer_is_current(datetime(2026, 4, 6, 11, 0, tzinfo=TZ), due=due, now=now))
+        self.assertFalse(timer_is_current(None, due=due, now=now))
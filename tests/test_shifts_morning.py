@@ -0,0 +1,46 @@
+import unittest
+from datetime import date, time
+from types import SimpleNamespace
+
+from bot.app.services.reminders_scheduler import build_coverage_alerts, build_morning_shift_messages, coverage_alert_text
+from shared.services.telegram_outbox import KIND_MESSAGE
+
+
+class TestMorningShiftMessages(unittest.TestCase):
+    def test_one_message_per_recipient_with_own_link(self):
+        rows = [
+            SimpleNamespace(id=11, user_id=1, tg_id=1001, hours=8),
+            SimpleNamespace(id=12, user_id=2, tg_id=None, hours=8),
+            SimpleNamespace(id=13, user_id=3, tg_id=1003, hours=None),
+        ]
+        items = build_morning_shift_messages(
+            rows, day=date(2026, 4, 1), tokens={1: "tok-1", 2: "tok-2", 3: "tok-3"}, base_url="https://crm.example"
+        )
+        self.assertEqual([(i.kind, i.chat_id, i.dedupe_key) for i in items], [
+            (KIND_MESSAGE, 1001, "shifts_morning:11"),
+            (KIND_MESSAGE, 1003, "shifts_morning:13"),
+        ])
+        self.assertIn("(8ч)", items[0].payload["text"])
+        self.assertIn("https://crm.example/crm/auth/tg?t=tok-1&", items[0].payload["text"])
+        self.assertEqual(items[1].payload["reply_markup"]["inline_keyboard"][2][0]["url"].split("t=")[1][:5], "tok-3")
+        self.assertEqual(items[0].payload["reply_markup"]["inline_keyboard"][0][0]["callback_data"], "shift:start:2026-04-01")
+
+    def test_coverage_alert_only_when_short(self):
+        day = date(2026, 4, 1)
+        self.assertIsNone(coverage_alert_text([SimpleNamespace(start_time=time(9, 0), end_time=time(21, 0))], day=day))
+        # Nobody planned (a day off): nothing to alert about.
+        self.assertIsNone(coverage_alert_text([], day=day))
+
+        text = coverage_alert_text([SimpleNamespace(start_time=time(12, 0), end_time=None)], day=day)
+        self.assertIn("10:00–12:00 · 0 чел.", text)
+
+    def test_coverage_alert_goes_to_every_recipient(self):
+        items = build_coverage_alerts("alert", day=date(2026, 4, 1), recipients=[1, 2])
+        self.assertEqual([(i.chat_id, i.dedupe_key, i.payload["text"]) for i in items], [
+            (1, "shift_coverage_alert:2026-04-01:1", "alert"),
+            (2, "shift_coverage_alert:2026-04-01:2", "alert"),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
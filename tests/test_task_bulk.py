@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi import HTTPException
+
+from shared.services import task_bulk
+from shared.services.task_bulk import (
+    MAX_BULK_TASKS,
+    _TaskRow,
+    newly_assigned,
+    normalize_task_ids,
+    render_bulk_assigned_text,
+    render_bulk_status_text,
+)
+
+
+def _row(tid: int, *assignees: int) -> _TaskRow:
+    return _TaskRow(
+        id=tid,
+        title=f"Задача {tid}",
+        status="new",
+        priority="normal",
+        created_by_user_id=1,
+        started_by_user_id=None,
+        assignee_ids=tuple(assignees),
+    )
+
+
+class _FakeNotifications:
+    def __init__(self, session):
+        self.enqueued: list[dict] = []
+        _FakeNotifications.last = self
+
+    async def resolve_recipients_tg_ids(self, *, user_ids):
+        return {uid: (0 if uid == 30 else 1000 + uid) for uid in user_ids}
+
+    async def enqueue(self, **kw):
+        self.enqueued.append(kw)
+
+
+class TestTaskBulk(unittest.TestCase):
+    def test_normalize_task_ids_dedupes_and_keeps_order(self):
+        self.assertEqual(normalize_task_ids([3, "1", 3, 0, -2, 2]), [3, 1, 2])
+
+    def test_normalize_task_ids_rejects_bad_input(self):
+        for raw in (None, "1,2", [], ["x"], list(range(1, MAX_BULK_TASKS + 2))):
+            with self.assertRaises(HTTPException):
+                normalize_task_ids(raw)
+
+    def test_render_bulk_status_text_escapes_and_truncates(self):
+        items = [{"task_id": i, "title": f"<t{i}>", "from": "review"} for i in range(1, 36)]
+        text = render_bulk_status_text({"items": items, "to": "done", "actor_name": "Иван"})
+        self.assertIn("35 задач → Выполнено", text)
+        self.assertIn("&lt;t1&gt;", text)
+        self.assertNotIn("<t1>", text)
+        self.assertIn("… и ещё 5", text)
+        self.assertIn("Иван", text)
+
+    def test_newly_assigned_skips_existing_assignees_and_actor(self):
+        rows = [_row(1), _row(2, 10), _row(3, 10, 20)]
+        by_recipient = newly_assigned(rows, [10, 20, 99], actor_id=99)
+        self.assertEqual({k: [r.id for r in v] for k, v in by_recipient.items()}, {10: [1], 20: [1, 2]})
+        self.assertEqual(newly_assigned(rows, [], actor_id=99), {})
+
+    def test_assigned_notifications_fold_per_recipient(self):
+        rows = [_row(1), _row(2, 10), _row(3)]
+        by_recipient = newly_assigned(rows, [10, 20, 30], actor_id=5)
+        actor = SimpleNamespace(id=5, first_name="Иван", last_name="Петров")
+        with mock.patch.object(task_bulk, "TaskNotificationService", _FakeNotifications):
+            asyncio.run(
+                task_bulk._enqueue_bulk_assigned_notifications(
+                    session=None, actor=actor, by_recipient=by_recipient, event_ids={1: 71, 2: 72, 3: 73}
+                )
+            )
+        sent = _FakeNotifications.last.enqueued
+        # User 30 has no Telegram id, user 10 already had task 2.
+        self.assertEqual([(n["recipient_user_id"], n["payload"]["task_ids"]) for n in sent], [(10, [1, 3]), (20, [1, 2, 3])])
+        self.assertEqual({n["type"] for n in sent}, {"bulk_assigned"})
+        self.assertEqual({n["dedupe_key"] for n in sent}, {"bulk_assigned:71"})
+        self.assertEqual(sent[0]["payload"]["actor_name"], "Иван Петров")
+
+    def test_render_bulk_assigned_text_escapes_and_truncates(self):
+        items = [{"task_id": i, "title": f"<t{i}>"} for i in range(1, 33)]
+        text = render_bulk_assigned_text({"items": items, "actor_name": "Иван"})
+        self.assertIn("Вам назначены задачи: 32", text)
+        self.assertIn("&lt;t1&gt;", text)
+        self.assertIn("… и ещё 2", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from bot.app.services.task_notifications_worker import _coalesce_digests, _dispatch, _next_wait_seconds, _Outgoing
+from bot.app.utils.rate_limit import AsyncRateLimiter
+
+
+class _FakeBot:
+    def __init__(self, *, flood_chat: int | None = None):
+        self.sent: list[tuple[int, str]] = []
+        self.edited: list[tuple[int, int, str]] = []
+        self.active = 0
+        self.max_active = 0
+        self.flood_chat = flood_chat
+        self._next_id = 100
+
+    async def send_message(self, *, chat_id, text, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if chat_id == self.flood_chat and text == "b":
+                raise TelegramRetryAfter(method=SendMessage(chat_id=chat_id, text=text), message="flood", retry_after=7)
+            self._next_id += 1
+            self.sent.append((int(chat_id), str(text)))
+            return SimpleNamespace(message_id=self._next_id)
+        finally:
+            self.active -= 1
+
+    async def edit_message_text(self, *, chat_id, message_id, text, **kwargs):
+        self.edited.append((int(chat_id), int(message_id), str(text)))
+
+
+def _out(chat_id: int, text: str, *, task_id: int = 1, force_new: bool = True) -> _Outgoing:
+    return _Outgoing(
+        n=None,
+        chat_id=chat_id,
+        task_id=task_id,
+        typ="status_changed",
+        text=text,
+        kb=None,
+        task=None,
+        payload={},
+        force_new=force_new,
+    )
+
+
+class TestTaskNotificationsDispatch(unittest.IsolatedAsyncioTestCase):
+    async def test_chats_run_concurrently_and_keep_order(self):
+        bot = _FakeBot()
+        items = [_out(chat, f"{chat}-{i}") for i in range(3) for chat in (1, 2, 3)]
+        await _dispatch(bot=bot, outgoing=items, limiter=AsyncRateLimiter(rate_per_sec=1000, burst=100), max_concurrent_chats=3)
+        self.assertGreater(bot.max_active, 1)
+        for chat in (1, 2, 3):
+            self.assertEqual([t for c, t in bot.sent if c == chat], [f"{chat}-0", f"{chat}-1", f"{chat}-2"])
+
+    async def test_same_task_edits_message_sent_earlier_in_batch(self):
+        bot = _FakeBot()
+        first = _out(5, "first")
+        second = _out(5, "second", force_new=False)
+        await _dispatch(bot=bot, outgoing=[first, second], limiter=AsyncRateLimiter(rate_per_sec=1000, burst=100), max_concurrent_chats=2)
+        self.assertEqual(len(bot.sent), 1)
+        self.assertTrue(second.edited)
+        self.assertEqual(second.delivered, first.delivered)
+
+    async def test_flood_control_defers_rest_of_chat_only(self):
+        bot = _FakeBot(flood_chat=1)
+        a, b, c = _out(1, "a"), _out(1, "b"), _out(1, "c")
+        other = _out(2, "x")
+        await _dispatch(bot=bot, outgoing=[a, b, c, other], limiter=AsyncRateLimiter(rate_per_sec=1000, burst=100), max_concurrent_chats=2)
+        self.assertIsNone(a.retry_after)
+        self.assertEqual((b.retry_after, c.retry_after), (7, 7))
+        self.assertIsNotNone(other.delivered)
+        self.assertNotIn((1, "c"), bot.sent)
+
+
+class TestDigestCoalescing(unittest.TestCase):
+    def _routine(self, chat_id: int, task_id: int, text: str) -> _Outgoing:
+        o = _out(chat_id, text, task_id=task_id, force_new=False)
+        o.typ = "comment"
+        o.n = SimpleNamespace(id=text)
+        o.payload = {"actor_name": "Иван", "text": text}
+        o.task = SimpleNamespace(title=f"Задача {task_id}")
+        o.board_url = "https://example.org/crm/tasks"
+        return o
+
+    def test_routine_updates_fold_into_one_digest_in_place(self):
+        created = _out(1, "created")
+        a = self._routine(1, 10, "a")
+        b = self._routine(1, 11, "b")
+        other_chat = self._routine(2, 10, "x")
+        out = _coalesce_digests([a, created, b, other_chat])
+
+        self.assertEqual([o.typ for o in out], ["status_changed", "digest", "comment"])
+        digest = out[1]
+        self.assertEqual(digest.merged, [a.n])
+        self.assertTrue(digest.force_new)
+        self.assertIn("Задача 10", digest.text)
+        self.assertIn("Задача 11", digest.text)
+
+    def test_single_task_digest_edits_last_message(self):
+        a = self._routine(1, 10, "a")
+        b = self._routine(1, 10, "b")
+        b.edit_target = (1, 555)
+        (digest,) = _coalesce_digests([a, b])
+        self.assertFalse(digest.force_new)
+        self.assertEqual(digest.edit_target, (1, 555))
+        self.assertEqual(digest.digest_tasks, 1)
+
+    def test_force_new_items_are_never_folded(self):
+        items = [_out(1, "x"), _out(1, "y")]
+        self.assertEqual(_coalesce_digests(items), items)
+
+
+class TestWorkerWait(unittest.TestCase):
+    def test_locked_due_rows_back_off_up_to_poll_interval(self):
+        now = datetime(2026, 4, 6, 9, 0, tzinfo=timezone.utc)
+        past = now - timedelta(seconds=5)
+        waits = [_next_wait_seconds(due_at=past, now=now, poll_seconds=20, empty_claims=k) for k in range(8)]
+        self.assertEqual(waits, [0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 20.0, 20.0])
+
+    def test_future_due_and_idle(self):
+        now = datetime(2026, 4, 6, 9, 0, tzinfo=timezone.utc)
+        self.assertEqual(_next_wait_seconds(due_at=now + timedelta(seconds=7), now=now, poll_seconds=20, empty_claims=0), 7.0)
+        self.assertEqual(_next_wait_seconds(due_at=now + timedelta(hours=1), now=now, poll_seconds=20, empty_claims=0), 20.0)
+        self.assertEqual(_next_wait_seconds(due_at=None, now=now, poll_seconds=20, empty_claims=3), 20.0)
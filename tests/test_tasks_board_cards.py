@@ -0,0 +1,104 @@
+import itertools
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from shared.enums import TaskPriority, TaskStatus
+from shared.services.task_permissions import TaskPermissionSubject, task_permissions, task_permissions_many
+from shared.utils import format_moscow
+from web.app.services.tasks_board import TaskCardContext, build_task_card_views
+
+
+class TestTaskPermissionsMany(unittest.TestCase):
+    def test_matches_single_evaluation(self):
+        actor = 10
+        subjects = []
+        for st, assignees, started_by, created_by in itertools.product(
+            [s.value for s in TaskStatus],
+            [[], [10], [11], [10, 11]],
+            [None, 10, 11],
+            [None, 10, 11],
+        ):
+            subjects.append(
+                TaskPermissionSubject(
+                    status=st,
+                    created_by_user_id=created_by,
+                    assignee_user_ids=tuple(assignees),
+                    started_by_user_id=started_by,
+                )
+            )
+        for is_admin, is_manager in [(False, False), (True, False), (False, True)]:
+            batch = task_permissions_many(
+                subjects=subjects, actor_user_id=actor, is_admin=is_admin, is_manager=is_manager
+            )
+            for s, p in zip(subjects, batch):
+                single = task_permissions(
+                    status=s.status,
+                    actor_user_id=actor,
+                    created_by_user_id=s.created_by_user_id,
+                    assignee_user_ids=list(s.assignee_user_ids),
+                    started_by_user_id=s.started_by_user_id,
+                    is_admin=is_admin,
+                    is_manager=is_manager,
+                )
+                self.assertEqual(p, single, msg=str(s))
+
+
+class TestBuildTaskCardViews(unittest.TestCase):
+    def _task(self, **kw):
+        u1 = SimpleNamespace(id=1, first_name="Иван", last_name="Петров", color="#fff")
+        u2 = SimpleNamespace(id=2, first_name="", last_name=None, color=None)
+        base = dict(
+            id=5,
+            title="T",
+            description="  ",
+            status=TaskStatus.IN_PROGRESS,
+            priority=TaskPriority.URGENT,
+            due_at=datetime(2026, 3, 1, 21, 30, tzinfo=timezone.utc),
+            created_at=datetime(2026, 2, 28, 9, 5, tzinfo=timezone.utc),
+            created_by_user_id=1,
+            created_by_user=u1,
+            started_by_user_id=None,
+            assignees=[u1, u2],
+            photo_url=None,
+            photo_path=None,
+            tg_photo_file_id="abc",
+            photo_file_id=None,
+        )
+        base.update(kw)
+        return SimpleNamespace(**base)
+
+    def test_card_fields(self):
+        t = self._task()
+        ctx = TaskCardContext.create(
+            actor_id=2, is_admin=False, is_manager=False, now=datetime(2026, 3, 2, tzinfo=timezone.utc)
+        )
+        (v,) = build_task_card_views([t], ctx=ctx, with_permissions=True)
+        self.assertEqual(v["due_at_str"], format_moscow(t.due_at))
+        self.assertEqual(v["created_at_str"], format_moscow(t.created_at))
+        self.assertEqual(v["assignees_str"], "Иван Петров, #2")
+        self.assertEqual(v["created_by_str"], "Иван Петров")
+        self.assertIsNone(v["description"])
+        self.assertTrue(v["is_assigned_to_me"])
+        self.assertTrue(v["is_overdue"])
+        self.assertEqual(v["attachment_url"], "/crm/tasks/5/photo")
+        self.assertTrue(v["permissions"]["finish_to_review"])
+        self.assertFalse(v["permissions"]["archive"])
+
+    def test_cards_do_not_share_mutable_views(self):
+        ctx = TaskCardContext.create(actor_id=1, is_manager=True)
+        a, b = build_task_card_views([self._task(id=1), self._task(id=2)], ctx=ctx, with_permissions=True)
+        a["assignees"][0]["color"] = "x"
+        a["permissions"]["archive"] = False
+        self.assertEqual(b["assignees"][0]["color"], "#fff")
+        self.assertTrue(b["permissions"]["archive"])
+
+    def test_non_utc_datetime_falls_back(self):
+        dt = datetime(2026, 1, 1, 12, 0, tzinfo=timezone(timedelta(hours=5)))
+        ctx = TaskCardContext.create()
+        self.assertEqual(ctx.format_msk(dt), format_moscow(dt))
+        self.assertEqual(ctx.format_msk(None), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from sqlalchemy.dialects import postgresql
+
+from bot.app.services.telegram_outbox import (
+    _finalize,
+    _next_wait_seconds,
+    build_items,
+    claim_outbox_rows,
+    dispatch,
+    renew_outbox_leases,
+)
+from bot.app.utils.rate_limit import AsyncRateLimiter
+from shared.models import TelegramOutbox
+from shared.services.telegram_outbox import KIND_MESSAGE, KIND_SALARY_LINE, KIND_SHIFT_SWAP_OFFER, message_payload
+
+
+class _FakeBot:
+    def __init__(self, *, flood_text: str | None = None):
+        self.sent: list[tuple[int, str]] = []
+        self.flood_text = flood_text
+        self._next_id = 100
+
+    async def send_message(self, *, chat_id, text, **kwargs):
+        await asyncio.sleep(0)
+        if text == self.flood_text:
+            raise TelegramRetryAfter(method=SendMessage(chat_id=chat_id, text=text), message="flood", retry_after=5)
+        self._next_id += 1
+        self.sent.append((int(chat_id), str(text)))
+        return SimpleNamespace(message_id=self._next_id)
+
+
+_id = 0
+
+
+def _row(kind: str, chat_id: int, payload: dict) -> TelegramOutbox:
+    global _id
+    _id += 1
+    return TelegramOutbox(
+        id=_id,
+        kind=kind,
+        chat_id=chat_id,
+        payload=payload,
+        status="pending",
+        attempts=1,
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def _msg(chat_id: int, text: str) -> TelegramOutbox:
+    return _row(KIND_MESSAGE, chat_id, message_payload(text=text))
+
+
+class _NoSession:
+    pass
+
+
+class TestTelegramOutbox(unittest.IsolatedAsyncioTestCase):
+    def _limiter(self) -> AsyncRateLimiter:
+        return AsyncRateLimiter(rate_per_sec=1000, burst=100)
+
+    def test_salary_lines_merge_per_chat(self):
+        rows = [
+            _row(KIND_SALARY_LINE, 1, {"line": "a"}),
+            _msg(2, "x"),
+            _row(KIND_SALARY_LINE, 1, {"line": "b"}),
+            _row(KIND_SALARY_LINE, 2, {"line": "c"}),
+        ]
+        items = build_items(rows)
+        self.assertEqual([(i.kind, i.chat_id, len(i.rows)) for i in items], [
+            (KIND_SALARY_LINE, 1, 2),
+            (KIND_MESSAGE, 2, 1),
+            (KIND_SALARY_LINE, 2, 1),
+        ])
+
+    async def test_digest_is_one_message(self):
+        bot = _FakeBot()
+        items = build_items([_row(KIND_SALARY_LINE, 1, {"line": "a"}), _row(KIND_SALARY_LINE, 1, {"line": "b"})])
+        await dispatch(bot=bot, items=items, limiter=self._limiter(), max_concurrent_chats=4)
+        self.assertEqual(len(bot.sent), 1)
+        self.assertIn("a\nb", bot.sent[0][1])
+
+    async def test_per_chat_order_and_flood_defers_rest_of_chat(self):
+        bot = _FakeBot(flood_text="1-b")
+        items = build_items([_msg(1, "1-a"), _msg(2, "2-a"), _msg(1, "1-b"), _msg(1, "1-c"), _msg(2, "2-b")])
+        await dispatch(bot=bot, items=items, limiter=self._limiter(), max_concurrent_chats=4)
+        self.assertEqual([t for c, t in bot.sent if c == 1], ["1-a"])
+        self.assertEqual([t for c, t in bot.sent if c == 2], ["2-a", "2-b"])
+        by_text = {i.payload["text"]: i for i in items}
+        self.assertEqual(by_text["1-b"].retry_after, 5)
+        self.assertEqual(by_text["1-c"].retry_after, 5)
+
+        now = datetime(2026, 1, 1, 0, 1, tzinfo=timezone.utc)
+        await _finalize(_NoSession(), by_text["1-c"], now=now)
+        row = by_text["1-c"].head
+        self.assertEqual(row.status, "pending")
+        self.assertEqual(row.attempts, 0)
+        self.assertEqual((row.next_retry_at - now).total_seconds(), 5)
+
+        await _finalize(_NoSession(), by_text["2-b"], now=now)
+        self.assertEqual(by_text["2-b"].head.status, "sent")
+        self.assertIsNotNone(by_text["2-b"].head.tg_message_id)
+
+    async def test_swap_offer_of_closed_request_is_not_sent(self):
+        bot = _FakeBot()
+        items = build_items([
+            _row(KIND_SHIFT_SWAP_OFFER, 1, {**message_payload(text="open"), "request_id": 1}),
+            _row(KIND_SHIFT_SWAP_OFFER, 2, {**message_payload(text="closed"), "request_id": 2}),
+        ])
+        items[1].cancelled = True
+        limiter = self._limiter()
+        await dispatch(bot=bot, items=items, limiter=limiter, max_concurrent_chats=4)
+        self.assertEqual(bot.sent, [(1, "open")])
+        self.assertFalse(items[1].sent)
+        # Only the sent offer took a rate limiter token.
+        self.assertAlmostEqual(limiter._tokens, limiter.capacity - 1, delta=0.5)
+
+        await _finalize(_NoSession(), items[1], now=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(items[1].head.status, "cancelled")
+        self.assertIsNone(items[1].head.sent_at)
+
+    async def test_permanent_error_fails_row(self):
+        item = build_items([_row("nope", 1, {})])[0]
+        await dispatch(bot=_FakeBot(), items=[item], limiter=self._limiter(), max_concurrent_chats=1)
+        await _finalize(_NoSession(), item, now=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(item.head.status, "failed")
+
+    async def test_finalize_releases_lease(self):
+        row = _msg(1, "a")
+        row.claimed_by = "host:1"
+        row.lease_until = datetime(2026, 1, 1, 0, 2, tzinfo=timezone.utc)
+        item = build_items([row])[0]
+        await dispatch(bot=_FakeBot(), items=[item], limiter=self._limiter(), max_concurrent_chats=1)
+        await _finalize(_NoSession(), item, now=datetime(2026, 1, 1, 0, 1, tzinfo=timezone.utc))
+        self.assertEqual(row.status, "sent")
+        self.assertIsNone(row.claimed_by)
+        self.assertIsNone(row.lease_until)
+
+    async def test_claim_statement_skips_locked_rows(self):
+        class _Recorder:
+            def __init__(self):
+                self.statements = []
+
+            async def execute(self, stmt, params=None):
+                self.statements.append(stmt)
+                return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+        rec = _Recorder()
+        await claim_outbox_rows(rec, worker_id="host:1", limit=10)
+        sql = str(rec.statements[-1].compile(dialect=postgresql.dialect()))
+        self.assertIn("FOR UPDATE SKIP LOCKED", sql)
+        self.assertIn("claimed_by", sql)
+        self.assertIn("pg_advisory_xact_lock", str(rec.statements[0]))
+
+    def test_empty_claims_back_off_up_to_poll_interval(self):
+        # A due row of a chat leased elsewhere: due_in stays 0 while claims come back empty.
+        waits = [_next_wait_seconds(due_in=0.0, poll_seconds=30, empty_claims=k) for k in range(9)]
+        self.assertEqual(waits, [0.05, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 30.0])
+        self.assertEqual(_next_wait_seconds(due_in=3.0, poll_seconds=30, empty_claims=0), 3.0)
+        self.assertEqual(_next_wait_seconds(due_in=None, poll_seconds=30, empty_claims=2), 30.0)
+
+    async def test_chat_stops_once_its_lease_is_lost(self):
+        bot = _FakeBot()
+        items = build_items([_msg(1, "1-a"), _msg(1, "1-b"), _msg(2, "2-a")])
+        lost = {int(items[1].head.id)}
+        await dispatch(bot=bot, items=items, limiter=self._limiter(), max_concurrent_chats=4, lost=lost)
+        self.assertEqual(bot.sent, [(1, "1-a"), (2, "2-a")])
+        self.assertFalse(items[1].sent)
+        # Should a row of the chat still be ours at finalize, it goes back to pending unharmed.
+        await _finalize(_NoSession(), items[1], now=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual((items[1].head.status, items[1].head.attempts), ("pending", 0))
+
+    async def test_renew_extends_only_own_pending_rows(self):
+        class _Recorder:
+            def __init__(self):
+                self.statements = []
+
+            async def execute(self, stmt, params=None):
+                self.statements.append(stmt)
+                return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: [1, 3]))
+
+        rec = _Recorder()
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        gone = await renew_outbox_leases(rec, worker_id="host:1", ids=[1, 2, 3], now=now)
+        self.assertEqual(gone, {2})
+        compiled = rec.statements[0].compile(dialect=postgresql.dialect())
+        self.assertIn("claimed_by = %(claimed_by_1)s", str(compiled))
+        self.assertEqual(compiled.params["claimed_by_1"], "host:1")
+        self.assertEqual(compiled.params["lease_until"], datetime(2026, 1, 1, 0, 2, tzinfo=timezone.utc))
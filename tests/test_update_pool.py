@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+
+from bot.app.services.update_pool import KeyedUpdatePool
+
+
+class TestKeyedUpdatePool(unittest.IsolatedAsyncioTestCase):
+    async def test_same_key_in_order_other_keys_in_parallel(self):
+        done: list[tuple[int, int]] = []
+        active = 0
+        max_active = 0
+
+        async def handler(item):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            done.append(item)
+            active -= 1
+
+        pool = KeyedUpdatePool(handler, workers=4, max_pending=100)
+        pool.start()
+        for i in range(3):
+            for user in (1, 2, 3):
+                self.assertTrue(await pool.submit(user, (user, i)))
+        await pool.stop()
+
+        self.assertGreater(max_active, 1)
+        for user in (1, 2, 3):
+            self.assertEqual([i for u, i in done if u == user], [0, 1, 2])
+        self.assertEqual(pool.metrics.processed, 9)
+
+    async def test_full_pool_rejects_after_timeout(self):
+        release = asyncio.Event()
+
+        async def handler(_item):
+            await release.wait()
+
+        pool = KeyedUpdatePool(handler, workers=1, max_pending=2)
+        pool.start()
+        self.assertTrue(await pool.submit(1, "a"))
+        self.assertTrue(await pool.submit(2, "b"))
+        self.assertFalse(await pool.submit(3, "c", timeout=0.01))
+        self.assertEqual(pool.metrics.rejected, 1)
+        release.set()
+        await pool.stop()
+        self.assertEqual(pool.metrics.processed, 2)
+
+    async def test_failing_item_does_not_block_lane(self):
+        seen = []
+
+        async def handler(item):
+            seen.append(item)
+            if item == "bad":
+                raise RuntimeError("boom")
+
+        pool = KeyedUpdatePool(handler, workers=2)
+        pool.start()
+        await pool.submit(1, "bad")
+        await pool.submit(1, "ok")
+        await pool.stop()
+        self.assertEqual(seen, ["bad", "ok"])
+        self.assertEqual(pool.metrics.failed, 1)
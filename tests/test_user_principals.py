@@ -0,0 +1,51 @@
+import unittest
+from types import SimpleNamespace
+
+from bot.app.services.user_principals import UserPrincipal, UserPrincipalCache
+from shared.enums import Position, UserStatus
+
+
+def _principal(tg_id: int, **kw) -> UserPrincipal:
+    base = dict(
+        id=tg_id * 10,
+        tg_id=tg_id,
+        first_name="A",
+        last_name="B",
+        birth_date=None,
+        rate_k=None,
+        hour_rate=None,
+        schedule=None,
+        position=Position.MANAGER,
+        status=UserStatus.APPROVED,
+        color="#000000",
+        is_deleted=False,
+        created_at=None,
+        updated_at=None,
+    )
+    base.update(kw)
+    return UserPrincipal.from_user(SimpleNamespace(**base))
+
+
+class TestUserPrincipalCache(unittest.TestCase):
+    def test_notify_evicts_only_that_user(self):
+        cache = UserPrincipalCache(ttl=60)
+        cache.put(_principal(1))
+        cache.put(_principal(2))
+        cache.on_notify("1")
+        self.assertIsNone(cache.peek(1))
+        self.assertIsNotNone(cache.peek(2))
+
+    def test_reconnect_payload_clears_all(self):
+        cache = UserPrincipalCache(ttl=60)
+        cache.put(_principal(1))
+        cache.on_notify("")
+        self.assertIsNone(cache.peek(1))
+
+    def test_zero_ttl_disables_cache(self):
+        cache = UserPrincipalCache(ttl=0)
+        cache.put(_principal(1))
+        self.assertIsNone(cache.peek(1))
+
+    def test_flags_follow_status_and_position(self):
+        self.assertTrue(_principal(1).flags.is_manager)
+        self.assertFalse(_principal(1, status=UserStatus.BLACKLISTED).flags.is_manager)
@@ -1,7 +1,6 @@
 """Finance module web routes."""
 from __future__ import annotations
 
-import asyncio
 import csv
 import io
 import logging
@@ -20,6 +19,8 @@ from shared.db import get_async_session
 
 logger = logging.getLogger(__name__)
 from shared.services.pin_guard import record_pin_fail, clear_pin_fail, should_alert as _should_alert
+from shared.services.background_tasks import spawn_background
+from shared.services.telegram_outbox import KIND_MESSAGE, enqueue_standalone, message_payload
 from shared.services.finance_pin import (
     get_finance_settings as _get_finance_settings_row,
     verify_finance_pin,
@@ -118,7 +119,7 @@ def _get_user_key(request: Request) -> tuple[str, str]:
     return f"ip:{ip}", f"ip={ip}"
 
 
-async def _send_pin_alert(user_display: str, attempts: int) -> None:
+async def _send_pin_alert(user_display: str, attempts: int, *, via_outbox: bool = False) -> None:
     from web.app.services.messenger import Messenger
     from datetime import datetime as _dt
     token = str(getattr(settings, "BOT_TOKEN", "") or "").strip()
@@ -135,6 +136,12 @@ async def _send_pin_alert(user_display: str, attempts: int) -> None:
         f"🕐 Время: {now_str}\n"
         f"🔒 Раздел: Финансы"
     )
+    if via_outbox:
+        # Spill-over from the background supervisor: deliver through the durable outbox.
+        for uid in admin_ids:
+            await enqueue_standalone(kind=KIND_MESSAGE, chat_id=int(uid), payload=message_payload(text=text))
+        logger.info("FINANCE_PIN_ALERT_SENT admins=%d via=outbox", len(admin_ids))
+        return
     messenger = Messenger(token)
     n_sent = 0
     for uid in admin_ids:
@@ -178,7 +185,12 @@ async def fin_pin_verify(request: Request, session: AsyncSession = Depends(get_d
     count = record_pin_fail(user_key)
     logger.info("FINANCE_PIN_FAIL attempt=%d/%d user=%s", count, 3, user_display)
     if _should_alert(count):
-        asyncio.create_task(_send_pin_alert(user_display, count))
+        await spawn_background(
+            "alerts",
+            lambda: _send_pin_alert(user_display, count),
+            name="finance_pin_alert",
+            spill=lambda: _send_pin_alert(user_display, count, via_outbox=True),
+        )
     return JSONResponse({"ok": False, "error": "wrong_pin", "error_message": _human_error("wrong_pin")}, status_code=403)
 
 
@@ -1,10 +1,10 @@
 import builtins
 
-import asyncio
 import time as pytime
 
 from fastapi import FastAPI, Depends, Request, Response, HTTPException, status, Form, UploadFile, File, Header
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -13,7 +13,6 @@ from datetime import datetime, timezone, timedelta, time, date
 from typing import Optional, List
 import json
 import logging
-import httpx
 import re
 import calendar
 
@@ -39,7 +38,7 @@ from sqlalchemy import select, delete
 from sqlalchemy import case
 from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import noload, selectinload
 from decimal import Decimal
 from shared.services.material_stock import (
     recalculate_material_stock,
@@ -51,6 +50,7 @@ from shared.services.materials_remains import set_material_remains
 
 from shared.db import add_after_commit_callback
 from shared.services.stock_events_notify import notify_reports_chat_about_stock_event, StockEventActor
+from shared.services.bot_clients import close_bot_clients, get_bot, get_http_client
 
 from .services.stocks_dashboard import (
     build_chart_rows,
@@ -63,6 +63,7 @@ from .services.stocks_dashboard import (
 
 from .config import get_config
 from .services.messenger import Messenger
+from .services.tasks_board import TaskCardContext, build_task_card_views, permissions_view, task_card_view
 from .repository import AdminLogRepo
 from shared.enums import AdminActionType
 
@@ -85,6 +86,15 @@ from shared.permissions import role_flags, can_use_tasks_archive, can_view_task
 from shared.services.task_permissions import task_permissions, validate_status_transition
 from shared.services.task_audit import diff_task_for_audit
 from shared.services.task_edit import update_task_with_audit
+from shared.services.partitions import history_since, load_history
+from shared.services.task_bulk import (
+    bulk_archive_tasks,
+    bulk_change_task_status,
+    bulk_set_task_assignees,
+    bulk_set_task_priority,
+    bulk_unarchive_tasks,
+    normalize_task_ids,
+)
 from shared.services.purchases_domain import purchase_take_in_work, purchase_cancel, purchase_mark_bought
 from shared.services.purchases_render import purchases_chat_message_text, purchases_chat_kb_dict, purchase_created_user_message
 from shared.services.tasks_flow import add_task_comment as shared_add_task_comment
@@ -92,7 +102,11 @@ from shared.services.tasks_flow import return_task_to_rework as shared_return_ta
 from shared.services.tasks_flow import enqueue_task_taken_in_work_notifications, enqueue_task_sent_to_review_notifications
 from shared.services.tasks_flow import enqueue_task_status_changed_notifications
 
+from shared.services.schedule_autofill import bulk_autofill_schedule, parse_bulk_autofill_body
+from shared.services.shifts_service import get_day_staff
 from shared.services.shifts_domain import (
+    DEFAULT_SHIFT_END,
+    DEFAULT_SHIFT_START,
     calc_int_hours_from_times,
     emergency_preset_times,
     normalize_shift_times as shared_normalize_shift_times,
@@ -124,6 +138,32 @@ from shared.services.salaries_service import suggest_salary_payout_for_period
 from shared.services.salaries_service import calc_user_shifts, update_salary_shift_state, create_salary_adjustment
 from shared.services.salaries_service import get_balance_cutoff_date, is_shift_accruable_for_balance
 from shared.services.shifts_rating import schedule_shift_rating_request_after_commit
+from shared.services.shift_review_queue import format_review_cursor, load_review_page, parse_review_cursor
+from shared.services.shift_events import (
+    SHIFT_AMOUNT_APPROVED,
+    SHIFT_AMOUNT_SUBMITTED,
+    SHIFT_STARTED,
+    publish_shift_event,
+)
+from shared.services.telegram_outbox import KIND_BROADCAST_DELIVERY, enqueue as enqueue_tg_outbox
+from shared.services.telegram_outbox import enqueue_message as enqueue_tg_message
+from shared.services.telegram_outbox import KIND_MESSAGE, enqueue_standalone, message_payload
+from shared.services.background_tasks import drain_background_tasks, spawn_background
+from web.app.services.schedule_month_cache import (
+    etag_matches,
+    schedule_month_cache,
+    schedule_month_etag,
+    schedule_month_stamp,
+    shift_coverage_cache,
+    shift_coverage_etag,
+)
+from shared.services.shift_coverage import load_month_coverage
+from web.app.services.schedule_range import (
+    load_schedule_range,
+    parse_month_range,
+    schedule_range_etag,
+    schedule_range_stamp,
+)
 from shared.services.salaries_calc import q2, calc_shift_salary
 
 from shared.models import SalaryPayout
@@ -131,9 +171,6 @@ from shared.models import SalaryPayoutAudit
 from shared.models import SalaryShiftAudit
 
 
-DEFAULT_SHIFT_START = time(10, 0)
-DEFAULT_SHIFT_END = time(18, 0)
-
 MAX_TASK_PHOTO_MB = 20
 MAX_TASK_PHOTO_BYTES = MAX_TASK_PHOTO_MB * 1024 * 1024
 
@@ -222,7 +259,7 @@ def _get_salary_user_key(request: Request) -> tuple[str, str]:
     return f"sal:ip:{ip}", f"ip={ip}"
 
 
-async def _send_salary_pin_alert(user_display: str, attempts: int) -> None:
+async def _send_salary_pin_alert(user_display: str, attempts: int, *, via_outbox: bool = False) -> None:
     from web.app.services.messenger import Messenger
     from datetime import datetime as _dt
     token = str(getattr(settings, "BOT_TOKEN", "") or "").strip()
@@ -239,6 +276,12 @@ async def _send_salary_pin_alert(user_display: str, attempts: int) -> None:
         f"🕐 Время: {now_str}\n"
         f"🔒 Раздел: Зарплаты"
     )
+    if via_outbox:
+        # Spill-over from the background supervisor: deliver through the durable outbox.
+        for uid in admin_ids:
+            await enqueue_standalone(kind=KIND_MESSAGE, chat_id=int(uid), payload=message_payload(text=text))
+        logger.info("SALARY_PIN_ALERT_SENT admins=%d via=outbox", len(admin_ids))
+        return
     messenger = Messenger(token)
     n_sent = 0
     for uid in admin_ids:
@@ -407,6 +450,15 @@ app = FastAPI(title="Admin Panel", root_path="/crm")
 # Make app aware of reverse proxy (X-Forwarded-Proto/Host) so url_for builds https URLs behind nginx
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 
+
+@app.on_event("shutdown")
+async def _close_bot_clients_on_shutdown() -> None:
+    # Let background jobs (alerts, after-commit work) finish or spill to the outbox first.
+    await drain_background_tasks()
+    # Pooled Telegram clients (aiogram Bot + raw Bot API httpx client) live for the whole process.
+    await close_bot_clients()
+
+
 from web.app.finance_routes import router as _finance_router  # noqa: E402
 app.include_router(_finance_router)
 
@@ -796,170 +848,6 @@ async def api_broadcasts_upload(
     }
 
 
-async def _run_broadcast_send(*, broadcast_id: int) -> None:
-    # Runs after commit. Uses its own DB session.
-    try:
-        async with get_async_session() as session:
-            b = (
-                (await session.execute(select(Broadcast).where(Broadcast.id == int(broadcast_id))))
-            ).scalar_one_or_none()
-            if b is None:
-                return
-
-            # Load deliveries + users
-            rows = (
-                await session.execute(
-                    select(BroadcastDelivery)
-                    .where(BroadcastDelivery.broadcast_id == int(broadcast_id))
-                    .options(selectinload(BroadcastDelivery.user))
-                    .order_by(BroadcastDelivery.id.asc())
-                )
-            ).scalars().all()
-
-            messenger = Messenger(settings.BOT_TOKEN)
-            kb = _broadcast_rating_kb(broadcast_id=int(broadcast_id))
-
-            delivered = int(getattr(b, "delivered_count", 0) or 0)
-            failed = int(getattr(b, "failed_count", 0) or 0)
-            no_tg = int(getattr(b, "no_tg_count", 0) or 0)
-
-            media_type = str(getattr(b, "media_type", "") or "") or None
-            media_key = str(getattr(b, "media_path", "") or "") or None
-            # We stored media_path as URL-like (/crm/static/uploads/...), derive key if possible
-            if media_key and media_key.startswith("/crm/static/uploads/"):
-                media_key = media_key[len("/crm/static/uploads/") :]
-            if media_key and media_key.startswith("static/uploads/"):
-                media_key = media_key[len("static/uploads/") :]
-
-            media_bytes: bytes | None = None
-            media_filename: str | None = None
-            if media_type in {"photo", "video"} and media_key:
-                try:
-                    fs_path = _broadcast_media_fs_path_from_key(str(media_key))
-                    if fs_path.exists():
-                        media_bytes = fs_path.read_bytes()
-                        media_filename = fs_path.name
-                except Exception:
-                    media_bytes = None
-                    media_filename = None
-
-            for d in rows:
-                u = getattr(d, "user", None)
-                chat_id = int(getattr(u, "tg_id", 0) or 0) if u is not None else 0
-                if not chat_id:
-                    if str(getattr(d, "delivery_status", "") or "") != "no_tg":
-                        d.delivery_status = "no_tg"
-                    no_tg += 1
-                    b.no_tg_count = int(no_tg)
-                    await session.flush()
-                    continue
-
-                # default: mark pending before sending
-                d.delivery_status = "pending"
-                await session.flush()
-
-                try:
-                    msg_text = str(getattr(b, "text", "") or "")
-                    msg_id: int | None = None
-                    if media_type in {"photo", "video"} and media_bytes is not None and media_filename is not None:
-                        # Telegram caption is limited; if too long -> send media without caption, then text+kb
-                        if len(msg_text) > 1024:
-                            if media_type == "photo":
-                                ok1, _, err1 = await messenger.send_photo_ex(
-                                    chat_id=chat_id,
-                                    file_bytes=media_bytes,
-                                    filename=media_filename,
-                                    caption=None,
-                                    reply_markup=None,
-                                    parse_mode="HTML",
-                                )
-                            else:
-                                ok1, _, err1 = await messenger.send_video_ex(
-                                    chat_id=chat_id,
-                                    file_bytes=media_bytes,
-                                    filename=media_filename,
-                                    caption=None,
-                                    reply_markup=None,
-                                    parse_mode="HTML",
-                                )
-                            if not ok1:
-                                raise Exception(err1 or "media send failed")
-
-                            ok2, msg_id2, err2 = await messenger.send_message_ex(
-                                chat_id=chat_id,
-                                text=msg_text,
-                                reply_markup=kb,
-                                parse_mode="HTML",
-                            )
-                            if not ok2:
-                                raise Exception(err2 or "text send failed")
-                            msg_id = msg_id2
-                        else:
-                            if media_type == "photo":
-                                okm, msg_idm, errm = await messenger.send_photo_ex(
-                                    chat_id=chat_id,
-                                    file_bytes=media_bytes,
-                                    filename=media_filename,
-                                    caption=msg_text,
-                                    reply_markup=kb,
-                                    parse_mode="HTML",
-                                )
-                            else:
-                                okm, msg_idm, errm = await messenger.send_video_ex(
-                                    chat_id=chat_id,
-                                    file_bytes=media_bytes,
-                                    filename=media_filename,
-                                    caption=msg_text,
-                                    reply_markup=kb,
-                                    parse_mode="HTML",
-                                )
-                            if not okm:
-                                raise Exception(errm or "media send failed")
-                            msg_id = msg_idm
-                    else:
-                        ok, mid, err = await messenger.send_message_ex(
-                            chat_id=chat_id,
-                            text=msg_text,
-                            reply_markup=kb,
-                            parse_mode="HTML",
-                        )
-                        if not ok:
-                            raise Exception(err or "send failed")
-                        msg_id = mid
-
-                    d.tg_chat_id = int(chat_id)
-                    d.tg_message_id = int(msg_id) if msg_id is not None else None
-                    d.delivered_at = utc_now()
-                    d.delivery_status = "success"
-                    d.error_text = None
-                    delivered += 1
-                    b.delivered_count = int(delivered)
-                except Exception as e:
-                    d.tg_chat_id = int(chat_id)
-                    d.tg_message_id = None
-                    d.delivered_at = None
-                    d.delivery_status = "failed"
-                    d.error_text = str(e)
-                    failed += 1
-                    b.failed_count = int(failed)
-
-                await session.flush()
-
-            b.status = "sent"
-            b.sent_at = utc_now()
-            await session.flush()
-    except Exception:
-        try:
-            async with get_async_session() as session2:
-                b2 = (
-                    (await session2.execute(select(Broadcast).where(Broadcast.id == int(broadcast_id))))
-                ).scalar_one_or_none()
-                if b2 is not None:
-                    b2.status = "failed"
-                    await session2.flush()
-        except Exception:
-            pass
-
 @app.get("/api/users/positions")
 @app.get("/crm/api/users/positions")
 async def api_users_positions(
@@ -1081,6 +969,7 @@ async def api_broadcasts_send(
     seen_user_ids: set[int] = set()
     total = 0
     no_tg = 0
+    pending: list[BroadcastDelivery] = []
     for u in users:
         uid = int(getattr(u, "id"))
         if uid in seen_user_ids:
@@ -1102,23 +991,35 @@ async def api_broadcasts_send(
                 )
             )
         else:
-            session.add(
-                BroadcastDelivery(
-                    broadcast_id=int(b.id),
-                    user_id=int(uid),
-                    tg_chat_id=int(chat_id),
-                    tg_message_id=None,
-                    delivered_at=None,
-                    delivery_status="pending",
-                    error_text=None,
-                )
+            d = BroadcastDelivery(
+                broadcast_id=int(b.id),
+                user_id=int(uid),
+                tg_chat_id=int(chat_id),
+                tg_message_id=None,
+                delivered_at=None,
+                delivery_status="pending",
+                error_text=None,
             )
+            session.add(d)
+            pending.append(d)
 
     b.total_recipients = int(total)
     b.no_tg_count = int(no_tg)
+    if not pending:
+        b.status = "sent"
+        b.sent_at = utc_now()
     await session.flush()
 
-    add_after_commit_callback(session, lambda: asyncio.create_task(_run_broadcast_send(broadcast_id=int(b.id))))
+    # One outbox row per recipient; the bot worker sends them and updates the counters.
+    kb = _broadcast_rating_kb(broadcast_id=int(b.id))
+    for d in pending:
+        await enqueue_tg_outbox(
+            session,
+            kind=KIND_BROADCAST_DELIVERY,
+            chat_id=int(d.tg_chat_id),
+            payload={"broadcast_id": int(b.id), "delivery_id": int(d.id), "reply_markup": kb},
+            dedupe_key=f"broadcast_delivery:{int(d.id)}",
+        )
 
     return {
         "id": int(b.id),
@@ -1630,6 +1531,33 @@ async def schedule_api_autofill(
     return {"ok": True, "created": int(created), "updated": int(updated), "skipped": int(skipped)}
 
 
+@app.post("/api/schedule/autofill/bulk")
+@app.post("/crm/api/schedule/autofill/bulk")
+async def schedule_api_autofill_bulk(
+    request: Request,
+    admin_id: int = Depends(require_admin_or_manager),
+    session: AsyncSession = Depends(get_db),
+):
+    """Autofill many users over a date range; ``dry_run`` returns the diff without writing."""
+    await ensure_manager_allowed(request, admin_id, session)
+
+    body = await request.json()
+    patterns, date_from, date_to = parse_bulk_autofill_body(body)
+    dry_run = bool(body.get("dry_run", False))
+    plan = await bulk_autofill_schedule(
+        session,
+        patterns=patterns,
+        date_from=date_from,
+        date_to=date_to,
+        overwrite=bool(body.get("overwrite", False)),
+        skip_fact_days=bool(body.get("skip_fact_days", True)),
+        dry_run=dry_run,
+        work_start=DEFAULT_SHIFT_START,
+        work_end=DEFAULT_SHIFT_END,
+    )
+    return plan.as_dict(dry_run=dry_run)
+
+
 @app.post("/api/salaries/shifts/{shift_id}/amount/update")
 @app.post("/crm/api/salaries/shifts/{shift_id}/amount/update")
 async def salaries_api_shift_amount_update(
@@ -1697,12 +1625,61 @@ async def salaries_api_shift_amount_update(
     await session.flush()
     if not bool(getattr(shift, "approval_required", False)):
         schedule_shift_rating_request_after_commit(session=session, shift_id=int(getattr(shift, "id", 0) or 0))
+    await publish_shift_event(
+        session,
+        (SHIFT_AMOUNT_SUBMITTED if bool(getattr(shift, "approval_required", False)) else SHIFT_AMOUNT_APPROVED),
+        shift,
+        actor_user_id=(int(getattr(actor, "id", 0) or 0) or None),
+    )
 
     # month param is accepted for frontend compatibility, no extra behavior here
     _ = month
     return {"ok": True}
 
 
+@app.get("/api/salaries/review-queue")
+@app.get("/crm/api/salaries/review-queue")
+async def salaries_api_review_queue(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = 20,
+    admin_id: int = Depends(require_admin_or_manager),
+    session: AsyncSession = Depends(get_db),
+):
+    """Shifts awaiting a manager (amount approval or unconfirmed salary state), newest first.
+
+    Keyset-paginated: pass ``next_cursor`` back as ``cursor`` for the next page.
+    """
+    await ensure_manager_allowed(request, admin_id, session)
+    await load_staff_user(session, admin_id)
+    if not _salary_pin_cookie_is_valid(request):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    try:
+        after = parse_review_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Неверный курсор")
+
+    items, next_key = await load_review_page(session, after=after, limit=int(limit))
+    return {
+        "items": [
+            {
+                "shift_id": it.shift_id,
+                "user_id": it.user_id,
+                "full_name": it.full_name,
+                "day": it.day.isoformat(),
+                "status": it.status,
+                "amount_default": it.amount_default,
+                "amount_submitted": it.amount_submitted,
+                "salary_state": it.salary_state,
+                "approval_pending": it.approval_pending,
+                "salary_unconfirmed": it.salary_unconfirmed,
+            }
+            for it in items
+        ],
+        "next_cursor": (format_review_cursor(next_key) if next_key is not None else None),
+    }
+
+
 @app.post("/api/salaries/shifts/{shift_id}/amount/approve")
 @app.post("/crm/api/salaries/shifts/{shift_id}/amount/approve")
 async def salaries_api_shift_amount_approve(
@@ -1732,6 +1709,7 @@ async def salaries_api_shift_amount_approve(
     session.add(shift)
     await session.flush()
     schedule_shift_rating_request_after_commit(session=session, shift_id=int(getattr(shift, "id", 0) or 0))
+    await publish_shift_event(session, SHIFT_AMOUNT_APPROVED, shift, actor_user_id=(int(getattr(actor, "id", 0) or 0) or None))
 
     return {"ok": True}
 
@@ -1860,94 +1838,7 @@ def _event_view(e: TaskEvent) -> dict:
 
 
 def _task_card_view(t: Task, *, actor_id: int | None = None) -> dict:
-    assignees = list(getattr(t, "assignees", None) or [])
-    assignees_str = ", ".join(
-        [
-            (f"{(u.first_name or '').strip()} {(u.last_name or '').strip()}".strip() or f"#{u.id}")
-            for u in assignees
-        ]
-    )
-    assignees_view = [
-        {
-            "id": int(getattr(u, "id", 0) or 0),
-            "first_name": (getattr(u, "first_name", None) or None),
-            "last_name": (getattr(u, "last_name", None) or None),
-            "color": (getattr(u, "color", None) or None),
-        }
-        for u in assignees
-    ]
-    is_assigned_to_me = False
-    if actor_id is not None:
-        is_assigned_to_me = any(int(u.id) == int(actor_id) for u in assignees)
-    due_at_utc = getattr(t, "due_at", None)
-    due_at_str = format_moscow(due_at_utc, "%d.%m.%Y %H:%M") if due_at_utc else ""
-    due_at_ts: int | None = None
-    if due_at_utc is not None:
-        try:
-            due_at_ts = int(due_at_utc.timestamp())
-        except Exception:
-            due_at_ts = None
-    created_at_utc = getattr(t, "created_at", None)
-    created_at_ts: int | None = None
-    if created_at_utc is not None:
-        try:
-            created_at_ts = int(created_at_utc.timestamp())
-        except Exception:
-            created_at_ts = None
-
-    created_by = getattr(t, "created_by_user", None)
-    created_by_str = ""
-    created_by_view: dict | None = None
-    if created_by is not None:
-        created_by_str = (
-            f"{(created_by.first_name or '').strip()} {(created_by.last_name or '').strip()}".strip()
-            or f"#{created_by.id}"
-        )
-        created_by_view = {
-            "id": int(getattr(created_by, "id", 0) or 0),
-            "name": created_by_str,
-            "color": (getattr(created_by, "color", None) or None),
-        }
-    is_overdue = bool(due_at_utc and due_at_utc < utc_now())
-
-    # Attachment indicator (reuse the same effective photo logic as in detail modal)
-    photo_url = str(getattr(t, "photo_url", "") or "").strip()
-    photo_path = str(getattr(t, "photo_path", "") or "").strip()
-    tg_photo_file_id = str(getattr(t, "tg_photo_file_id", "") or getattr(t, "photo_file_id", "") or "").strip()
-    proxy_photo_url = f"/crm/tasks/{int(t.id)}/photo" if tg_photo_file_id else ""
-    attachment_url = photo_url or photo_path or proxy_photo_url
-    has_attachment = bool(attachment_url)
-
-    # Permissions (same logic as detail modal)
-    perms_view: dict | None = None
-    try:
-        if actor_id is not None:
-            # derive actor flags from task board globals (passed via closure in tasks_board)
-            # NOTE: tasks_board passes actor_id only; permissions on board are computed there.
-            pass
-    except Exception:
-        perms_view = None
-
-    return {
-        "id": int(t.id),
-        "title": t.title,
-        "description": (str(getattr(t, "description", "") or "").strip() or None),
-        "priority": t.priority.value if hasattr(t.priority, "value") else str(t.priority),
-        "status": t.status.value if hasattr(t.status, "value") else str(t.status),
-        "due_at_str": due_at_str,
-        "due_at_ts": due_at_ts,
-        "created_at_str": format_moscow(created_at_utc, "%d.%m.%Y %H:%M"),
-        "created_at_ts": created_at_ts,
-        "created_by_str": created_by_str,
-        "created_by": created_by_view,
-        "assignees": assignees_view,
-        "assignees_str": assignees_str,
-        "is_assigned_to_me": is_assigned_to_me,
-        "is_overdue": is_overdue,
-        "has_attachment": has_attachment,
-        "attachment_url": attachment_url or None,
-        "permissions": perms_view,
-    }
+    return task_card_view(t, ctx=TaskCardContext.create(actor_id=actor_id))
 
 
 def _purchase_event_view(e: PurchaseEvent) -> dict:
@@ -2373,15 +2264,7 @@ def _task_permissions(*, t: Task, actor: User, is_admin: bool, is_manager: bool)
         is_admin=bool(is_admin),
         is_manager=bool(is_manager),
     )
-    return {
-        "take_in_progress": bool(perms.take_in_progress),
-        "finish_to_review": bool(perms.finish_to_review),
-        "accept_done": bool(perms.accept_done),
-        "send_back": bool(perms.send_back),
-        "archive": bool(perms.archive),
-        "unarchive": bool(perms.unarchive),
-        "comment": bool(perms.comment),
-    }
+    return permissions_view(perms)
 
 
 async def _load_task_full(session: AsyncSession, task_id: int) -> Task:
@@ -2393,12 +2276,13 @@ async def _load_task_full(session: AsyncSession, task_id: int) -> Task:
             selectinload(Task.created_by_user),
             selectinload(Task.comments).selectinload(TaskComment.author_user),
             selectinload(Task.comments).selectinload(TaskComment.photos),
-            selectinload(Task.events).selectinload(TaskEvent.actor_user),
+            noload(Task.events),
         )
     )
     t = res.scalar_one_or_none()
     if not t:
         raise HTTPException(404)
+    await load_history(session, t, "events", TaskEvent, TaskEvent.task_id, selectinload(TaskEvent.actor_user))
     return t
 
 
@@ -2598,6 +2482,77 @@ async def _apply_task_patch_with_audit(
     return True
 
 
+async def _bulk_tasks_request(request: Request) -> tuple[dict, list[int]]:
+    body = await request.json()
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="Неверный формат")
+    return body, normalize_task_ids(body.get("task_ids"))
+
+
+# Bulk routes are registered before /api/tasks/{task_id}/... so "bulk" is never parsed as a task id.
+@app.post("/api/tasks/bulk/archive")
+@app.post("/crm/api/tasks/bulk/archive")
+async def tasks_api_bulk_archive(request: Request, admin_id: int = Depends(require_authenticated_user), session: AsyncSession = Depends(get_db)):
+    await ensure_manager_allowed(request, admin_id, session)
+    actor = await load_staff_user(session, admin_id)
+    _body, task_ids = await _bulk_tasks_request(request)
+    res = await bulk_archive_tasks(session=session, actor=actor, task_ids=task_ids)
+    return res.as_dict()
+
+
+@app.post("/api/tasks/bulk/unarchive")
+@app.post("/crm/api/tasks/bulk/unarchive")
+async def tasks_api_bulk_unarchive(request: Request, admin_id: int = Depends(require_authenticated_user), session: AsyncSession = Depends(get_db)):
+    await ensure_manager_allowed(request, admin_id, session)
+    actor = await load_staff_user(session, admin_id)
+    _body, task_ids = await _bulk_tasks_request(request)
+    res = await bulk_unarchive_tasks(session=session, actor=actor, task_ids=task_ids)
+    return res.as_dict()
+
+
+@app.post("/api/tasks/bulk/status")
+@app.post("/crm/api/tasks/bulk/status")
+async def tasks_api_bulk_status(request: Request, admin_id: int = Depends(require_authenticated_user), session: AsyncSession = Depends(get_db)):
+    await ensure_manager_allowed(request, admin_id, session)
+    actor = await load_staff_user(session, admin_id)
+    body, task_ids = await _bulk_tasks_request(request)
+    res = await bulk_change_task_status(
+        session=session,
+        actor=actor,
+        task_ids=task_ids,
+        to_status=str(body.get("status") or ""),
+        comment=(str(body.get("comment") or "") or None),
+    )
+    return res.as_dict()
+
+
+@app.post("/api/tasks/bulk/assignees")
+@app.post("/crm/api/tasks/bulk/assignees")
+async def tasks_api_bulk_assignees(request: Request, admin_id: int = Depends(require_admin_or_manager), session: AsyncSession = Depends(get_db)):
+    await ensure_manager_allowed(request, admin_id, session)
+    actor = await load_staff_user(session, admin_id)
+    body, task_ids = await _bulk_tasks_request(request)
+    raw_ids = body.get("assignee_ids")
+    if not isinstance(raw_ids, list):
+        raise HTTPException(status_code=422, detail="assignee_ids должен быть массивом")
+    try:
+        assignee_ids = [int(x) for x in raw_ids]
+    except Exception:
+        raise HTTPException(status_code=422, detail="Неверный идентификатор исполнителя")
+    res = await bulk_set_task_assignees(session=session, actor=actor, task_ids=task_ids, assignee_ids=assignee_ids)
+    return res.as_dict()
+
+
+@app.post("/api/tasks/bulk/priority")
+@app.post("/crm/api/tasks/bulk/priority")
+async def tasks_api_bulk_priority(request: Request, admin_id: int = Depends(require_admin_or_manager), session: AsyncSession = Depends(get_db)):
+    await ensure_manager_allowed(request, admin_id, session)
+    actor = await load_staff_user(session, admin_id)
+    body, task_ids = await _bulk_tasks_request(request)
+    res = await bulk_set_task_priority(session=session, actor=actor, task_ids=task_ids, priority=str(body.get("priority") or ""))
+    return res.as_dict()
+
+
 @app.patch("/api/tasks/{task_id}")
 async def tasks_api_patch(
     task_id: int,
@@ -2758,25 +2713,25 @@ async def _download_tg_file_bytes(*, file_id: str) -> tuple[bytes | None, str |
         return None, None
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.get(f"https://api.telegram.org/bot{token}/getFile", params={"file_id": fid})
-            if r.status_code != 200:
-                logger.warning("tg getFile failed", extra={"status_code": int(r.status_code), "file_id": fid})
-                return None, None
-            payload = dict(r.json() or {})
-            result = dict(payload.get("result") or {})
-            file_path = str(result.get("file_path") or "").strip()
-            if not file_path:
-                logger.warning("tg getFile returned empty file_path", extra={"file_id": fid, "payload": payload})
-                return None, None
-            d = await client.get(f"https://api.telegram.org/file/bot{token}/{file_path}")
-            if d.status_code != 200:
-                logger.warning(
-                    "tg file download failed",
-                    extra={"status_code": int(d.status_code), "file_id": fid, "file_path": file_path},
-                )
-                return None, None
-            return bytes(d.content), "image/jpeg"
+        client = get_http_client()
+        r = await client.get(f"https://api.telegram.org/bot{token}/getFile", params={"file_id": fid}, timeout=30)
+        if r.status_code != 200:
+            logger.warning("tg getFile failed", extra={"status_code": int(r.status_code), "file_id": fid})
+            return None, None
+        payload = dict(r.json() or {})
+        result = dict(payload.get("result") or {})
+        file_path = str(result.get("file_path") or "").strip()
+        if not file_path:
+            logger.warning("tg getFile returned empty file_path", extra={"file_id": fid, "payload": payload})
+            return None, None
+        d = await client.get(f"https://api.telegram.org/file/bot{token}/{file_path}", timeout=30)
+        if d.status_code != 200:
+            logger.warning(
+                "tg file download failed",
+                extra={"status_code": int(d.status_code), "file_id": fid, "file_path": file_path},
+            )
+            return None, None
+        return bytes(d.content), "image/jpeg"
     except Exception:
         logger.exception("tg download exception", extra={"file_id": str(file_id)})
         return None, None
@@ -3128,7 +3083,12 @@ async def salaries_api_pin_verify(
         count = record_pin_fail(user_key)
         logger.info("SALARY_PIN_FAIL attempt=%d/%d user=%s", count, 3, user_display)
         if should_alert(count):
-            asyncio.create_task(_send_salary_pin_alert(user_display, count))
+            await spawn_background(
+                "alerts",
+                lambda: _send_salary_pin_alert(user_display, count),
+                name="salary_pin_alert",
+                spill=lambda: _send_salary_pin_alert(user_display, count, via_outbox=True),
+            )
         return JSONResponse({"ok": False, "error": "wrong_pin", "error_message": "Неверный PIN-код."}, status_code=403)
 
     clear_pin_fail(user_key)
@@ -4437,10 +4397,13 @@ async def salaries_api_payout_detail(
     if p is None:
         raise HTTPException(status_code=404)
 
+    audit_q = select(SalaryPayoutAudit).where(SalaryPayoutAudit.payout_id == int(payout_id))
+    audit_since = history_since(getattr(p, "created_at", None))
+    if audit_since is not None:
+        audit_q = audit_q.where(SalaryPayoutAudit.created_at >= audit_since)
     audit = (
         await session.execute(
-            select(SalaryPayoutAudit)
-            .where(SalaryPayoutAudit.payout_id == int(payout_id))
+            audit_q
             .order_by(SalaryPayoutAudit.created_at.desc(), SalaryPayoutAudit.id.desc())
         )
     ).scalars().first()
@@ -5228,11 +5191,17 @@ async def salaries_api_shift_audit_list(
     if not _salary_pin_cookie_is_valid(request):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
+    audit_q = select(SalaryShiftAudit).where(SalaryShiftAudit.shift_id == int(shift_id))
+    shift_created_at = (
+        await session.execute(select(ShiftInstance.created_at).where(ShiftInstance.id == int(shift_id)))
+    ).scalar_one_or_none()
+    audit_since = history_since(shift_created_at)
+    if audit_since is not None:
+        audit_q = audit_q.where(SalaryShiftAudit.created_at >= audit_since)
     rows = list(
         (
             await session.execute(
-                select(SalaryShiftAudit)
-                .where(SalaryShiftAudit.shift_id == int(shift_id))
+                audit_q
                 .order_by(SalaryShiftAudit.created_at.desc(), SalaryShiftAudit.id.desc())
                 .limit(200)
             )
@@ -5736,12 +5705,15 @@ async def _load_purchase_full(session: AsyncSession, purchase_id: int) -> Purcha
             selectinload(Purchase.taken_by_user),
             selectinload(Purchase.bought_by_user),
             selectinload(Purchase.archived_by_user),
-            selectinload(Purchase.events).selectinload(PurchaseEvent.actor_user),
+            noload(Purchase.events),
         )
     )
     p = res.scalar_one_or_none()
     if not p:
         raise HTTPException(status_code=404)
+    await load_history(
+        session, p, "events", PurchaseEvent, PurchaseEvent.purchase_id, selectinload(PurchaseEvent.actor_user)
+    )
     return p
 
 
@@ -6295,6 +6267,23 @@ async def schedule_api_month(
     if m < 1 or m > 12:
         raise HTTPException(status_code=422, detail="Неверный месяц")
 
+    stamp = await schedule_month_stamp(session, year=y, month=m)
+    etag = schedule_month_etag(year=y, month=m, target_user_id=target_user_id, stamp=stamp)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    cache_key = (y, m, target_user_id)
+    body = schedule_month_cache.get(cache_key, stamp)
+    if body is None:
+        payload = await _build_schedule_month(session, y=y, m=m, target_user_id=target_user_id)
+        body = JSONResponse(content=jsonable_encoder(payload)).body
+        schedule_month_cache.put(cache_key, stamp, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _build_schedule_month(session: AsyncSession, *, y: int, m: int, target_user_id: int | None) -> dict:
+    """Month payload of /api/schedule/month: all-staff preview (target_user_id=None) or one user's plan/fact."""
     _, last_day = calendar.monthrange(y, m)
     start = datetime(y, m, 1, tzinfo=MOSCOW_TZ).date()
     end = datetime(y, m, last_day, tzinfo=MOSCOW_TZ).date()
@@ -6553,6 +6542,66 @@ async def schedule_api_month(
     return {"year": y, "month": m, "days": out}
 
 
+@app.get("/api/schedule/range")
+async def schedule_api_range(
+    request: Request,
+    start: str,
+    end: str,
+    work_only: bool = True,
+    admin_id: int = Depends(require_authenticated_user),
+    session: AsyncSession = Depends(get_db),
+):
+    """Staff schedule for up to 12 months (``start``/``end`` as YYYY-MM) in the compact columnar form."""
+    await load_staff_user(session, admin_id)
+    date_from, date_to = parse_month_range(start, end)
+
+    stamp = await schedule_range_stamp(session, date_from=date_from, date_to=date_to)
+    etag = schedule_range_etag(date_from=date_from, date_to=date_to, work_only=bool(work_only), stamp=stamp)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    payload = await load_schedule_range(
+        session,
+        date_from=date_from,
+        date_to=date_to,
+        work_only=bool(work_only),
+        work_start=DEFAULT_SHIFT_START,
+        work_end=DEFAULT_SHIFT_END,
+    )
+    return JSONResponse(content=payload, headers=headers)
+
+
+@app.get("/api/schedule/coverage")
+async def schedule_api_coverage(
+    request: Request,
+    year: int,
+    month: int,
+    admin_id: int = Depends(require_admin_or_manager),
+    session: AsyncSession = Depends(get_db),
+):
+    """Per-day, per-hour planned vs started headcount of a month with the understaffed hours."""
+    await ensure_manager_allowed(request, admin_id, session)
+    await load_staff_user(session, admin_id)
+    y = int(year)
+    m = int(month)
+    if m < 1 or m > 12:
+        raise HTTPException(status_code=422, detail="Неверный месяц")
+
+    stamp = await schedule_month_stamp(session, year=y, month=m)
+    etag = shift_coverage_etag(year=y, month=m, stamp=stamp)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = shift_coverage_cache.get((y, m, None), stamp)
+    if body is None:
+        payload = await load_month_coverage(session, year=y, month=m)
+        body = JSONResponse(content=payload).body
+        shift_coverage_cache.put((y, m, None), stamp, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @app.post("/api/schedule/day")
 async def schedule_api_day(
     request: Request,
@@ -6829,63 +6878,29 @@ async def schedule_api_day_staff(
     except Exception:
         raise HTTPException(status_code=422, detail="Неверная дата")
 
-    rows = list(
-        (
-            await session.execute(
-                select(WorkShiftDay, User)
-                .join(User, User.id == WorkShiftDay.user_id)
-                .where(WorkShiftDay.day == d)
-                .where(WorkShiftDay.kind == "work")
-                .where(User.is_deleted == False)
-                .where(User.status == UserStatus.APPROVED)
-                .order_by(User.first_name, User.last_name, User.id)
-            )
-        ).all()
+    # Plan, user and latest fact in one statement; the web has no shift_schedule listener, so no memo.
+    rows = sorted(
+        (r for r in await get_day_staff(session, day=d, max_age=0) if r.is_approved),
+        key=lambda r: (str(r.first_name or ""), str(r.last_name or ""), int(r.user_id)),
     )
 
-    # Facts for this day to show per-user status
-    user_ids = sorted({int(getattr(u, "id")) for _, u in rows if getattr(u, "id", None) is not None})
-    facts_by_user: dict[int, ShiftInstance] = {}
-    if user_ids:
-        frs = list(
-            (
-                await session.scalars(
-                    select(ShiftInstance)
-                    .where(ShiftInstance.day == d)
-                    .where(ShiftInstance.user_id.in_(user_ids))
-                )
-            ).all()
-        )
-        for fr in frs:
-            uid = getattr(fr, "user_id", None)
-            if uid is None:
-                continue
-            facts_by_user[int(uid)] = fr
-
     out = []
-    for shift, u in rows:
-        name = (" ".join([str(getattr(u, "first_name", "") or "").strip(), str(getattr(u, "last_name", "") or "").strip()]).strip())
-        if not name:
-            name = str(getattr(u, "username", "") or "") or f"User #{int(getattr(u, 'id'))}"
-        uid = int(getattr(u, "id"))
-        fact = facts_by_user.get(uid)
-        st, et = _normalize_shift_times(
-            kind=str(getattr(shift, "kind", "") or ""),
-            start_time=getattr(shift, "start_time", None),
-            end_time=getattr(shift, "end_time", None),
-        )
+    for r in rows:
+        name = (" ".join([str(r.first_name or "").strip(), str(r.last_name or "").strip()]).strip()) or f"User #{int(r.user_id)}"
+        fact = r.shift
+        st, et = _normalize_shift_times(kind=r.kind, start_time=r.start_time, end_time=r.end_time)
         out.append(
             {
-                "user_id": uid,
+                "user_id": int(r.user_id),
                 "name": name,
-                "color": str(getattr(u, "color", "#94a3b8") or "#94a3b8"),
-                "kind": str(getattr(shift, "kind", "") or ""),
-                "hours": getattr(shift, "hours", None),
+                "color": str(r.color or "#94a3b8"),
+                "kind": r.kind,
+                "hours": r.hours,
                 "start_time": _time_to_hhmm(st),
                 "end_time": _time_to_hhmm(et),
-                "is_emergency": bool(getattr(shift, "is_emergency", False)),
-                "shift_status": str(getattr(fact, "status", "") or "") if fact is not None else "",
-                "shift_approval_required": bool(getattr(fact, "approval_required", False)) if fact is not None else False,
+                "is_emergency": bool(r.is_emergency),
+                "shift_status": str(fact.status or "") if fact is not None else "",
+                "shift_approval_required": bool(fact.approval_required) if fact is not None else False,
             }
         )
 
@@ -7141,6 +7156,7 @@ async def shifts_api_start(
         session.add(si)
         await session.flush()
         shift_id = int(si.id)
+        await publish_shift_event(session, SHIFT_STARTED, si, actor_user_id=int(actor.id))
     else:
         existing_shift.started_at = now
         existing_shift.status = ShiftInstanceStatus.STARTED
@@ -7148,6 +7164,7 @@ async def shifts_api_start(
             existing_shift.base_rate = base_rate
         await session.flush()
         shift_id = int(existing_shift.id)
+        await publish_shift_event(session, SHIFT_STARTED, existing_shift, actor_user_id=int(actor.id))
 
     return {
         "ok": True,
@@ -7257,17 +7274,12 @@ async def user_update(
     # if status changed, notify user with updated keyboard
     try:
         if old_status != user.status:
-            from aiogram import Bot  # local import to avoid unnecessary dependency at startup
             from bot.app.keyboards.main import main_menu_kb
-            bot = Bot(token=settings.BOT_TOKEN)
-            try:
-                await bot.send_message(
-                    user.tg_id,
-                    "Ваш статус обновлён.",
-                    reply_markup=main_menu_kb(user.status, user.tg_id, user.position),
-                )
-            finally:
-                await bot.session.close()
+            await get_bot().send_message(
+                user.tg_id,
+                "Ваш статус обновлён.",
+                reply_markup=main_menu_kb(user.status, user.tg_id, user.position),
+            )
     except Exception:
         # non-fatal
         pass
@@ -7289,17 +7301,12 @@ async def user_blacklist(user_id: int, request: Request, admin_id: int = Depends
     await repo.log(admin_tg_id=admin_id, user_id=user.id, action=AdminActionType.BLACKLIST, payload=None)
     # notify user about status change with updated keyboard
     try:
-        from aiogram import Bot  # local import to avoid heavy import at startup
         from bot.app.keyboards.main import main_menu_kb
-        bot = Bot(token=settings.BOT_TOKEN)
-        try:
-            await bot.send_message(
-                user.tg_id,
-                "Ваш статус обновлён.",
-                reply_markup=main_menu_kb(user.status, user.tg_id, user.position),
-            )
-        finally:
-            await bot.session.close()
+        await get_bot().send_message(
+            user.tg_id,
+            "Ваш статус обновлён.",
+            reply_markup=main_menu_kb(user.status, user.tg_id, user.position),
+        )
     except Exception:
         # non-fatal
         pass
@@ -7330,20 +7337,15 @@ async def user_delete(user_id: int, admin_id: int = Depends(require_admin), sess
             payload={"delete": True},
         )
         try:
-            from aiogram import Bot  # local import to avoid heavy import at startup
             from bot.app.utils.bot_commands import sync_commands_for_chat
 
-            bot = Bot(token=settings.BOT_TOKEN)
-            try:
-                await sync_commands_for_chat(
-                    bot=bot,
-                    chat_id=int(user.tg_id),
-                    is_admin=int(user.tg_id) in settings.admin_ids,
-                    status=None,
-                    position=None,
-                )
-            finally:
-                await bot.session.close()
+            await sync_commands_for_chat(
+                bot=get_bot(),
+                chat_id=int(user.tg_id),
+                is_admin=int(user.tg_id) in settings.admin_ids,
+                status=None,
+                position=None,
+            )
         except Exception:
             pass
     return HTMLResponse(
@@ -7432,14 +7434,12 @@ async def broadcast(text: str = Form(...), user_ids: Optional[str] = Form(None),
         q = q.where(User.id.in_(ids))
     res = await session.execute(q)
     users = res.scalars().all()
-    messenger = Messenger(settings.BOT_TOKEN)
-    ok_count = 0
+    repo = AdminLogRepo(session)
     for u in users:
-        ok = await messenger.send_message(u.tg_id, text)
-        if ok:
-            ok_count += 1
-            repo = AdminLogRepo(session)
-            await repo.log(admin_tg_id=admin_id, user_id=u.id, action=AdminActionType.BROADCAST, payload={"text": text})
+        if not int(getattr(u, "tg_id", 0) or 0):
+            continue
+        await enqueue_tg_message(session, chat_id=int(u.tg_id), text=text)
+        await repo.log(admin_tg_id=admin_id, user_id=u.id, action=AdminActionType.BROADCAST, payload={"text": text})
     return Response(status_code=204, headers={"HX-Trigger": "close-modal"})
 
 
@@ -7523,13 +7523,9 @@ async def tasks_board(request: Request, admin_id: int = Depends(require_admin_or
     tasks = list(res.scalars().unique().all())
 
     items_by = {TaskStatus.NEW.value: [], TaskStatus.IN_PROGRESS.value: [], TaskStatus.REVIEW.value: [], TaskStatus.DONE.value: []}
-    for t in tasks:
-        view = _task_card_view(t, actor_id=int(actor.id))
-        try:
-            view["permissions"] = _task_permissions(t=t, actor=actor, is_admin=is_admin, is_manager=is_manager)
-        except Exception:
-            view["permissions"] = None
-        items_by[(t.status.value if hasattr(t.status, "value") else str(t.status))].append(view)
+    card_ctx = TaskCardContext.create(actor_id=int(actor.id), is_admin=is_admin, is_manager=is_manager)
+    for view in build_task_card_views(tasks, ctx=card_ctx, with_permissions=True):
+        items_by[str(view["status"])].append(view)
 
     columns_all = [
         {"status": TaskStatus.NEW.value, "title": "Новые", "items": items_by[TaskStatus.NEW.value]},
@@ -7643,13 +7639,9 @@ async def tasks_board_public(request: Request, admin_id: int = Depends(require_a
     tasks = list(res.scalars().unique().all())
 
     items_by = {TaskStatus.NEW.value: [], TaskStatus.IN_PROGRESS.value: [], TaskStatus.REVIEW.value: [], TaskStatus.DONE.value: []}
-    for t in tasks:
-        view = _task_card_view(t, actor_id=int(actor.id))
-        try:
-            view["permissions"] = _task_permissions(t=t, actor=actor, is_admin=is_admin, is_manager=is_manager)
-        except Exception:
-            view["permissions"] = None
-        items_by[(t.status.value if hasattr(t.status, "value") else str(t.status))].append(view)
+    card_ctx = TaskCardContext.create(actor_id=int(actor.id), is_admin=is_admin, is_manager=is_manager)
+    for view in build_task_card_views(tasks, ctx=card_ctx, with_permissions=True):
+        items_by[str(view["status"])].append(view)
 
     columns_all = [
         {"status": TaskStatus.NEW.value, "title": "Новые", "items": items_by[TaskStatus.NEW.value]},
@@ -7763,18 +7755,9 @@ async def tasks_api_public_list(
 
     res = await session.execute(query)
     tasks = list(res.scalars().unique().all())
+    card_ctx = TaskCardContext.create(actor_id=int(actor.id), is_admin=is_admin, is_manager=is_manager)
     return {
-        "items": [
-            {
-                **_task_card_view(t, actor_id=int(actor.id)),
-                "permissions": (
-                    _task_permissions(t=t, actor=actor, is_admin=is_admin, is_manager=is_manager)
-                    if True
-                    else None
-                ),
-            }
-            for t in tasks
-        ],
+        "items": build_task_card_views(tasks, ctx=card_ctx, with_permissions=True),
         "mine": False,
     }
 
@@ -7838,11 +7821,10 @@ async def tasks_archive(request: Request, admin_id: int = Depends(require_authen
     res = await session.execute(query)
     tasks = list(res.scalars().unique().all())
 
-    items = []
-    for t in tasks:
-        v = _task_card_view(t)
-        v["archived_at_str"] = format_moscow(getattr(t, "archived_at", None), "%d.%m.%Y %H:%M")
-        items.append(v)
+    card_ctx = TaskCardContext.create()
+    items = build_task_card_views(tasks, ctx=card_ctx)
+    for t, v in zip(tasks, items):
+        v["archived_at_str"] = card_ctx.format_msk(getattr(t, "archived_at", None))
 
     return templates.TemplateResponse(
         request,
@@ -7931,11 +7913,10 @@ async def tasks_archive_public(request: Request, admin_id: int = Depends(require
     res = await session.execute(query)
     tasks = list(res.scalars().unique().all())
 
-    items = []
-    for t in tasks:
-        v = _task_card_view(t)
-        v["archived_at_str"] = format_moscow(getattr(t, "archived_at", None), "%d.%m.%Y %H:%M")
-        items.append(v)
+    card_ctx = TaskCardContext.create()
+    items = build_task_card_views(tasks, ctx=card_ctx)
+    for t, v in zip(tasks, items):
+        v["archived_at_str"] = card_ctx.format_msk(getattr(t, "archived_at", None))
 
     return templates.TemplateResponse(
         request,
@@ -0,0 +1,108 @@
+"""Benchmark: render tasks board cards per-card vs. with the batch builder.
+
+Usage: python -m web.app.scripts.bench_tasks_board [--cards 1000] [--rounds 20]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from shared.enums import TaskPriority, TaskStatus
+from shared.services.task_permissions import task_permissions
+from shared.utils import utc_now
+from web.app.services.tasks_board import (
+    TaskCardContext,
+    build_task_card_views,
+    permissions_view,
+    task_card_view,
+)
+
+
+def _make_tasks(n: int, *, users_count: int = 40, seed: int = 1) -> list[SimpleNamespace]:
+    rnd = random.Random(seed)
+    now = utc_now()
+    users = [
+        SimpleNamespace(id=i, first_name=f"Имя{i}", last_name=f"Фамилия{i}", color="#%06x" % (i * 99991 % 0xFFFFFF))
+        for i in range(1, users_count + 1)
+    ]
+    statuses = [TaskStatus.NEW, TaskStatus.IN_PROGRESS, TaskStatus.REVIEW, TaskStatus.DONE]
+    priorities = list(TaskPriority)
+    tasks: list[SimpleNamespace] = []
+    for i in range(1, n + 1):
+        creator = rnd.choice(users)
+        tasks.append(
+            SimpleNamespace(
+                id=i,
+                title=f"Задача {i}",
+                description=("Описание " * rnd.randint(0, 5)),
+                status=rnd.choice(statuses),
+                priority=rnd.choice(priorities),
+                due_at=(now + timedelta(hours=rnd.randint(-72, 72))) if rnd.random() < 0.6 else None,
+                created_at=now - timedelta(minutes=rnd.randint(0, 60 * 24 * 60)),
+                created_by_user_id=creator.id,
+                created_by_user=creator,
+                started_by_user_id=(rnd.choice(users).id if rnd.random() < 0.3 else None),
+                assignees=rnd.sample(users, rnd.randint(0, 3)),
+                photo_url=None,
+                photo_path=None,
+                tg_photo_file_id=("file" if rnd.random() < 0.1 else None),
+                photo_file_id=None,
+            )
+        )
+    return tasks
+
+
+def _render_per_card(tasks, *, actor_id: int, is_admin: bool, is_manager: bool) -> list[dict]:
+    out = []
+    for t in tasks:
+        view = task_card_view(t, ctx=TaskCardContext.create(actor_id=actor_id))
+        st = t.status.value
+        view["permissions"] = permissions_view(
+            task_permissions(
+                status=st,
+                actor_user_id=actor_id,
+                created_by_user_id=t.created_by_user_id,
+                assignee_user_ids=[int(u.id) for u in t.assignees],
+                started_by_user_id=t.started_by_user_id,
+                is_admin=is_admin,
+                is_manager=is_manager,
+            )
+        )
+        out.append(view)
+    return out
+
+
+def _render_batch(tasks, *, actor_id: int, is_admin: bool, is_manager: bool) -> list[dict]:
+    ctx = TaskCardContext.create(actor_id=actor_id, is_admin=is_admin, is_manager=is_manager)
+    return build_task_card_views(tasks, ctx=ctx, with_permissions=True)
+
+
+def _bench(fn, tasks, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn(tasks, actor_id=7, is_admin=False, is_manager=True)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=1000)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    tasks = _make_tasks(int(args.cards))
+    per_card = _bench(_render_per_card, tasks, int(args.rounds))
+    batch = _bench(_render_batch, tasks, int(args.rounds))
+    print(f"cards={len(tasks)} rounds={args.rounds}")
+    print(f"per-card: {per_card * 1000:.2f} ms")
+    print(f"batch:    {batch * 1000:.2f} ms ({per_card / batch if batch else 0:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.models import ScheduleMonthVersion, User
+
+
+async def schedule_month_stamp(session: AsyncSession, *, year: int, month: int) -> str:
+    """Version of everything a month payload depends on, in one round trip.
+
+    The plan/fact part is ``schedule_month_versions`` (bumped by triggers on every
+    work_shift_days / shift_instances write, whichever process makes it); names, colours and
+    statuses come from users, covered by their latest ``updated_at``.
+    """
+    version_q = (
+        select(ScheduleMonthVersion.version)
+        .where(ScheduleMonthVersion.month == date(int(year), int(month), 1))
+        .scalar_subquery()
+    )
+    users_q = select(func.max(User.updated_at)).scalar_subquery()
+    version, users_at = (await session.execute(select(version_q, users_q))).one()
+    users_part = int(users_at.timestamp() * 1000) if users_at is not None else 0
+    return f"{int(version or 0)}.{users_part}"
+
+
+def schedule_month_etag(*, year: int, month: int, target_user_id: int | None, stamp: str) -> str:
+    who = "all" if target_user_id is None else f"u{int(target_user_id)}"
+    return f'W/"sched-{int(year)}-{int(month):02d}-{who}-{stamp}"'
+
+
+def shift_coverage_etag(*, year: int, month: int, stamp: str) -> str:
+    return f'W/"coverage-{int(year)}-{int(month):02d}-{stamp}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip() for t in str(if_none_match).split(",")}
+    return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
+
+
+class ScheduleMonthCache:
+    """Per-process cache of rendered ``/api/schedule/month`` bodies keyed by (year, month, mode).
+
+    An entry is valid only for the stamp it was built with, so a stale one is simply rebuilt.
+    """
+
+    def __init__(self, *, size: int = 512):
+        self._size = int(size)
+        self._entries: OrderedDict[tuple[int, int, int | None], tuple[str, bytes]] = OrderedDict()
+
+    def get(self, key: tuple[int, int, int | None], stamp: str) -> bytes | None:
+        hit = self._entries.get(key)
+        if hit is None or hit[0] != stamp:
+            return None
+        self._entries.move_to_end(key)
+        return hit[1]
+
+    def put(self, key: tuple[int, int, int | None], stamp: str, body: bytes) -> None:
+        self._entries[key] = (stamp, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+schedule_month_cache = ScheduleMonthCache()
+# /api/schedule/coverage bodies, keyed (year, month, None) and stamped like the month payload.
+shift_coverage_cache = ScheduleMonthCache(size=64)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import calendar
+from datetime import date, time
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.enums import UserStatus
+from shared.models import ScheduleMonthVersion, ShiftInstance, User, WorkShiftDay
+
+
+MAX_RANGE_MONTHS = 12
+
+# Column order of every per-day entry in the range payload.
+RANGE_COLUMNS = ("user_idx", "kind", "start", "end", "fact_status")
+
+
+def parse_month_range(start: str, end: str) -> tuple[date, date]:
+    """``YYYY-MM`` bounds (inclusive) -> (first day of ``start``, last day of ``end``)."""
+
+    def _month(raw: str) -> tuple[int, int]:
+        try:
+            y_s, m_s = str(raw or "").strip().split("-", 1)
+            y, m = int(y_s), int(m_s)
+        except Exception:
+            raise HTTPException(status_code=422, detail="Неверный месяц")
+        if m < 1 or m > 12 or y < 2000 or y > 2100:
+            raise HTTPException(status_code=422, detail="Неверный месяц")
+        return y, m
+
+    y1, m1 = _month(start)
+    y2, m2 = _month(end)
+    months = (y2 * 12 + m2) - (y1 * 12 + m1) + 1
+    if months < 1:
+        raise HTTPException(status_code=422, detail="Неверный период")
+    if months > MAX_RANGE_MONTHS:
+        raise HTTPException(status_code=422, detail=f"Период не длиннее {MAX_RANGE_MONTHS} месяцев")
+    return date(y1, m1, 1), date(y2, m2, calendar.monthrange(y2, m2)[1])
+
+
+def _month_starts(date_from: date, date_to: date) -> list[date]:
+    out: list[date] = []
+    y, m = date_from.year, date_from.month
+    while (y, m) <= (date_to.year, date_to.month):
+        out.append(date(y, m, 1))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+async def schedule_range_stamp(session: AsyncSession, *, date_from: date, date_to: date) -> str:
+    """Like ``schedule_month_stamp`` for several months: per-month versions only grow, so their sum
+    over a fixed set of months changes on every write to any of them."""
+    versions_q = (
+        select(func.coalesce(func.sum(ScheduleMonthVersion.version), 0))
+        .where(ScheduleMonthVersion.month.in_(_month_starts(date_from, date_to)))
+        .scalar_subquery()
+    )
+    users_q = select(func.max(User.updated_at)).scalar_subquery()
+    total, users_at = (await session.execute(select(versions_q, users_q))).one()
+    users_part = int(users_at.timestamp() * 1000) if users_at is not None else 0
+    return f"{int(total or 0)}.{users_part}"
+
+
+def schedule_range_etag(*, date_from: date, date_to: date, work_only: bool, stamp: str) -> str:
+    mode = "w" if work_only else "a"
+    return f'W/"sched-range-{date_from:%Y%m}-{date_to:%Y%m}-{mode}-{stamp}"'
+
+
+def _hhmm(t: time | None) -> str | None:
+    if t is None:
+        return None
+    return f"{t.hour:02d}:{t.minute:02d}"
+
+
+def _user_name(first_name, last_name, user_id: int) -> str:
+    return " ".join([str(first_name or "").strip(), str(last_name or "").strip()]).strip() or f"User #{int(user_id)}"
+
+
+def build_range_payload(
+    *,
+    date_from: date,
+    date_to: date,
+    users: list[tuple[int, str, str]],
+    plan_rows: list[tuple[int, date, str, time | None, time | None]],
+    facts: dict[tuple[int, date], str],
+    work_start: time,
+    work_end: time,
+) -> dict:
+    """Columnar range payload: users listed once, days map to ``RANGE_COLUMNS`` tuples.
+
+    ``users`` is (id, name, color) in display order; plan rows of users not in it are ignored.
+    Facts without a plan row still show up, with ``kind`` set to null.
+    """
+    index = {int(uid): i for i, (uid, _name, _color) in enumerate(users)}
+    days: dict[str, list[list]] = {}
+    seen: set[tuple[int, date]] = set()
+
+    for uid, d, kind, start_time, end_time in plan_rows:
+        idx = index.get(int(uid))
+        if idx is None:
+            continue
+        kind = str(kind or "")
+        if kind == "work":
+            start_time, end_time = start_time or work_start, end_time or work_end
+        else:
+            start_time = end_time = None
+        seen.add((int(uid), d))
+        days.setdefault(d.isoformat(), []).append(
+            [idx, kind, _hhmm(start_time), _hhmm(end_time), facts.get((int(uid), d)) or None]
+        )
+
+    for (uid, d), fact_status in facts.items():
+        idx = index.get(int(uid))
+        if idx is None or (int(uid), d) in seen:
+            continue
+        days.setdefault(d.isoformat(), []).append([idx, None, None, None, fact_status or None])
+
+    for entries in days.values():
+        entries.sort(key=lambda e: e[0])
+    return {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "columns": list(RANGE_COLUMNS),
+        "users": [{"id": int(uid), "name": name, "color": color} for uid, name, color in users],
+        "days": dict(sorted(days.items())),
+    }
+
+
+async def load_schedule_range(
+    session: AsyncSession,
+    *,
+    date_from: date,
+    date_to: date,
+    work_only: bool,
+    work_start: time,
+    work_end: time,
+) -> dict:
+    """Schedule of all approved staff over ``date_from..date_to`` in two range queries."""
+    plan_q = (
+        select(
+            WorkShiftDay.user_id,
+            WorkShiftDay.day,
+            WorkShiftDay.kind,
+            WorkShiftDay.start_time,
+            WorkShiftDay.end_time,
+            User.first_name,
+            User.last_name,
+            User.color,
+        )
+        .join(User, User.id == WorkShiftDay.user_id)
+        .where(WorkShiftDay.day >= date_from)
+        .where(WorkShiftDay.day <= date_to)
+        .where(User.is_deleted == False)
+        .where(User.status == UserStatus.APPROVED)
+        .order_by(User.first_name, User.last_name, User.id, WorkShiftDay.day)
+    )
+    if work_only:
+        plan_q = plan_q.where(WorkShiftDay.kind == "work")
+    plan_res = (await session.execute(plan_q)).all()
+
+    fact_q = (
+        select(ShiftInstance.user_id, ShiftInstance.day, ShiftInstance.status, User.first_name, User.last_name, User.color)
+        .join(User, User.id == ShiftInstance.user_id)
+        .where(ShiftInstance.day >= date_from)
+        .where(ShiftInstance.day <= date_to)
+        .where(User.is_deleted == False)
+        .where(User.status == UserStatus.APPROVED)
+    )
+    fact_res = (await session.execute(fact_q)).all()
+
+    users: list[tuple[int, str, str]] = []
+    known: set[int] = set()
+    for uid, _d, _k, _s, _e, first_name, last_name, color in plan_res:
+        if int(uid) not in known:
+            known.add(int(uid))
+            users.append((int(uid), _user_name(first_name, last_name, uid), str(color or "#94a3b8")))
+    fact_only = sorted(
+        {(int(uid), _user_name(fn, ln, uid), str(color or "#94a3b8")) for uid, _d, _st, fn, ln, color in fact_res if int(uid) not in known},
+        key=lambda u: (u[1], u[0]),
+    )
+    users.extend(fact_only)
+
+    facts: dict[tuple[int, date], str] = {}
+    for uid, d, st, *_rest in fact_res:
+        facts[(int(uid), d)] = str(getattr(st, "value", st) or "")
+
+    return build_range_payload(
+        date_from=date_from,
+        date_to=date_to,
+        users=users,
+        plan_rows=[(int(r[0]), r[1], r[2], r[3], r[4]) for r in plan_res],
+        facts=facts,
+        work_start=work_start,
+        work_end=work_end,
+    )
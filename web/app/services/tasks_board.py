@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+from shared.services.task_permissions import (
+    TaskPermissionSubject,
+    TaskPermissions,
+    task_permissions_many,
+)
+from shared.utils import MOSCOW_TZ, format_moscow, utc_now
+
+
+@dataclass
+class TaskCardContext:
+    """Values shared by every card of one board render (computed once per request).
+
+    Moscow has kept a fixed UTC offset since 2014, so the offset is resolved once and
+    applied to every card timestamp instead of a zoneinfo conversion per value.
+    """
+
+    now: datetime
+    actor_id: int | None = None
+    is_admin: bool = False
+    is_manager: bool = False
+    msk_offset: timedelta = field(default_factory=lambda: timedelta(hours=3))
+    _user_names: dict[int, str] = field(default_factory=dict)
+    _user_views: dict[int, dict] = field(default_factory=dict)
+
+    @classmethod
+    def create(
+        cls,
+        *,
+        actor_id: int | None = None,
+        is_admin: bool = False,
+        is_manager: bool = False,
+        now: datetime | None = None,
+    ) -> "TaskCardContext":
+        now = now or utc_now()
+        offset = MOSCOW_TZ.utcoffset(now.replace(tzinfo=None)) or timedelta(hours=3)
+        return cls(
+            now=now,
+            actor_id=(int(actor_id) if actor_id is not None else None),
+            is_admin=bool(is_admin),
+            is_manager=bool(is_manager),
+            msk_offset=offset,
+        )
+
+    def user_name(self, u: Any) -> str:
+        uid = int(getattr(u, "id", 0) or 0)
+        name = self._user_names.get(uid)
+        if name is None:
+            name = (
+                f"{(getattr(u, 'first_name', None) or '').strip()} {(getattr(u, 'last_name', None) or '').strip()}".strip()
+                or f"#{uid}"
+            )
+            self._user_names[uid] = name
+        return name
+
+    def assignee_view(self, u: Any) -> dict:
+        uid = int(getattr(u, "id", 0) or 0)
+        view = self._user_views.get(uid)
+        if view is None:
+            view = {
+                "id": uid,
+                "first_name": (getattr(u, "first_name", None) or None),
+                "last_name": (getattr(u, "last_name", None) or None),
+                "color": (getattr(u, "color", None) or None),
+            }
+            self._user_views[uid] = view
+        # Cards are mutated by callers (e.g. archive adds fields), never share dicts.
+        return dict(view)
+
+    def format_msk(self, dt: datetime | None) -> str:
+        if dt is None:
+            return ""
+        if dt.tzinfo is not timezone.utc:
+            # Not a plain UTC timestamp (naive or another zone): use the generic path.
+            if dt.tzinfo is not None and dt.utcoffset() != timedelta(0):
+                return format_moscow(dt, "%d.%m.%Y %H:%M")
+        d = dt.replace(tzinfo=None) + self.msk_offset
+        return f"{d.day:02d}.{d.month:02d}.{d.year:04d} {d.hour:02d}:{d.minute:02d}"
+
+
+def _enum_value(v: Any) -> str:
+    return v.value if hasattr(v, "value") else str(v)
+
+
+def _ts(dt: datetime | None) -> int | None:
+    if dt is None:
+        return None
+    try:
+        return int(dt.timestamp())
+    except Exception:
+        return None
+
+
+def permissions_view(perms: TaskPermissions) -> dict:
+    return {
+        "take_in_progress": bool(perms.take_in_progress),
+        "finish_to_review": bool(perms.finish_to_review),
+        "accept_done": bool(perms.accept_done),
+        "send_back": bool(perms.send_back),
+        "archive": bool(perms.archive),
+        "unarchive": bool(perms.unarchive),
+        "comment": bool(perms.comment),
+    }
+
+
+def task_card_view(t: Any, *, ctx: TaskCardContext) -> dict:
+    assignees = list(getattr(t, "assignees", None) or [])
+    assignees_str = ", ".join([ctx.user_name(u) for u in assignees])
+    assignees_view = [ctx.assignee_view(u) for u in assignees]
+
+    is_assigned_to_me = False
+    if ctx.actor_id is not None:
+        is_assigned_to_me = any(int(u.id) == ctx.actor_id for u in assignees)
+
+    due_at_utc = getattr(t, "due_at", None)
+    created_at_utc = getattr(t, "created_at", None)
+
+    created_by = getattr(t, "created_by_user", None)
+    created_by_str = ""
+    created_by_view: dict | None = None
+    if created_by is not None:
+        created_by_str = ctx.user_name(created_by)
+        created_by_view = {
+            "id": int(getattr(created_by, "id", 0) or 0),
+            "name": created_by_str,
+            "color": (getattr(created_by, "color", None) or None),
+        }
+
+    # Attachment indicator (reuse the same effective photo logic as in detail modal)
+    photo_url = str(getattr(t, "photo_url", "") or "").strip()
+    photo_path = str(getattr(t, "photo_path", "") or "").strip()
+    tg_photo_file_id = str(getattr(t, "tg_photo_file_id", "") or getattr(t, "photo_file_id", "") or "").strip()
+    proxy_photo_url = f"/crm/tasks/{int(t.id)}/photo" if tg_photo_file_id else ""
+    attachment_url = photo_url or photo_path or proxy_photo_url
+
+    return {
+        "id": int(t.id),
+        "title": t.title,
+        "description": (str(getattr(t, "description", "") or "").strip() or None),
+        "priority": _enum_value(t.priority),
+        "status": _enum_value(t.status),
+        "due_at_str": ctx.format_msk(due_at_utc) if due_at_utc else "",
+        "due_at_ts": _ts(due_at_utc),
+        "created_at_str": ctx.format_msk(created_at_utc),
+        "created_at_ts": _ts(created_at_utc),
+        "created_by_str": created_by_str,
+        "created_by": created_by_view,
+        "assignees": assignees_view,
+        "assignees_str": assignees_str,
+        "is_assigned_to_me": is_assigned_to_me,
+        "is_overdue": bool(due_at_utc and due_at_utc < ctx.now),
+        "has_attachment": bool(attachment_url),
+        "attachment_url": attachment_url or None,
+        "permissions": None,
+    }
+
+
+def _permission_subject(t: Any) -> TaskPermissionSubject:
+    started_by = getattr(t, "started_by_user_id", None)
+    return TaskPermissionSubject(
+        status=_enum_value(t.status),
+        created_by_user_id=int(getattr(t, "created_by_user_id", 0) or 0) or None,
+        assignee_user_ids=tuple(int(u.id) for u in (getattr(t, "assignees", None) or [])),
+        started_by_user_id=(int(started_by) if started_by is not None else None),
+    )
+
+
+def build_task_card_views(
+    tasks: Iterable[Any],
+    *,
+    ctx: TaskCardContext,
+    with_permissions: bool = False,
+) -> list[dict]:
+    """Build board card views for many tasks, sharing per-request work across cards.
+
+    When ``with_permissions`` is set, the actor's permissions are evaluated for the whole
+    set in one pass and stored under ``"permissions"`` of every card.
+    """
+    tasks = list(tasks)
+    views = [task_card_view(t, ctx=ctx) for t in tasks]
+    if with_permissions and ctx.actor_id is not None:
+        perms = task_permissions_many(
+            subjects=[_permission_subject(t) for t in tasks],
+            actor_user_id=ctx.actor_id,
+            is_admin=ctx.is_admin,
+            is_manager=ctx.is_manager,
+        )
+        views_by_perm: dict[TaskPermissions, dict] = {}
+        for v, p in zip(views, perms):
+            pv = views_by_perm.get(p)
+            if pv is None:
+                pv = permissions_view(p)
+                views_by_perm[p] = pv
+            v["permissions"] = dict(pv)
+    return views